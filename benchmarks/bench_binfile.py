@@ -0,0 +1,95 @@
+"""
+Compare the time and peak memory used to read an EPANET binary output file
+with BinFile.read, one report period at a time with BinFile.read_periods, and
+with the memory mapped LazyBinFile.
+
+A long simulation (with water quality, so every attribute has values) is run
+once with the EpanetSimulator. The file is then read:
+
+* entirely with BinFile.read
+* one period at a time with BinFile.read_periods, keeping only the minimum
+  pressure of each period
+* entirely with LazyBinFile.read
+* for one attribute (pressure) with LazyBinFile.node_values
+* for one attribute, 10 nodes and the last day with LazyBinFile.node_values
+
+Peak memory is measured with tracemalloc, which counts the NumPy and pandas
+allocations but not the pages of the mapped file.
+
+Usage::
+
+    python benchmarks/bench_binfile.py --network Net6 --days 7
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+from os.path import abspath, dirname, join
+
+import pandas as pd
+import wntr
+from wntr.epanet.io import BinFile, LazyBinFile
+
+ex_datadir = join(dirname(abspath(__file__)), "..", "examples", "networks")
+
+
+def measure(func):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    result = func()
+    total = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return total, peak / 2**20
+
+
+def min_pressures(binfile):
+    return [nodes["pressure"].min() for t, nodes, links in
+            BinFile().read_periods(binfile, node_attributes=["pressure"], link_attributes=[])]
+
+
+def read_all(binfile):
+    with LazyBinFile(binfile) as f:
+        return f.read()
+
+
+def read_pressure(binfile):
+    with LazyBinFile(binfile) as f:
+        return f.node_values("pressure")
+
+
+def read_selection(binfile):
+    with LazyBinFile(binfile) as f:
+        return f.node_values("pressure", names=f.node_names[:10], start=f.report_times[-1] - 24 * 3600)
+
+
+def run(name, days, tmpdir):
+    wn = wntr.network.WaterNetworkModel(join(ex_datadir, name + ".inp"))
+    wn.options.time.duration = days * 24 * 3600
+    wn.options.quality.parameter = "AGE"
+    prefix = join(tmpdir, "temp")
+    wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=prefix)
+    binfile = prefix + ".bin"
+    rows = []
+    for label, func in [("BinFile.read", BinFile().read),
+                        ("BinFile.read_periods, min pressure", min_pressures),
+                        ("LazyBinFile.read", read_all),
+                        ("LazyBinFile pressure", read_pressure),
+                        ("LazyBinFile pressure, 10 nodes, 1 day", read_selection)]:
+        rows.append((label,) + measure(lambda: func(binfile)))
+    df = pd.DataFrame(rows, columns=["reader", "time (s)", "peak memory (MiB)"])
+    return df, os.path.getsize(binfile) / 2**20
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--network", default="Net6", help="name of the example network")
+    parser.add_argument("--days", type=int, default=7, help="duration of the simulation")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        df, size = run(args.network, args.days, tmpdir)
+    print("binary output file: {0:.1f} MiB".format(size))
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.precision", 3):
+        print(df)
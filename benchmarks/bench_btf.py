@@ -0,0 +1,75 @@
+"""
+Compare the NewtonSolver with the BlockTriangularSolver (Newton's method on
+the stages of the block triangular form of the hydraulic system) on the
+bundled example networks.
+
+For each network and demand model, the size of the core (the largest
+diagonal block) is reported together with the size of the full system and
+the sizes of the stages solved before and after the core. The time spent in
+the solver is taken from the profile of WNTRSimulator.run_sim.
+
+Usage::
+
+    python benchmarks/bench_btf.py --hours 24 --networks Net3 ky4 Net6
+"""
+import argparse
+import time
+from os.path import abspath, dirname, join
+
+import numpy as np
+import pandas as pd
+import wntr
+from wntr.sim.solvers import BlockTriangularForm, BlockTriangularSolver, NewtonSolver
+
+ex_datadir = join(dirname(abspath(__file__)), "..", "examples", "networks")
+
+
+def block_form(wn):
+    m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn)
+    m.set_structure()
+    t0 = time.perf_counter()
+    form = BlockTriangularForm(m.evaluate_jacobian())
+    return form, time.perf_counter() - t0
+
+
+def time_solver(inp_file, hours, mode, solver):
+    wn = wntr.network.WaterNetworkModel(inp_file)
+    wn.options.time.duration = hours * 3600
+    wn.options.hydraulic.demand_model = mode
+    t0 = time.perf_counter()
+    results = wntr.sim.WNTRSimulator(wn).run_sim(solver=solver, profile=True)
+    total = time.perf_counter() - t0
+    return total, results.profile["solve"].sum(), int(results.profile["iterations"].sum()), results
+
+
+def run(networks, hours, modes):
+    rows = []
+    for name in networks:
+        inp_file = join(ex_datadir, name + ".inp")
+        for mode in modes:
+            wn = wntr.network.WaterNetworkModel(inp_file)
+            wn.options.hydraulic.demand_model = mode
+            form, analysis_time = block_form(wn)
+            start = form.block_ptr[form.core]
+            end = form.block_ptr[form.core + 1]
+            newton_total, newton_solve, newton_iter, newton_res = time_solver(inp_file, hours, mode, NewtonSolver)
+            btf_total, btf_solve, btf_iter, btf_res = time_solver(inp_file, hours, mode, BlockTriangularSolver)
+            head_diff = np.abs(newton_res.node["head"] - btf_res.node["head"]).max().max()
+            rows.append((name, mode, form.size, form.core_size, start, form.size - end, form.num_blocks,
+                         analysis_time, newton_iter, btf_iter, newton_solve, btf_solve, newton_total, btf_total,
+                         head_diff))
+    return pd.DataFrame(rows, columns=["network", "mode", "n (full)", "n (core)", "n (before core)",
+                                       "n (after core)", "blocks", "analysis (s)", "newton iterations",
+                                       "btf iterations", "newton solve (s)", "btf solve (s)", "newton total (s)",
+                                       "btf total (s)", "max head difference (m)"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--networks", nargs="*", default=["Net1", "Net2", "Net3", "ky4", "Net6"],
+                        help="names of the example networks")
+    parser.add_argument("--hours", type=int, default=24, help="duration of the simulations")
+    parser.add_argument("--modes", nargs="*", default=["DD", "PDD"], help="demand models")
+    args = parser.parse_args()
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.precision", 3):
+        print(run(args.networks, args.hours, args.modes))
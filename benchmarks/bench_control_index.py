@@ -0,0 +1,96 @@
+"""
+Compare the time spent checking controls in the WNTRSimulator with and
+without the event index of the ControlChecker (run_sim(index_controls=...)).
+
+Thousands of controls are added to each network: time controls that open
+pipes at random hydraulic timesteps, and conditional controls on junction
+pressures and tank levels. The thresholds of the conditional controls are
+chosen so that only some of them are activated. The time spent in the
+presolve, postsolve and feasibility control phases is taken from the profile
+of WNTRSimulator.run_sim, and the results with and without the index are
+checked to be identical.
+
+Usage::
+
+    python benchmarks/bench_control_index.py --hours 24 --networks Net3 ky4 --controls 1000 5000
+"""
+import argparse
+import time
+from os.path import abspath, dirname, join
+
+import numpy as np
+import pandas as pd
+import wntr
+from wntr.network.controls import Comparison, Control, ControlAction
+from wntr.network import LinkStatus
+
+ex_datadir = join(dirname(abspath(__file__)), "..", "examples", "networks")
+control_phases = ["presolve_controls", "postsolve_controls", "feasibility_controls"]
+
+
+def build_network(name, hours, num_controls, seed=0):
+    wn = wntr.network.WaterNetworkModel(join(ex_datadir, name + ".inp"))
+    wn.options.time.duration = hours * 3600
+    rng = np.random.default_rng(seed)
+    pipes = wn.pipe_name_list
+    junctions = wn.junction_name_list
+    tanks = wn.tank_name_list
+    num_steps = int(hours * 3600 // wn.options.time.hydraulic_timestep)
+    for i in range(num_controls):
+        pipe = wn.get_link(pipes[rng.integers(len(pipes))])
+        action = ControlAction(pipe, "status", LinkStatus.Open)
+        kind = i % 3
+        if kind == 0:
+            t = int(rng.integers(1, num_steps + 1)) * wn.options.time.hydraulic_timestep
+            control = Control._time_control(wn, t, "SIM_TIME", False, action)
+        elif kind == 1 or len(tanks) == 0:
+            junction = wn.get_node(junctions[rng.integers(len(junctions))])
+            control = Control._conditional_control(junction, "pressure", Comparison.lt,
+                                                   float(rng.uniform(-50.0, 20.0)), action)
+        else:
+            tank = wn.get_node(tanks[rng.integers(len(tanks))])
+            level = float(rng.uniform(tank.min_level - 5.0, tank.min_level + 0.5))
+            control = Control._conditional_control(tank, "level", Comparison.le, level, action)
+        wn.add_control("bench{0}".format(i), control)
+    return wn
+
+
+def time_run(name, hours, num_controls, index_controls):
+    wn = build_network(name, hours, num_controls)
+    t0 = time.perf_counter()
+    results = wntr.sim.WNTRSimulator(wn).run_sim(profile=True, index_controls=index_controls)
+    total = time.perf_counter() - t0
+    return total, results.profile[control_phases].sum().sum(), results
+
+
+def identical(results1, results2):
+    if results1.time != results2.time:
+        return False
+    for res1, res2 in [(results1.node, results2.node), (results1.link, results2.link)]:
+        for key in res1.keys():
+            if not np.array_equal(res1[key].values, res2[key].values, equal_nan=True):
+                return False
+    return True
+
+
+def run(networks, hours, num_controls):
+    rows = []
+    for name in networks:
+        for n in num_controls:
+            polled_total, polled_controls, polled_res = time_run(name, hours, n, False)
+            indexed_total, indexed_controls, indexed_res = time_run(name, hours, n, True)
+            rows.append((name, n, polled_controls, indexed_controls, polled_total, indexed_total,
+                         identical(polled_res, indexed_res)))
+    return pd.DataFrame(rows, columns=["network", "controls", "polled controls (s)", "indexed controls (s)",
+                                       "polled total (s)", "indexed total (s)", "identical"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--networks", nargs="*", default=["Net3", "ky4"], help="names of the example networks")
+    parser.add_argument("--hours", type=int, default=24, help="duration of the simulations")
+    parser.add_argument("--controls", nargs="*", type=int, default=[0, 1000, 5000],
+                        help="numbers of controls added to each network")
+    args = parser.parse_args()
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.precision", 3):
+        print(run(args.networks, args.hours, args.controls))
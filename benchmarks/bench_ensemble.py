@@ -0,0 +1,80 @@
+"""
+Measure how an ensemble of EPANET simulations scales with the number of
+worker processes of the EnsembleEpanetSimulator.
+
+Each scenario adds a fire fighting demand at a random junction of the network.
+The ensemble is run with a plain loop of EpanetSimulator.run_sim calls (one
+INP file per run, in a temporary directory), serially in this process, and in
+pools with an increasing number of workers. The time to start the pool is
+included. The speedup is relative to the serial ensemble and is bounded by the
+number of CPUs, which is printed with the results.
+
+Usage::
+
+    python benchmarks/bench_ensemble.py --network Net3 --hours 24 --scenarios 200 --workers 1 2 4 8
+"""
+import argparse
+import functools
+import os
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+import numpy as np
+import pandas as pd
+import wntr
+
+ex_datadir = join(dirname(abspath(__file__)), "..", "examples", "networks")
+
+
+def add_fire_flow(wn, name, demand):
+    wn.get_node(name).add_fire_fighting_demand(wn, demand, 0, wn.options.time.duration)
+
+
+def build_scenarios(wn, num_scenarios, seed=0):
+    rng = np.random.default_rng(seed)
+    junctions = wn.junction_name_list
+    return [functools.partial(add_fire_flow, name=junctions[rng.integers(len(junctions))],
+                              demand=float(rng.uniform(0.01, 0.1))) for i in range(num_scenarios)]
+
+
+def time_loop(name, hours, scenarios):
+    t0 = time.perf_counter()
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for scenario in scenarios:
+            wn = wntr.network.WaterNetworkModel(join(ex_datadir, name + ".inp"))
+            wn.options.time.duration = hours * 3600
+            scenario(wn)
+            wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=join(tmpdir, "temp"))
+    return time.perf_counter() - t0
+
+
+def run(name, hours, num_scenarios, workers):
+    wn = wntr.network.WaterNetworkModel(join(ex_datadir, name + ".inp"))
+    wn.options.time.duration = hours * 3600
+    scenarios = build_scenarios(wn, num_scenarios)
+    sim = wntr.sim.EnsembleEpanetSimulator(wn)
+    rows = [("loop of EpanetSimulator", time_loop(name, hours, scenarios))]
+    t0 = time.perf_counter()
+    sim.run_ensemble(scenarios)
+    rows.append(("serial ensemble", time.perf_counter() - t0))
+    for processes in workers:
+        t0 = time.perf_counter()
+        sim.run_ensemble(scenarios, processes=processes)
+        rows.append(("{0} workers".format(processes), time.perf_counter() - t0))
+    df = pd.DataFrame(rows, columns=["mode", "time (s)"])
+    df["scenarios/s"] = num_scenarios / df["time (s)"]
+    df["speedup"] = df["time (s)"].iloc[1] / df["time (s)"]
+    return df
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--network", default="Net3", help="name of the example network")
+    parser.add_argument("--hours", type=int, default=24, help="duration of the simulations")
+    parser.add_argument("--scenarios", type=int, default=200, help="number of scenarios")
+    parser.add_argument("--workers", nargs="*", type=int, default=[1, 2, 4, 8], help="numbers of worker processes")
+    args = parser.parse_args()
+    print("CPUs: {0}".format(os.cpu_count()))
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.precision", 3):
+        print(run(args.network, args.hours, args.scenarios, args.workers))
@@ -0,0 +1,92 @@
+"""
+Compare EpanetSimulator runs that write and read an INP file every time with
+runs that keep the EPANET project open and push only the changes made to the
+model (run_sim(reuse_project=True)), and with an EpanetSession, which also
+reads the results from the toolkit instead of the binary output file.
+
+A pipe criticality loop is run on each network: one pipe is closed per
+simulation and opened again afterwards (simulations that fail, e.g., because
+the closure disconnects part of the network, are skipped). The total time of
+the loop is reported for both modes, together with the largest relative
+pressure difference between them. Where a closure disconnects part of a
+network, the pressures reach thousands of meters and depend on the rounding
+of the values written to the INP file.
+
+Usage::
+
+    python benchmarks/bench_epanet_reuse.py --hours 0 24 --networks Net3 ky4 Net6 --pipes 50
+"""
+import argparse
+import tempfile
+import time
+from os.path import abspath, dirname, join
+
+import numpy as np
+import pandas as pd
+import wntr
+from wntr.epanet.project import EpanetSession
+from wntr.network import LinkStatus
+
+ex_datadir = join(dirname(abspath(__file__)), "..", "examples", "networks")
+
+
+def time_loop(name, hours, num_pipes, mode, file_prefix):
+    wn = wntr.network.WaterNetworkModel(join(ex_datadir, name + ".inp"))
+    wn.options.time.duration = hours * 3600
+    pipes = wn.pipe_name_list[:num_pipes]
+    pressures = []
+    t0 = time.perf_counter()
+    if mode == "session":
+        sim = EpanetSession(wn, node_attributes=["pressure"], link_attributes=[])
+        run = lambda: sim.solve(wn)
+    else:
+        sim = wntr.sim.EpanetSimulator(wn)
+        run = lambda: sim.run_sim(file_prefix=file_prefix, reuse_project=mode == "reuse")
+    for pipe_name in pipes:
+        pipe = wn.get_link(pipe_name)
+        status = pipe.initial_status
+        pipe.initial_status = LinkStatus.Closed
+        try:
+            results = run()
+            pressures.append(results.node["pressure"].values)
+        except Exception:
+            # closing some pipes disconnects part of the network
+            pressures.append(None)
+        pipe.initial_status = status
+    total = time.perf_counter() - t0
+    if mode == "session":
+        sim.close()
+    else:
+        sim.close_project()
+    return total, pressures
+
+
+def max_difference(pressures1, pressures2):
+    return max((np.abs(p1 - p2) / np.maximum(1.0, np.abs(p1))).max()
+               for p1, p2 in zip(pressures1, pressures2) if p1 is not None and p2 is not None)
+
+
+def run(networks, hours, num_pipes):
+    rows = []
+    with tempfile.TemporaryDirectory() as tmpdir:
+        prefix = join(tmpdir, "temp")
+        for name in networks:
+            for h in hours:
+                file_total, file_pressures = time_loop(name, h, num_pipes, "file", prefix)
+                reuse_total, reuse_pressures = time_loop(name, h, num_pipes, "reuse", prefix)
+                session_total, session_pressures = time_loop(name, h, num_pipes, "session", prefix)
+                rows.append((name, h, len(file_pressures), file_total, reuse_total, session_total,
+                             max(max_difference(file_pressures, reuse_pressures),
+                                 max_difference(file_pressures, session_pressures))))
+    return pd.DataFrame(rows, columns=["network", "hours", "runs", "INP file (s)", "reuse project (s)", "session (s)",
+                                       "max relative pressure difference"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--networks", nargs="*", default=["Net3", "ky4", "Net6"], help="names of the example networks")
+    parser.add_argument("--hours", nargs="*", type=int, default=[0, 24], help="durations of the simulations")
+    parser.add_argument("--pipes", type=int, default=50, help="number of pipes closed, one per simulation")
+    args = parser.parse_args()
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.precision", 3):
+        print(run(args.networks, args.hours, args.pipes))
@@ -0,0 +1,97 @@
+"""
+Compare the RPN evaluator of wntr.sim.aml with the vectorized evaluator
+(wntr.sim.models.vectorized) on the bundled Net3 and ky10 networks and on
+synthetic grid networks.
+
+Usage::
+
+    python benchmarks/bench_evaluator.py --grid 20 50 100 --repeat 20
+"""
+import argparse
+import time
+from os.path import abspath, dirname, join
+
+import numpy as np
+import pandas as pd
+import wntr
+from wntr.sim.models.vectorized import VectorizedHydraulicModel
+
+ex_datadir = join(dirname(abspath(__file__)), "..", "examples", "networks")
+
+
+def grid_network(n, length=100.0, diameter=0.3, roughness=100.0, base_demand=0.0005):
+    """
+    Build an n x n grid of junctions fed by a reservoir connected to one corner.
+    """
+    wn = wntr.network.WaterNetworkModel()
+    for i in range(n):
+        for j in range(n):
+            wn.add_junction("J{0}_{1}".format(i, j), base_demand=base_demand, elevation=0.0)
+    for i in range(n):
+        for j in range(n):
+            if i + 1 < n:
+                wn.add_pipe("PV{0}_{1}".format(i, j), "J{0}_{1}".format(i, j), "J{0}_{1}".format(i + 1, j),
+                            length=length, diameter=diameter, roughness=roughness)
+            if j + 1 < n:
+                wn.add_pipe("PH{0}_{1}".format(i, j), "J{0}_{1}".format(i, j), "J{0}_{1}".format(i, j + 1),
+                            length=length, diameter=diameter, roughness=roughness)
+    wn.add_reservoir("R", base_head=100.0)
+    wn.add_pipe("PR", "R", "J0_0", length=length, diameter=2 * diameter, roughness=roughness)
+    wn.options.time.duration = 0
+    return wn
+
+
+def time_evaluations(model, repeat):
+    model.set_structure()
+    x = model.get_x()
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        model.evaluate_residuals(x)
+    t_res = (time.perf_counter() - t0) / repeat
+    t0 = time.perf_counter()
+    for i in range(repeat):
+        model.evaluate_jacobian(x)
+    t_jac = (time.perf_counter() - t0) / repeat
+    return t_res, t_jac
+
+
+def time_snapshot(wn_factory, evaluator):
+    wn = wn_factory()
+    wn.options.time.duration = 0
+    sim = wntr.sim.WNTRSimulator(wn)
+    t0 = time.perf_counter()
+    results = sim.run_sim(evaluator=evaluator)
+    return time.perf_counter() - t0, int(results.solver_statistics["iterations"].sum())
+
+
+def run(grid_sizes, repeat):
+    cases = [
+        ("Net3", lambda: wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))),
+        ("ky10", lambda: wntr.network.WaterNetworkModel(join(ex_datadir, "ky10.inp"))),
+    ]
+    for n in grid_sizes:
+        cases.append(("grid{0}x{0}".format(n), lambda n=n: grid_network(n)))
+
+    rows = []
+    for name, wn_factory in cases:
+        wn = wn_factory()
+        m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn)
+        vm = VectorizedHydraulicModel(m, wn)
+        rpn_res, rpn_jac = time_evaluations(m, repeat)
+        vec_res, vec_jac = time_evaluations(vm, repeat)
+        rpn_sim, rpn_iter = time_snapshot(wn_factory, "rpn")
+        vec_sim, vec_iter = time_snapshot(wn_factory, "vectorized")
+        rows.append((name, len(vm.get_x()), rpn_res * 1e3, vec_res * 1e3, rpn_jac * 1e3, vec_jac * 1e3,
+                     rpn_sim, vec_sim, rpn_iter, vec_iter))
+    return pd.DataFrame(rows, columns=["network", "n", "rpn residuals (ms)", "vectorized residuals (ms)",
+                                       "rpn jacobian (ms)", "vectorized jacobian (ms)", "rpn snapshot (s)",
+                                       "vectorized snapshot (s)", "rpn iterations", "vectorized iterations"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grid", type=int, nargs="*", default=[20, 50, 100], help="sizes of the grid networks")
+    parser.add_argument("--repeat", type=int, default=20, help="number of evaluations to time")
+    args = parser.parse_args()
+    with pd.option_context("display.width", 200, "display.max_columns", 20, "display.precision", 3):
+        print(run(args.grid, args.repeat))
@@ -0,0 +1,70 @@
+"""
+Compare the NewtonSolver with the GGASolver (Newton steps computed from the
+reduced system in the junction heads) on the bundled example networks.
+
+The time spent in the solver (evaluating the model and solving the linear
+systems) is taken from the profile of WNTRSimulator.run_sim. Both solvers
+take the same Newton steps, so the number of iterations and the results are
+the same up to rounding.
+
+Usage::
+
+    python benchmarks/bench_gga.py --hours 24 --networks Net3 ky4 Net6
+"""
+import argparse
+import time
+from os.path import abspath, dirname, join
+
+import numpy as np
+import pandas as pd
+import wntr
+from wntr.sim.solvers import EliminationLayout, GGASolver, NewtonSolver
+
+ex_datadir = join(dirname(abspath(__file__)), "..", "examples", "networks")
+
+
+def system_sizes(wn):
+    m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn)
+    m.set_structure()
+    J = m.evaluate_jacobian()
+    rows, cols = wntr.sim.hydraulics.GGAPartition(m).get_pairs()
+    return J.shape[0], EliminationLayout(J, rows, cols).num_reduced
+
+
+def time_solver(inp_file, hours, mode, solver):
+    wn = wntr.network.WaterNetworkModel(inp_file)
+    wn.options.time.duration = hours * 3600
+    wn.options.hydraulic.demand_model = mode
+    t0 = time.perf_counter()
+    results = wntr.sim.WNTRSimulator(wn).run_sim(solver=solver, profile=True)
+    total = time.perf_counter() - t0
+    return total, results.profile["solve"].sum(), int(results.profile["iterations"].sum()), results
+
+
+def run(networks, hours, modes):
+    rows = []
+    for name in networks:
+        inp_file = join(ex_datadir, name + ".inp")
+        for mode in modes:
+            wn = wntr.network.WaterNetworkModel(inp_file)
+            wn.options.hydraulic.demand_model = mode
+            n_full, n_reduced = system_sizes(wn)
+            newton_total, newton_solve, newton_iter, newton_res = time_solver(inp_file, hours, mode, NewtonSolver)
+            gga_total, gga_solve, gga_iter, gga_res = time_solver(inp_file, hours, mode, GGASolver)
+            head_diff = np.abs(newton_res.node["head"] - gga_res.node["head"]).max().max()
+            rows.append((name, mode, n_full, n_reduced, newton_iter, gga_iter, newton_solve, gga_solve,
+                         newton_solve / gga_solve, newton_total, gga_total, head_diff))
+    return pd.DataFrame(rows, columns=["network", "mode", "n (full)", "n (reduced)", "newton iterations",
+                                       "gga iterations", "newton solve (s)", "gga solve (s)", "solve speedup",
+                                       "newton total (s)", "gga total (s)", "max head difference (m)"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--networks", nargs="*", default=["Net1", "Net2", "Net3", "ky4", "Net6"],
+                        help="names of the example networks")
+    parser.add_argument("--hours", type=int, default=24, help="duration of the simulations")
+    parser.add_argument("--modes", nargs="*", default=["DD", "PDD"], help="demand models")
+    args = parser.parse_args()
+    with pd.option_context("display.width", 250, "display.max_columns", 20, "display.precision", 3):
+        print(run(args.networks, args.hours, args.modes))
@@ -3,4 +3,4 @@ The wntr.epanet package provides EPANET2 compatibility functions for WNTR.
 """
 from .io import InpFile  #, BinFile, HydFile, RptFile
 from .util import FlowUnits, MassUnits, HydParam, QualParam, EN
-from . import toolkit, io, util, exceptions, msx
+from . import toolkit, io, util, exceptions, msx, project
@@ -10,6 +10,7 @@ import logging
 import os
 import re
 import sys
+import time
 import warnings
 from collections import OrderedDict
 
@@ -2863,6 +2864,508 @@ class BinFile(object):
         
         return self.results
 
+    def read_periods(self, filename, convergence_error=False, darcy_weisbach=False, convert=True,
+                     node_attributes=None, link_attributes=None, timeout=None, poll_interval=0.1):
+        """Read a binary file one report period at a time.
+
+        This is a generator: each report period is read, converted and
+        yielded as soon as its fixed-size record is in the file, and the
+        results of the other periods are never held in memory. With a timeout,
+        the file is followed while EPANET is still writing it, so that the
+        first periods of a long simulation can be processed while the later
+        ones are being solved (remove the file of a previous simulation
+        before it starts, or its periods will be read instead).
+
+        If the file ends before the last report period (or does not grow
+        within the timeout), the simulation did not converge: an error is
+        raised if convergence_error is True, otherwise a warning is issued,
+        results.error_code is set and the generator stops. The reader
+        attributes (node_names, link_names, report_times, flow_units, etc.)
+        are set when the prolog has been read.
+
+        Parameters
+        ----------
+        filename : str
+            An EPANET BIN output file
+        convergence_error: bool (optional)
+            If convergence_error is True, an error will be raised if the
+            simulation does not converge. If convergence_error is False, the periods
+            before the failure are yielded, a warning will be issued, and
+            results.error_code will be set if the simulation does not converge.
+            Default = False.
+        darcy_weisbach : bool (optional)
+            Set to True if the Darcy-Weisbach headloss formula was used, to convert
+            pipe settings (roughness coefficients). Default = False.
+        convert : bool (optional)
+            Convert the values of each period to SI units. Default = True.
+        node_attributes, link_attributes : list of str (optional)
+            The attributes to read, by default all of them (see
+            :class:`LazyBinFile`).
+        timeout : float (optional)
+            The number of seconds to wait for the file to be created or to
+            grow before it is considered incomplete. If None (default), the
+            file is read as it is.
+        poll_interval : float (optional)
+            The number of seconds between checks of the size of the file
+            while waiting for it. Default = 0.1.
+
+        Yields
+        ------
+        time : int
+            The report time, in seconds
+        node_values : dict
+            {attribute: numpy.array of the values of the nodes, in the order of node_names}
+        link_values : dict
+            {attribute: numpy.array of the values of the links, in the order of link_names}
+
+        Examples
+        --------
+        >>> reader = BinFile()
+        >>> for t, nodes, links in reader.read_periods('temp.bin', node_attributes=['pressure'],
+        ...                                            link_attributes=[]):    # doctest: +SKIP
+        ...     min_pressure = nodes['pressure'].min()
+        """
+        node_attributes = _BINFILE_NODE_RESULTS if node_attributes is None else list(node_attributes)
+        link_attributes = _BINFILE_LINK_RESULTS if link_attributes is None else list(link_attributes)
+        for attribute in node_attributes:
+            if attribute not in _BINFILE_NODE_RESULTS:
+                raise ValueError('Unrecognized node attribute: {0}. Options are {1}.'.format(
+                    attribute, _BINFILE_NODE_RESULTS))
+        for attribute in link_attributes:
+            if attribute not in _BINFILE_LINK_RESULTS:
+                raise ValueError('Unrecognized link attribute: {0}. Options are {1}.'.format(
+                    attribute, _BINFILE_LINK_RESULTS))
+        self.results = wntr.sim.SimulationResults()
+        self.results.error_code = None
+        ftype = np.dtype(self.ftype)
+        deadline = [None if timeout is None else time.monotonic() + timeout]
+
+        def wait():
+            # sleep and return True if the file may still grow
+            if deadline[0] is None or time.monotonic() >= deadline[0]:
+                return False
+            time.sleep(poll_interval)
+            return True
+
+        logger.debug('Stream binary EPANET data from %s', filename)
+        while True:
+            try:
+                fin = open(filename, 'rb')
+                break
+            except FileNotFoundError:
+                if not wait():
+                    raise
+        with fin:
+            while True:
+                try:
+                    header = _read_binfile_prolog(fin, ftype, self.idlen)
+                    break
+                except EOFError:
+                    if not wait():
+                        raise
+                    fin.seek(0)
+            for key in ['flow_units', 'pres_units', 'mass_units', 'quality_type', 'num_nodes', 'num_tanks',
+                        'num_links', 'num_pumps', 'num_valves', 'report_start', 'report_step', 'duration',
+                        'chemical', 'chem_units', 'inp_file', 'report_file', 'peak_energy', 'report_times']:
+                setattr(self, key, header[key])
+            self.node_names = np.array(header['node_names'])
+            self.link_names = np.array(header['link_names'])
+            self.num_periods = len(self.report_times)
+            self.results.network_name = self.inp_file
+            nnodes, nlinks = self.num_nodes, self.num_links
+            link_types = header['link_types']
+            nodes = [(attribute, slice(i * nnodes, (i + 1) * nnodes))
+                     for i, attribute in enumerate(_BINFILE_NODE_RESULTS) if attribute in node_attributes]
+            links = [(attribute, slice(4 * nnodes + i * nlinks, 4 * nnodes + (i + 1) * nlinks))
+                     for i, attribute in enumerate(_BINFILE_LINK_RESULTS) if attribute in link_attributes]
+
+            def read_record(nbytes):
+                # EPANET flushes the file in blocks, so a record may be partly written
+                pos = fin.tell()
+                buf = fin.read(nbytes)
+                while len(buf) < nbytes and wait():
+                    fin.seek(pos)
+                    buf = fin.read(nbytes)
+                if len(buf) == nbytes and timeout is not None:
+                    deadline[0] = time.monotonic() + timeout
+                return buf
+
+            period_bytes = (4 * nnodes + 8 * nlinks) * ftype.itemsize
+            fin.seek(header['results_offset'])
+            for t in self.report_times:
+                buf = read_record(period_bytes)
+                if len(buf) < period_bytes:
+                    msg = 'Simulation did not converge at time ' + self._get_time(t) + '.'
+                    if convergence_error:
+                        logger.error(msg)
+                        raise RuntimeError(msg)
+                    warnings.warn(msg)
+                    self.results.error_code = wntr.sim.results.ResultsStatus.error
+                    return
+                data = np.frombuffer(buf, dtype=ftype)
+                node_values = dict()
+                link_values = dict()
+                for attribute, index in nodes:
+                    values = data[index]
+                    if convert:
+                        values = _binfile_to_si(attribute, values, self.flow_units, self.quality_type,
+                                                self.mass_units)
+                    node_values[attribute] = values
+                for attribute, index in links:
+                    values = data[index]
+                    if convert:
+                        values = _binfile_to_si(attribute, values, self.flow_units, self.quality_type,
+                                                self.mass_units, link_types, darcy_weisbach, self.convert_status)
+                    link_values[attribute] = values
+                yield int(t), node_values, link_values
+
+            logger.debug('... read epilog ...')
+            buf = read_record(4 * ftype.itemsize + 12)
+            magic2 = None
+            if len(buf) == 4 * ftype.itemsize + 12:
+                self.averages = np.frombuffer(buf[:4 * ftype.itemsize], dtype=ftype)
+                _, warnflag, magic2 = np.frombuffer(buf[4 * ftype.itemsize:], dtype=np.int32)
+                if warnflag != 0:
+                    logger.warning('Warnings were issued during simulation')
+            if header['magic'] != magic2:
+                logger.critical('The magic number did not match -- binary incomplete or incorrectly read.')
+
+
+def _read_binfile_prolog(fin, ftype, idlen=32):
+    """Read the prolog and energy sections of an EPANET binary output file.
+
+    Returns a dictionary with the network description and the byte offset of
+    the first report period."""
+    ftype = np.dtype(ftype)
+
+    def read(dtype, count):
+        dtype = np.dtype(dtype)
+        buf = fin.read(dtype.itemsize * count)
+        if len(buf) < dtype.itemsize * count:
+            raise EOFError('The binary output file is too short to contain the prolog')
+        return np.frombuffer(buf, dtype=dtype, count=count)
+
+    def decode(names):
+        return [bytes(name).decode(sys_default_enc).replace('\x00', '') for name in names]
+
+    prolog = read(np.int32, 15)
+    nnodes, ntanks, nlinks, npumps = int(prolog[2]), int(prolog[3]), int(prolog[4]), int(prolog[5])
+    read(np.uint8, 240)  # title lines
+    header = dict(magic=prolog[0], version=prolog[1], num_nodes=nnodes, num_tanks=ntanks, num_links=nlinks,
+                  num_pumps=npumps, num_valves=int(prolog[6]), quality_type=QualType(prolog[7]),
+                  flow_units=FlowUnits(prolog[9]), pres_units=PressureUnits(prolog[10]),
+                  statistics=StatisticsType(prolog[11]), report_start=int(prolog[12]),
+                  report_step=int(prolog[13]), duration=int(prolog[14]))
+    header['inp_file'] = read(np.uint8, 260)
+    header['report_file'] = read(np.uint8, 260)
+    header['chemical'] = bytes(read(np.uint8, idlen)).decode(sys_default_enc)
+    wqunits = bytes(read(np.uint8, idlen)).decode(sys_default_enc)
+    mass = wqunits.split('/', 1)[0]
+    header['chem_units'] = wqunits
+    header['mass_units'] = MassUnits[mass] if mass in ['mg', 'ug'] else MassUnits.mg
+    header['node_names'] = decode(read('V{0}'.format(idlen), nnodes))
+    header['link_names'] = decode(read('V{0}'.format(idlen), nlinks))
+    read(np.int32, 2 * nlinks)  # start and end nodes
+    header['link_types'] = read(np.int32, nlinks)
+    read(np.int32, ntanks)  # tank indexes
+    read(ftype, ntanks + nnodes + 2 * nlinks)  # tank areas, elevations, lengths and diameters
+    read(np.uint8, npumps * (4 + 6 * ftype.itemsize))  # pump energy
+    header['peak_energy'] = read(ftype, 1)
+    header['results_offset'] = fin.tell()
+
+    report_start, report_step, duration = header['report_start'], header['report_step'], header['duration']
+    report_times = np.arange(report_start, duration + report_step - (duration % report_step), report_step)
+    if header['statistics'] in [StatisticsType.Maximum, StatisticsType.Minimum, StatisticsType.Range]:
+        report_times = np.array([report_start + report_step])
+    header['report_times'] = report_times
+    return header
+
+
+_BINFILE_NODE_RESULTS = ['demand', 'head', 'pressure', 'quality']
+_BINFILE_LINK_RESULTS = ['flowrate', 'velocity', 'headloss', 'quality', 'status', 'setting', 'reaction_rate',
+                         'friction_factor']
+
+
+def _binfile_to_si(attribute, values, flow_units, quality_type, mass_units, link_types=None,
+                   darcy_weisbach=False, convert_status=True):
+    """Convert the values of a results attribute of a binary output file to
+    SI units, as in BinFile.read. The last axis of values is the element
+    axis; link_types are the EPANET types of those elements (links only)."""
+    if attribute == 'demand':
+        return HydParam.Demand._to_si(flow_units, values)
+    elif attribute == 'head':
+        return HydParam.HydraulicHead._to_si(flow_units, values)
+    elif attribute == 'pressure':
+        return HydParam.Pressure._to_si(flow_units, values)
+    elif attribute == 'quality':
+        if quality_type is QualType.Chem:
+            return QualParam.Concentration._to_si(flow_units, values, mass_units=mass_units)
+        elif quality_type is QualType.Age:
+            return QualParam.WaterAge._to_si(flow_units, values, mass_units=mass_units)
+        return values
+    elif attribute == 'flowrate':
+        return HydParam.Flow._to_si(flow_units, values)
+    elif attribute == 'velocity':
+        return HydParam.Velocity._to_si(flow_units, values)
+    elif attribute == 'headloss':
+        values = np.array(values)
+        pipes = link_types < 2
+        values[..., pipes] = to_si(flow_units, values[..., pipes], HydParam.HeadLoss)  # Pipe or CV
+        values[..., ~pipes] = to_si(flow_units, values[..., ~pipes], HydParam.Length)  # Pump or Valve
+        return values
+    elif attribute == 'status':
+        if not convert_status:
+            return values
+        status = np.array(values)
+        status[status <= 2] = 0
+        status[status == 3] = 1
+        status[status >= 5] = 1
+        status[status == 4] = 2
+        return status
+    elif attribute == 'setting':
+        # pump setting is relative speed (unitless)
+        values = np.array(values)
+        mask = link_types == EN.PIPE
+        values[..., mask] = to_si(flow_units, values[..., mask], HydParam.RoughnessCoeff,
+                                  darcy_weisbach=darcy_weisbach)
+        for link_type in [EN.PRV, EN.PSV, EN.PBV]:
+            mask = link_types == link_type
+            values[..., mask] = to_si(flow_units, values[..., mask], HydParam.Pressure)
+        mask = link_types == EN.FCV
+        values[..., mask] = to_si(flow_units, values[..., mask], HydParam.Flow)
+        return values
+    elif attribute == 'reaction_rate':
+        return QualParam.ReactionRate._to_si(flow_units, values, mass_units)
+    return values
+
+
+class LazyBinFile(object):
+    """EPANET binary output file reader that maps the file into memory and
+    reads only the requested results.
+
+    :class:`BinFile` reads every result of every report period into a
+    DataFrame. This reader only parses the prolog and the epilog of the file.
+    The report periods are memory mapped; :py:meth:`node_values` and
+    :py:meth:`link_values` return one attribute for a selection of elements
+    and report times, and :py:meth:`read` builds a results object from such
+    selections. Results are in SI units unless ``convert=False``.
+
+    Partial results of a simulation that did not converge are handled as in
+    :py:meth:`BinFile.read`.
+
+    Parameters
+    ----------
+    filename : str
+        An EPANET BIN output file
+    convergence_error: bool (optional)
+        If True, an error is raised if the file does not contain all the
+        report periods. If False, the available periods are used, a warning
+        is issued and error_code is set. Default = False.
+    darcy_weisbach : bool (optional)
+        Set to True if the Darcy-Weisbach headloss formula was used, to convert
+        pipe settings (roughness coefficients). Default = False.
+    convert_status : bool, optional
+        Convert the EPANET link status (8 values) to simpler WNTR status (3 values), by default True.
+    ftype : str, optional
+        The float type of the file, by default '=f4' (as in :class:`BinFile`).
+
+    Examples
+    --------
+    >>> with LazyBinFile('temp.bin') as binfile:    # doctest: +SKIP
+    ...     pressure = binfile.node_values('pressure', names=['10', '15'], start=3600)
+    """
+
+    node_attributes = _BINFILE_NODE_RESULTS
+    link_attributes = _BINFILE_LINK_RESULTS
+
+    def __init__(self, filename, convergence_error=False, darcy_weisbach=False, convert_status=True,
+                 ftype='=f4'):
+        self.filename = filename
+        self.ftype = ftype
+        self.darcy_weisbach = darcy_weisbach
+        self.convert_status = convert_status
+        with open(filename, 'rb') as fin:
+            header = _read_binfile_prolog(fin, ftype)
+            fin.seek(0, os.SEEK_END)
+            size = fin.tell()
+        for key, value in header.items():
+            setattr(self, key, value)
+        self._node_index = dict((name, i) for i, name in enumerate(self.node_names))
+        self._link_index = dict((name, i) for i, name in enumerate(self.link_names))
+
+        itemsize = np.dtype(ftype).itemsize
+        self._period_size = 4 * self.num_nodes + 8 * self.num_links
+        num_periods = len(self.report_times)
+        N = max(0, min(num_periods, (size - self.results_offset) // (self._period_size * itemsize)))
+        self.error_code = None
+        if N < num_periods:
+            t = self.report_times[N]
+            msg = 'Simulation did not converge at time ' + self._get_time(t) + '.'
+            if convergence_error:
+                logger.error(msg)
+                raise RuntimeError(msg)
+            warnings.warn(msg)
+            self.error_code = wntr.sim.results.ResultsStatus.error
+            self.report_times = self.report_times[0:N]
+        if N > 0:
+            self._data = np.memmap(filename, dtype=np.dtype(ftype), mode='r', offset=self.results_offset,
+                                   shape=(N, self._period_size))
+        else:
+            self._data = np.empty((0, self._period_size), dtype=np.dtype(ftype))
+
+        self.averages = None
+        self.warnflag = None
+        epilog_offset = self.results_offset + num_periods * self._period_size * itemsize
+        if N == num_periods and size >= epilog_offset + 4 * itemsize + 12:
+            epilog = np.memmap(filename, dtype=np.uint8, mode='r', offset=epilog_offset,
+                               shape=(4 * itemsize + 12, ))
+            self.averages = np.array(epilog[:4 * itemsize].view(np.dtype(ftype)))
+            _, self.warnflag, magic2 = epilog[4 * itemsize:].view(np.int32)
+            del epilog
+            if self.magic != magic2:
+                logger.critical('The magic number did not match -- binary incomplete or incorrectly read.')
+            if self.warnflag != 0:
+                logger.warning('Warnings were issued during simulation')
+
+    _get_time = BinFile._get_time
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Release the memory map of the file. Arrays returned without
+        conversion keep it open until they are deleted."""
+        self._data = None
+
+    def _time_slice(self, start, end):
+        times = self.report_times
+        i0 = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        i1 = len(times) if end is None else int(np.searchsorted(times, end, side='right'))
+        return slice(i0, i1)
+
+    @staticmethod
+    def _element_index(names, index):
+        """A slice when the elements are contiguous, otherwise an array of indexes."""
+        if names is None:
+            return slice(None)
+        idx = np.array([index[name] for name in names], dtype=int)
+        if len(idx) > 0 and np.array_equal(idx, np.arange(idx[0], idx[0] + len(idx))):
+            return slice(int(idx[0]), int(idx[0]) + len(idx))
+        return idx
+
+    def _values(self, block, count, names, index, start, end):
+        times = self._time_slice(start, end)
+        elements = self._element_index(names, index)
+        return self._data[times, block:block + count][:, elements], elements
+
+    def node_values(self, attribute, names=None, start=None, end=None, convert=True):
+        """Return the values of a node attribute.
+
+        Parameters
+        ----------
+        attribute : str
+            One of 'demand', 'head', 'pressure' or 'quality'
+        names : list of str (optional)
+            The nodes, default all nodes
+        start, end : int (optional)
+            The first and last report times to include, in seconds. Default
+            all report times.
+        convert : bool (optional)
+            Convert the values to SI units. Default = True.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values, one row per report time and one column per node.
+            Without conversion, and if the nodes are all nodes or a
+            contiguous range of nodes, the array is a view of the mapped
+            file.
+        """
+        if attribute not in self.node_attributes:
+            raise ValueError('Unknown node attribute: {0}. Options are {1}.'.format(attribute, self.node_attributes))
+        block = self.node_attributes.index(attribute) * self.num_nodes
+        values, elements = self._values(block, self.num_nodes, names, self._node_index, start, end)
+        if convert:
+            values = _binfile_to_si(attribute, values, self.flow_units, self.quality_type, self.mass_units)
+        return values
+
+    def link_values(self, attribute, names=None, start=None, end=None, convert=True):
+        """Return the values of a link attribute.
+
+        Parameters
+        ----------
+        attribute : str
+            One of 'flowrate', 'velocity', 'headloss', 'quality', 'status',
+            'setting', 'reaction_rate' or 'friction_factor'
+        names : list of str (optional)
+            The links, default all links
+        start, end : int (optional)
+            The first and last report times to include, in seconds. Default
+            all report times.
+        convert : bool (optional)
+            Convert the values to SI units (and the status to WNTR values if
+            convert_status is True). Default = True.
+
+        Returns
+        -------
+        numpy.ndarray
+            The values, one row per report time and one column per link.
+            Without conversion, and if the links are all links or a
+            contiguous range of links, the array is a view of the mapped
+            file.
+        """
+        if attribute not in self.link_attributes:
+            raise ValueError('Unknown link attribute: {0}. Options are {1}.'.format(attribute, self.link_attributes))
+        block = 4 * self.num_nodes + self.link_attributes.index(attribute) * self.num_links
+        values, elements = self._values(block, self.num_links, names, self._link_index, start, end)
+        if convert:
+            values = _binfile_to_si(attribute, values, self.flow_units, self.quality_type, self.mass_units,
+                                    self.link_types[elements], self.darcy_weisbach, self.convert_status)
+        return values
+
+    def read(self, node_attributes=None, link_attributes=None, nodes=None, links=None, start=None, end=None,
+             convert=True):
+        """Read a selection of results into a results object.
+
+        Parameters
+        ----------
+        node_attributes, link_attributes : list of str (optional)
+            The attributes to read, default all of them. Use an empty list to
+            skip the node or link results.
+        nodes, links : list of str (optional)
+            The elements to read, default all of them
+        start, end : int (optional)
+            The first and last report times to include, in seconds
+        convert : bool (optional)
+            Convert the values to SI units. Default = True.
+
+        Returns
+        -------
+        SimulationResults
+        """
+        if node_attributes is None:
+            node_attributes = self.node_attributes
+        if link_attributes is None:
+            link_attributes = self.link_attributes
+        times = self.report_times[self._time_slice(start, end)]
+        node_names = self.node_names if nodes is None else list(nodes)
+        link_names = self.link_names if links is None else list(links)
+        results = wntr.sim.SimulationResults()
+        results.network_name = self.inp_file
+        results.error_code = self.error_code
+        results.node = dict()
+        results.link = dict()
+        for attribute in node_attributes:
+            values = self.node_values(attribute, nodes, start, end, convert)
+            results.node[attribute] = pd.DataFrame(values, index=times, columns=node_names)
+        for attribute in link_attributes:
+            values = self.link_values(attribute, links, start, end, convert)
+            results.link[attribute] = pd.DataFrame(values, index=times, columns=link_names)
+        return results
+
 
 class NoSectionError(Exception):
     pass
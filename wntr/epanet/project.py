@@ -0,0 +1,579 @@
+"""
+The wntr.epanet.project module keeps an open EPANET toolkit project up to date
+with a water network model, so that a model can be run again without writing
+and re-reading an INP file.
+"""
+import copy
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import wntr
+from wntr.network.base import Link, LinkStatus
+from wntr.network.controls import _ControlType, Comparison, SimTimeCondition, TimeOfDayCondition, ValueCondition
+from wntr.network.elements import Junction, Tank, Valve
+from wntr.network.io import write_inpfile
+
+from .exceptions import EpanetException
+from .toolkit import ENepanet
+from .util import EN, FlowUnits, HydParam, from_si, to_si
+
+logger = logging.getLogger(__name__)
+
+_below = (np.less, np.less_equal, Comparison.le, Comparison.lt)
+
+
+def open_project(wn, rptfile, binfile):
+    """
+    Open an EPANET project (version 2.2) for a water network model.
+
+    The model is written to a temporary INP file, which is removed once the
+    project is open.
+
+    Parameters
+    ----------
+    wn: WaterNetworkModel
+        The water network model
+    rptfile: str
+        The EPANET report file
+    binfile: str
+        The EPANET binary output file
+
+    Returns
+    -------
+    enData: wntr.epanet.toolkit.ENepanet
+        The open project
+    """
+    fd, inpfile = tempfile.mkstemp(suffix='.inp')
+    os.close(fd)
+    try:
+        write_inpfile(wn, inpfile, units=wn.options.hydraulic.inpfile_units, version=2.2)
+        enData = ENepanet(version=2.2)
+        enData.ENopen(inpfile, rptfile, binfile)
+    finally:
+        os.remove(inpfile)
+    return enData
+
+
+class ProjectUpdater(object):
+    """
+    Pushes the changes made to a water network model into an open EPANET project.
+
+    The updater records the model as it was when the project was loaded. Each
+    call to :py:meth:`update` compares the model with the recorded state and
+    sets only the values that changed, using the toolkit:
+
+    - junction elevations, emitter coefficients and demands
+    - reservoir heads and head patterns
+    - tank elevations, levels, diameters and minimum volumes
+    - pipe lengths, diameters, roughness coefficients, minor losses and initial status
+    - pump initial status, initial speed and speed patterns
+    - valve diameters, minor losses and initial settings
+    - pattern multipliers and new patterns
+    - simple controls appended to or removed from the end of the control list
+    - the simulation duration
+
+    Any other change (e.g., adding or removing nodes and links, changing
+    curves, rules, options or water quality inputs) cannot be made through the
+    toolkit in a way that matches a project read from an INP file. Then
+    :py:meth:`update` returns False and the project has to be loaded again.
+    :py:meth:`reset` sets the project back to the model it was loaded from.
+
+    Parameters
+    ----------
+    enData: wntr.epanet.toolkit.ENepanet
+        The open EPANET project (version 2.2), loaded from an INP file written for wn
+    wn: WaterNetworkModel
+        The water network model the project was loaded from
+    """
+
+    def __init__(self, enData, wn):
+        self._en = enData
+        self._state = self._snapshot(wn)
+        self._baseline = self._state
+        self._project_patterns = set(self._state['patterns'].keys())
+        self.num_changes = 0
+
+    def update(self, wn):
+        """
+        Push the changes made to the model since the last update (or since the
+        project was loaded) into the project.
+
+        Parameters
+        ----------
+        wn: WaterNetworkModel
+
+        Returns
+        -------
+        updated: bool
+            True if the project matches the model. False if the model changed
+            in a way that cannot be pushed; the project must then be loaded
+            again (it may have been partially updated).
+        """
+        return self._apply(self._snapshot(wn))
+
+    def reset(self):
+        """
+        Set the values changed by :py:meth:`update` back to the values of the
+        model the project was loaded from.
+
+        Returns
+        -------
+        updated: bool
+            True if the project matches the model it was loaded from. False
+            if an earlier update failed; the project must then be loaded again.
+        """
+        return self._apply(self._baseline)
+
+    def _apply(self, state):
+        old = self._state
+        self.num_changes = 0
+        if old is None:
+            return False
+        for key in ['units', 'options', 'curves', 'rules', 'sources']:
+            if state[key] != old[key]:
+                logger.debug('{0} changed; the EPANET project must be reloaded'.format(key))
+                return False
+        if state['nodes'].keys() != old['nodes'].keys() or state['links'].keys() != old['links'].keys():
+            logger.debug('nodes or links were added or removed; the EPANET project must be reloaded')
+            return False
+        node_changes = self._changed(old['nodes'], state['nodes'])
+        link_changes = self._changed(old['links'], state['links'])
+        if node_changes is None or link_changes is None:
+            logger.debug('an element changed in a way that cannot be pushed; the EPANET project must be reloaded')
+            return False
+        controls = self._control_changes(old['controls'], state['controls'])
+        if controls is None:
+            logger.debug('controls changed in a way that cannot be pushed; the EPANET project must be reloaded')
+            return False
+
+        self._state = None
+        self._units = state['units'][0]
+        self._darcy_weisbach = state['units'][1]
+        self._default_pattern = state['units'][2]
+        self._pattern_names = state['patterns']
+        try:
+            for name, multipliers in state['patterns'].items():
+                if name not in self._project_patterns:
+                    self._en.ENaddpattern(name)
+                    self._project_patterns.add(name)
+                elif old['patterns'].get(name) == multipliers:
+                    continue
+                self._en.ENsetpattern(self._en.ENgetpatternindex(name), np.frombuffer(multipliers).tolist())
+                self.num_changes += 1
+            for name, values in node_changes:
+                self._push_node(name, values)
+            for name, values in link_changes:
+                self._push_link(name, values)
+            num_deleted, added = controls
+            for i in range(len(old['controls']), len(old['controls']) - num_deleted, -1):
+                self._en.ENdeletecontrol(i)
+            for key in added:
+                self._en.ENaddcontrol(key[0], self._en.ENgetlinkindex(key[1]), key[2],
+                                      self._en.ENgetnodeindex(key[3]) if key[3] else 0, key[4])
+            if state['duration'] != old['duration']:
+                self._en.ENsettimeparam(EN.DURATION, state['duration'])
+                self.num_changes += 1
+        except EpanetException as e:
+            logger.warning('could not update the EPANET project ({0}); it must be reloaded'.format(e))
+            return False
+        self.num_changes += len(node_changes) + len(link_changes) + num_deleted + len(added)
+        self._state = state
+        return True
+
+    @staticmethod
+    def _changed(old, new):
+        changes = []
+        for name, (struct, values) in new.items():
+            old_struct, old_values = old[name]
+            if struct != old_struct:
+                return None
+            if values != old_values:
+                changes.append((name, values))
+        return changes
+
+    @staticmethod
+    def _control_changes(old, new):
+        n = 0
+        for old_key, new_key in zip(old, new):
+            if old_key != new_key:
+                break
+            n += 1
+        added = new[n:]
+        for key in added:
+            if key[0] is None:
+                return None
+        return len(old) - n, added
+
+    def _pattern_index(self, name):
+        if name is None or name not in self._pattern_names:
+            return 0
+        return self._en.ENgetpatternindex(name)
+
+    def _push_node(self, name, values):
+        en = self._en
+        units = self._units
+        index = en.ENgetnodeindex(name)
+        kind = values[0]
+        if kind == 'J':
+            elevation, emitter, demands = values[1:]
+            en.ENsetnodevalue(index, EN.ELEVATION, from_si(units, elevation, HydParam.Elevation))
+            en.ENsetnodevalue(index, EN.EMITTER, from_si(units, emitter, HydParam.EmitterCoeff))
+            for i in range(en.ENgetnumdemands(index)):
+                en.ENdeletedemand(index, 1)
+            for base, pattern, category in demands:
+                if pattern not in self._pattern_names:
+                    pattern = self._default_pattern
+                en.ENadddemand(index, from_si(units, base, HydParam.Demand), pattern,
+                               '' if category is None else str(category))
+        elif kind == 'T':
+            elevation, init_level, min_level, max_level, diameter, min_vol, vol_curve = values[1:]
+            en.ENsettankdata(index, from_si(units, elevation, HydParam.Elevation),
+                             from_si(units, init_level, HydParam.HydraulicHead),
+                             from_si(units, min_level, HydParam.HydraulicHead),
+                             from_si(units, max_level, HydParam.HydraulicHead),
+                             from_si(units, diameter, HydParam.TankDiameter),
+                             from_si(units, min_vol, HydParam.Volume), vol_curve)
+        else:
+            head, pattern = values[1:]
+            en.ENsetnodevalue(index, EN.ELEVATION, from_si(units, head, HydParam.HydraulicHead))
+            en.ENsetnodevalue(index, EN.PATTERN, self._pattern_index(pattern))
+
+    def _push_link(self, name, values):
+        en = self._en
+        units = self._units
+        index = en.ENgetlinkindex(name)
+        kind = values[0]
+        if kind == 'P':
+            length, diameter, roughness, minor_loss, closed = values[1:]
+            en.ENsetpipedata(index, from_si(units, length, HydParam.Length),
+                             from_si(units, diameter, HydParam.PipeDiameter),
+                             from_si(units, roughness, HydParam.RoughnessCoeff, darcy_weisbach=self._darcy_weisbach),
+                             minor_loss)
+            en.ENsetlinkvalue(index, EN.INITSTATUS, 0 if closed else 1)
+        elif kind == 'U':
+            closed, speed, pattern = values[1:]
+            # opening a pump resets its speed to 1
+            en.ENsetlinkvalue(index, EN.INITSTATUS, 0 if closed else 1)
+            if not closed:
+                en.ENsetlinkvalue(index, EN.INITSETTING, speed)
+            en.ENsetlinkvalue(index, EN.LINKPATTERN, self._pattern_index(pattern))
+        else:
+            valve_type, diameter, minor_loss, setting = values[1:]
+            en.ENsetlinkvalue(index, EN.DIAMETER, from_si(units, diameter, HydParam.PipeDiameter))
+            if minor_loss > 0 or en.ENgetlinkvalue(index, EN.MINORLOSS) != 0:
+                # the toolkit refuses a minor loss of 0, so removing one needs a reload
+                en.ENsetlinkvalue(index, EN.MINORLOSS, minor_loss)
+            if valve_type in ['PRV', 'PSV', 'PBV']:
+                setting = from_si(units, setting, HydParam.Pressure)
+            elif valve_type == 'FCV':
+                setting = from_si(units, setting, HydParam.Flow)
+            en.ENsetlinkvalue(index, EN.INITSETTING, setting)
+
+    def _snapshot(self, wn):
+        """The model inputs that are written to an INP file, split into the
+        values the updater can push and the ones that need a reload."""
+        units = wn.options.hydraulic.inpfile_units
+        units = FlowUnits[units.upper()] if isinstance(units, str) else FlowUnits(units)
+        darcy_weisbach = wn.options.hydraulic.headloss == 'D-W'
+        patterns = dict()
+        for name in wn.pattern_name_list:
+            patterns[name] = np.asarray(wn.get_pattern(name).multipliers, dtype=float).tobytes()
+        default_pattern = wn.options.hydraulic.pattern
+        if default_pattern is None:
+            default_pattern = '1'
+        if default_pattern not in patterns:
+            default_pattern = ''
+
+        options = copy.deepcopy(wn.options.to_dict())
+        duration = int(options['time'].pop('duration'))
+        for key in ['graphics', 'user']:
+            options.pop(key, None)
+
+        closed = LinkStatus.Closed
+        nodes = dict()
+        for name, node in wn.junctions():
+            demands = tuple([(d.base_value, d.pattern_name, d.category) for d in node.demand_timeseries_list])
+            nodes[name] = (('J', node.initial_quality),
+                           ('J', node.elevation, node.emitter_coefficient or 0.0, demands))
+        for name, node in wn.tanks():
+            nodes[name] = (('T', node.vol_curve_name, node.overflow, node.mixing_model, node.mixing_fraction,
+                            node.bulk_coeff, node.initial_quality),
+                           ('T', node.elevation, node.init_level, node.min_level, node.max_level,
+                            node.diameter, node.min_vol, node.vol_curve_name or ''))
+        for name, node in wn.reservoirs():
+            nodes[name] = (('R', node.initial_quality),
+                           ('R', node.head_timeseries.base_value, node.head_timeseries.pattern_name))
+
+        links = dict()
+        for name, link in wn.pipes():
+            links[name] = (('P', link.start_node_name, link.end_node_name, link.check_valve,
+                            link.bulk_coeff, link.wall_coeff),
+                           ('P', link.length, link.diameter, link.roughness, link.minor_loss,
+                            link.initial_status == closed))
+        for name, link in wn.pumps():
+            is_closed = link.initial_status == closed
+            speed = link.speed_timeseries.base_value
+            setting = link.initial_setting
+            if not is_closed and isinstance(setting, float) and setting != 1.0:
+                speed = setting
+            curve = link.pump_curve_name if link.pump_type == 'HEAD' else link.power
+            links[name] = (('U', link.start_node_name, link.end_node_name, link.pump_type, curve,
+                            link.energy_price, link.energy_pattern, link.efficiency_curve_name),
+                           ('U', is_closed, speed, link.speed_timeseries.pattern_name))
+        for name, link in wn.valves():
+            status = LinkStatus(link.initial_status)
+            struct = ('V', link.start_node_name, link.end_node_name, link.valve_type, status)
+            if link.valve_type == 'GPV' or status != LinkStatus.Active:
+                # the setting of a GPV is its curve, and setting a valve
+                # through the toolkit would make a fixed valve active
+                links[name] = (struct + (link.initial_setting, ), ())
+            else:
+                links[name] = (struct, ('V', link.valve_type, link.diameter, link.minor_loss,
+                                        link.initial_setting))
+
+        curves = tuple((name, curve.curve_type, tuple(tuple(p) for p in curve.points))
+                       for name, curve in wn.curves())
+        sources = tuple((name, source.node_name, source.source_type, source.strength_timeseries.base_value,
+                         source.strength_timeseries.pattern_name) for name, source in wn.sources())
+        rules = []
+        controls = []
+        for name, control in wn.controls():
+            if control.epanet_control_type == _ControlType.rule:
+                rules.append((name, str(control)))
+            else:
+                key = self._control_key(control, units)
+                if key is not None:
+                    controls.append(key)
+        return dict(units=(units, darcy_weisbach, default_pattern), options=options, duration=duration,
+                    patterns=patterns, nodes=nodes, links=links, curves=curves, sources=sources,
+                    rules=tuple(rules), controls=controls)
+
+    @staticmethod
+    def _control_key(control, units):
+        """The arguments of ENaddcontrol for a simple control, following
+        InpFile._write_controls. The key is None for controls that are not
+        written, and starts with None for controls that cannot be added
+        through the toolkit."""
+        unsupported = (None, str(control))
+        if len(control._then_actions) != 1 or len(control._else_actions) != 0:
+            return unsupported
+        action = control._then_actions[0]
+        link = action._target_obj
+        if not isinstance(link, Link):
+            return None
+        attribute = action._attribute.lower()
+        value = action._value
+        if attribute == 'status':
+            if isinstance(link, Valve) or getattr(link, 'check_valve', False):
+                return unsupported
+            setting = 0.0 if LinkStatus(value) == LinkStatus.Closed else 1.0
+        elif attribute == 'setting' and isinstance(link, Valve):
+            if link.valve_type in ['PRV', 'PSV', 'PBV']:
+                setting = from_si(units, value, HydParam.Pressure)
+            elif link.valve_type == 'FCV':
+                setting = from_si(units, value, HydParam.Flow)
+            elif link.valve_type == 'TCV':
+                setting = value
+            else:
+                return unsupported
+        elif attribute in ['setting', 'base_speed']:
+            setting = value
+        else:
+            return None
+        condition = control._condition
+        if isinstance(condition, SimTimeCondition):
+            return (EN.TIMER, link.name, float(setting), None, float(condition._threshold))
+        elif isinstance(condition, TimeOfDayCondition):
+            return (EN.TIMEOFDAY, link.name, float(setting), None, float(condition._threshold))
+        elif isinstance(condition, ValueCondition):
+            node = condition._source_obj
+            if isinstance(node, Tank):
+                level = from_si(units, condition._threshold, HydParam.HydraulicHead)
+            elif isinstance(node, Junction):
+                level = from_si(units, condition._threshold, HydParam.Pressure)
+            else:
+                return unsupported
+            ctype = EN.LOWLEVEL if condition._relation in _below else EN.HILEVEL
+            return (ctype, link.name, float(setting), node.name, float(level))
+        return None
+
+
+class EpanetSession(object):
+    """
+    An EPANET project kept open to run many hydraulic scenarios of a water
+    network model.
+
+    The project is loaded once, from the baseline model. :py:meth:`solve`
+    pushes the changes made to a model with the same nodes and links (e.g.,
+    closed pipes or fire fighting demands) into the project with
+    :class:`ProjectUpdater`, runs the hydraulic simulation and reads the
+    results directly from the toolkit; no INP, report or binary output file is
+    written or read. :py:meth:`reset` sets the project back to the baseline
+    model between scenarios, without loading it again.
+
+    Only hydraulics are simulated. The session can be used as a context
+    manager, which closes the project on exit.
+
+    Parameters
+    ----------
+    wn: WaterNetworkModel
+        The baseline water network model
+    node_attributes: list of str (optional)
+        Node results to read, from 'demand', 'head' and 'pressure'.
+        Default = all of them.
+    link_attributes: list of str (optional)
+        Link results to read, from 'flowrate', 'velocity' and 'status'.
+        The status is 0 (closed) or 1 (open, which includes active valves).
+        Default = all of them.
+
+    Examples
+    --------
+    A pipe criticality analysis, one closed pipe per scenario:
+
+    >>> with EpanetSession(wn) as session:    # doctest: +SKIP
+    ...     for name in wn.pipe_name_list:
+    ...         wn.get_link(name).initial_status = LinkStatus.Closed
+    ...         results[name] = session.solve(wn)
+    ...         wn.get_link(name).initial_status = LinkStatus.Open
+    ...         session.reset()
+    """
+
+    _node_params = {'demand': (EN.DEMAND, HydParam.Demand),
+                    'head': (EN.HEAD, HydParam.HydraulicHead),
+                    'pressure': (EN.PRESSURE, HydParam.Pressure)}
+    _link_params = {'flowrate': (EN.FLOW, HydParam.Flow),
+                    'velocity': (EN.VELOCITY, HydParam.Velocity),
+                    'status': (EN.STATUS, None)}
+
+    def __init__(self, wn, node_attributes=None, link_attributes=None):
+        if node_attributes is None:
+            node_attributes = list(self._node_params.keys())
+        if link_attributes is None:
+            link_attributes = list(self._link_params.keys())
+        for attribute in node_attributes:
+            if attribute not in self._node_params:
+                raise ValueError('Unknown node attribute: {0}'.format(attribute))
+        for attribute in link_attributes:
+            if attribute not in self._link_params:
+                raise ValueError('Unknown link attribute: {0}'.format(attribute))
+        self._node_attributes = list(node_attributes)
+        self._link_attributes = list(link_attributes)
+        self._network_name = wn.name
+        self._tmpdir = tempfile.mkdtemp()
+        self._en = None
+        try:
+            self._en = open_project(wn, os.path.join(self._tmpdir, 'session.rpt'),
+                                    os.path.join(self._tmpdir, 'session.bin'))
+            self._updater = ProjectUpdater(self._en, wn)
+            en = self._en
+            self._units = FlowUnits(en.ENgetflowunits())
+            self._node_names = [en.ENgetnodeid(i) for i in range(1, en.ENgetcount(EN.NODECOUNT) + 1)]
+            self._link_names = [en.ENgetlinkid(i) for i in range(1, en.ENgetcount(EN.LINKCOUNT) + 1)]
+        except Exception:
+            self.close()
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def apply(self, wn):
+        """
+        Push the changes made to a model into the project.
+
+        Parameters
+        ----------
+        wn: WaterNetworkModel
+            A model with the same nodes and links as the baseline model
+
+        Returns
+        -------
+        num_changes: int
+            The number of values set in the project
+        """
+        if not self._updater.update(wn):
+            raise ValueError('The changes to the water network model cannot be applied to the open EPANET '
+                             'project (e.g., nodes or links were added or removed, or options changed); '
+                             'use a new session')
+        return self._updater.num_changes
+
+    def reset(self):
+        """
+        Set the project back to the baseline model.
+        """
+        if not self._updater.reset():
+            raise RuntimeError('The EPANET project could not be reset; use a new session')
+
+    def solve(self, wn=None):
+        """
+        Run the hydraulic simulation.
+
+        Parameters
+        ----------
+        wn: WaterNetworkModel (optional)
+            If given, the changes made to this model are applied first (see
+            :py:meth:`apply`). Otherwise, the project is simulated as it is.
+
+        Returns
+        -------
+        SimulationResults
+            Results at each reporting time step, in SI units
+        """
+        if wn is not None:
+            self.apply(wn)
+        en = self._en
+        duration = en.ENgettimeparam(EN.DURATION)
+        report_step = en.ENgettimeparam(EN.REPORTSTEP)
+        report_start = en.ENgettimeparam(EN.REPORTSTART)
+        times = list(range(report_start, duration + 1, report_step))
+        node_values = dict((attribute, np.empty((len(times), len(self._node_names))))
+                           for attribute in self._node_attributes)
+        link_values = dict((attribute, np.empty((len(times), len(self._link_names))))
+                           for attribute in self._link_attributes)
+        i = 0
+        en.ENopenH()
+        try:
+            # start from the initial flows, not from the end of the last run
+            en.ENinitH(EN.INITFLOW)
+            tstep = 1
+            while tstep > 0:
+                t = en.ENrunH()
+                if i < len(times) and t == times[i]:
+                    for attribute, values in node_values.items():
+                        values[i, :] = en.ENgetnodevalues(self._node_params[attribute][0])
+                    for attribute, values in link_values.items():
+                        values[i, :] = en.ENgetlinkvalues(self._link_params[attribute][0])
+                    i += 1
+                tstep = en.ENnextH()
+        finally:
+            en.ENcloseH()
+
+        results = wntr.sim.SimulationResults()
+        results.network_name = self._network_name
+        results.node = dict()
+        results.link = dict()
+        for attribute, values in node_values.items():
+            values = to_si(self._units, values[:i], self._node_params[attribute][1])
+            results.node[attribute] = pd.DataFrame(values, index=times[:i], columns=self._node_names)
+        for attribute, values in link_values.items():
+            param = self._link_params[attribute][1]
+            values = values[:i] if param is None else to_si(self._units, values[:i], param)
+            results.link[attribute] = pd.DataFrame(values, index=times[:i], columns=self._link_names)
+        return results
+
+    def close(self):
+        """
+        Close the EPANET project.
+        """
+        if self._en is not None:
+            self._en.ENclose()
+            self._en = None
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
@@ -10,6 +10,8 @@ import platform
 import sys
 from ctypes import byref
 
+import numpy as np
+
 if sys.version_info[0:2] <= (3, 11):
     from pkg_resources import resource_filename
 else:
@@ -179,7 +181,7 @@ class ENepanet:
         """
         if self._project is not None:
             if self.fileLoaded:
-                self.EN_close(self._project)
+                self.ENclose()
             if self.fileLoaded:
                 raise RuntimeError("File is loaded and cannot be closed")
             if inpfile is None:
@@ -597,6 +599,27 @@ class ENepanet:
         self._error()
         return fValue.value
 
+    def ENgetlinkid(self, iIndex):
+        """Gets the ID name of a link given its index.
+
+        Parameters
+        ----------
+        iIndex : int
+            a link's index (starting from 1).
+
+        Returns
+        -------
+        str
+            the link name
+        """
+        fValue = ctypes.create_string_buffer(SizeLimits.EN_MAX_ID.value)
+        if self._project is not None:
+            self.errcode = self.ENlib.EN_getlinkid(self._project, iIndex, byref(fValue))
+        else:
+            self.errcode = self.ENlib.ENgetlinkid(iIndex, byref(fValue))
+        self._error()
+        return str(fValue.value, "UTF-8")
+
     def ENgetlinkindex(self, sId):
         """Retrieves index of a link with specific ID
 
@@ -642,6 +665,58 @@ class ENepanet:
         self._error()
         return fValue.value
 
+    def ENgetnodevalues(self, iCode):
+        """Retrieves a parameter value for all nodes
+
+        Parameters
+        -------------
+        iCode : int
+            Node parameter code (see toolkit.optNodeParams)
+
+        Returns
+        ---------
+        numpy.ndarray
+            Values of the node parameter, ordered by node index
+
+        """
+        if self._project is not None:
+            return self._getvalues(self.ENlib.EN_getnodevalue, 0, iCode, ctypes.c_double())
+        else:
+            return self._getvalues(self.ENlib.ENgetnodevalue, 0, iCode, ctypes.c_float())
+
+    def ENgetlinkvalues(self, iCode):
+        """Retrieves a parameter value for all links
+
+        Parameters
+        -------------
+        iCode : int
+            Link parameter code (see toolkit.optLinkParams)
+
+        Returns
+        ---------
+        numpy.ndarray
+            Values of the link parameter, ordered by link index
+
+        """
+        if self._project is not None:
+            return self._getvalues(self.ENlib.EN_getlinkvalue, 2, iCode, ctypes.c_double())
+        else:
+            return self._getvalues(self.ENlib.ENgetlinkvalue, 2, iCode, ctypes.c_float())
+
+    def _getvalues(self, getvalue, iCountCode, iCode, fValue):
+        """Call a node or link value getter for every element, avoiding the
+        per-call overhead of ENgetnodevalue and ENgetlinkvalue"""
+        values = np.empty(self.ENgetcount(iCountCode))
+        ref = byref(fValue)
+        args = () if self._project is None else (self._project, )
+        for i in range(len(values)):
+            errcode = getvalue(*args, i + 1, iCode, ref)
+            if errcode:
+                self.errcode = errcode
+                self._error()
+            values[i] = fValue.value
+        return values
+
     def ENsetlinkvalue(self, iIndex, iCode, fValue):
         """Set the value on a link
 
@@ -683,6 +758,193 @@ class ENepanet:
             self.errcode = self.ENlib.ENsetnodevalue(ctypes.c_int(iIndex), ctypes.c_int(iCode), ctypes.c_float(fValue))
         self._error()
 
+    def ENsetpipedata(self, iIndex, dLength, dDiam, dRough, dMloss):
+        """Set the length, diameter, roughness and minor loss of a pipe
+
+        Parameters
+        ----------
+        iIndex : int
+            the link index
+        dLength : float
+            the pipe length
+        dDiam : float
+            the pipe diameter
+        dRough : float
+            the pipe roughness coefficient
+        dMloss : float
+            the minor loss coefficient
+        """
+        if self._project is not None:
+            self.errcode = self.ENlib.EN_setpipedata(
+                self._project, ctypes.c_int(iIndex), ctypes.c_double(dLength), ctypes.c_double(dDiam),
+                ctypes.c_double(dRough), ctypes.c_double(dMloss)
+            )
+        else:
+            self.errcode = self.ENlib.ENsetpipedata(
+                ctypes.c_int(iIndex), ctypes.c_float(dLength), ctypes.c_float(dDiam),
+                ctypes.c_float(dRough), ctypes.c_float(dMloss)
+            )
+        self._error()
+
+    def ENsettankdata(self, iIndex, dElev, dInitlvl, dMinlvl, dMaxlvl, dDiam, dMinvol, sVolcurve=""):
+        """Set the geometry and levels of a tank
+
+        Parameters
+        ----------
+        iIndex : int
+            the node index
+        dElev : float
+            the elevation of the tank bottom
+        dInitlvl : float
+            the initial water level
+        dMinlvl : float
+            the minimum water level
+        dMaxlvl : float
+            the maximum water level
+        dDiam : float
+            the tank diameter
+        dMinvol : float
+            the volume at the minimum level
+        sVolcurve : str
+            the name of the volume curve, or an empty string
+        """
+        if self._project is not None:
+            self.errcode = self.ENlib.EN_settankdata(
+                self._project, ctypes.c_int(iIndex), ctypes.c_double(dElev), ctypes.c_double(dInitlvl),
+                ctypes.c_double(dMinlvl), ctypes.c_double(dMaxlvl), ctypes.c_double(dDiam),
+                ctypes.c_double(dMinvol), sVolcurve.encode("latin-1")
+            )
+        else:
+            self.errcode = self.ENlib.ENsettankdata(
+                ctypes.c_int(iIndex), ctypes.c_float(dElev), ctypes.c_float(dInitlvl),
+                ctypes.c_float(dMinlvl), ctypes.c_float(dMaxlvl), ctypes.c_float(dDiam),
+                ctypes.c_float(dMinvol), sVolcurve.encode("latin-1")
+            )
+        self._error()
+
+    def ENgetnumdemands(self, iIndex):
+        """Get the number of demand categories of a junction
+
+        Parameters
+        ----------
+        iIndex : int
+            the node index
+
+        Returns
+        -------
+        int
+            the number of demand categories
+        """
+        iCount = ctypes.c_int()
+        if self._project is not None:
+            self.errcode = self.ENlib.EN_getnumdemands(self._project, ctypes.c_int(iIndex), byref(iCount))
+        else:
+            self.errcode = self.ENlib.ENgetnumdemands(ctypes.c_int(iIndex), byref(iCount))
+        self._error()
+        return iCount.value
+
+    def ENadddemand(self, iIndex, dBase, sPattern="", sName=""):
+        """Append a demand category to a junction
+
+        Parameters
+        ----------
+        iIndex : int
+            the node index
+        dBase : float
+            the base demand
+        sPattern : str
+            the name of the demand pattern, or an empty string for no pattern
+        sName : str
+            the name of the demand category
+        """
+        if self._project is not None:
+            self.errcode = self.ENlib.EN_adddemand(
+                self._project, ctypes.c_int(iIndex), ctypes.c_double(dBase),
+                sPattern.encode("latin-1"), sName.encode("latin-1")
+            )
+        else:
+            self.errcode = self.ENlib.ENadddemand(
+                ctypes.c_int(iIndex), ctypes.c_float(dBase), sPattern.encode("latin-1"), sName.encode("latin-1")
+            )
+        self._error()
+
+    def ENdeletedemand(self, iIndex, iDemandIndex):
+        """Delete a demand category from a junction
+
+        Parameters
+        ----------
+        iIndex : int
+            the node index
+        iDemandIndex : int
+            the index of the demand category (starting from 1)
+        """
+        if self._project is not None:
+            self.errcode = self.ENlib.EN_deletedemand(self._project, ctypes.c_int(iIndex), ctypes.c_int(iDemandIndex))
+        else:
+            self.errcode = self.ENlib.ENdeletedemand(ctypes.c_int(iIndex), ctypes.c_int(iDemandIndex))
+        self._error()
+
+    def ENgetpatternindex(self, sId):
+        """Retrieves index of a pattern with specific ID
+
+        Parameters
+        ----------
+        sId : str
+            Pattern ID
+
+        Returns
+        -------
+        int
+            the pattern index, or 0 if there is no such pattern
+        """
+        iIndex = ctypes.c_int()
+        if self._project is not None:
+            errcode = self.ENlib.EN_getpatternindex(self._project, sId.encode("latin-1"), byref(iIndex))
+        else:
+            errcode = self.ENlib.ENgetpatternindex(sId.encode("latin-1"), byref(iIndex))
+        if errcode:
+            return 0
+        return iIndex.value
+
+    def ENaddpattern(self, sId):
+        """Add a new time pattern with a single multiplier of 1.0
+
+        Parameters
+        ----------
+        sId : str
+            the pattern ID
+
+        Returns
+        -------
+        int
+            the index of the new pattern
+        """
+        if self._project is not None:
+            self.errcode = self.ENlib.EN_addpattern(self._project, sId.encode("latin-1"))
+        else:
+            self.errcode = self.ENlib.ENaddpattern(sId.encode("latin-1"))
+        self._error()
+        return self.ENgetpatternindex(sId)
+
+    def ENsetpattern(self, iIndex, values):
+        """Set all of the multipliers of a time pattern
+
+        Parameters
+        ----------
+        iIndex : int
+            the pattern index
+        values : list of float
+            the multipliers
+        """
+        n = len(values)
+        if self._project is not None:
+            fValues = (ctypes.c_double * n)(*values)
+            self.errcode = self.ENlib.EN_setpattern(self._project, ctypes.c_int(iIndex), fValues, ctypes.c_int(n))
+        else:
+            fValues = (ctypes.c_float * n)(*values)
+            self.errcode = self.ENlib.ENsetpattern(ctypes.c_int(iIndex), fValues, ctypes.c_int(n))
+        self._error()
+
     def ENsettimeparam(self, eParam, lValue):
         """Set a time parameter value
 
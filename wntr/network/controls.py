@@ -5,6 +5,9 @@ simulation.
 """
 import math
 import enum
+import heapq
+import numbers
+from bisect import bisect_left, bisect_right
 import numpy as np
 import logging
 import six
@@ -2251,6 +2254,7 @@ class Control(Rule):
 class ControlChangeTracker(Observer):
     def __init__(self):
         self._actions = dict()
+        self._targets = OrderedDict()  # {(obj, attr): number of registered actions with this target}
         self._previous_values: Dict[Any, Dict[Tuple[Any, str], Any]] = dict()  # {key: {(obj, attr): value}}
         self._changed: Dict[Any, MutableSet[Tuple[Any, str]]] = dict()  # {key: set of (obj, attr) that has been changed from _previous_values}
 
@@ -2262,8 +2266,8 @@ class ControlChangeTracker(Observer):
         self._previous_values[key] = dict()
         self._changed[key] = OrderedSet()
 
-        for action in self._actions.keys():
-            obj, attr = action.target()
+        # many actions can share a target; each target is only read once
+        for obj, attr in self._targets.keys():
             self._previous_values[key][(obj, attr)] = getattr(obj, attr)
 
     def set_reference_point(self, key):
@@ -2307,6 +2311,8 @@ class ControlChangeTracker(Observer):
         for action in control.actions():
             if action not in self._actions:
                 self._actions[action] = OrderedSet()
+                target = action.target()
+                self._targets[target] = self._targets.get(target, 0) + 1
             self._actions[action].add(control)
             action.subscribe(self)
 
@@ -2347,15 +2353,233 @@ class ControlChangeTracker(Observer):
                 del self._actions[action]
 
                 obj_attr = action.target()
+                self._targets[obj_attr] -= 1
+                if self._targets[obj_attr] > 0:
+                    continue
+                del self._targets[obj_attr]
                 for ref_point in self._previous_values.keys():
                     self._previous_values[ref_point].pop(obj_attr)
                     self._changed[ref_point].discard(obj_attr)
 
 
-class ControlChecker(object):
+def _is_number(value):
+    return isinstance(value, numbers.Real) and not math.isnan(value)
+
+
+def _margin(value):
+    # conditions compare values rounded to 10 decimals; thresholds closer than this to a value are always
+    # re-evaluated
+    return 1e-8 * max(1.0, abs(value))
+
+
+class _ThresholdIndex(object):
+    """
+    The controls with a ValueCondition on one attribute of one element, sorted by threshold. The cached
+    results of all of these controls are the results at ``value``.
+    """
     def __init__(self):
+        self.thresholds = []
+        self.entries = []
+        self.value = None
+
+    def add(self, pos, control):
+        threshold = float(control._condition._threshold)
+        i = bisect_right(self.thresholds, threshold)
+        self.thresholds.insert(i, threshold)
+        self.entries.insert(i, (pos, control))
+
+
+class _ControlIndex(object):
+    """
+    Event index of the controls registered with a ControlChecker (see
+    :class:`~wntr.network.controls.ControlChecker`).
+
+    Parameters
+    ----------
+    controls: iterable of ControlBase
+        The controls, in the order in which they were registered
+    """
+    def __init__(self, controls):
+        self._polled = []  # [(pos, control)] evaluated at every check
+        self._values = OrderedDict()  # {(obj, attr): _ThresholdIndex}
+        self._tank_levels = OrderedDict()  # {(obj, attr): [[pos, control, value at the last evaluation]]}
+        self._times = []  # heap of (threshold, pos, control) for times that have not been reached
+        self._current_times = []  # [(threshold, pos, control)] for times that have been reached
+        self._past_times = []  # [(threshold, pos, control)] for times before the previous timestep
+        self._model = None
+        self._last_time = None
+        self._required = dict()  # {pos: (control, backtrack)} for the indexed controls that need activated
+        for pos, control in enumerate(controls):
+            self._add(pos, control)
+
+    def _add(self, pos, control):
+        condition = control._condition
+        if type(control) not in {Rule, Control} or control._else_actions:
+            self._polled.append((pos, control))
+        elif type(condition) is ValueCondition and _is_number(condition._threshold):
+            key = (condition._source_obj, condition._source_attr)
+            if key not in self._values:
+                self._values[key] = _ThresholdIndex()
+            self._values[key].add(pos, control)
+        elif type(condition) is TankLevelCondition and _is_number(condition._threshold):
+            key = (condition._source_obj, condition._source_attr)
+            self._tank_levels.setdefault(key, []).append([pos, control, None])
+        elif (type(condition) is SimTimeCondition and condition._relation is Comparison.eq and
+              not condition._repeat and (self._model is None or condition._model is self._model)):
+            # the condition is only True at the timestep that reaches the threshold
+            self._model = condition._model
+            heapq.heappush(self._times, (condition._threshold, pos, control))
+        elif (type(condition) is TimeOfDayCondition and condition._relation is Comparison.eq and
+              float(condition._threshold).is_integer() and
+              (self._model is None or condition._model is self._model)):
+            # the condition is only True at the timestep that reaches its next clock time
+            self._model = condition._model
+            heapq.heappush(self._times, (self._clock_time(condition, self._model._prev_sim_time), pos, control))
+        else:
+            self._polled.append((pos, control))
+
+    def _clock_time(self, condition, after):
+        """
+        The first simulation time after `after` at which the TimeOfDayCondition condition can become True
+        (see TimeOfDayCondition.evaluate). Only repeating conditions depend on `after`.
+        """
+        start = self._model.options.time.start_clocktime
+        threshold = condition._threshold
+        if after is None:
+            # before the first timestep (the simulators start with a previous time of -1)
+            after = -1
+        if not condition._repeat:
+            return threshold + condition._first_day * 86400 - start
+        # evaluate compares (t - threshold) % 86400 with the threshold, which moves past the threshold
+        # when the shifted time t reaches 2 * threshold (mod 86400)
+        first = 2 * threshold - start
+        return first + (math.floor((after - first) / 86400) + 1) * 86400
+
+    def _is_repeating(self, control):
+        condition = control._condition
+        return type(condition) is TimeOfDayCondition and condition._repeat
+
+    def _evaluate(self, pos, control):
+        do, back = control.is_control_action_required()
+        if do:
+            self._required[pos] = (control, back)
+        else:
+            self._required.pop(pos, None)
+
+    def check(self):
+        required = dict()
+        for pos, control in self._polled:
+            do, back = control.is_control_action_required()
+            if do:
+                required[pos] = (control, back)
+        self._check_times()
+        for key, index in self._values.items():
+            self._check_values(key, index)
+        for key, entries in self._tank_levels.items():
+            self._check_tank_levels(key, entries)
+        required.update(self._required)
+        for pos, (control, back) in list(self._required.items()):
+            if back:
+                # a condition that is still satisfied at the next check does not backtrack again
+                self._required[pos] = (control, 0)
+        return [required[pos] for pos in sorted(required)]
+
+    def _check_times(self):
+        if self._model is None:
+            return
+        time = self._model.sim_time
+        prev_time = self._model._prev_sim_time
+        if self._last_time is not None and time < self._last_time:
+            # the simulation went back in time; start over
+            for entry in self._current_times + self._past_times:
+                self._required.pop(entry[1], None)
+            entries = self._times + self._current_times + self._past_times
+            self._times = [(self._clock_time(control._condition, prev_time), pos, control)
+                           if self._is_repeating(control) else (threshold, pos, control)
+                           for threshold, pos, control in entries]
+            heapq.heapify(self._times)
+            self._current_times = []
+            self._past_times = []
+        self._last_time = time
+        while len(self._times) > 0 and self._times[0][0] <= time:
+            self._current_times.append(heapq.heappop(self._times))
+        current_times = []
+        for entry in self._current_times:
+            threshold, pos, control = entry
+            self._evaluate(pos, control)
+            if prev_time < threshold:
+                current_times.append(entry)
+            elif self._is_repeating(control):
+                # the control was evaluated at this check, so a next clock time that has already been
+                # reached only needs to be kept with the current times
+                entry = (self._clock_time(control._condition, prev_time), pos, control)
+                if entry[0] <= time:
+                    current_times.append(entry)
+                else:
+                    heapq.heappush(self._times, entry)
+            else:
+                self._past_times.append(entry)
+        self._current_times = current_times
+
+    def _check_values(self, key, index):
+        value = getattr(*key)
+        prev = index.value
+        if prev is not None and value == prev:
+            return
+        if prev is None or not _is_number(value):
+            i, j = 0, len(index.entries)
+        else:
+            lo = min(value, prev)
+            hi = max(value, prev)
+            i = bisect_left(index.thresholds, lo - _margin(lo))
+            j = bisect_right(index.thresholds, hi + _margin(hi))
+        for k in range(i, j):
+            self._evaluate(*index.entries[k])
+        index.value = value if _is_number(value) else None
+
+    def _check_tank_levels(self, key, entries):
+        # TankLevelConditions backtrack based on the value at their last evaluation (which may have been by
+        # another ControlChecker), so each condition is checked against that value as well
+        value = getattr(*key)
+        number = _is_number(value)
+        for entry in entries:
+            pos, control, last = entry
+            condition = control._condition
+            if number and last is not None and _is_number(condition._last_value):
+                lo = min(value, last, condition._last_value)
+                hi = max(value, last, condition._last_value)
+                threshold = condition._threshold
+                if threshold < lo - _margin(lo) or threshold > hi + _margin(hi):
+                    condition._last_value = value
+                    continue
+            self._evaluate(pos, control)
+            entry[2] = value if number else None
+
+
+class ControlChecker(object):
+    """
+    Checks which of the registered controls need to be activated.
+
+    If indexed is True, controls are only evaluated when their inputs have changed. Controls with a
+    ValueCondition are indexed by the element and attribute they compare and sorted by threshold; they are
+    re-evaluated only when the value of the attribute has moved across their threshold since the last check.
+    Controls with a TankLevelCondition are re-evaluated in the same way. Controls with a SimTimeCondition at
+    a single time and controls with a TimeOfDayCondition at a whole second (CLOCKTIME controls) are kept in
+    a queue ordered by time and are only evaluated at the timestep that reaches the time; a repeating
+    TimeOfDayCondition is put back in the queue at its next clock time. All other controls are evaluated at
+    every check. The controls that need to be activated are the same as when every control is evaluated, and
+    are returned in the order in which they were registered.
+
+    Parameters
+    ----------
+    indexed: bool
+        If True (default), use the event index. If False, evaluate every control at every check.
+    """
+    def __init__(self, indexed=True):
         self._controls = OrderedSet()
         """OrderedSet of ControlBase"""
+        self._indexed = indexed
+        self._index = None
 
     def __iter__(self):
         return iter(self._controls)
@@ -2369,6 +2593,7 @@ class ControlChecker(object):
         control: ControlBase
         """
         self._controls.add(control)
+        self._index = None
 
     def deregister(self, control):
         """
@@ -2379,6 +2604,7 @@ class ControlChecker(object):
         control: ControlBase
         """
         self._controls.remove(control)
+        self._index = None
 
     def check(self):
         """
@@ -2389,6 +2615,10 @@ class ControlChecker(object):
         controls_to_run: list of tuple
             The tuple is (ControlBase, backtrack)
         """
+        if self._indexed:
+            if self._index is None:
+                self._index = _ControlIndex(self._controls)
+            return self._index.check()
         controls_to_run = []
         for c in self._controls:
             do, back = c.is_control_action_required()
@@ -4,5 +4,10 @@ simulations using the water network model.
 """
 from wntr.sim.core import WaterNetworkSimulator, WNTRSimulator
 from wntr.sim.results import SimulationResults
-from wntr.sim.solvers import NewtonSolver
-from wntr.sim.epanet import EpanetSimulator
\ No newline at end of file
+from wntr.sim.solvers import NewtonSolver, GGASolver, BlockTriangularSolver
+from wntr.sim.hydraulics import HydraulicModelCache
+from wntr.sim.periodic import PeriodicStateDetector
+from wntr.sim.epanet import EpanetSimulator
+from wntr.sim.batch import BatchWNTRSimulator
+from wntr.sim.fork import ForkWNTRSimulator
+from wntr.sim.ensemble import EnsembleEpanetSimulator
@@ -1,5 +1,5 @@
 """WNTR's algebraic modeling language module (SWIG)."""
 
 from .expr import Var, Param, exp, log, sin, cos, tan, asin, acos, atan, inequality, sign, abs, value, ConditionalExpression
-from .aml import Model, ParamDict, VarDict, ConstraintDict, Constraint
+from .aml import Model, ParamDict, VarDict, ConstraintDict, Constraint, new_structure_version
 
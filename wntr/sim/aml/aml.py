@@ -1,6 +1,7 @@
 """WNTR AML base classes."""
 
 import sys
+import itertools
 import scipy
 from .evaluator import Evaluator
 from .expr import Var, Param, native_numeric_types, Float, ConditionalExpression
@@ -9,6 +10,20 @@ from wntr.utils.ordered_set import OrderedSet
 from collections.abc import MutableMapping
 
 
+# structure versions are unique across all models so that caches keyed on the
+# version (e.g., wntr.sim.solvers.SparseLUCache) cannot confuse two models
+_structure_versions = itertools.count(1)
+
+
+def new_structure_version():
+    """
+    Get a structure version that has not been used by any model. Objects that build their own
+    structure from a model (e.g., wntr.sim.models.vectorized.VectorizedHydraulicModel) use it so
+    that their versions never collide with those of the models.
+    """
+    return next(_structure_versions)
+
+
 class Constraint(object):
     __slots__ = ('_expr', 'name', '_c_obj')
 
@@ -55,6 +70,9 @@ class Model(object):
         self._vars_referenced_by_con = OrderedDict()
         self._params_referenced_by_con = OrderedDict()
         self._floats_referenced_by_con = OrderedDict()
+        self._structure_version = None
+        self._structure_modified = True
+        self._next_rank = 0
 
     def __setattr__(self, name, val):
         """
@@ -120,6 +138,7 @@ class Model(object):
     def _increment_var(self, var):
         if var not in self._var_cvar_map:
             cvar = self._evaluator.add_var(var.value)
+            cvar.rank = self._new_rank()
             var._c_obj = cvar
             self._var_cvar_map[var] = cvar
             self._refcounts[var] = 1
@@ -128,6 +147,11 @@ class Model(object):
             cvar = self._var_cvar_map[var]
         return cvar
 
+    def _new_rank(self):
+        rank = self._next_rank
+        self._next_rank = rank + 1
+        return rank
+
     def _increment_param(self, param):
         if param not in self._param_cparam_map:
             cparam = self._evaluator.add_param(param.value)
@@ -180,7 +204,9 @@ class Model(object):
             self._evaluator.remove_float(cfloat)
 
     def _register_conditional_constraint(self, con):
+        self._structure_modified = True
         ccon = self._evaluator.add_if_else_constraint()
+        ccon.rank = self._new_rank()
         con._c_obj = ccon
         self._con_ccon_map[con] = ccon
         leaf_ndx_map = OrderedDict()
@@ -246,7 +272,9 @@ class Model(object):
         if type(con.expr) == ConditionalExpression:
             self._register_conditional_constraint(con)
             return None
+        self._structure_modified = True
         ccon = self._evaluator.add_constraint()
+        ccon.rank = self._new_rank()
         con._c_obj = ccon
         self._con_ccon_map[con] = ccon
         leaf_ndx_map = OrderedDict()
@@ -296,6 +324,7 @@ class Model(object):
         self._floats_referenced_by_con[con] = referenced_floats
 
     def _remove_conditional_constraint(self, con):
+        self._structure_modified = True
         self._evaluator.remove_if_else_constraint(self._con_ccon_map[con])
         del self._con_ccon_map[con]
         for v in self._vars_referenced_by_con[con]:
@@ -312,6 +341,7 @@ class Model(object):
         if type(con.expr) == ConditionalExpression:
             self._remove_conditional_constraint(con)
             return None
+        self._structure_modified = True
         self._evaluator.remove_constraint(self._con_ccon_map[con])
         del self._con_ccon_map[con]
         for v in self._vars_referenced_by_con[con]:
@@ -365,7 +395,7 @@ class Model(object):
             tmp += '\n'
         return tmp
 
-    def set_structure(self):
+    def set_structure(self, incremental=True):
         """
         This method essentially just orders all of the variables and constraints so that
         the constraint residuals and the jacobian can be evaluated efficiently. This method
@@ -373,8 +403,99 @@ class Model(object):
         can be called. If any changes are made to the model (e.g., variables/constraints are
         added/removed), then this method needs called again. Avoid calling this method too often
         if you are concerned about efficiency.
+
+        Variables and constraints are ordered by the order in which they were added to the model,
+        so the structure does not depend on where the evaluator objects are allocated.
+
+        Once the structure has been set, later calls only patch the rows and columns of the
+        constraints and variables that were added or removed (added constraints and variables
+        take the places of removed ones), so the indices of all other constraints and variables
+        are kept. The structure is rebuilt from scratch if more than half of the rows changed.
+
+        Parameters
+        ----------
+        incremental: bool
+            If False, the structure is always rebuilt from scratch.
+        """
+        self._evaluator.set_structure(incremental)
+        if self._structure_modified:
+            self._structure_version = new_structure_version()
+            self._structure_modified = False
+
+    def get_structure(self):
+        """
+        Get the order of the variables and constraints so that it can be restored in an
+        equivalent model with :py:meth:`load_structure`. The structure must be set.
+
+        Returns
+        -------
+        structure: dict
+            'vars' and 'cons' map the names of the variables and constraints to (index, rank);
+            'next_rank' is the rank of the next variable or constraint added to the model.
+        """
+        if self.structure_version is None:
+            raise RuntimeError('The structure of the model is not set. Please call set_structure() first.')
+        structure = dict()
+        structure['vars'] = {v.name: (cvar.index, cvar.rank) for v, cvar in self._var_cvar_map.items()}
+        structure['cons'] = {c.name: (ccon.index, ccon.rank) for c, ccon in self._con_ccon_map.items()}
+        structure['next_rank'] = self._next_rank
+        return structure
+
+    def load_structure(self, structure):
+        """
+        Order the variables and constraints as in a structure from :py:meth:`get_structure` of
+        an equivalent model (a model with variables and constraints of the same names). The ranks
+        are restored as well, so later changes to the structure are ordered the same way as in the
+        original model.
+
+        Parameters
+        ----------
+        structure: dict
+        """
+        var_structure = structure['vars']
+        con_structure = structure['cons']
+        if (len(var_structure) != len(self._var_cvar_map) or len(con_structure) != len(self._con_ccon_map) or
+                any(v.name not in var_structure for v in self._var_cvar_map) or
+                any(c.name not in con_structure for c in self._con_ccon_map)):
+            raise ValueError('The variables and constraints of the model do not match the structure.')
+        for v, cvar in self._var_cvar_map.items():
+            cvar.rank = var_structure[v.name][0]
+        for c, ccon in self._con_ccon_map.items():
+            ccon.rank = con_structure[c.name][0]
+        self._structure_modified = True
+        self.set_structure(incremental=False)
+        for v, cvar in self._var_cvar_map.items():
+            cvar.rank = var_structure[v.name][1]
+        for c, ccon in self._con_ccon_map.items():
+            ccon.rank = con_structure[c.name][1]
+        self._next_rank = structure['next_rank']
+
+    @property
+    def structure_version(self):
+        """
+        An integer identifying the current ordering of the variables and constraints (and therefore
+        the sparsity pattern of the jacobian). The version changes whenever set_structure is called
+        after constraints were added or removed. Variables are only part of the structure through
+        the constraints that reference them, so adding a variable that no constraint uses does not
+        change the version. It is None until set_structure has been called.
+        """
+        if self._structure_modified:
+            return None
+        return self._structure_version
+
+    @property
+    def num_full_restructures(self):
+        """
+        The number of times set_structure ordered all of the variables and constraints from scratch.
+        """
+        return self._evaluator.num_full_restructures
+
+    @property
+    def num_incremental_restructures(self):
+        """
+        The number of times set_structure only patched the rows and columns that changed.
         """
-        self._evaluator.set_structure()
+        return self._evaluator.num_incremental_restructures
 
     def cons(self):
         for i in self._con_ccon_map:
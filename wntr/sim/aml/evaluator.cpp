@@ -232,9 +232,9 @@ double _evaluate(double* stack, std::vector<int>* rpn, std::vector<Leaf*>* value
 
 Evaluator::~Evaluator()
 {
-  if (is_structure_set)
+  if (stack != NULL)
     {
-      remove_structure();
+      delete[] stack;
     }
   
   std::set<Constraint*>::iterator con_iter;
@@ -277,6 +277,7 @@ Var* Evaluator::add_var(double value)
     }
   Var* v = new Var(value);
   var_set.insert(v);
+  new_vars.insert(v);
   return v;
 }
 
@@ -313,6 +314,7 @@ Constraint* Evaluator::add_constraint()
     }
   Constraint* c = new Constraint();
   con_set.insert(c);
+  new_cons.insert(c);
   return c;
 }
 
@@ -325,6 +327,7 @@ IfElseConstraint* Evaluator::add_if_else_constraint()
     }
   IfElseConstraint* c = new IfElseConstraint();
   if_else_con_set.insert(c);
+  new_if_else_cons.insert(c);
   return c;
 }
 
@@ -335,6 +338,11 @@ void Evaluator::remove_var(Var* v)
     {
       remove_structure();
     }
+  if (new_vars.erase(v) == 0 && v->index >= 0)
+    {
+      var_vector[v->index] = NULL;
+      free_var_slots.push_back(v->index);
+    }
   var_set.erase(v);
   delete v;
 }
@@ -368,6 +376,10 @@ void Evaluator::remove_constraint(Constraint* c)
     {
       remove_structure();
     }
+  if (new_cons.erase(c) == 0 && c->index >= 0)
+    {
+      clear_row(c->index);
+    }
   con_set.erase(c);
   delete c;
 }
@@ -379,122 +391,348 @@ void Evaluator::remove_if_else_constraint(IfElseConstraint* c)
     {
       remove_structure();
     }
+  if (new_if_else_cons.erase(c) == 0 && c->index >= 0)
+    {
+      clear_row(c->index);
+    }
   if_else_con_set.erase(c);
   delete c;
 }
 
 
-void Evaluator::set_structure()
+void Evaluator::resize_rows(int n_rows)
 {
-  if (is_structure_set)
+  row_con.resize(n_rows, NULL);
+  row_if_else_con.resize(n_rows, NULL);
+  leaves.resize(n_rows);
+  jac_vars.resize(n_rows);
+  n_conditions.resize(n_rows, 0);
+  condition_rpn.resize(n_rows);
+  fn_rpn.resize(n_rows);
+  jac_rpn.resize(n_rows);
+}
+
+
+void Evaluator::update_max_rpn_size(std::vector<std::vector<int> > &rpn)
+{
+  for (std::vector<std::vector<int> >::iterator rpn_iter = rpn.begin(); rpn_iter != rpn.end(); ++rpn_iter)
     {
-      remove_structure();
+      if ((int) rpn_iter->size() > max_rpn_size)
+	max_rpn_size = rpn_iter->size();
+    }
+}
+
+
+void Evaluator::set_row(int row, Constraint* con)
+{
+  con->index = row;
+  row_con[row] = con;
+  row_if_else_con[row] = NULL;
+  leaves[row] = con->leaves;
+  n_conditions[row] = 1;
+  condition_rpn[row].assign(1, std::vector<int>());
+  fn_rpn[row].assign(1, con->fn_rpn);
+  jac_vars[row].clear();
+  jac_rpn[row].clear();
+  std::map<Var*, std::vector<int> >::iterator jac_rpn_iter;
+  for (jac_rpn_iter = con->jac_rpn.begin(); jac_rpn_iter != con->jac_rpn.end(); ++jac_rpn_iter)
+    {
+      jac_vars[row].push_back(jac_rpn_iter->first);
+      jac_rpn[row].push_back(jac_rpn_iter->second);
+    }
+  nnz += jac_vars[row].size();
+  update_max_rpn_size(fn_rpn[row]);
+  update_max_rpn_size(jac_rpn[row]);
+}
+
+
+void Evaluator::set_row(int row, IfElseConstraint* con)
+{
+  con->index = row;
+  row_con[row] = NULL;
+  row_if_else_con[row] = con;
+  leaves[row] = con->leaves;
+  int _n_conditions = con->condition_rpn.size();
+  n_conditions[row] = _n_conditions;
+  condition_rpn[row] = con->condition_rpn;
+  fn_rpn[row] = con->fn_rpn;
+  jac_vars[row].clear();
+  jac_rpn[row].clear();
+  std::map<Var*, std::vector<std::vector<int> > >::iterator jac_rpn_iter;
+  for (jac_rpn_iter = con->jac_rpn.begin(); jac_rpn_iter != con->jac_rpn.end(); ++jac_rpn_iter)
+    {
+      if (((int) jac_rpn_iter->second.size()) != _n_conditions)
+	{
+	  throw StructureException("The number of vectors in jac_rpn must be equal to the number of conditions for an IfElseConstraint.");
+	}
+      jac_vars[row].push_back(jac_rpn_iter->first);
+    }
+  // the derivatives are stored by condition so that the derivatives of one
+  // condition are contiguous
+  for (int i=0; i<_n_conditions; ++i)
+    {
+      for (jac_rpn_iter = con->jac_rpn.begin(); jac_rpn_iter != con->jac_rpn.end(); ++jac_rpn_iter)
+	{
+	  jac_rpn[row].push_back(jac_rpn_iter->second[i]);
+	}
+    }
+  nnz += jac_vars[row].size();
+  update_max_rpn_size(condition_rpn[row]);
+  update_max_rpn_size(fn_rpn[row]);
+  update_max_rpn_size(jac_rpn[row]);
+}
+
+
+void Evaluator::clear_row(int row)
+{
+  nnz -= jac_vars[row].size();
+  row_con[row] = NULL;
+  row_if_else_con[row] = NULL;
+  leaves[row].clear();
+  jac_vars[row].clear();
+  n_conditions[row] = 0;
+  condition_rpn[row].clear();
+  fn_rpn[row].clear();
+  jac_rpn[row].clear();
+  free_rows.push_back(row);
+}
+
+
+void Evaluator::move_row(int from, int to)
+{
+  row_con[to] = row_con[from];
+  row_if_else_con[to] = row_if_else_con[from];
+  if (row_con[to] != NULL)
+    row_con[to]->index = to;
+  else
+    row_if_else_con[to]->index = to;
+  leaves[to].swap(leaves[from]);
+  jac_vars[to].swap(jac_vars[from]);
+  n_conditions[to] = n_conditions[from];
+  condition_rpn[to].swap(condition_rpn[from]);
+  fn_rpn[to].swap(fn_rpn[from]);
+  jac_rpn[to].swap(jac_rpn[from]);
+}
+
+
+void Evaluator::set_structure(bool incremental)
+{
+  int n_changes = std::max(new_cons.size() + new_if_else_cons.size(), free_rows.size());
+  if (incremental && is_structure_set && n_changes == 0 && new_vars.empty() && free_var_slots.empty())
+    {
+      return;
+    }
+  if (incremental && num_full_restructures > 0 && 2 * n_changes <= (int) row_con.size())
+    {
+      incremental_structure();
+      ++num_incremental_restructures;
+    }
+  else
+    {
+      full_structure();
+      ++num_full_restructures;
+    }
+
+  if (max_rpn_size > stack_size)
+    {
+      if (stack != NULL)
+	delete[] stack;
+      stack = new double[max_rpn_size];
+      stack_size = max_rpn_size;
     }
   is_structure_set = true;
-  var_vector.clear();
-  leaves.clear();
-  col_ndx.clear();
-  row_nnz.clear();
+}
+
+
+// The structure orders variables and constraints by their rank (set by the
+// Python model in the order they were created) so that it does not depend
+// on memory addresses. Equal ranks keep the order of the sets.
+struct RankedRow
+{
+  int rank;
+  Constraint* con;
+  IfElseConstraint* if_else_con;
+};
 
-  fn_rpn.clear();
-  jac_rpn.clear();
 
-  n_conditions.clear();
-  if_else_condition_rpn.clear();
-  if_else_fn_rpn.clear();
-  if_else_jac_rpn.clear();
+static bool var_rank_less(const Var* a, const Var* b)
+{
+  return a->rank < b->rank;
+}
+
+
+static bool row_rank_less(const RankedRow &a, const RankedRow &b)
+{
+  return a.rank < b.rank;
+}
+
+
+static std::vector<Var*> ranked_vars(const std::set<Var*> &vars)
+{
+  std::vector<Var*> result(vars.begin(), vars.end());
+  std::stable_sort(result.begin(), result.end(), var_rank_less);
+  return result;
+}
 
-  int max_rpn_size = 0;
+
+static std::vector<RankedRow> ranked_rows(const std::set<Constraint*> &cons, const std::set<IfElseConstraint*> &if_else_cons)
+{
+  std::vector<RankedRow> result;
+  result.reserve(cons.size() + if_else_cons.size());
+  std::set<Constraint*>::const_iterator con_iter;
+  for (con_iter = cons.begin(); con_iter != cons.end(); ++con_iter)
+    {
+      RankedRow row = {(*con_iter)->rank, *con_iter, NULL};
+      result.push_back(row);
+    }
+  std::set<IfElseConstraint*>::const_iterator if_else_con_iter;
+  for (if_else_con_iter = if_else_cons.begin(); if_else_con_iter != if_else_cons.end(); ++if_else_con_iter)
+    {
+      RankedRow row = {(*if_else_con_iter)->rank, NULL, *if_else_con_iter};
+      result.push_back(row);
+    }
+  std::stable_sort(result.begin(), result.end(), row_rank_less);
+  return result;
+}
+
+
+void Evaluator::full_structure()
+{
+  new_vars.clear();
+  new_cons.clear();
+  new_if_else_cons.clear();
+  free_var_slots.clear();
+  free_rows.clear();
+  nnz = 0;
+  max_rpn_size = 0;
 
   //******************************************
-  // Variables
+  // Variables, ordered by rank
   //******************************************
-  std::set<Var*>::iterator var_iter;
-  int ndx = 0;
-  for (var_iter = var_set.begin(); var_iter != var_set.end(); ++var_iter)
+  var_vector.clear();
+  std::vector<Var*> vars = ranked_vars(var_set);
+  for (unsigned int ndx = 0; ndx < vars.size(); ++ndx)
     {
-      var_vector.push_back(*var_iter);
-      (*var_iter)->index = ndx;
-      ++ndx;
+      var_vector.push_back(vars[ndx]);
+      vars[ndx]->index = ndx;
     }
 
   //******************************************
-  // Constraints
+  // Constraints and IfElseConstraints,
+  // ordered by rank
   //******************************************
-  row_nnz.push_back(0);
-  ndx = 0;
-  std::set<Constraint*>::iterator con_iter;
-  for (con_iter = con_set.begin(); con_iter != con_set.end(); ++con_iter)
+  resize_rows(0);
+  resize_rows(con_set.size() + if_else_con_set.size());
+  std::vector<RankedRow> rows = ranked_rows(con_set, if_else_con_set);
+  for (unsigned int ndx = 0; ndx < rows.size(); ++ndx)
     {
-      Constraint* con = *con_iter;
-      con->index = ndx;
-      leaves.push_back(con->leaves);
-      fn_rpn.push_back(con->fn_rpn);
-      if (con->fn_rpn.size() > max_rpn_size)
-	max_rpn_size = con->fn_rpn.size();
-      row_nnz.push_back(row_nnz[ndx] + con->jac_rpn.size());
-      std::map<Var*, std::vector<int> >::iterator jac_rpn_iter;
-      for (jac_rpn_iter = con->jac_rpn.begin(); jac_rpn_iter != con->jac_rpn.end(); ++jac_rpn_iter)
-	{
-	  col_ndx.push_back(jac_rpn_iter->first->index);
-	  jac_rpn.push_back(jac_rpn_iter->second);
-	  if (jac_rpn_iter->second.size() > max_rpn_size)
-	    max_rpn_size = jac_rpn_iter->second.size();
-	}
-      ++ndx;
+      if (rows[ndx].con != NULL)
+	set_row(ndx, rows[ndx].con);
+      else
+	set_row(ndx, rows[ndx].if_else_con);
     }
+}
+
 
+void Evaluator::incremental_structure()
+{
   //******************************************
-  // IfElseConstraints
+  // Variables
+  //
+  // New variables fill the slots of removed
+  // variables first. If more variables were
+  // removed than added, the last variables are
+  // moved into the remaining slots.
   //******************************************
-  std::set<IfElseConstraint*>::iterator if_else_con_iter;
-  int _n_conditions = 0;
-  for (if_else_con_iter = if_else_con_set.begin(); if_else_con_iter != if_else_con_set.end(); ++if_else_con_iter)
+  std::sort(free_var_slots.begin(), free_var_slots.end());
+  unsigned int k = 0;
+  int slot;
+  std::vector<Var*> vars = ranked_vars(new_vars);
+  for (unsigned int i = 0; i < vars.size(); ++i)
     {
-      IfElseConstraint* con = *if_else_con_iter;
-      con->index = ndx;
-      leaves.push_back(con->leaves);
-      _n_conditions = con->condition_rpn.size();
-      n_conditions.push_back(_n_conditions);
-      row_nnz.push_back(row_nnz[ndx] + con->jac_rpn.size()); // every vector in con->jac_rpn should be the same size
-      for (int i=0; i<_n_conditions; ++i)
+      if (k < free_var_slots.size())
 	{
-	  if_else_condition_rpn.push_back(con->condition_rpn[i]);
-	  if (con->condition_rpn[i].size() > max_rpn_size)
-	    max_rpn_size = con->condition_rpn[i].size();
-	  if_else_fn_rpn.push_back(con->fn_rpn[i]);
-	  if (con->fn_rpn[i].size() > max_rpn_size)
-	    max_rpn_size = con->fn_rpn[i].size();
-	  for (std::map<Var*, std::vector<std::vector<int> > >::iterator jac_rpn_iter=con->jac_rpn.begin(); jac_rpn_iter!=con->jac_rpn.end(); ++jac_rpn_iter)
-	    {
-	      if (((int) jac_rpn_iter->second.size()) != _n_conditions)
-		{
-		  throw StructureException("The number of vectors in jac_rpn must be equal to the number of conditions for an IfElseConstraint.");
-		}
-	      if (i==0)
-		{
-		  col_ndx.push_back(jac_rpn_iter->first->index);
-		}
-	      if_else_jac_rpn.push_back(jac_rpn_iter->second[i]);
-	      if (jac_rpn_iter->second[i].size() > max_rpn_size)
-		max_rpn_size = jac_rpn_iter->second[i].size();
-	    }
+	  slot = free_var_slots[k];
+	  ++k;
+	}
+      else
+	{
+	  slot = var_vector.size();
+	  var_vector.push_back(NULL);
 	}
-      ++ndx;
+      var_vector[slot] = vars[i];
+      vars[i]->index = slot;
     }
-  
-  nnz = row_nnz.back();
-  stack = new double[max_rpn_size];
+  for (; k < free_var_slots.size(); ++k)
+    {
+      slot = free_var_slots[k];
+      while (!var_vector.empty() && var_vector.back() == NULL)
+	var_vector.pop_back();
+      if (slot >= (int) var_vector.size())
+	break;
+      var_vector[slot] = var_vector.back();
+      var_vector[slot]->index = slot;
+      var_vector.pop_back();
+    }
+  while (!var_vector.empty() && var_vector.back() == NULL)
+    var_vector.pop_back();
+
+  //******************************************
+  // Constraints
+  //
+  // Only the rows of removed and added
+  // constraints are modified; the same rules
+  // as for the variables are used to keep the
+  // rows of the other constraints.
+  //******************************************
+  std::sort(free_rows.begin(), free_rows.end());
+  std::vector<int> holes;
+  holes.swap(free_rows);
+  k = 0;
+  int n_rows = row_con.size();
+  std::vector<RankedRow> rows = ranked_rows(new_cons, new_if_else_cons);
+  for (unsigned int i = 0; i < rows.size(); ++i)
+    {
+      if (k < holes.size())
+	{
+	  slot = holes[k];
+	  ++k;
+	}
+      else
+	{
+	  slot = n_rows;
+	  ++n_rows;
+	  resize_rows(n_rows);
+	}
+      if (rows[i].con != NULL)
+	set_row(slot, rows[i].con);
+      else
+	set_row(slot, rows[i].if_else_con);
+    }
+  for (; k < holes.size(); ++k)
+    {
+      slot = holes[k];
+      while (n_rows > 0 && row_con[n_rows-1] == NULL && row_if_else_con[n_rows-1] == NULL)
+	--n_rows;
+      if (slot >= n_rows)
+	break;
+      move_row(n_rows-1, slot);
+      --n_rows;
+    }
+  while (n_rows > 0 && row_con[n_rows-1] == NULL && row_if_else_con[n_rows-1] == NULL)
+    --n_rows;
+  resize_rows(n_rows);
+
+  new_vars.clear();
+  new_cons.clear();
+  new_if_else_cons.clear();
+  free_var_slots.clear();
 }
 
 
 void Evaluator::remove_structure()
 {
-  if (is_structure_set)
-    {
-      is_structure_set = false;
-      delete[] stack;
-    }
+  is_structure_set = false;
 }
 
 
@@ -504,49 +742,18 @@ void Evaluator::evaluate(double* array_out, int array_length_out)
     {
       throw StructureException("Cannot call evaluate() if the structure is not set. Please call set_structure() first.");
     }
-  int num_cons = con_set.size();
-  int num_if_else_cons = if_else_con_set.size();
-  int con_ndx = 0;
-  while (con_ndx<num_cons)
-    {
-      array_out[con_ndx] = _evaluate(stack, &(fn_rpn[con_ndx]), &(leaves[con_ndx]));
-      ++con_ndx;
-    }
-
-  int c = 0;
-  int _n_conditions = 0;
-  bool found;
-  int condition_ndx = 0;
+  int n_rows = row_con.size();
   int i;
-  while (con_ndx < num_cons + num_if_else_cons)
+  int _n_conditions;
+  for (int row=0; row<n_rows; ++row)
     {
-      found = false;
-      _n_conditions = n_conditions[c];
+      _n_conditions = n_conditions[row];
       i = 0;
-      while (!found)
+      while (i < _n_conditions - 1 && condition_rpn[row][i].size() != 0 && _evaluate(stack, &(condition_rpn[row][i]), &(leaves[row])) != 1)
 	{
-	  if (if_else_condition_rpn[condition_ndx].size() == 0)
-	    {
-	      found = true;
-	    }
-	  else if (_evaluate(stack, &(if_else_condition_rpn[condition_ndx]), &(leaves[con_ndx])) == 1)
-	    {
-	      found = true;
-	    }
-
-	  if (found)
-	    {
-	      array_out[con_ndx] = _evaluate(stack, &(if_else_fn_rpn[condition_ndx]), &(leaves[con_ndx]));
-	      condition_ndx += _n_conditions - i;
-	    }
-	  else
-	    {
-	      ++condition_ndx;
-	      ++i;
-	    }
+	  ++i;
 	}
-      ++c;
-      ++con_ndx;
+      array_out[row] = _evaluate(stack, &(fn_rpn[row][i]), &(leaves[row]));
     }
 }
 
@@ -557,71 +764,28 @@ void Evaluator::evaluate_csr_jacobian(double* values_array_out, int values_array
     {
       throw StructureException("Cannot call evaluate_csr_jacobian() if the structure is not set. Please call set_structure() first.");
     }
-  int num_cons = con_set.size();
-  int num_if_else_cons = if_else_con_set.size();
+  int n_rows = row_con.size();
   row_nnz_array_out[0] = 0;
   int nnz_ndx = 0;
-  int nnz;
-
-  int con_ndx = 0;
-  while (con_ndx < num_cons)
+  int row_nnz;
+  int i;
+  int _n_conditions;
+  for (int row=0; row<n_rows; ++row)
     {
-      row_nnz_array_out[con_ndx+1] = row_nnz[con_ndx+1];
-      nnz = row_nnz[con_ndx+1] - row_nnz[con_ndx];
-      for (int i=0; i<nnz; ++i)
+      row_nnz = jac_vars[row].size();
+      row_nnz_array_out[row+1] = row_nnz_array_out[row] + row_nnz;
+      _n_conditions = n_conditions[row];
+      i = 0;
+      while (i < _n_conditions - 1 && condition_rpn[row][i].size() != 0 && _evaluate(stack, &(condition_rpn[row][i]), &(leaves[row])) != 1)
 	{
-	  values_array_out[nnz_ndx] = _evaluate(stack, &(jac_rpn[nnz_ndx]), &(leaves[con_ndx]));
-	  col_ndx_array_out[nnz_ndx] = col_ndx[nnz_ndx];
-	  ++nnz_ndx;
+	  ++i;
 	}
-      ++con_ndx;
-    }
-
-  int c = 0;
-  int i = 0;
-  int _n_conditions = 0;
-  bool found;
-  int condition_ndx = 0;
-  int jac_ndx = 0;
-  while (con_ndx < num_cons + num_if_else_cons)
-    {
-      row_nnz_array_out[con_ndx+1] = row_nnz[con_ndx+1];
-      nnz = row_nnz[con_ndx+1] - row_nnz[con_ndx];
-      _n_conditions = n_conditions[c];
-      i = 0;
-      found = false;
-      while (!found)
+      for (int j=0; j<row_nnz; ++j)
 	{
-	  if (if_else_condition_rpn[condition_ndx].size() == 0)
-	    {
-	      found = true;
-	    }
-	  else if (_evaluate(stack, &(if_else_condition_rpn[condition_ndx]), &(leaves[con_ndx])) == 1)
-	    {
-	      found = true;
-	    }
-
-	  if (found)
-	    {
-	      for (int j=0; j<nnz; ++j)
-		{
-		  values_array_out[nnz_ndx] = _evaluate(stack, &(if_else_jac_rpn[jac_ndx]), &(leaves[con_ndx]));
-		  col_ndx_array_out[nnz_ndx] = col_ndx[nnz_ndx];
-		  ++nnz_ndx;
-		  ++jac_ndx;
-		}
-	      condition_ndx += _n_conditions - i;
-	      jac_ndx += (_n_conditions - i - 1) * nnz;
-	    }
-	  else
-	    {
-	      ++condition_ndx;
-	      ++i;
-	      jac_ndx += nnz;
-	    }
+	  values_array_out[nnz_ndx] = _evaluate(stack, &(jac_rpn[row][i * row_nnz + j]), &(leaves[row]));
+	  col_ndx_array_out[nnz_ndx] = jac_vars[row][j]->index;
+	  ++nnz_ndx;
 	}
-      ++con_ndx;
-      ++c;
     }
 }
 
@@ -652,5 +816,3 @@ void Evaluator::load_var_values_from_x(double *arrayin, int array_length_in)
       var_vector[i]->value = arrayin[i];
     }
 }
-
-
@@ -4,6 +4,7 @@
 #include <map>
 #include <stdexcept>
 #include <cmath>
+#include <algorithm>
 
 
 const int ADD = -1;
@@ -55,11 +56,12 @@ public:
 class Var: public Leaf
 {
 public:
-  Var(){}
-  Var(double val): Leaf(val) {}
+  Var(){index = -1; rank = 0;}
+  Var(double val): Leaf(val) {index = -1; rank = 0;}
   ~Var(){}
 
   int index;
+  int rank;
 };
 
 
@@ -84,7 +86,7 @@ public:
 class Constraint
 {
 public:
-  Constraint(){}
+  Constraint(){index = -1; rank = 0;}
   ~Constraint(){}
 
   void add_leaf(Leaf* leaf);
@@ -96,13 +98,14 @@ public:
   std::vector<Leaf*> leaves;
 
   int index;
+  int rank;
 };
 
 
 class IfElseConstraint
 {
 public:
-  IfElseConstraint(){}
+  IfElseConstraint(){index = -1; rank = 0;}
   ~IfElseConstraint(){}
 
   void add_leaf(Leaf* leaf);
@@ -122,17 +125,20 @@ public:
   std::vector<Leaf*> leaves;
 
   int index;
+  int rank;
 };
 
 
 class Evaluator
 {
 public:
-  Evaluator(){is_structure_set = false;}
+  Evaluator(){is_structure_set = false; stack = NULL; stack_size = 0; max_rpn_size = 0; nnz = 0; num_full_restructures = 0; num_incremental_restructures = 0;}
   ~Evaluator();
 
   int nnz;
   double* stack;
+  int num_full_restructures;
+  int num_incremental_restructures;
 
   Var* add_var(double value);
   Param* add_param(double value);
@@ -146,7 +152,7 @@ public:
   void remove_constraint(Constraint* c);
   void remove_if_else_constraint(IfElseConstraint* c);
 
-  void set_structure();
+  void set_structure(bool incremental=true);
   void remove_structure();
 
   void get_x(double *array_out, int array_length_out);
@@ -157,6 +163,8 @@ public:
 
 private:
   bool is_structure_set;
+  int stack_size;
+  int max_rpn_size;
   
   std::set<Var*> var_set;
   std::set<Param*> param_set;
@@ -164,18 +172,34 @@ private:
   std::set<Constraint*> con_set;
   std::set<IfElseConstraint*> if_else_con_set;
 
-  std::vector<Var*> var_vector;
-  std::vector<std::vector<Leaf*> > leaves;
-  std::vector<int> col_ndx;
-  std::vector<int> row_nnz;
+  // changes since the structure was last set
+  std::set<Var*> new_vars;
+  std::set<Constraint*> new_cons;
+  std::set<IfElseConstraint*> new_if_else_cons;
+  std::vector<int> free_var_slots;
+  std::vector<int> free_rows;
 
-  std::vector<std::vector<int> > fn_rpn;
-  std::vector<std::vector<int> > jac_rpn;
+  std::vector<Var*> var_vector;
 
+  // one entry per row of the jacobian; a Constraint is stored as an
+  // IfElseConstraint with a single condition that is always true
+  std::vector<Constraint*> row_con;
+  std::vector<IfElseConstraint*> row_if_else_con;
+  std::vector<std::vector<Leaf*> > leaves;
+  std::vector<std::vector<Var*> > jac_vars;
   std::vector<int> n_conditions;
-  std::vector<std::vector<int> > if_else_condition_rpn;
-  std::vector<std::vector<int> > if_else_fn_rpn;
-  std::vector<std::vector<int> > if_else_jac_rpn;
+  std::vector<std::vector<std::vector<int> > > condition_rpn;
+  std::vector<std::vector<std::vector<int> > > fn_rpn;
+  std::vector<std::vector<std::vector<int> > > jac_rpn;
+
+  void full_structure();
+  void incremental_structure();
+  void resize_rows(int n_rows);
+  void set_row(int row, Constraint* con);
+  void set_row(int row, IfElseConstraint* con);
+  void clear_row(int row);
+  void move_row(int from, int to);
+  void update_max_rpn_size(std::vector<std::vector<int> > &rpn);
 };
 
 
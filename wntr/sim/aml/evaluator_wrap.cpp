@@ -3793,6 +3793,20 @@ SWIG_AsVal_int (PyObject * obj, int *val)
 }
 
 
+SWIGINTERN int
+SWIG_AsVal_bool (PyObject *obj, bool *val)
+{
+  int r;
+  if (!PyBool_Check(obj))
+    return SWIG_ERROR;
+  r = PyObject_IsTrue(obj);
+  if (r == -1)
+    return SWIG_ERROR;
+  if (val) *val = r ? true : false;
+  return SWIG_OK;
+}
+
+
 #if NPY_API_VERSION < 0x00000007
 #define NPY_ARRAY_DEFAULT NPY_DEFAULT
 #define NPY_ARRAY_FARRAY  NPY_FARRAY
@@ -5103,6 +5117,58 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_Var_rank_set(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Var *arg1 = (Var *) 0 ;
+  int arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Var, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Var_rank_set" "', argument " "1"" of type '" "Var *""'"); 
+  }
+  arg1 = reinterpret_cast< Var * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[0], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "Var_rank_set" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
+  if (arg1) (arg1)->rank = arg2;
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_Var_rank_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Var *arg1 = (Var *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  int result;
+  
+  if (!SWIG_Python_UnpackTuple(args, "Var_rank_get", 0, 0, 0)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Var, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Var_rank_get" "', argument " "1"" of type '" "Var *""'"); 
+  }
+  arg1 = reinterpret_cast< Var * >(argp1);
+  result = (int) ((arg1)->rank);
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 SWIGPY_DESTRUCTOR_CLOSURE(_wrap_delete_Var) /* defines _wrap_delete_Var_destructor_closure */
 
 SWIGINTERN int _wrap_new_Param__SWIG_0(PyObject *self, Py_ssize_t nobjs, PyObject **SWIGUNUSEDPARM(swig_obj)) {
@@ -5804,6 +5870,58 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_Constraint_rank_set(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Constraint *arg1 = (Constraint *) 0 ;
+  int arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Constraint, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Constraint_rank_set" "', argument " "1"" of type '" "Constraint *""'"); 
+  }
+  arg1 = reinterpret_cast< Constraint * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[0], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "Constraint_rank_set" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
+  if (arg1) (arg1)->rank = arg2;
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_Constraint_rank_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Constraint *arg1 = (Constraint *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  int result;
+  
+  if (!SWIG_Python_UnpackTuple(args, "Constraint_rank_get", 0, 0, 0)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Constraint, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Constraint_rank_get" "', argument " "1"" of type '" "Constraint *""'"); 
+  }
+  arg1 = reinterpret_cast< Constraint * >(argp1);
+  result = (int) ((arg1)->rank);
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 SWIGPY_DESTRUCTOR_CLOSURE(_wrap_delete_Constraint) /* defines _wrap_delete_Constraint_destructor_closure */
 
 SWIGINTERN int _wrap_new_IfElseConstraint(PyObject *self, PyObject *args, PyObject *kwargs) {
@@ -6558,6 +6676,58 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_IfElseConstraint_rank_set(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  IfElseConstraint *arg1 = (IfElseConstraint *) 0 ;
+  int arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_IfElseConstraint, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "IfElseConstraint_rank_set" "', argument " "1"" of type '" "IfElseConstraint *""'"); 
+  }
+  arg1 = reinterpret_cast< IfElseConstraint * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[0], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "IfElseConstraint_rank_set" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
+  if (arg1) (arg1)->rank = arg2;
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_IfElseConstraint_rank_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  IfElseConstraint *arg1 = (IfElseConstraint *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  int result;
+  
+  if (!SWIG_Python_UnpackTuple(args, "IfElseConstraint_rank_get", 0, 0, 0)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_IfElseConstraint, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "IfElseConstraint_rank_get" "', argument " "1"" of type '" "IfElseConstraint *""'"); 
+  }
+  arg1 = reinterpret_cast< IfElseConstraint * >(argp1);
+  result = (int) ((arg1)->rank);
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 SWIGPY_DESTRUCTOR_CLOSURE(_wrap_delete_IfElseConstraint) /* defines _wrap_delete_IfElseConstraint_destructor_closure */
 
 SWIGINTERN int _wrap_new_Evaluator(PyObject *self, PyObject *args, PyObject *kwargs) {
@@ -6729,6 +6899,110 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_Evaluator_num_full_restructures_set(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Evaluator *arg1 = (Evaluator *) 0 ;
+  int arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Evaluator, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Evaluator_num_full_restructures_set" "', argument " "1"" of type '" "Evaluator *""'"); 
+  }
+  arg1 = reinterpret_cast< Evaluator * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[0], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "Evaluator_num_full_restructures_set" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
+  if (arg1) (arg1)->num_full_restructures = arg2;
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_Evaluator_num_full_restructures_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Evaluator *arg1 = (Evaluator *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  int result;
+  
+  if (!SWIG_Python_UnpackTuple(args, "Evaluator_num_full_restructures_get", 0, 0, 0)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Evaluator, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Evaluator_num_full_restructures_get" "', argument " "1"" of type '" "Evaluator *""'"); 
+  }
+  arg1 = reinterpret_cast< Evaluator * >(argp1);
+  result = (int) ((arg1)->num_full_restructures);
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_Evaluator_num_incremental_restructures_set(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Evaluator *arg1 = (Evaluator *) 0 ;
+  int arg2 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  int val2 ;
+  int ecode2 = 0 ;
+  PyObject *swig_obj[2] ;
+  
+  if (!args) SWIG_fail;
+  swig_obj[0] = args;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Evaluator, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Evaluator_num_incremental_restructures_set" "', argument " "1"" of type '" "Evaluator *""'"); 
+  }
+  arg1 = reinterpret_cast< Evaluator * >(argp1);
+  ecode2 = SWIG_AsVal_int(swig_obj[0], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "Evaluator_num_incremental_restructures_set" "', argument " "2"" of type '" "int""'");
+  } 
+  arg2 = static_cast< int >(val2);
+  if (arg1) (arg1)->num_incremental_restructures = arg2;
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_Evaluator_num_incremental_restructures_get(PyObject *self, PyObject *args) {
+  PyObject *resultobj = 0;
+  Evaluator *arg1 = (Evaluator *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  PyObject *swig_obj[1] ;
+  int result;
+  
+  if (!SWIG_Python_UnpackTuple(args, "Evaluator_num_incremental_restructures_get", 0, 0, 0)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Evaluator, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Evaluator_num_incremental_restructures_get" "', argument " "1"" of type '" "Evaluator *""'"); 
+  }
+  arg1 = reinterpret_cast< Evaluator * >(argp1);
+  result = (int) ((arg1)->num_incremental_restructures);
+  resultobj = SWIG_From_int(static_cast< int >(result));
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
 SWIGINTERN PyObject *_wrap_Evaluator_add_var(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   Evaluator *arg1 = (Evaluator *) 0 ;
@@ -7166,14 +7440,56 @@ fail:
 }
 
 
-SWIGINTERN PyObject *_wrap_Evaluator_set_structure(PyObject *self, PyObject *args) {
+SWIGINTERN PyObject *_wrap_Evaluator_set_structure__SWIG_0(PyObject *self, Py_ssize_t nobjs, PyObject **swig_obj) {
   PyObject *resultobj = 0;
   Evaluator *arg1 = (Evaluator *) 0 ;
+  bool arg2 ;
   void *argp1 = 0 ;
   int res1 = 0 ;
-  PyObject *swig_obj[1] ;
+  bool val2 ;
+  int ecode2 = 0 ;
   
-  if (!SWIG_Python_UnpackTuple(args, "Evaluator_set_structure", 0, 0, 0)) SWIG_fail;
+  if ((nobjs < 2) || (nobjs > 2)) SWIG_fail;
+  res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Evaluator, 0 |  0 );
+  if (!SWIG_IsOK(res1)) {
+    SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Evaluator_set_structure" "', argument " "1"" of type '" "Evaluator *""'"); 
+  }
+  arg1 = reinterpret_cast< Evaluator * >(argp1);
+  ecode2 = SWIG_AsVal_bool(swig_obj[1], &val2);
+  if (!SWIG_IsOK(ecode2)) {
+    SWIG_exception_fail(SWIG_ArgError(ecode2), "in method '" "Evaluator_set_structure" "', argument " "2"" of type '" "bool""'");
+  } 
+  arg2 = static_cast< bool >(val2);
+  {
+    try
+    {
+      (arg1)->set_structure(arg2);
+    }
+    catch (StructureException &e)
+    {
+      std::string s("Evaluator error: "), s2(e.what());
+      s = s + s2;
+      SWIG_exception(SWIG_RuntimeError, s.c_str());
+    }
+    catch (...)
+    {
+      SWIG_exception(SWIG_RuntimeError, "unkown exception");
+    }
+  }
+  resultobj = SWIG_Py_Void();
+  return resultobj;
+fail:
+  return NULL;
+}
+
+
+SWIGINTERN PyObject *_wrap_Evaluator_set_structure__SWIG_1(PyObject *self, Py_ssize_t nobjs, PyObject **SWIGUNUSEDPARM(swig_obj)) {
+  PyObject *resultobj = 0;
+  Evaluator *arg1 = (Evaluator *) 0 ;
+  void *argp1 = 0 ;
+  int res1 = 0 ;
+  
+  if ((nobjs < 1) || (nobjs > 1)) SWIG_fail;
   res1 = SWIG_ConvertPtr(self, &argp1,SWIGTYPE_p_Evaluator, 0 |  0 );
   if (!SWIG_IsOK(res1)) {
     SWIG_exception_fail(SWIG_ArgError(res1), "in method '" "Evaluator_set_structure" "', argument " "1"" of type '" "Evaluator *""'"); 
@@ -7202,6 +7518,48 @@ fail:
 }
 
 
+SWIGINTERN PyObject *_wrap_Evaluator_set_structure(PyObject *self, PyObject *args) {
+  Py_ssize_t argc;
+  PyObject *argv[3] = {
+    0
+  };
+  
+  if (!(argc = SWIG_Python_UnpackTuple(args, "Evaluator_set_structure", 0, 2, argv+1))) SWIG_fail;
+  argv[0] = self;
+  if (argc == 1) {
+    int _v;
+    void *vptr = 0;
+    int res = SWIG_ConvertPtr(argv[0], &vptr, SWIGTYPE_p_Evaluator, 0);
+    _v = SWIG_CheckState(res);
+    if (_v) {
+      return _wrap_Evaluator_set_structure__SWIG_1(self, argc, argv);
+    }
+  }
+  if (argc == 2) {
+    int _v;
+    void *vptr = 0;
+    int res = SWIG_ConvertPtr(argv[0], &vptr, SWIGTYPE_p_Evaluator, 0);
+    _v = SWIG_CheckState(res);
+    if (_v) {
+      {
+        int res = SWIG_AsVal_bool(argv[1], NULL);
+        _v = SWIG_CheckState(res);
+      }
+      if (_v) {
+        return _wrap_Evaluator_set_structure__SWIG_0(self, argc, argv);
+      }
+    }
+  }
+  
+fail:
+  SWIG_Python_RaiseOrModifyTypeError("Wrong number or type of arguments for overloaded function 'Evaluator_set_structure'.\n"
+    "  Possible C/C++ prototypes are:\n"
+    "    Evaluator::set_structure(bool)\n"
+    "    Evaluator::set_structure()\n");
+  return 0;
+}
+
+
 SWIGINTERN PyObject *_wrap_Evaluator_remove_structure(PyObject *self, PyObject *args) {
   PyObject *resultobj = 0;
   Evaluator *arg1 = (Evaluator *) 0 ;
@@ -8016,9 +8374,11 @@ static PyHeapTypeObject SwigPyBuiltin__Leaf_type = {
 SWIGINTERN SwigPyClientData SwigPyBuiltin__Leaf_clientdata = {0, 0, 0, 0, 0, 0, (PyTypeObject *)&SwigPyBuiltin__Leaf_type};
 
 static SwigPyGetSet Var_index_getset = { _wrap_Var_index_get, _wrap_Var_index_set };
+static SwigPyGetSet Var_rank_getset = { _wrap_Var_rank_get, _wrap_Var_rank_set };
 static SwigPyGetSet Var___dict___getset = { SwigPyObject_get___dict__, 0 };
 SWIGINTERN PyGetSetDef SwigPyBuiltin__Var_getset[] = {
     { (char *)"index", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Var_index_getset },
+    { (char *)"rank", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Var_rank_getset },
     { (char *)"__dict__", SwigPyBuiltin_FunpackGetterClosure, 0, (char *)"", &Var___dict___getset },
     { NULL, NULL, NULL, NULL, NULL } /* Sentinel */
 };
@@ -8655,12 +9015,14 @@ SWIGINTERN SwigPyClientData SwigPyBuiltin__Float_clientdata = {0, 0, 0, 0, 0, 0,
 
 static SwigPyGetSet Constraint_leaves_getset = { _wrap_Constraint_leaves_get, _wrap_Constraint_leaves_set };
 static SwigPyGetSet Constraint_index_getset = { _wrap_Constraint_index_get, _wrap_Constraint_index_set };
+static SwigPyGetSet Constraint_rank_getset = { _wrap_Constraint_rank_get, _wrap_Constraint_rank_set };
 static SwigPyGetSet Constraint___dict___getset = { SwigPyObject_get___dict__, 0 };
 static SwigPyGetSet Constraint_fn_rpn_getset = { _wrap_Constraint_fn_rpn_get, _wrap_Constraint_fn_rpn_set };
 static SwigPyGetSet Constraint_jac_rpn_getset = { _wrap_Constraint_jac_rpn_get, _wrap_Constraint_jac_rpn_set };
 SWIGINTERN PyGetSetDef SwigPyBuiltin__Constraint_getset[] = {
     { (char *)"leaves", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Constraint_leaves_getset },
     { (char *)"index", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Constraint_index_getset },
+    { (char *)"rank", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Constraint_rank_getset },
     { (char *)"__dict__", SwigPyBuiltin_FunpackGetterClosure, 0, (char *)"", &Constraint___dict___getset },
     { (char *)"fn_rpn", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Constraint_fn_rpn_getset },
     { (char *)"jac_rpn", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Constraint_jac_rpn_getset },
@@ -8880,6 +9242,7 @@ static SwigPyGetSet IfElseConstraint_current_condition_rpn_getset = { _wrap_IfEl
 static SwigPyGetSet IfElseConstraint_condition_rpn_getset = { _wrap_IfElseConstraint_condition_rpn_get, _wrap_IfElseConstraint_condition_rpn_set };
 static SwigPyGetSet IfElseConstraint_leaves_getset = { _wrap_IfElseConstraint_leaves_get, _wrap_IfElseConstraint_leaves_set };
 static SwigPyGetSet IfElseConstraint_index_getset = { _wrap_IfElseConstraint_index_get, _wrap_IfElseConstraint_index_set };
+static SwigPyGetSet IfElseConstraint_rank_getset = { _wrap_IfElseConstraint_rank_get, _wrap_IfElseConstraint_rank_set };
 static SwigPyGetSet IfElseConstraint___dict___getset = { SwigPyObject_get___dict__, 0 };
 static SwigPyGetSet IfElseConstraint_current_fn_rpn_getset = { _wrap_IfElseConstraint_current_fn_rpn_get, _wrap_IfElseConstraint_current_fn_rpn_set };
 static SwigPyGetSet IfElseConstraint_fn_rpn_getset = { _wrap_IfElseConstraint_fn_rpn_get, _wrap_IfElseConstraint_fn_rpn_set };
@@ -8890,6 +9253,7 @@ SWIGINTERN PyGetSetDef SwigPyBuiltin__IfElseConstraint_getset[] = {
     { (char *)"condition_rpn", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &IfElseConstraint_condition_rpn_getset },
     { (char *)"leaves", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &IfElseConstraint_leaves_getset },
     { (char *)"index", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &IfElseConstraint_index_getset },
+    { (char *)"rank", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &IfElseConstraint_rank_getset },
     { (char *)"__dict__", SwigPyBuiltin_FunpackGetterClosure, 0, (char *)"", &IfElseConstraint___dict___getset },
     { (char *)"current_fn_rpn", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &IfElseConstraint_current_fn_rpn_getset },
     { (char *)"fn_rpn", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &IfElseConstraint_fn_rpn_getset },
@@ -9110,10 +9474,14 @@ static PyHeapTypeObject SwigPyBuiltin__IfElseConstraint_type = {
 SWIGINTERN SwigPyClientData SwigPyBuiltin__IfElseConstraint_clientdata = {0, 0, 0, 0, 0, 0, (PyTypeObject *)&SwigPyBuiltin__IfElseConstraint_type};
 
 static SwigPyGetSet Evaluator___dict___getset = { SwigPyObject_get___dict__, 0 };
+static SwigPyGetSet Evaluator_num_full_restructures_getset = { _wrap_Evaluator_num_full_restructures_get, _wrap_Evaluator_num_full_restructures_set };
+static SwigPyGetSet Evaluator_num_incremental_restructures_getset = { _wrap_Evaluator_num_incremental_restructures_get, _wrap_Evaluator_num_incremental_restructures_set };
 static SwigPyGetSet Evaluator_nnz_getset = { _wrap_Evaluator_nnz_get, _wrap_Evaluator_nnz_set };
 static SwigPyGetSet Evaluator_stack_getset = { _wrap_Evaluator_stack_get, _wrap_Evaluator_stack_set };
 SWIGINTERN PyGetSetDef SwigPyBuiltin__Evaluator_getset[] = {
     { (char *)"__dict__", SwigPyBuiltin_FunpackGetterClosure, 0, (char *)"", &Evaluator___dict___getset },
+    { (char *)"num_full_restructures", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Evaluator_num_full_restructures_getset },
+    { (char *)"num_incremental_restructures", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Evaluator_num_incremental_restructures_getset },
     { (char *)"nnz", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Evaluator_nnz_getset },
     { (char *)"stack", SwigPyBuiltin_FunpackGetterClosure, SwigPyBuiltin_FunpackSetterClosure, (char *)"", &Evaluator_stack_getset },
     { NULL, NULL, NULL, NULL, NULL } /* Sentinel */
@@ -9144,7 +9512,7 @@ SWIGINTERN PyMethodDef SwigPyBuiltin__Evaluator_methods[] = {
   { "remove_float", _wrap_Evaluator_remove_float, METH_O, "" },
   { "remove_constraint", _wrap_Evaluator_remove_constraint, METH_O, "" },
   { "remove_if_else_constraint", _wrap_Evaluator_remove_if_else_constraint, METH_O, "" },
-  { "set_structure", _wrap_Evaluator_set_structure, METH_NOARGS, "" },
+  { "set_structure", _wrap_Evaluator_set_structure, METH_VARARGS, "" },
   { "remove_structure", _wrap_Evaluator_remove_structure, METH_NOARGS, "" },
   { "get_x", _wrap_Evaluator_get_x, METH_O, "" },
   { "load_var_values_from_x", _wrap_Evaluator_load_var_values_from_x, METH_O, "" },
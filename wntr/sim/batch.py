@@ -0,0 +1,439 @@
+"""
+Batched solution of many hydraulic scenarios that differ only in a few
+parameters of the same water network model.
+"""
+import logging
+import pickle
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+import wntr.sim.hydraulics
+import wntr.sim.results
+from wntr.network import LinkStatus, Junction, Reservoir, Node
+from wntr.sim.aml.aml import ParamDict
+from wntr.sim.core import WNTRSimulator, _solver_statistics_columns
+from wntr.sim.scenarios import check_scenario, scenario_keys
+from wntr.sim.solvers import NewtonSolver, SolverStatus, SparseLUCache
+
+logger = logging.getLogger(__name__)
+
+
+class BatchWNTRSimulator(WNTRSimulator):
+    """
+    WNTR simulator that solves many scenarios of the same network at once.
+
+    The hydraulic model is built once with
+    :py:func:`~wntr.sim.hydraulics.create_hydraulic_model`. Scenarios with the
+    same link status overrides share the same model structure; their equations
+    are stacked into a single block diagonal Newton system so that the
+    ordering of the sparse LU factorization is computed once and reused by all
+    blocks and iterations. Each scenario is a dictionary with any of the
+    following keys:
+
+    * 'demand': {junction name: expected demand (m^3/s)}
+    * 'head': {reservoir name: base head (m)}
+    * 'status': {link name: :class:`~wntr.network.base.LinkStatus` or str}
+    * 'nodes': {node name: {attribute: value}}
+    * 'links': {link name: {attribute: value}}
+
+    Attributes under 'nodes' and 'links' must be attributes that only change
+    parameters of the hydraulic model (e.g., roughness, diameter, minor_loss,
+    elevation, or the leak and pressure dependent demand coefficients).
+
+    The simulator is deliberately limited to steady-state simulations: the
+    duration of the network must be 0, and only the initial hydraulic
+    timestep is simulated. In an extended period simulation, the tank levels
+    and the control decisions of each scenario evolve separately, so the
+    scenarios would soon stop sharing a model structure and the batch would
+    fall back to separate simulations. Extended period scenarios (e.g., a
+    criticality analysis over a full day) should be run with
+    :py:class:`~wntr.sim.fork.ForkWNTRSimulator`,
+    :py:class:`~wntr.sim.ensemble.EnsembleEpanetSimulator`, or
+    :py:class:`~wntr.sim.core.WNTRSimulator`. If the controls of the network
+    (including check valves, pumps, and valves) change a status or setting
+    for a scenario at the initial timestep, or if a scenario does not
+    converge in the batch, that scenario is simulated separately with
+    :py:class:`~wntr.sim.core.WNTRSimulator`.
+
+    Parameters
+    ----------
+    wn: WaterNetworkModel
+        Water network model
+    """
+
+    _scenario_keys = ('demand', 'head') + scenario_keys
+
+    def __init__(self, wn):
+        super(BatchWNTRSimulator, self).__init__(wn)
+        self._param_dicts = None
+        self._params_by_name = dict()
+        self._loaded_params = list()
+
+    def run_sim(self, scenarios, solver_options=None, convergence_error=False, HW_approx='default'):
+        """
+        Run a batch of steady-state hydraulic simulations.
+
+        Parameters
+        ----------
+        scenarios: list of dict
+            The parameter overrides for each scenario (see :py:class:`BatchWNTRSimulator`)
+        solver_options: dict
+            See :py:class:`~wntr.sim.solvers.NewtonSolver` for possible options
+        convergence_error: bool (optional)
+            Passed to :py:meth:`WNTRSimulator.run_sim <wntr.sim.core.WNTRSimulator.run_sim>` for
+            scenarios that are simulated separately.
+        HW_approx: str
+            Specifies which Hazen-Williams headloss approximation to use. Options are 'default' and 'piecewise'.
+
+        Returns
+        -------
+        results: list of SimulationResults
+            One results object for each scenario, in the same order as scenarios
+
+        Raises
+        ------
+        ValueError
+            If the duration of the network is not 0 (extended period simulations are not supported)
+        """
+        if self._wn.sim_time != 0:
+            raise ValueError('BatchWNTRSimulator requires a water network model with sim_time equal to 0.')
+        if self._wn.options.time.duration > 0:
+            raise ValueError('BatchWNTRSimulator only runs steady-state simulations; set '
+                             'wn.options.time.duration to 0.')
+        template = pickle.dumps(self._wn)
+
+        logger.debug('creating hydraulic model')
+        self.mode = self._wn.options.hydraulic.demand_model
+        self._model, self._model_updater = wntr.sim.hydraulics.create_hydraulic_model(wn=self._wn, HW_approx=HW_approx)
+        scenarios = [self._check_scenario(s) for s in scenarios]
+        self._setup_sim_options(solver=NewtonSolver, backup_solver=None, solver_options=solver_options,
+                                backup_solver_options=None, convergence_error=convergence_error)
+        self._param_dicts = [v for v in vars(self._model).values() if isinstance(v, ParamDict)]
+        self._params_by_name = dict()
+        self._loaded_params = list()
+        solver = NewtonSolver(solver_options)
+        self._lu_cache = SparseLUCache()
+
+        self._valve_source_checker = wntr.sim.core._ValveSourceChecker(self._wn)
+        self._get_control_managers()
+        self._register_controls_with_observers()
+        self._initialize_internal_graph()
+        self._change_tracker.set_reference_point('graph')
+        self._change_tracker.set_reference_point('model')
+        self._change_tracker.set_reference_point('results')
+        self._results_index = wntr.sim.hydraulics.ResultsIndex(self._wn, self._model)
+        wntr.sim.hydraulics.update_network_previous_values(self._wn)
+        self._wn._prev_sim_time = -1
+        base_link_state = self._get_link_state()
+
+        groups = OrderedDict()
+        for ndx, scenario in enumerate(scenarios):
+            key = frozenset((link, int(status)) for link, status in scenario['status'].items())
+            groups.setdefault(key, list()).append(ndx)
+
+        results = [None] * len(scenarios)
+        modified_links = set()
+        for key, ndx_list in groups.items():
+            self._set_link_state(base_link_state)
+            for link, status in key:
+                link.initial_status = LinkStatus(status)
+                modified_links.add(link)
+            num_full_restructures = self._model.num_full_restructures
+            num_incremental_restructures = self._model.num_incremental_restructures
+            self._prepare_group(modified_links)
+            restructures = (self._model.num_full_restructures - num_full_restructures,
+                            self._model.num_incremental_restructures - num_incremental_restructures)
+            x0 = self._model.get_x()
+            scenario_params = [self._get_scenario_params(scenarios[ndx]) for ndx in ndx_list]
+            group_link_state = self._get_link_state()
+            self._results_index.update_elements(state[0] for state in group_link_state)
+            self._results_index.set_isolated(self._isolated_junction_ndx, self._isolated_link_ndx)
+
+            num_symbolic = self._lu_cache.num_symbolic
+            num_numeric = self._lu_cache.num_numeric
+            t0 = time.time()
+            solutions = self._solve_batch(solver, scenario_params, x0)
+            logger.debug('solved {0} scenarios in {1} seconds'.format(len(ndx_list), time.time() - t0))
+            stats = (self._lu_cache.num_symbolic - num_symbolic, self._lu_cache.num_numeric - num_numeric)
+
+            for ndx, params, (status, mesg, iter_count, x) in zip(ndx_list, scenario_params, solutions):
+                res = None
+                if status == SolverStatus.converged:
+                    res = self._get_scenario_results(scenarios[ndx], params, x, group_link_state)
+                else:
+                    logger.debug('scenario {0} did not converge in the batch: {1}'.format(ndx, mesg))
+                if res is None:
+                    res = self._run_standalone(template, scenarios[ndx], solver_options, convergence_error,
+                                               HW_approx)
+                    res.solver_statistics['batch_size'] = 1
+                else:
+                    res.solver_statistics = pd.DataFrame([(0, 0, iter_count, stats[0], stats[1], 0,
+                                                           restructures[0], restructures[1], None,
+                                                           np.nan, np.nan, np.nan, 0, len(ndx_list))],
+                                                         columns=_solver_statistics_columns + ['batch_size'])
+                results[ndx] = res
+            self._load_params(list())
+
+        self._set_link_state(base_link_state)
+        for link in modified_links:
+            self._model_updater.update(self._model, self._wn, link, 'status')
+        return results
+
+    def _check_scenario(self, scenario):
+        check_scenario(self._wn, scenario, keys=self._scenario_keys, functions=False)
+        checked = dict()
+        checked['demand'] = OrderedDict()
+        for name, value in scenario.get('demand', dict()).items():
+            if not isinstance(self._wn.get_node(name), Junction):
+                raise ValueError('Demand overrides are only supported for junctions; got {0}'.format(name))
+            checked['demand'][name] = float(value)
+        checked['head'] = OrderedDict()
+        for name, value in scenario.get('head', dict()).items():
+            if not isinstance(self._wn.get_node(name), Reservoir):
+                raise ValueError('Head overrides are only supported for reservoirs; got {0}'.format(name))
+            checked['head'][name] = float(value)
+        checked['status'] = OrderedDict()
+        for name, status in scenario.get('status', dict()).items():
+            if isinstance(status, str):
+                status = LinkStatus[status]
+            checked['status'][self._wn.get_link(name)] = LinkStatus(status)
+        checked['attributes'] = list()
+        for name, value in checked['head'].items():
+            checked['attributes'].append((self._wn.get_node(name), 'base_head', value))
+        for key, get in (('nodes', self._wn.get_node), ('links', self._wn.get_link)):
+            for name, attrs in scenario.get(key, dict()).items():
+                obj = get(name)
+                for attr, value in attrs.items():
+                    if (obj, attr) not in self._model_updater.update_functions:
+                        raise ValueError('{0} of {1} is not a parameter of the hydraulic model.'.format(attr, name))
+                    checked['attributes'].append((obj, attr, value))
+        return checked
+
+    def _get_link_state(self):
+        return [(link, link._user_status, link._internal_status, link._initial_status, link._setting)
+                for name, link in self._wn.links()]
+
+    @staticmethod
+    def _set_link_state(state):
+        for link, user_status, internal_status, initial_status, setting in state:
+            link._user_status = user_status
+            link._internal_status = internal_status
+            link._initial_status = initial_status
+            link._setting = setting
+
+    def _prepare_group(self, modified_links):
+        """
+        Run the controls for the first timestep with the current link statuses and update the
+        internal graph, isolated junctions/links, and model accordingly.
+        """
+        self._wn.sim_time = 0
+        self._rule_iter = 0
+        self._compute_next_timestep_and_run_presolve_controls_and_rules(first_step=True)
+        self._wn.sim_time = 0
+        self._run_feasibility_controls()
+
+        for link in modified_links:
+            self._connectivity.set_status(link)
+            self._model_updater.update(self._model, self._wn, link, 'status')
+        self._update_internal_graph()
+        self._get_isolated_junctions_and_links()
+        wntr.sim.hydraulics.update_model_for_controls(self._model, self._wn, self._model_updater, self._change_tracker)
+        wntr.sim.models.param.source_head_param(self._model, self._wn)
+        wntr.sim.models.param.expected_demand_param(self._model, self._wn)
+        self._model.set_structure()
+
+    def _params_for(self, name):
+        if name not in self._params_by_name:
+            self._params_by_name[name] = [d[name] for d in self._param_dicts if name in d]
+        return self._params_by_name[name]
+
+    def _get_scenario_params(self, scenario):
+        """
+        Get a list of (param, value) tuples with the values of the model parameters for a scenario.
+        """
+        m = self._model
+        values = OrderedDict()
+        saved = self._apply_attributes(scenario)
+        try:
+            for obj, attr, value in scenario['attributes']:
+                self._model_updater.update(m, self._wn, obj, attr)
+                if m.structure_version is None:
+                    raise ValueError('Changing {0} of {1} changes the structure of the hydraulic model; use '
+                                     'the status key for link status overrides.'.format(attr, obj.name))
+                for p in self._params_for(obj.name):
+                    values[p] = p.value
+            for name, value in scenario['demand'].items():
+                values[m.expected_demand[name]] = value
+            for name in scenario['head'].keys():
+                node = self._wn.get_node(name)
+                values[m.source_head[name]] = node.head_timeseries.at(self._wn.sim_time)
+        finally:
+            self._restore_attributes(saved)
+            for obj, attr, value in scenario['attributes']:
+                self._model_updater.update(m, self._wn, obj, attr)
+            wntr.sim.models.param.source_head_param(m, self._wn)
+        base_values = OrderedDict((p, p.value) for p in values.keys())
+        return [(p, value, base_values[p]) for p, value in values.items() if value != base_values[p]]
+
+    @staticmethod
+    def _apply_attributes(scenario):
+        saved = list()
+        for obj, attr, value in scenario['attributes']:
+            saved.append((obj, attr, getattr(obj, attr)))
+            setattr(obj, attr, value)
+        return saved
+
+    @staticmethod
+    def _restore_attributes(saved):
+        for obj, attr, value in reversed(saved):
+            setattr(obj, attr, value)
+
+    def _load_params(self, params):
+        for p, value, base_value in self._loaded_params:
+            p.value = base_value
+        for p, value, base_value in params:
+            p.value = value
+        self._loaded_params = params
+
+    def _solve_batch(self, solver, scenario_params, x0):
+        """
+        Solve the scenarios with a block diagonal Newton method.
+
+        Returns
+        -------
+        solutions: list of tuple
+            (status, message, iterations, x) for each scenario
+        """
+        m = self._model
+        structure_version = m.structure_version
+        n_scenarios = len(scenario_params)
+        x = [x0.copy() for i in range(n_scenarios)]
+        r = [None] * n_scenarios
+        solutions = [None] * n_scenarios
+        active = list(range(n_scenarios))
+        t0 = time.time()
+
+        if len(x0) == 0:
+            return [(SolverStatus.converged, 'No variables or constraints', 0, x0) for i in range(n_scenarios)]
+
+        for outer_iter in range(solver.maxiter):
+            if time.time() - t0 >= solver.time_limit:
+                break
+
+            remaining = list()
+            blocks = list()
+            for k in active:
+                self._load_params(scenario_params[k])
+                m.load_var_values_from_x(x[k])
+                if r[k] is None:
+                    r[k] = m.evaluate_residuals()
+                if np.max(abs(r[k])) < solver.tol:
+                    solutions[k] = (SolverStatus.converged, 'Solved Successfully', outer_iter, x[k])
+                    continue
+                remaining.append(k)
+                blocks.append(m.evaluate_jacobian(x=None))
+            active = remaining
+            if len(active) == 0:
+                break
+
+            try:
+                factor = self._lu_cache.factorize_block_diagonal(blocks, structure_version)
+            except RuntimeError as e:
+                if 'singular' not in str(e):
+                    raise
+                for k in active:
+                    solutions[k] = (SolverStatus.error, 'Jacobian is singular at iteration ' + str(outer_iter),
+                                    outer_iter, x[k])
+                active = list()
+                break
+            d = -factor.solve(np.concatenate([r[k] for k in active]))
+            d = np.split(d, len(active))
+
+            remaining = list()
+            for k, d_k in zip(active, d):
+                if not solver.bt or outer_iter < solver.bt_start_iter:
+                    x[k] = x[k] + d_k
+                    r[k] = None
+                    remaining.append(k)
+                    continue
+                self._load_params(scenario_params[k])
+                r_norm = np.max(abs(r[k]))
+                alpha = 1.0
+                for iter_bt in range(solver.bt_maxiter):
+                    x_ = x[k] + alpha * d_k
+                    m.load_var_values_from_x(x_)
+                    r_ = m.evaluate_residuals()
+                    if np.max(abs(r_)) < (1.0 - 0.0001 * alpha) * r_norm:
+                        x[k] = x_
+                        r[k] = r_
+                        remaining.append(k)
+                        break
+                    alpha = alpha * solver.rho
+                else:
+                    solutions[k] = (SolverStatus.error, 'Line search failed at iteration ' + str(outer_iter),
+                                    outer_iter, x[k])
+            active = remaining
+
+        for k in active:
+            solutions[k] = (SolverStatus.error, 'Reached maximum number of iterations or time limit', solver.maxiter,
+                            x[k])
+        return solutions
+
+    def _get_scenario_results(self, scenario, params, x, group_link_state):
+        """
+        Store the solution of a scenario in the network, check the controls, and collect the results.
+        Returns None if the controls would change the network for this scenario.
+        """
+        m = self._model
+        results_index = self._results_index
+        self._load_params(params)
+        m.load_var_values_from_x(x)
+        saved = self._apply_attributes(scenario)
+        try:
+            results_index.update_elements(obj for obj, attr, value in scenario['attributes'])
+            results_index.update(m, self._change_tracker)
+            results_index.store_in_network()
+            self._change_tracker.set_reference_point('batch')
+            self._run_postsolve_controls()
+            self._run_feasibility_controls()
+            changes_made = self._change_tracker.changes_made(ref_point='batch')
+            self._change_tracker.remove_reference_point('batch')
+            self._set_link_state(group_link_state)
+            if changes_made:
+                logger.debug('controls changed the network for a scenario; simulating it separately')
+                return None
+
+            results_buffer = wntr.sim.hydraulics.ResultsBuffer(self._wn, 1)
+            results_buffer.save(results_index)
+            results = wntr.sim.results.SimulationResults()
+            results.error_code = None
+            results.time = [0]
+            results.network_name = self._wn.name
+            results_buffer.get_results(results)
+        finally:
+            self._restore_attributes(saved)
+            results_index.update_elements(obj for obj, attr, value in scenario['attributes'])
+        return results
+
+    def _run_standalone(self, template, scenario, solver_options, convergence_error, HW_approx):
+        wn = pickle.loads(template)
+        multiplier = wn.options.hydraulic.demand_multiplier
+        if len(scenario['demand']) > 0:
+            # a pattern name of None would pick up the default pattern
+            wn.add_pattern('_batch_constant', [1.0])
+        for name, value in scenario['demand'].items():
+            junction = wn.get_node(name)
+            junction.demand_timeseries_list.clear()
+            junction.demand_timeseries_list.append((value / multiplier, '_batch_constant'))
+        for link, status in scenario['status'].items():
+            wn.get_link(link.name).initial_status = status
+        for obj, attr, value in scenario['attributes']:
+            if isinstance(obj, Node):
+                setattr(wn.get_node(obj.name), attr, value)
+            else:
+                setattr(wn.get_link(obj.name), attr, value)
+        sim = WNTRSimulator(wn)
+        return sim.run_sim(solver_options=solver_options, convergence_error=convergence_error, HW_approx=HW_approx)
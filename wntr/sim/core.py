@@ -2,7 +2,9 @@
 """
 
 import wntr.sim.hydraulics
-from wntr.sim.solvers import NewtonSolver, SolverStatus
+from wntr.sim.solvers import NewtonSolver, GGASolver, BlockTriangularSolver, SolverStatus, SparseLUCache, \
+    LinearSolver
+from wntr.sim.models.vectorized import VectorizedHydraulicModel
 import wntr.sim.results
 import numpy as np
 import warnings
@@ -12,11 +14,9 @@ import logging
 import scipy.optimize
 import scipy.sparse
 import scipy.sparse.csr
-import itertools
-from collections import OrderedDict
 from wntr.utils.ordered_set import OrderedSet
 from wntr.network import Junction, Pipe, Valve, Pump, Tank, Reservoir, LinkStatus, WaterNetworkModel, Link
-from wntr.sim.network_isolation import check_for_isolated_junctions, get_long_size
+from wntr.sim.network_isolation import NetworkConnectivity
 from wntr.sim.aml.aml import VarDict, ParamDict
 from wntr.sim.aml.expr import Var, Param
 from wntr.network.controls import (AndCondition, Comparison, Control, ControlAction,
@@ -38,6 +38,7 @@ import enum
 import pandas as pd
 import json
 import os
+import pickle
 try:
     import plotly
 except ImportError:
@@ -45,6 +46,26 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# columns of results.solver_statistics; one row per solve
+_solver_statistics_columns = ['time', 'trial', 'iterations', 'lu_symbolic', 'lu_numeric', 'lu_reused',
+                              'full_restructures', 'incremental_restructures', 'start_point',
+                              'iterations_without_predictor', 'linear_solve_time', 'fill_in', 'krylov_iterations']
+
+
+def _comparable_options(value):
+    """
+    The run_sim options in the form that is saved in a checkpoint and compared on resume. Linear solver
+    objects (see the linear_solver option of NewtonSolver) are replaced by their class and public
+    parameters, so that an equivalent solver created for the resumed simulation matches.
+    """
+    if isinstance(value, dict):
+        return dict((key, _comparable_options(v)) for key, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return type(value)(_comparable_options(v) for v in value)
+    if isinstance(value, LinearSolver):
+        params = dict((key, _comparable_options(v)) for key, v in vars(value).items() if not key.startswith('_'))
+        return (type(value).__module__ + '.' + type(value).__qualname__, params)
+    return value
 
 # TODO: allow user to turn of demand status and leak model status controls
 # TODO: allow user to switch between wntr and ipopt models
@@ -590,6 +611,210 @@ class _ValveSourceChecker(Observer):
         return self._cached_results[valve]
 
 
+class _WarmStartPredictor(object):
+    """
+    Builds the starting point for the solve at the next hydraulic timestep.
+
+    Candidates are (1) the previous solution, (2) an extrapolation of the last two converged
+    flow/head vectors, and (3) the solution stored for the same time of day on an earlier day of
+    the simulation. The candidate with the smallest initial constraint violation is loaded into
+    the model. When a candidate other than the previous solution is chosen, the start without the
+    prediction is kept so that :py:meth:`iterations_without_prediction` can measure the Newton
+    iterations the prediction saved.
+
+    With method='linear', the extrapolation is scaled by the ratio of the timesteps. With
+    method='secant', it is scaled by the projection of the change in the expected demands and
+    source heads since the last solve onto the change between the last two solves.
+    """
+    def __init__(self, m, method='secant'):
+        if method not in {'linear', 'secant'}:
+            raise ValueError('Unexpected value for predictor: ' + str(method))
+        self.method = method
+        self._vars = list(m.flow.values()) + list(m.head.values())
+        self._params = list(m.expected_demand.values()) + list(m.source_head.values())
+        self._history = list()  # (time, x, p) for the last two converged solves
+        self._library = dict()  # time of day -> x
+        self._baseline = None  # (var, value) at the previous solution if another start was chosen
+
+    def _get_x(self):
+        return np.fromiter((v.value for v in self._vars), dtype=float, count=len(self._vars))
+
+    def get_state(self):
+        return self._history, self._library
+
+    def set_state(self, state):
+        self._history, self._library = state
+
+    def _get_p(self):
+        return np.fromiter((p.value for p in self._params), dtype=float, count=len(self._params))
+
+    def _load_x(self, x):
+        for v, val in zip(self._vars, x):
+            v.value = val
+
+    def record(self, sim_time):
+        """Store the converged solution at sim_time."""
+        x = self._get_x()
+        self._history.append((sim_time, x, self._get_p()))
+        if len(self._history) > 2:
+            self._history.pop(0)
+        self._library[int(sim_time) % 86400] = x
+
+    def _extrapolate(self, sim_time, p):
+        (t0, x0, p0), (t1, x1, p1) = self._history
+        if self.method == 'linear':
+            if t1 == t0:
+                return None
+            scale = (sim_time - t1) / (t1 - t0)
+        else:
+            dp_old = p1 - p0
+            denom = np.dot(dp_old, dp_old)
+            if denom == 0:
+                return None
+            scale = np.dot(p - p1, dp_old) / denom
+        scale = min(max(scale, -2.0), 2.0)
+        return x1 + scale * (x1 - x0)
+
+    def predict(self, model, sim_time):
+        """
+        Load the best starting point into the model.
+
+        Returns
+        -------
+        choice: str
+            'previous', 'extrapolation', or 'library'
+        """
+        self._baseline = None
+        if len(self._history) == 0:
+            return 'previous'
+        if model.structure_version is None:
+            model.set_structure()
+
+        x_prev = self._get_x()
+        r_prev = np.max(abs(model.evaluate_residuals()))
+        best = ('previous', r_prev, x_prev)
+
+        candidates = list()
+        if len(self._history) == 2:
+            candidates.append(('extrapolation', self._extrapolate(sim_time, self._get_p())))
+        tod = int(sim_time) % 86400
+        if tod in self._library and self._history[-1][0] != sim_time:
+            candidates.append(('library', self._library[tod]))
+
+        for name, x in candidates:
+            if x is None:
+                continue
+            self._load_x(x)
+            r = np.max(abs(model.evaluate_residuals()))
+            if r < best[1]:
+                best = (name, r, x)
+
+        if best[0] != 'previous':
+            self._load_x(x_prev)
+            self._baseline = [(v, v.value) for d in vars(model).values() if isinstance(d, VarDict)
+                              for v in d.values()]
+        self._load_x(best[2])
+        return best[0]
+
+    def iterations_without_prediction(self, model, solve):
+        """
+        Solve again from the previous solution and return the number of Newton iterations.
+
+        Parameters
+        ----------
+        model: wntr.sim.aml.Model
+        solve: function
+            Called without arguments once the model is at the previous solution; returns the
+            number of Newton iterations.
+
+        Returns
+        -------
+        iterations: int or None
+            None if the last call to :py:meth:`predict` chose the previous solution, in which
+            case the solve just done already started there. The values of the variables of the
+            model are restored afterwards.
+        """
+        if self._baseline is None:
+            return None
+        solution = [(v, v.value) for d in vars(model).values() if isinstance(d, VarDict) for v in d.values()]
+        for v, val in self._baseline:
+            v.value = val
+        self._baseline = None
+        try:
+            return solve()
+        finally:
+            for v, val in solution:
+                v.value = val
+
+
+class _Profiler(object):
+    """
+    Wall-clock time spent in each phase of WNTRSimulator.run_sim and solver counters, recorded
+    for every trial.
+
+    :py:meth:`stop` adds the time since the previous call to :py:meth:`start` or :py:meth:`stop`
+    to a phase, so consecutive phases only need one call each. :py:meth:`finish` completes the
+    record of a trial and passes it to the callback.
+    """
+    phases = ['presolve_controls', 'feasibility_controls', 'graph_update', 'isolation', 'model_update',
+              'solve', 'store_results', 'postsolve_controls', 'save_results']
+    counters = ['iterations', 'line_search_steps', 'full_restructures', 'incremental_restructures']
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.records = list()
+        self._record = self._new_record()
+        self._t0 = time.perf_counter()
+
+    def _new_record(self):
+        record = dict.fromkeys(self.phases, 0.0)
+        record.update(dict.fromkeys(self.counters, 0))
+        return record
+
+    def start(self):
+        self._t0 = time.perf_counter()
+
+    def stop(self, phase):
+        t = time.perf_counter()
+        self._record[phase] += t - self._t0
+        self._t0 = t
+
+    def count(self, counter, n):
+        if n is not None:
+            self._record[counter] += n
+
+    def finish(self, sim_time, trial):
+        record = {'time': int(sim_time), 'trial': trial}
+        record.update(self._record)
+        self.records.append(record)
+        self._record = self._new_record()
+        if self.callback is not None:
+            self.callback(record)
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.records, columns=['time', 'trial'] + self.phases + self.counters)
+
+
+class _NullProfiler(object):
+    """
+    Used when profiling is disabled.
+    """
+    def start(self):
+        pass
+
+    def stop(self, phase):
+        pass
+
+    def count(self, counter, n):
+        pass
+
+    def finish(self, sim_time, trial):
+        pass
+
+    def to_dataframe(self):
+        return None
+
+
 class WNTRSimulator(WaterNetworkSimulator):
     """
     WNTR simulator class.
@@ -612,15 +837,11 @@ class WNTRSimulator(WaterNetworkSimulator):
         super(WNTRSimulator, self).__init__(wn)
 
         # attributes needed isolated junctions/links
-        self._prev_isolated_junctions = OrderedSet()
-        self._prev_isolated_links = OrderedSet()
-        self._internal_graph = None
-        self._node_pairs_with_multiple_links = None
-        self._link_name_to_id = OrderedDict()
-        self._link_id_to_name = OrderedDict()
-        self._node_name_to_id = OrderedDict()
-        self._node_id_to_name = OrderedDict()
-        self._source_ids = None
+        self._connectivity = None
+        self._isolated_junctions = None
+        self._isolated_links = None
+        self._isolated_junction_ndx = np.zeros(0, dtype=int)
+        self._isolated_link_ndx = np.zeros(0, dtype=int)
 
         # attributes needed for controls
         self._presolve_controls = ControlChecker()
@@ -638,6 +859,11 @@ class WNTRSimulator(WaterNetworkSimulator):
         self._solver_options = dict()
         self._backup_solver_options = dict()
         self._convergence_error = False
+        self._lu_cache = SparseLUCache()
+        self._results_index = None
+        self._checkpoint = None
+        self._branch_time = None
+        self._snapshot = None
 
         # other attributes
         self._hydraulic_timestep = None
@@ -648,15 +874,6 @@ class WNTRSimulator(WaterNetworkSimulator):
 
         self._valve_source_checker: Optional[_ValveSourceChecker] = None
 
-        long_size = get_long_size()
-        if long_size == 4:
-            self._int_dtype = np.int32
-        else:
-            assert long_size == 8
-            self._int_dtype = np.int64
-
-        self._initialize_name_id_maps()
-
     def _get_time(self):
         s = int(self._wn.sim_time)
         h = int(s/3600)
@@ -974,11 +1191,11 @@ class WNTRSimulator(WaterNetworkSimulator):
                 self._valve_source_checker.register_control(control)
                 self._change_tracker.register_control(control)
 
-    def _get_control_managers(self):
-        self._presolve_controls = ControlChecker()
-        self._postsolve_controls = ControlChecker()
-        self._rules = ControlChecker()
-        self._feasibility_controls = ControlChecker()
+    def _get_control_managers(self, indexed=True):
+        self._presolve_controls = ControlChecker(indexed)
+        self._postsolve_controls = ControlChecker(indexed)
+        self._rules = ControlChecker(indexed)
+        self._feasibility_controls = ControlChecker(indexed)
         self._change_tracker = ControlChangeTracker()
 
         def categorize_control(control):
@@ -1189,7 +1406,9 @@ class WNTRSimulator(WaterNetworkSimulator):
 
     def run_sim(self, solver=NewtonSolver, backup_solver=None, solver_options=None,
                 backup_solver_options=None, convergence_error=False, HW_approx='default',
-                diagnostics=False):
+                diagnostics=False, predictor=None, evaluator='rpn', update_network=True, profile=False,
+                profile_callback=None, checkpoint_file=None, checkpoint_interval=86400, presolve=False,
+                model_cache=None, periodic_state=None, index_controls=True):
 
         """
         Run an extended period simulation (hydraulics only).
@@ -1197,11 +1416,16 @@ class WNTRSimulator(WaterNetworkSimulator):
         Parameters
         ----------
         solver: object
-            :py:class:`~wntr.sim.solvers.NewtonSolver` or Scipy solver
+            :py:class:`~wntr.sim.solvers.NewtonSolver`, :py:class:`~wntr.sim.solvers.GGASolver` (Newton
+            steps computed from the reduced system in the junction heads),
+            :py:class:`~wntr.sim.solvers.BlockTriangularSolver` (Newton's method on the blocks of the
+            block triangular form, one stage at a time) or Scipy solver
         backup_solver: object
-            :py:class:`~wntr.sim.solvers.NewtonSolver` or Scipy solver
+            :py:class:`~wntr.sim.solvers.NewtonSolver`, :py:class:`~wntr.sim.solvers.GGASolver`,
+            :py:class:`~wntr.sim.solvers.BlockTriangularSolver` or Scipy solver
         solver_options: dict
-            See :py:class:`~wntr.sim.solvers.NewtonSolver` for possible options
+            See :py:class:`~wntr.sim.solvers.NewtonSolver` and :py:class:`~wntr.sim.solvers.GGASolver` for
+            possible options
         backup_solver_options: dict
         convergence_error: bool (optional)
             If convergence_error is True, an error will be raised if the
@@ -1213,10 +1437,86 @@ class WNTRSimulator(WaterNetworkSimulator):
             see the WNTR documentation on hydraulics for details.
         diagnostics: bool
             If True, then run with diagnostics on
+        predictor: str (optional)
+            Warm start for the solver at each new hydraulic timestep. Options are None (start from the
+            previous solution), 'linear' (extrapolate the last two solutions in time), and 'secant'
+            (extrapolate the last two solutions scaled by the change in expected demands and source
+            heads). Solutions are also stored by time of day and reused on later days of the simulation
+            if they are a better starting point. The Newton iterations the solve would have taken from the
+            previous solution are stored in results.solver_statistics (iterations_without_predictor),
+            which costs a second solve at the timesteps where another starting point is chosen.
+        evaluator: str
+            The backend used to evaluate the residuals and jacobian of the hydraulic model. Options
+            are 'rpn' (the evaluator of wntr.sim.aml) and 'vectorized'
+            (:py:class:`~wntr.sim.models.vectorized.VectorizedHydraulicModel`).
+        update_network: bool
+            If True (default), the results of every solve are stored in all of the nodes and links of the
+            network (e.g., junction.head). If False, only tanks, reservoirs and the elements used by controls
+            are updated during the simulation, and the remaining elements are updated once at the end of the
+            simulation. The results returned by run_sim are the same in both cases.
+        profile: bool
+            If True, the wall-clock time spent in each phase of every trial (presolve controls,
+            feasibility controls, graph update, isolation check, model update, solve, storing results in
+            the network, postsolve controls, and saving results) and the number of Newton iterations, line
+            search steps and model restructures are stored in results.profile, a DataFrame with one row
+            per trial. Default = False.
+        profile_callback: function (optional)
+            Called with a dict holding the profile record (time, trial, phases and counters) at the end of
+            each trial. Setting profile_callback enables profiling.
+        checkpoint_file: str (optional)
+            If given, the state of the simulation (the network, including tank heads, link statuses and
+            the state of controls and rules, the solution of the hydraulic model and its ordering, and the
+            results so far) is saved to this file every checkpoint_interval seconds of simulation time. An
+            interrupted simulation can be resumed with :py:meth:`from_checkpoint`.
+        checkpoint_interval: int
+            The simulation time between checkpoints, in seconds. Default = 86400.
+        presolve: bool
+            If True, dead-end branches and chains of series pipes are removed from the hydraulic model
+            before each solve and their heads, flows and demands are computed from the solution of the
+            remaining model (see :py:class:`~wntr.sim.hydraulics.ModelPresolve`). The network is not
+            changed and the results include all nodes and links. Only supported with the 'rpn' evaluator
+            and the default Hazen-Williams approximation. Default = False.
+        model_cache: HydraulicModelCache
+            If provided, the hydraulic model is taken from the cache (see
+            :py:class:`~wntr.sim.hydraulics.HydraulicModelCache`) instead of being built from scratch,
+            and is returned to the cache at the end of the simulation so that later simulations of
+            networks with the same structure can reuse it. Default = None.
+        periodic_state: PeriodicStateDetector
+            If provided, the tank levels and link statuses at each report time are compared with those
+            one period earlier, and the simulation stops once they agree over a full period (see
+            :py:class:`~wntr.sim.periodic.PeriodicStateDetector`). The early exit is recorded in
+            results.early_exit. Default = None.
+        index_controls: bool
+            If True (default), controls are only evaluated when their inputs have changed (see
+            :py:class:`~wntr.network.controls.ControlChecker`). The results are the same; set to False to
+            evaluate every control at every check.
         """
         logger.debug('creating hydraulic model')
         self.mode = self._wn.options.hydraulic.demand_model
-        self._model, self._model_updater = wntr.sim.hydraulics.create_hydraulic_model(wn=self._wn, HW_approx=HW_approx)
+        if model_cache is None:
+            self._model, self._model_updater = wntr.sim.hydraulics.create_hydraulic_model(wn=self._wn,
+                                                                                           HW_approx=HW_approx)
+        else:
+            self._model, self._model_updater = model_cache.get_model(self._wn, HW_approx=HW_approx)
+        if evaluator == 'rpn':
+            solver_model = self._model
+            gga_partition = wntr.sim.hydraulics.GGAPartition(self._model)
+        elif evaluator == 'vectorized':
+            solver_model = VectorizedHydraulicModel(self._model, self._wn)
+            gga_partition = wntr.sim.hydraulics.GGAPartition(self._model, solver_model)
+        else:
+            raise ValueError('Unexpected value for evaluator: ' + str(evaluator))
+        if presolve:
+            if evaluator != 'rpn':
+                raise NotImplementedError('The presolve is only supported with the rpn evaluator.')
+            model_presolve = wntr.sim.hydraulics.ModelPresolve(self._model, self._wn, self._model_updater)
+        else:
+            model_presolve = None
+
+        if profile or profile_callback is not None:
+            profiler = _Profiler(profile_callback)
+        else:
+            profiler = _NullProfiler()
 
         if diagnostics:
             diagnostics = _Diagnostics(self._wn, self._model, self.mode, enable=True)
@@ -1227,18 +1527,40 @@ class WNTRSimulator(WaterNetworkSimulator):
                                 backup_solver_options=backup_solver_options, convergence_error=convergence_error)
 
         self._valve_source_checker = _ValveSourceChecker(self._wn)
-        self._get_control_managers()
+        self._get_control_managers(index_controls)
         self._register_controls_with_observers()
 
-        node_res, link_res = wntr.sim.hydraulics.initialize_results_dict(self._wn)
+        if isinstance(self._report_timestep, (float, int)):
+            num_report_times = self._wn.options.time.duration // self._report_timestep + 1
+        else:
+            num_report_times = self._wn.options.time.duration // self._hydraulic_timestep + 1
+        if update_network:
+            store_elements = None
+        else:
+            store_elements = OrderedSet()
+            for control_checker in [self._presolve_controls, self._rules, self._postsolve_controls,
+                                    self._feasibility_controls]:
+                for control in control_checker:
+                    store_elements.update(control.requires())
+        self._results_index = wntr.sim.hydraulics.ResultsIndex(self._wn, self._model, store_elements)
+        param_schedule = wntr.sim.models.param.ParamSchedule(self._wn, self._wn.sim_time,
+                                                             self._wn.options.time.duration)
+        results_buffer = wntr.sim.hydraulics.ResultsBuffer(self._wn, num_report_times)
         results = wntr.sim.results.SimulationResults()
         results.error_code = None
         results.time = []
         results.network_name = self._wn.name
+        solver_stats = []
+        self._lu_cache = SparseLUCache()
+        if predictor is None:
+            warm_start = None
+        else:
+            warm_start = _WarmStartPredictor(self._model, method=predictor)
 
         self._initialize_internal_graph()
         self._change_tracker.set_reference_point('graph')
         self._change_tracker.set_reference_point('model')
+        self._change_tracker.set_reference_point('results')
 
         if self._wn.sim_time == 0:
             first_step = True
@@ -1249,9 +1571,55 @@ class WNTRSimulator(WaterNetworkSimulator):
         resolve = False
         self._rule_iter = 0  # this is used to determine the rule timestep
 
+        checkpoint_options = _comparable_options(dict(HW_approx=HW_approx, predictor=predictor, evaluator=evaluator,
+                                                      update_network=update_network, solver_options=solver_options,
+                                                      presolve=presolve))
+        next_checkpoint = self._wn.sim_time + checkpoint_interval
+        # a resumed simulation keeps the checkpoint times of the simulation that was checkpointed
+        checkpoint_every = checkpoint_interval if checkpoint_file is not None else None
+        if self._checkpoint is not None:
+            checkpoint = self._checkpoint
+            self._checkpoint = None
+            if checkpoint['options'] != checkpoint_options:
+                raise ValueError('run_sim must be called with the same options as the simulation that was '
+                                 'checkpointed: {0}'.format(checkpoint['options']))
+            self._rule_iter = checkpoint['rule_iter']
+            var_values = checkpoint['var_values']
+            if model_presolve is not None and model_presolve.update():
+                self._results_index.set_presolved(model_presolve.eliminated_vars)
+            if not checkpoint.get('modified', False):
+                self._model.load_structure(checkpoint['structure'])
+            else:
+                # the network of a forked simulation may be changed at the branch time, which can add
+                # or remove constraints; the ordering is only restored if the model still matches
+                try:
+                    self._model.load_structure(checkpoint['structure'])
+                except ValueError:
+                    logger.debug('the model of the modified network does not match the checkpoint')
+            for d in vars(self._model).values():
+                if isinstance(d, VarDict):
+                    for v in d.values():
+                        v.value = var_values.get(v.name, v.value)
+            self._lu_cache.set_state(checkpoint['lu_ordering'])
+            results.time = checkpoint['time']
+            results_buffer.set_state(checkpoint['results_buffer'])
+            solver_stats = checkpoint['solver_stats']
+            if warm_start is not None:
+                warm_start.set_state(checkpoint['warm_start'])
+            if isinstance(profiler, _Profiler) and checkpoint['profile'] is not None:
+                profiler.records = checkpoint['profile']
+            next_checkpoint = checkpoint['next_checkpoint']
+            if checkpoint_file is None:
+                checkpoint_every = checkpoint['checkpoint_interval']
+
         if first_step:
             wntr.sim.hydraulics.update_network_previous_values(self._wn)
             self._wn._prev_sim_time = -1
+            if periodic_state is not None:
+                periodic_state.reset()
+        if periodic_state is not None:
+            tanks = [tank for tank_name, tank in self._wn.tanks()]
+            links = [link for link_name, link in self._wn.links()]
 
         logger.debug('starting simulation')
 
@@ -1261,6 +1629,7 @@ class WNTRSimulator(WaterNetworkSimulator):
             if logger.getEffectiveLevel() <= logging.DEBUG:
                 logger.debug('\n\n')
 
+            profiler.start()
             if not resolve:
                 if not first_step:
                     """
@@ -1270,23 +1639,71 @@ class WNTRSimulator(WaterNetworkSimulator):
                     wntr.sim.hydraulics.update_tank_heads(self._wn)
                 trial = 0
                 self._compute_next_timestep_and_run_presolve_controls_and_rules(first_step)
+                profiler.stop('presolve_controls')
 
             self._run_feasibility_controls()
+            profiler.stop('feasibility_controls')
 
             # Prepare for solve
             self._update_internal_graph()
+            profiler.stop('graph_update')
             num_isolated_junctions, num_isolated_links = self._get_isolated_junctions_and_links()
+            self._results_index.set_isolated(self._isolated_junction_ndx, self._isolated_link_ndx)
+            profiler.stop('isolation')
             if not first_step and not resolve:
                 wntr.sim.hydraulics.update_tank_heads(self._wn)
             wntr.sim.hydraulics.update_model_for_controls(self._model, self._wn, self._model_updater, self._change_tracker)
-            wntr.sim.models.param.source_head_param(self._model, self._wn)
-            wntr.sim.models.param.expected_demand_param(self._model, self._wn)
+            param_schedule.update(self._model, self._wn)
+            if model_presolve is not None and model_presolve.update():
+                self._results_index.set_presolved(model_presolve.eliminated_vars)
+            if warm_start is not None and not resolve:
+                start_point = warm_start.predict(self._model, self._wn.sim_time)
+            else:
+                start_point = None
+            profiler.stop('model_update')
 
             diagnostics.run(last_step='presolve controls, rules, and model updates', next_step='solve')
 
-            solver_status, mesg, iter_count = _solver_helper(self._model, self._solver, self._solver_options)
+            num_symbolic = self._lu_cache.num_symbolic
+            num_numeric = self._lu_cache.num_numeric
+            num_reused = self._lu_cache.num_reused
+            linear_solve_time = self._lu_cache.linear_solve_time
+            num_krylov_iterations = self._lu_cache.num_krylov_iterations
+            num_full_restructures = self._model.num_full_restructures
+            num_incremental_restructures = self._model.num_incremental_restructures
+            solver_status, mesg, iter_count = _solver_helper(solver_model, self._solver, self._solver_options,
+                                                             self._lu_cache, profiler, gga_partition)
             if solver_status == 0 and self._backup_solver is not None:
-                solver_status, mesg, iter_count = _solver_helper(self._model, self._backup_solver, self._backup_solver_options)
+                solver_status, mesg, iter_count = _solver_helper(solver_model, self._backup_solver, self._backup_solver_options,
+                                                                 self._lu_cache, profiler, gga_partition)
+            if warm_start is None:
+                iterations_without_predictor = np.nan
+            else:
+                iterations_without_predictor = iter_count
+                if solver_status != 0 and start_point is not None:
+                    # a separate LU cache, so the counters and the chord factorization of the run are
+                    # not changed by the comparison solve
+                    iterations_without_predictor = warm_start.iterations_without_prediction(
+                        self._model, lambda: _solver_helper(solver_model, self._solver, self._solver_options,
+                                                            SparseLUCache(), None, gga_partition)[2])
+                    if iterations_without_predictor is None:
+                        iterations_without_predictor = iter_count
+                if iterations_without_predictor is None:
+                    iterations_without_predictor = np.nan
+            profiler.stop('solve')
+            profiler.count('iterations', iter_count)
+            profiler.count('full_restructures', self._model.num_full_restructures - num_full_restructures)
+            profiler.count('incremental_restructures',
+                           self._model.num_incremental_restructures - num_incremental_restructures)
+            solver_stats.append((int(self._wn.sim_time), trial, iter_count,
+                                 self._lu_cache.num_symbolic - num_symbolic,
+                                 self._lu_cache.num_numeric - num_numeric,
+                                 self._lu_cache.num_reused - num_reused,
+                                 self._model.num_full_restructures - num_full_restructures,
+                                 self._model.num_incremental_restructures - num_incremental_restructures,
+                                 start_point, iterations_without_predictor,
+                                 self._lu_cache.linear_solve_time - linear_solve_time, self._lu_cache.fill_in,
+                                 self._lu_cache.num_krylov_iterations - num_krylov_iterations))
             if solver_status == 0:
                 if self._convergence_error:
                     logger.error('Simulation did not converge at time ' + self._get_time() + '. ' + mesg) 
@@ -1294,6 +1711,7 @@ class WNTRSimulator(WaterNetworkSimulator):
                 warnings.warn('Simulation did not converge at time ' + self._get_time() + '. ' + mesg)
                 logger.warning('Simulation did not converge at time ' + self._get_time() + '. ' + mesg)
                 results.error_code = wntr.sim.results.ResultsStatus.error
+                profiler.finish(self._wn.sim_time, trial)
                 diagnostics.run(last_step='solve', next_step='break')
                 break
 
@@ -1301,7 +1719,11 @@ class WNTRSimulator(WaterNetworkSimulator):
 
             # Enter results in network and update previous inputs
             logger.debug('storing results in network')
-            wntr.sim.hydraulics.store_results_in_network(self._wn, self._model)
+            if model_presolve is not None:
+                model_presolve.back_substitute()
+            self._results_index.update(self._model, self._change_tracker)
+            self._results_index.store_in_network()
+            profiler.stop('store_results')
 
             diagnostics.run(last_step='solve and store results in network', next_step='postsolve controls')
 
@@ -1311,6 +1733,8 @@ class WNTRSimulator(WaterNetworkSimulator):
                 resolve = True
                 self._update_internal_graph()
                 wntr.sim.hydraulics.update_model_for_controls(self._model, self._wn, self._model_updater, self._change_tracker)
+                profiler.stop('postsolve_controls')
+                profiler.finish(self._wn.sim_time, trial)
                 diagnostics.run(last_step='postsolve controls and model updates', next_step='solve next trial')
                 trial += 1
                 if trial > max_trials:
@@ -1323,14 +1747,17 @@ class WNTRSimulator(WaterNetworkSimulator):
                     break
                 continue
 
+            profiler.stop('postsolve_controls')
             diagnostics.run(last_step='postsolve controls and model updates', next_step='advance time')
 
             logger.debug('no changes made by postsolve controls; moving to next timestep')
 
             resolve = False
+            if warm_start is not None:
+                warm_start.record(self._wn.sim_time)
             if isinstance(self._report_timestep, (float, int)):
                 if self._wn.sim_time % self._report_timestep == 0:
-                    wntr.sim.hydraulics.save_results(self._wn, node_res, link_res)
+                    results_buffer.save(self._results_index)
                     if len(results.time) > 0 and int(self._wn.sim_time) == results.time[-1]:
                         if int(self._wn.sim_time) != self._wn.sim_time:
                             raise RuntimeError('Time steps increments smaller than 1 second are forbidden.'+
@@ -1339,11 +1766,16 @@ class WNTRSimulator(WaterNetworkSimulator):
                             raise RuntimeError('Simulation already solved this timestep')
                     results.time.append(int(self._wn.sim_time))
             elif self._report_timestep.upper() == 'ALL':
-                wntr.sim.hydraulics.save_results(self._wn, node_res, link_res)
+                results_buffer.save(self._results_index)
                 if len(results.time) > 0 and int(self._wn.sim_time) == results.time[-1]:
                     raise RuntimeError('Simulation already solved this timestep')
                 results.time.append(int(self._wn.sim_time))
+            if periodic_state is not None and len(results.time) > 0 and results.time[-1] == self._wn.sim_time:
+                periodic_state.record(self._wn.sim_time, [tank.level for tank in tanks],
+                                      [link.status for link in links])
             wntr.sim.hydraulics.update_network_previous_values(self._wn)
+            profiler.stop('save_results')
+            profiler.finish(self._wn.sim_time, trial)
             first_step = False
             self._wn.sim_time += self._hydraulic_timestep
             overstep = float(self._wn.sim_time) % self._hydraulic_timestep
@@ -1352,193 +1784,180 @@ class WNTRSimulator(WaterNetworkSimulator):
             if self._wn.sim_time > self._wn.options.time.duration:
                 break
 
-        wntr.sim.hydraulics.get_results(self._wn, results, node_res, link_res)
-        
+            if periodic_state is not None and periodic_state.detected:
+                logger.debug('periodic state reached; the simulation is stopped early')
+                break
+
+            if checkpoint_every is not None and self._wn.sim_time >= next_checkpoint:
+                while next_checkpoint <= self._wn.sim_time:
+                    next_checkpoint += checkpoint_every
+                if checkpoint_file is not None:
+                    self._save_checkpoint(checkpoint_file, checkpoint_options, next_checkpoint, results,
+                                          results_buffer, solver_stats, warm_start, profiler, checkpoint_every)
+                # the factorization reused by the CHORD option of the NewtonSolver is not saved, so it is
+                # not reused across checkpoints (also when a resumed simulation passes them)
+                self._lu_cache.discard_last_factor()
+
+            if self._branch_time is not None and self._wn.sim_time >= self._branch_time:
+                checkpoint = self._get_checkpoint(checkpoint_options, next_checkpoint, results, results_buffer,
+                                                  solver_stats, warm_start, profiler, checkpoint_every)
+                self._snapshot = pickle.dumps(checkpoint, protocol=pickle.HIGHEST_PROTOCOL)
+                break
+
+        if not update_network:
+            self._results_index.set_store_elements()
+            self._results_index.store_in_network()
+        if model_cache is not None:
+            if model_presolve is not None:
+                model_presolve.restore()
+            wntr.sim.hydraulics.update_model_for_controls(self._model, self._wn, self._model_updater,
+                                                          self._change_tracker)
+            model_cache.release(self._wn)
+        results_buffer.get_results(results)
+        if periodic_state is not None:
+            periodic_state.finish(results, self._wn.options.time.duration)
+        results.profile = profiler.to_dataframe()
+        results.solver_statistics = pd.DataFrame(solver_stats, columns=_solver_statistics_columns)
+        logger.debug('LU ordering reused for {0} of {1} factorizations'.format(
+            self._lu_cache.num_numeric, self._lu_cache.num_numeric + self._lu_cache.num_symbolic))
+        logger.debug('{0} linear solves in {1:.4f} seconds; last fill-in {2:.2f}; {3} krylov iterations'.format(
+            self._lu_cache.num_linear_solves, self._lu_cache.linear_solve_time, self._lu_cache.fill_in,
+            self._lu_cache.num_krylov_iterations))
+        logger.debug('model structure set incrementally {0} times and from scratch {1} times'.format(
+            self._model.num_incremental_restructures, self._model.num_full_restructures))
+
         return results
 
-    def _initialize_name_id_maps(self):
-        n = 0
-        for link_name, link in self._wn.links():
-            self._link_name_to_id[link_name] = n
-            self._link_id_to_name[n] = link_name
-            n += 1
-        n = 0
-        for node_name, node in self._wn.nodes():
-            self._node_name_to_id[node_name] = n
-            self._node_id_to_name[n] = node_name
-            n += 1
+    def _save_checkpoint(self, filename, options, next_checkpoint, results, results_buffer, solver_stats,
+                         warm_start, profiler, checkpoint_interval):
+        logger.debug('saving checkpoint at time ' + self._get_time())
+        checkpoint = self._get_checkpoint(options, next_checkpoint, results, results_buffer, solver_stats,
+                                          warm_start, profiler, checkpoint_interval)
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'wb') as f:
+            pickle.dump(checkpoint, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_filename, filename)
+
+    def _get_checkpoint(self, options, next_checkpoint, results, results_buffer, solver_stats, warm_start,
+                        profiler, checkpoint_interval):
+        checkpoint = dict()
+        checkpoint['network'] = self._pickle_network()
+        checkpoint['options'] = options
+        checkpoint['next_checkpoint'] = next_checkpoint
+        checkpoint['rule_iter'] = self._rule_iter
+        checkpoint['structure'] = self._model.get_structure()
+        checkpoint['var_values'] = {v.name: v.value for d in vars(self._model).values() if isinstance(d, VarDict)
+                                    for v in d.values()}
+        checkpoint['time'] = results.time
+        checkpoint['results_buffer'] = results_buffer.get_state()
+        checkpoint['solver_stats'] = solver_stats
+        checkpoint['warm_start'] = None if warm_start is None else warm_start.get_state()
+        checkpoint['profile'] = getattr(profiler, 'records', None)
+        checkpoint['lu_ordering'] = self._lu_cache.get_state()
+        checkpoint['checkpoint_interval'] = checkpoint_interval
+        return checkpoint
+
+    def _pickle_network(self):
+        # the simulator observes the control actions; it is not part of the network state
+        actions = [action for name, control in self._wn.controls() for action in control.actions()]
+        observers = [action._observers for action in actions]
+        for action in actions:
+            action._observers = OrderedSet()
+        try:
+            return pickle.dumps(self._wn, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            for action, action_observers in zip(actions, observers):
+                action._observers = action_observers
+
+    @classmethod
+    def from_checkpoint(cls, checkpoint_file):
+        """
+        Create a simulator that resumes a simulation from a checkpoint written by
+        :py:meth:`run_sim`.
+
+        The network is restored from the checkpoint. Calling run_sim on the returned simulator,
+        with the same options as the simulation that was checkpointed, continues the simulation
+        and returns the results from the start of the original simulation. The results are identical
+        to those of an uninterrupted simulation (except for solver statistics). With the CHORD option
+        of the NewtonSolver, the factorization reused from earlier timesteps is discarded whenever a
+        checkpoint is saved, so that the resumed simulation makes the same steps.
+
+        Parameters
+        ----------
+        checkpoint_file: str
+
+        Returns
+        -------
+        sim: WNTRSimulator
+        """
+        with open(checkpoint_file, 'rb') as f:
+            checkpoint = pickle.load(f)
+        wn = pickle.loads(checkpoint['network'])
+        sim = cls(wn)
+        sim._checkpoint = checkpoint
+        return sim
 
     def _initialize_internal_graph(self):
-        n_links = OrderedDict()
-        rows = []
-        cols = []
-        vals = []
-        for link_name, link in itertools.chain(self._wn.pipes(), self._wn.pumps(), self._wn.valves()):
-            from_node_name = link.start_node_name
-            to_node_name = link.end_node_name
-            from_node_id = self._node_name_to_id[from_node_name]
-            to_node_id = self._node_name_to_id[to_node_name]
-            if (from_node_id, to_node_id) not in n_links:
-                n_links[(from_node_id, to_node_id)] = 0
-                n_links[(to_node_id, from_node_id)] = 0
-            n_links[(from_node_id, to_node_id)] += 1
-            n_links[(to_node_id, from_node_id)] += 1
-            rows.append(from_node_id)
-            cols.append(to_node_id)
-            rows.append(to_node_id)
-            cols.append(from_node_id)
-            if link.status == wntr.network.LinkStatus.Closed:
-                vals.append(0)
-                vals.append(0)
-            else:
-                vals.append(1)
-                vals.append(1)
-
-        rows = np.array(rows, dtype=self._int_dtype)
-        cols = np.array(cols, dtype=self._int_dtype)
-        vals = np.array(vals, dtype=self._int_dtype)
-        self._internal_graph = scipy.sparse.csr_matrix((vals, (rows, cols)))
-
-        ndx_map = OrderedDict()
-        for link_name, link in self._wn.links():
-            from_node_name = link.start_node_name
-            to_node_name = link.end_node_name
-            from_node_id = self._node_name_to_id[from_node_name]
-            to_node_id = self._node_name_to_id[to_node_name]
-            ndx1 = _get_csr_data_index(self._internal_graph, from_node_id, to_node_id)
-            ndx2 = _get_csr_data_index(self._internal_graph, to_node_id, from_node_id)
-            ndx_map[link] = (ndx1, ndx2)
-        self._map_link_to_internal_graph_data_ndx = ndx_map
-
-        self._number_of_connections = [0 for i in range(self._wn.num_nodes)]
-        for node_id in self._node_id_to_name.keys():
-            self._number_of_connections[node_id] = self._internal_graph.indptr[node_id+1] - self._internal_graph.indptr[node_id]
-        self._number_of_connections = np.array(self._number_of_connections, dtype=self._int_dtype)
-
-        self._node_pairs_with_multiple_links = OrderedDict()
-        for from_node_id, to_node_id in n_links.keys():
-            if n_links[(from_node_id, to_node_id)] > 1:
-                if (to_node_id, from_node_id) in self._node_pairs_with_multiple_links:
-                    continue
-                self._internal_graph[from_node_id, to_node_id] = 0
-                self._internal_graph[to_node_id, from_node_id] = 0
-                from_node_name = self._node_id_to_name[from_node_id]
-                to_node_name = self._node_id_to_name[to_node_id]
-                tmp_list = self._node_pairs_with_multiple_links[(from_node_id, to_node_id)] = []
-                for link_name in self._wn.get_links_for_node(from_node_name):
-                    link = self._wn.get_link(link_name)
-                    if link.start_node_name == to_node_name or link.end_node_name == to_node_name:
-                        tmp_list.append(link)
-                        if link.status != wntr.network.LinkStatus.Closed:
-                            ndx1, ndx2 = ndx_map[link]
-                            self._internal_graph.data[ndx1] = 1
-                            self._internal_graph.data[ndx2] = 1
-
-        self._source_ids = []
-        for node_name, node in self._wn.tanks():
-            node_id = self._node_name_to_id[node_name]
-            self._source_ids.append(node_id)
-        for node_name, node in self._wn.reservoirs():
-            node_id = self._node_name_to_id[node_name]
-            self._source_ids.append(node_id)
-        self._source_ids = np.array(self._source_ids, dtype=self._int_dtype)
+        self._connectivity = NetworkConnectivity(self._wn)
+        junctions = self._connectivity.nodes[:self._wn.num_junctions]
+        self._isolated_junctions = np.fromiter((node._is_isolated for node in junctions), dtype=bool,
+                                               count=len(junctions))
+        self._isolated_links = np.fromiter((link._is_isolated for link in self._connectivity.links),
+                                           dtype=bool, count=self._wn.num_links)
+        self._isolated_junction_ndx = np.flatnonzero(self._isolated_junctions)
+        self._isolated_link_ndx = np.flatnonzero(self._isolated_links)
 
     def _update_internal_graph(self):
-        data = self._internal_graph.data
-        ndx_map = self._map_link_to_internal_graph_data_ndx
-        for obj, attr in self._change_tracker.get_changes(ref_point='graph'):
-            if 'status' == attr:
-                if obj.status == wntr.network.LinkStatus.Closed:
-                    ndx1, ndx2 = ndx_map[obj]
-                    data[ndx1] = 0
-                    data[ndx2] = 0
-                else:
-                    ndx1, ndx2 = ndx_map[obj]
-                    data[ndx1] = 1
-                    data[ndx2] = 1
-
-        for key, link_list in self._node_pairs_with_multiple_links.items():
-            first_link = link_list[0]
-            ndx1, ndx2 = ndx_map[first_link]
-            data[ndx1] = 0
-            data[ndx2] = 0
-            for link in link_list:
-                if link.status != wntr.network.LinkStatus.Closed:
-                    ndx1, ndx2 = ndx_map[link]
-                    data[ndx1] = 1
-                    data[ndx2] = 1
-        self._change_tracker.reset_reference_point(key='graph')
+        self._connectivity.update(self._change_tracker, ref_point='graph')
 
     def _get_isolated_junctions_and_links(self):
         logger_level = logger.getEffectiveLevel()
 
         if logger_level <= logging.DEBUG:
             logger.debug('checking for isolated junctions and links')
-        for j in self._prev_isolated_junctions:
-            junction = self._wn.get_node(j)
-            junction._is_isolated = False
-        for l in self._prev_isolated_links:
-            link = self._wn.get_link(l)
-            link._is_isolated = False
-
-        node_indicator = np.ones(self._wn.num_nodes, dtype=self._int_dtype)
-        check_for_isolated_junctions(self._source_ids, node_indicator, self._internal_graph.indptr,
-                                     self._internal_graph.indices, self._internal_graph.data,
-                                     self._number_of_connections)
-
-        isolated_junction_ids = [i for i in range(len(node_indicator)) if node_indicator[i] == 1]
-        isolated_junctions = OrderedSet()
-        isolated_links = OrderedSet()
-        for j_id in isolated_junction_ids:
-            j = self._node_id_to_name[j_id]
-            junction = self._wn.get_node(j)
-            junction._is_isolated = True
-            isolated_junctions.add(j)
-            connected_links = self._wn.get_links_for_node(j)
-            for l in connected_links:
-                link = self._wn.get_link(l)
-                link._is_isolated = True
-                isolated_links.add(l)
+        isolated_junctions, isolated_links = self._connectivity.find_isolated()
+        changed_junctions = np.flatnonzero(isolated_junctions != self._isolated_junctions)
+        changed_links = np.flatnonzero(isolated_links != self._isolated_links)
+
+        if len(changed_junctions) > 0 or len(changed_links) > 0:
+            nodes = self._connectivity.nodes
+            links = self._connectivity.links
+            for ndx in changed_junctions:
+                nodes[ndx]._is_isolated = bool(isolated_junctions[ndx])
+            for ndx in changed_links:
+                links[ndx]._is_isolated = bool(isolated_links[ndx])
+            for ndx in changed_junctions:
+                self._model_updater.update(self._model, self._wn, nodes[ndx], '_is_isolated')
+            for ndx in changed_links:
+                self._model_updater.update(self._model, self._wn, links[ndx], '_is_isolated')
+            self._isolated_junctions = isolated_junctions
+            self._isolated_links = isolated_links
+            self._isolated_junction_ndx = np.flatnonzero(isolated_junctions)
+            self._isolated_link_ndx = np.flatnonzero(isolated_links)
 
         if logger_level <= logging.DEBUG:
-            if len(isolated_junctions) > 0 or len(isolated_links) > 0:
-                logger.debug('isolated junctions: {0}'.format(isolated_junctions))
-                logger.debug('isolated links: {0}'.format(isolated_links))
-        wntr.sim.hydraulics.update_model_for_isolated_junctions_and_links(self._model, self._wn, self._model_updater,
-                                                                          self._prev_isolated_junctions,
-                                                                          self._prev_isolated_links,
-                                                                          isolated_junctions, isolated_links)
-        self._prev_isolated_junctions = isolated_junctions
-        self._prev_isolated_links = isolated_links
-        return len(isolated_junctions), len(isolated_links)
-
-
-def _get_csr_data_index(a, row, col):
-    """
-    Parameters:
-    a: scipy.sparse.csr.csr_matrix
-    row: int
-    col: int
-    """
-    row_indptr = a.indptr[row]
-    num = a.indptr[row+1] - row_indptr
-    cols = a.indices[row_indptr:row_indptr+num]
-    n = 0
-    for j in cols:
-        if j == col:
-            return row_indptr + n
-        n += 1
-    raise RuntimeError('Unable to find csr data index.')
-
-
-def _solver_helper(model, solver, solver_options):
+            if len(self._isolated_junction_ndx) > 0 or len(self._isolated_link_ndx) > 0:
+                logger.debug('isolated junctions: {0}'.format(
+                    [self._connectivity.node_names[ndx] for ndx in self._isolated_junction_ndx]))
+                logger.debug('isolated links: {0}'.format(
+                    [self._connectivity.link_names[ndx] for ndx in self._isolated_link_ndx]))
+        return len(self._isolated_junction_ndx), len(self._isolated_link_ndx)
+
+
+def _solver_helper(model, solver, solver_options, lu_cache=None, profiler=None, partition=None):
     """
 
     Parameters
     ----------
-    model: wntr.aml.Model
+    model: wntr.aml.Model or wntr.sim.models.vectorized.VectorizedHydraulicModel
     solver: class or function
     solver_options: dict
+    lu_cache: wntr.sim.solvers.SparseLUCache
+        Only used by the NewtonSolver, GGASolver and BlockTriangularSolver
+    profiler: _Profiler
+        Only used by the NewtonSolver, GGASolver and BlockTriangularSolver to count line search steps
+    partition: wntr.sim.hydraulics.GGAPartition
+        Only used by the GGASolver
 
     Returns
     -------
@@ -1547,9 +1966,14 @@ def _solver_helper(model, solver, solver_options):
     """
     logger.debug('solving')
     model.set_structure()
-    if solver is NewtonSolver:
-        _solver = NewtonSolver(solver_options)
-        sol = _solver.solve(model)
+    if solver is NewtonSolver or solver is GGASolver or solver is BlockTriangularSolver:
+        if solver is GGASolver:
+            _solver = GGASolver(solver_options, partition)
+        else:
+            _solver = solver(solver_options)
+        sol = _solver.solve(model, lu_cache=lu_cache)
+        if profiler is not None:
+            profiler.count('line_search_steps', _solver.num_line_search_steps)
     elif solver is scipy.optimize.fsolve:
         x, infodict, ier, mesg = solver(model.evaluate_residuals, model.get_x(), **solver_options)
         if ier != 1:
@@ -1568,6 +1992,8 @@ def _solver_helper(model, solver, solver_options):
             sol = SolverStatus.error, '', None
     else:
         raise ValueError('Solver not recognized.')
+    if isinstance(model, VectorizedHydraulicModel):
+        model.store_var_values()
     return sol
 
 
@@ -0,0 +1,155 @@
+"""
+Ensembles of EPANET simulations of scenarios of the same water network model,
+run in a pool of processes.
+"""
+import logging
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from wntr.sim.epanet import EpanetSimulator
+from wntr.sim.scenarios import check_scenario, apply_scenario, init_worker, run_worker
+
+logger = logging.getLogger(__name__)
+
+
+class EnsembleEpanetSimulator(EpanetSimulator):
+    """
+    EPANET simulator that runs an ensemble of scenarios of a water network model.
+
+    :py:meth:`run_ensemble` applies each scenario to a copy of the water
+    network model, which is then simulated with :py:meth:`EpanetSimulator.run_sim
+    <wntr.sim.epanet.EpanetSimulator.run_sim>`, either serially or in a pool of
+    processes. A scenario is either None (no changes), a function that takes
+    the water network model as its only argument and changes it (e.g., adds
+    controls or demands), or a dictionary with any of the following keys:
+
+    * 'status': {link name: initial :class:`~wntr.network.base.LinkStatus` or str}
+    * 'nodes': {node name: {attribute: value}}
+    * 'links': {link name: {attribute: value}}
+
+    Functions must be picklable (e.g., defined at the module level or
+    created with functools.partial) to be run in a pool of processes.
+
+    Each worker (or this process, if the scenarios are run serially) writes
+    the EPANET files of its scenarios in a private scratch directory, so that
+    concurrent simulations never share files. The directory is created in
+    /dev/shm (a tmpfs) when it is available and removed when the worker exits;
+    only the files of the last scenario are kept until then. By default, the
+    worker keeps its EPANET project open between scenarios and pushes only the
+    changes of each scenario into it (see the reuse_project option of
+    :py:meth:`EpanetSimulator.run_sim <wntr.sim.epanet.EpanetSimulator.run_sim>`).
+
+    Parameters
+    ----------
+    wn: WaterNetworkModel
+        Water network model
+    reader, result_types:
+        See :class:`~wntr.sim.epanet.EpanetSimulator`
+    """
+
+    def run_ensemble(self, scenarios, processes=None, scratch_dir=None, **kwargs):
+        """
+        Simulate each scenario.
+
+        Parameters
+        ----------
+        scenarios: list
+            The changes to the network for each simulation (see :py:class:`EnsembleEpanetSimulator`)
+        processes: int (optional)
+            The number of worker processes. If None (default), the scenarios are run serially
+            in this process.
+        scratch_dir: str (optional)
+            The directory in which the private scratch directories are created. Default is
+            /dev/shm if it exists, otherwise the system temporary directory.
+        kwargs:
+            Passed to :py:meth:`EpanetSimulator.run_sim <wntr.sim.epanet.EpanetSimulator.run_sim>`,
+            except file_prefix. reuse_project is True by default.
+
+        Returns
+        -------
+        results: list of SimulationResults
+            One results object for each scenario, in the same order as scenarios
+        """
+        scenarios = list(scenarios)
+        results = [None] * len(scenarios)
+        for i, res in self.iter_results(scenarios, processes=processes, scratch_dir=scratch_dir, **kwargs):
+            results[i] = res
+        return results
+
+    def iter_results(self, scenarios, processes=None, scratch_dir=None, **kwargs):
+        """
+        Simulate each scenario and yield the results as soon as each simulation completes.
+
+        The parameters are the same as for :py:meth:`run_ensemble`. If a simulation
+        fails, its exception is raised and the scenarios that have not started
+        are cancelled; so are they if the generator is closed early.
+
+        Yields
+        ------
+        index: int
+            The index of the scenario in scenarios
+        results: SimulationResults
+            The results of the scenario
+        """
+        scenarios = list(scenarios)
+        for scenario in scenarios:
+            check_scenario(self._wn, scenario)
+        if 'file_prefix' in kwargs:
+            raise ValueError('file_prefix is not supported by EnsembleEpanetSimulator; the files are written '
+                             'in a scratch directory.')
+        kwargs.setdefault('reuse_project', True)
+        if scratch_dir is None and os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+            scratch_dir = '/dev/shm'
+        network = pickle.dumps(self._wn)
+
+        if processes is None:
+            worker = _EnsembleWorker(network, self.reader, scratch_dir, kwargs)
+            try:
+                for i, scenario in enumerate(scenarios):
+                    yield i, worker.run(scenario)
+            finally:
+                worker.close()
+            return
+
+        # the model is sent once to each worker instead of with every scenario
+        executor = ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                                       initargs=(_EnsembleWorker, network, self.reader, scratch_dir, kwargs))
+        try:
+            futures = dict((executor.submit(run_worker, scenario), i) for i, scenario in enumerate(scenarios))
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+class _EnsembleWorker(object):
+    """Runs scenarios in a private scratch directory, keeping one simulator
+    (and its open EPANET project) for all of them."""
+
+    def __init__(self, network, reader, scratch_dir, options):
+        self._network = network
+        self._reader = reader
+        self._options = options
+        self._sim = None
+        self.directory = tempfile.mkdtemp(prefix='wntr_ensemble_', dir=scratch_dir)
+
+    def run(self, scenario):
+        wn = pickle.loads(self._network)
+        if scenario is not None:
+            apply_scenario(wn, scenario, initial=True)
+        if self._sim is None:
+            self._sim = EpanetSimulator(wn, reader=self._reader)
+        else:
+            # the open project is updated to match the new copy of the model
+            self._sim._wn = wn
+        return self._sim.run_sim(file_prefix=os.path.join(self.directory, 'scenario'), **self._options)
+
+    def close(self):
+        if self._sim is not None:
+            self._sim.close_project()
+            self._sim = None
+        shutil.rmtree(self.directory, ignore_errors=True)
+
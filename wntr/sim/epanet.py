@@ -8,9 +8,10 @@ from wntr.network.base import Link, Node
 from wntr.network.controls import StopControl, StopCriteria
 from wntr.network.model import WaterNetworkModel
 from wntr.sim.core import WaterNetworkSimulator
+from wntr.sim.periodic import PeriodicStateDetector
 from wntr.network.io import write_inpfile
 from wntr.epanet.util import EN, HydParam, MassUnits, FlowUnits, QualParam, to_si
-import wntr.epanet.toolkit as _tk
+from wntr.epanet.project import ProjectUpdater, open_project
 import wntr.epanet
 import warnings
 import logging
@@ -98,6 +99,9 @@ class EpanetSimulator(WaterNetworkSimulator):
         self._overrides = dict()
         self._duration = None
         self._stop_criteria = None
+        self._project = None
+        self._project_updater = None
+        self._project_prefix = None
 
     def run_sim(
         self,
@@ -107,6 +111,8 @@ class EpanetSimulator(WaterNetworkSimulator):
         hydfile=None,
         version=2.2,
         convergence_error=False,
+        reuse_project=False,
+        save_inp=False,
     ):
         """
         Run the EPANET simulator.
@@ -140,6 +146,21 @@ class EpanetSimulator(WaterNetworkSimulator):
             simulation does not converge. If convergence_error is False, partial results are returned,
             a warning will be issued, and results.error_code will be set to 0
             if the simulation does not converge.  Default = False.
+        reuse_project: bool (optional)
+            If True, the EPANET project is kept open after the run. The next
+            call to run_sim pushes only the changes made to the water network
+            model since the last run into the open project (see
+            :class:`~wntr.epanet.project.ProjectUpdater`) instead of writing and
+            reading an INP file. The project is loaded again if the model
+            changed in a way that cannot be pushed or if the file prefix
+            changed. The EPANET report file is not written in this mode.
+            Requires version 2.2. Use :py:meth:`close_project` to close the
+            project. Default = False.
+        save_inp: bool (optional)
+            Only used if reuse_project is True. If True, the project is saved
+            to ``file_prefix + '.inp'`` before each run, for debugging.
+            Without reuse_project, the INP file is always written because
+            EPANET reads the model from it. Default = False.
         """
         if isinstance(version, str):
             version = float(version)
@@ -157,23 +178,35 @@ class EpanetSimulator(WaterNetworkSimulator):
         if not convergence_error and self._convergence_error is not None:
             convergence_error = self._convergence_error
 
-        write_inpfile(
-            self._wn,
-            inpfile,
-            units=self._wn.options.hydraulic.inpfile_units,
-            version=version,
-        )
-        epanet = wntr.epanet.toolkit.ENepanet(version=version)
         rptfile = file_prefix + ".rpt"
         outfile = file_prefix + ".bin"
         if self._wn._msx is not None:
             save_hyd = True
+            save_inp = True
         if hydfile is None:
             hydfile = file_prefix + ".hyd"
-        epanet.ENopen(inpfile, rptfile, outfile)
+        if reuse_project:
+            if version != 2.2:
+                raise ValueError("reuse_project requires version 2.2 of the EPANET toolkit")
+            epanet = self._get_project(file_prefix, rptfile, outfile)
+            if save_inp:
+                epanet.ENsaveinpfile(inpfile)
+        else:
+            self.close_project()
+            write_inpfile(
+                self._wn,
+                inpfile,
+                units=self._wn.options.hydraulic.inpfile_units,
+                version=version,
+            )
+            epanet = wntr.epanet.toolkit.ENepanet(version=version)
+            epanet.ENopen(inpfile, rptfile, outfile)
         if use_hyd:
             epanet.ENusehydfile(hydfile)
             logger.debug("Loaded hydraulics")
+        elif reuse_project:
+            self._solve_hydraulics(epanet)
+            logger.debug("Solved hydraulics")
         else:
             epanet.ENsolveH()
             logger.debug("Solved hydraulics")
@@ -182,9 +215,10 @@ class EpanetSimulator(WaterNetworkSimulator):
             logger.debug("Saved hydraulics")
         epanet.ENsolveQ()
         logger.debug("Solved quality")
-        epanet.ENreport()
-        logger.debug("Ran quality")
-        epanet.ENclose()
+        if not reuse_project:
+            epanet.ENreport()
+            logger.debug("Ran quality")
+            epanet.ENclose()
         logger.debug("Completed run")
         # os.sys.stderr.write('Finished Closing\n')
 
@@ -215,6 +249,44 @@ class EpanetSimulator(WaterNetworkSimulator):
 
         return results
 
+    def _get_project(self, file_prefix, rptfile, outfile):
+        """Return the open project, updated to match the model, or load a new one."""
+        if self._project is not None and self._project_prefix == file_prefix:
+            if self._project_updater.update(self._wn):
+                logger.debug("Pushed {0} changes into the open project".format(self._project_updater.num_changes))
+                return self._project
+        self.close_project()
+        epanet = open_project(self._wn, rptfile, outfile)
+        logger.debug("Loaded the project")
+        self._project = epanet
+        self._project_updater = ProjectUpdater(epanet, self._wn)
+        self._project_prefix = file_prefix
+        return epanet
+
+    @staticmethod
+    def _solve_hydraulics(epanet):
+        """ENsolveH, but starting from the initial link flows like a newly
+        loaded project instead of the flows at the end of the last run."""
+        epanet.ENopenH()
+        try:
+            epanet.ENinitH(EN.SAVE + EN.INITFLOW)
+            tstep = 1
+            while tstep > 0:
+                epanet.ENrunH()
+                tstep = epanet.ENnextH()
+        finally:
+            epanet.ENcloseH()
+
+    def close_project(self):
+        """
+        Close the EPANET project kept open by ``run_sim(reuse_project=True)``, if any.
+        """
+        if self._project is not None:
+            self._project.ENclose()
+        self._project = None
+        self._project_updater = None
+        self._project_prefix = None
+
 
 class StepwiseEpanetSimulator(WaterNetworkSimulator):
 
@@ -247,25 +319,28 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         self._temp_node_report_lines = dict()
         self._overrides = dict()
         self._stop_criteria = None
+        self._periodic_state = None
+        self._tank_name_idx = list()
+        self._tank_elevations = None
         self._version = 2.2
         self._node_attributes = [
-            (_tk.NodeParam.QUALITY, "_quality", "quality", QualParam.Quality),
-            (_tk.NodeParam.DEMAND, "_demand", "demand", HydParam.Demand),
-            (_tk.NodeParam.HEAD, "_head", "head", HydParam.HydraulicHead),
-            (_tk.NodeParam.PRESSURE, "_pressure", "pressure", HydParam.Pressure),
+            (EN.QUALITY, "_quality", "quality", QualParam.Quality),
+            (EN.DEMAND, "_demand", "demand", HydParam.Demand),
+            (EN.HEAD, "_head", "head", HydParam.HydraulicHead),
+            (EN.PRESSURE, "_pressure", "pressure", HydParam.Pressure),
         ]
         self._link_attributes = [
             (
-                _tk.LinkParam.LINKQUAL,
+                EN.LINKQUAL,
                 "_quality",
                 "quality",
                 QualParam.LinkQuality,
             ),
-            (_tk.LinkParam.FLOW, "_flow", "flowrate", HydParam.Flow),
-            (_tk.LinkParam.VELOCITY, "_velocity", "velocity", HydParam.Velocity),
-            (_tk.LinkParam.HEADLOSS, "_headloss", "headloss", HydParam.HeadLoss),
-            (_tk.LinkParam.STATUS, "_user_status", "status", None),
-            (_tk.LinkParam.SETTING, "_setting", "setting", None),
+            (EN.FLOW, "_flow", "flowrate", HydParam.Flow),
+            (EN.VELOCITY, "_velocity", "velocity", HydParam.Velocity),
+            (EN.HEADLOSS, "_headloss", "headloss", HydParam.HeadLoss),
+            (EN.STATUS, "_user_status", "status", None),
+            (EN.SETTING, "_setting", "setting", None),
         ]
         self.logger = logger
 
@@ -289,6 +364,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         maximum_duration=None,
         estimated_results_size=None,
         stop_criteria: StopCriteria = None,
+        periodic_state: PeriodicStateDetector = None,
     ) -> "StepwiseEpanetSimulator":
         """
         Create a new context-managed EPANET v2.2 simulator. This simulator must be used
@@ -316,6 +392,10 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             estimate from the duration and report step.
         stop_criteria : StopCriteria
             Simulation termination criteria that are not EPANET standard, by default None.
+        periodic_state : PeriodicStateDetector
+            Stop the simulation once the tank levels and link statuses at the report times repeat
+            over a full period, by default None. The early exit is recorded in the ``early_exit``
+            attribute of the results.
 
 
         Returns
@@ -349,6 +429,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         self._stop_criteria = (
             stop_criteria if stop_criteria is not None else StopCriteria()
         )
+        self._periodic_state = periodic_state
         return self
 
     def __enter__(self):
@@ -388,10 +469,10 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         )
 
         if self._T_maximum is None:
-            epanet.ENsettimeparam(_tk.TimeParam.DURATION, self._T_maximum)
+            epanet.ENsettimeparam(EN.DURATION, self._T_maximum)
         self._t = 0
-        self._report_timestep = epanet.ENgettimeparam(_tk.TimeParam.REPORTSTEP)
-        self._report_start = epanet.ENgettimeparam(_tk.TimeParam.REPORTSTART)
+        self._report_timestep = epanet.ENgettimeparam(EN.REPORTSTEP)
+        self._report_start = epanet.ENgettimeparam(EN.REPORTSTART)
         self._last_line_added = -1
         self._setup_overrides()
         if self._wn.options.quality.parameter is not None:
@@ -425,19 +506,21 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
                 )
 
         self._setup_results_object(initial_chunks * self._chunk_size)
+        if self._periodic_state is not None:
+            self._periodic_state.reset()
         # setup intermediate sensors indices from names to internal EPANET numbers
         new_link_sensors = dict()
         new_node_sensors = dict()
         for name, vals in self._link_sensors.items():
             wn_name, attr = name
             en_idx = epanet.ENgetlinkindex(wn_name)
-            if attr == _tk.LinkParam.LINKQUAL:
+            if attr == EN.LINKQUAL:
                 vals = (vals[0], vals[1], self._link_sensors[0][-1])
             new_link_sensors[(en_idx, attr)] = vals
         for name, vals in self._node_sensors.items():
             wn_name, attr = name
             en_idx = epanet.ENgetnodeindex(wn_name)
-            if attr == _tk.NodeParam.QUALITY:
+            if attr == EN.QUALITY:
                 vals = (vals[0], vals[1], self._node_sensors[0][-1])
             new_node_sensors[(en_idx, attr)] = vals
         self._link_sensors = new_link_sensors
@@ -451,12 +534,12 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         epanet.ENrunH()
         epanet.ENrunQ()
         self._T_duration = orig_duration
-        self._dt = epanet.ENgettimeparam(_tk.TimeParam.REPORTSTEP)
+        self._dt = epanet.ENgettimeparam(EN.REPORTSTEP)
         # # Load initial time-0 results into results (if reporting)
         self._save_report_step()  # saves on internal temp results lists
         # # Load initial time-0 results into intermediate sensors
         self._save_intermediate_values()  # stores on WaterNetworkModel
-        self._t = epanet.ENgettimeparam(_tk.TimeParam.HTIME)
+        self._t = epanet.ENgettimeparam(EN.HTIME)
         tstep = epanet.ENnextH()
         self._tstep = tstep
         qstep = epanet.ENnextQ()
@@ -472,6 +555,8 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         # self.logger.debug("Next time {}, next stop {}, duration {}", self.next_time, self._next_stop_time, self._duration)
         if (self.next_time > self._T_duration) or self.next_time <= 0 or self._tstep <= 0:
             raise StopIteration
+        if self._periodic_state is not None and self._periodic_state.detected:
+            raise StopIteration
         return self.step()
 
     def step(self):
@@ -483,7 +568,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         self._wn._prev_sim_time = self._t
         epanet.ENrunH()
         epanet.ENrunQ()
-        self._wn.sim_time = epanet.ENgettimeparam(_tk.TimeParam.HTIME)
+        self._wn.sim_time = epanet.ENgettimeparam(EN.HTIME)
 
         # Read all sensors in the _node and _link sensors list
         self._save_intermediate_values()
@@ -493,10 +578,10 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         # Check on stop criteria
         conditions = self._stop_criteria.check()
         # if len(conditions) > 0:
-        #     # enData.ENsettimeparam(_tk.TimeParam.DURATION, enData.ENgettimeparam(_tk.TimeParam.HTIME))
+        #     # enData.ENsettimeparam(EN.DURATION, enData.ENgettimeparam(EN.HTIME))
         #     completed = False
 
-        self._t = epanet.ENgettimeparam(_tk.TimeParam.HTIME)
+        self._t = epanet.ENgettimeparam(EN.HTIME)
         # Move EPANET forward in time
         t_hyd = epanet.ENnextH()
         t_qual = epanet.ENnextQ()
@@ -510,7 +595,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
 
     def continue_run(self):
         stop, cond = self.step()
-        while len(cond) < 1 and self._T_break > self.current_time:
+        while len(cond) < 1 and self._T_break > self.current_time and not self.periodic_state_detected:
             stop, cond = self.step()
         if self._T_break <= self.current_time:
             self.set_breakpoint(self._T_maximum)
@@ -520,27 +605,33 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         epanet = self._epanet
         if epanet is None:
             raise RuntimeError(self.__class__.__name__ + " not initialized before use")
-        if self.current_time < self._T_maximum:
+        stopped_early = self.current_time < self._T_maximum
+        if stopped_early:
             self.set_breakpoint(self.current_time)
-            self._epanet.ENsettimeparam(_tk.TimeParam.DURATION, self.current_time)
+            self._epanet.ENsettimeparam(EN.DURATION, self.current_time)
         epanet.ENcloseH()
         epanet.ENcloseQ()
-        epanet.ENreport()
+        if not stopped_early:
+            # the output file is incomplete if the simulation stopped before its duration
+            epanet.ENreport()
         epanet.ENclose()
         logger.debug("Completed step run")
         self._epanet = None
-        # results = wntr.epanet.io.BinFile().read(self.outfile)
-        return self.get_results()
 
     @property
     def current_time(self):
         """int: the last time solved (read-only, in seconds)"""
         return self._t
 
+    @property
+    def periodic_state_detected(self):
+        """bool: True if the periodic state detector has ended the simulation (read-only)"""
+        return self._periodic_state is not None and self._periodic_state.detected
+
     @property
     def next_time(self):
         """int: the next time to be solved (read-only, in secconds)"""
-        return self._epanet.ENgettimeparam(_tk.TimeParam.HTIME)
+        return self._epanet.ENgettimeparam(EN.HTIME)
 
     @property
     def duration(self):
@@ -573,6 +664,8 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             df2 = self._results.link[name]
             index = np.reshape(df2['index'], -1)
             results.link[name] = pd.DataFrame(data=np.reshape(df2['data'],(len(index),-1)), columns=df2['columns'], index=index)
+        if self._periodic_state is not None:
+            self._periodic_state.finish(results, self._T_duration)
         return results
 
     def add_stop_criterion(self, control: StopControl):
@@ -671,11 +764,9 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             if isinstance(attribute, (EN, int)):
                 return self._epanet.ENgetlinkvalue(link_id, attribute)
             elif isinstance(attribute, str) and attribute.upper() == "QUALITY":
-                return self._epanet.ENgetlinkvalue(link_id, _tk.LinkParam.LINKQUAL)
+                return self._epanet.ENgetlinkvalue(link_id, EN.LINKQUAL)
             else:
-                return self._epanet.ENgetlinkvalue(
-                    link_id, _tk.LinkParam[attribute.upper()]
-                )
+                return self._epanet.ENgetlinkvalue(link_id, EN[attribute.upper()])
         else:
             msg = "The simulator has not been initialized"
             logger.error(msg)
@@ -725,7 +816,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
         else:
             link_id = link_name
         for attr, aname, _, f in self._link_attributes:
-            if attr == _tk.LinkParam.SETTING:
+            if attr == EN.SETTING:
                 if link.link_type == "Pipe":
                     f = HydParam.RoughnessCoeff
                 elif link.link_type == "Valve":
@@ -819,8 +910,8 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             a = RuntimeError("The simulation has not been initialized")
             logger.error(a)
             raise a
-        self._epanet.ENsettimeparam(_tk.TimeParam.HYDSTEP, dt_hyd)
-        return self._epanet.ENgettimeparam(_tk.TimeParam.HYDSTEP)
+        self._epanet.ENsettimeparam(EN.HYDSTEP, dt_hyd)
+        return self._epanet.ENgettimeparam(EN.HYDSTEP)
 
     def set_breakpoint(self, sim_time: int) -> int:
         """
@@ -856,17 +947,17 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
                 )
             )
             warnings.warn(w)
-            return self._t  # self._en.ENgettimeparam(_tk.TimeParam.DURATION)
+            return self._t  # self._en.ENgettimeparam(EN.DURATION)
         elif self._t == sim_time:
             w = RuntimeWarning("The simulation is already at time {}".format(sim_time))
             warnings.warn(w)
-            return self._t  # self._en.ENgettimeparam(_tk.TimeParam.DURATION)
+            return self._t  # self._en.ENgettimeparam(EN.DURATION)
         else:
             self._T_break = sim_time
-            # self._en.ENsettimeparam(_tk.TimeParam.DURATION, seconds)
+            # self._en.ENsettimeparam(EN.DURATION, seconds)
             return (
                 self._T_break
-            )  # self._en.ENgettimeparam(_tk.TimeParam.DURATION)
+            )  # self._en.ENgettimeparam(EN.DURATION)
 
     def set_link_status(self, link_name: str, value: float, override=True):
         if self._epanet is None:
@@ -874,7 +965,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             logger.error(w)
             raise w
         link_num = self._epanet.ENgetlinkindex(link_name)
-        self._epanet.ENsetlinkvalue(link_num, _tk.LinkParam.STATUS, value)
+        self._epanet.ENsetlinkvalue(link_num, EN.STATUS, value)
         if link_name in self._overrides and override:
             # FIXME: handle overrides
             controls = self._overrides[link_name]
@@ -887,7 +978,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
                     ctrl_data["nodeindex"],
                     (
                         1e30
-                        if ctrl_data["type"] == _tk.CtrlType.HILEVEL
+                        if ctrl_data["type"] == EN.HILEVEL
                         else -1e30
                     ),
                 )
@@ -901,7 +992,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             logger.error(w)
             raise w
         link_num = self._epanet.ENgetlinkindex(link_name)
-        self._epanet.ENsetlinkvalue(link_num, _tk.LinkParam.SETTING, value)
+        self._epanet.ENsetlinkvalue(link_num, EN.SETTING, value)
         if link_name in self._overrides and override:
             # FIXME: handle overrides
             controls = self._overrides[link_name]
@@ -914,7 +1005,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
                     ctrl_data["nodeindex"],
                     (
                         1e30
-                        if ctrl_data["type"] == _tk.CtrlType.HILEVEL
+                        if ctrl_data["type"] == EN.HILEVEL
                         else -1e30
                     ),
                 )
@@ -945,7 +1036,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             warnings.warn(w)
 
     def _save_report_step(self):
-        t = self._epanet.ENgettimeparam(_tk.TimeParam.HTIME)
+        t = self._epanet.ENgettimeparam(EN.HTIME)
         # this is checking to make sure we are at a report step, or if past the step, but it didn't get reported, then report out.
         report_line = (
             -1
@@ -962,13 +1053,13 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             pressure = list()
             quality = list()
             for idx in self._node_name_idx:
-                demand.append(self._epanet.ENgetnodevalue(idx, _tk.NodeParam.DEMAND))
-                head.append(self._epanet.ENgetnodevalue(idx, _tk.NodeParam.HEAD))
+                demand.append(self._epanet.ENgetnodevalue(idx, EN.DEMAND))
+                head.append(self._epanet.ENgetnodevalue(idx, EN.HEAD))
                 pressure.append(
-                    self._epanet.ENgetnodevalue(idx, _tk.NodeParam.PRESSURE)
+                    self._epanet.ENgetnodevalue(idx, EN.PRESSURE)
                 )
                 quality.append(
-                    self._epanet.ENgetnodevalue(idx, _tk.NodeParam.QUALITY)
+                    self._epanet.ENgetnodevalue(idx, EN.QUALITY)
                 )
             self._temp_node_report_lines["demand"].append(demand)
             self._temp_node_report_lines["head"].append(head)
@@ -982,18 +1073,18 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             setting = list()
             for idx in self._link_name_idx:
                 linkqual.append(
-                    self._epanet.ENgetlinkvalue(idx, _tk.LinkParam.LINKQUAL)
+                    self._epanet.ENgetlinkvalue(idx, EN.LINKQUAL)
                 )
-                flow.append(self._epanet.ENgetlinkvalue(idx, _tk.LinkParam.FLOW))
+                flow.append(self._epanet.ENgetlinkvalue(idx, EN.FLOW))
                 velocity.append(
-                    self._epanet.ENgetlinkvalue(idx, _tk.LinkParam.VELOCITY)
+                    self._epanet.ENgetlinkvalue(idx, EN.VELOCITY)
                 )
                 headloss.append(
-                    self._epanet.ENgetlinkvalue(idx, _tk.LinkParam.HEADLOSS)
+                    self._epanet.ENgetlinkvalue(idx, EN.HEADLOSS)
                 )
-                status.append(self._epanet.ENgetlinkvalue(idx, _tk.LinkParam.STATUS))
+                status.append(self._epanet.ENgetlinkvalue(idx, EN.STATUS))
                 setting.append(
-                    self._epanet.ENgetlinkvalue(idx, _tk.LinkParam.SETTING)
+                    self._epanet.ENgetlinkvalue(idx, EN.SETTING)
                 )
             self._temp_link_report_lines["quality"].append(linkqual)
             self._temp_link_report_lines["flowrate"].append(flow)
@@ -1001,6 +1092,16 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             self._temp_link_report_lines["headloss"].append(headloss)
             self._temp_link_report_lines["status"].append(status)
             self._temp_link_report_lines["setting"].append(setting)
+            if self._periodic_state is not None:
+                levels = (
+                    to_si(
+                        self._flow_units,
+                        np.array([head[i] for i in self._tank_name_idx]),
+                        HydParam.HydraulicHead,
+                    )
+                    - self._tank_elevations
+                )
+                self._periodic_state.record(time, levels, status)
 
     def _copy_results_object(self):
         if len(self._temp_index) == 0:
@@ -1039,6 +1140,13 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             )
         for node_name in self._node_name_str:
             self._node_name_idx.append(self._epanet.ENgetnodeindex(node_name))
+        tank_names = set(self._wn.tank_name_list)
+        self._tank_name_idx = [
+            i for i, node_name in enumerate(self._node_name_str) if node_name in tank_names
+        ]
+        self._tank_elevations = np.array(
+            [self._wn.get_node(self._node_name_str[i]).elevation for i in self._tank_name_idx]
+        )
         for link_name in self._link_name_str:
             self._link_name_idx.append(self._epanet.ENgetlinkindex(link_name))
         for _, _, name, _ in self._node_attributes:
@@ -1058,7 +1166,7 @@ class StepwiseEpanetSimulator(WaterNetworkSimulator):
             for obj in ctrl.requires():
                 if isinstance(obj, Link):
                     require_override.add(obj)
-        numctrls = self._epanet.ENgetcount(_tk.CountType.CONTROLCOUNT)
+        numctrls = self._epanet.ENgetcount(EN.CONTROLCOUNT)
         link_indexes = dict()
         for link in require_override:
             link_name = link.name
@@ -0,0 +1,137 @@
+"""
+What-if continuations of a simulation that share the simulation up to a
+branch time.
+"""
+import logging
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+
+from wntr.sim.core import WNTRSimulator
+from wntr.sim.scenarios import check_scenario, apply_scenario, init_worker, run_worker
+
+logger = logging.getLogger(__name__)
+
+
+class ForkWNTRSimulator(WNTRSimulator):
+    """
+    WNTR simulator that forks a simulation into many what-if continuations.
+
+    :py:meth:`run_sim` simulates the network up to a branch time once and keeps
+    a snapshot of the simulator state at that time (the same state that is
+    saved in a checkpoint, see :py:meth:`WNTRSimulator.run_sim
+    <wntr.sim.core.WNTRSimulator.run_sim>`). :py:meth:`run_continuations` then
+    simulates the rest of the duration for each scenario, starting from a copy
+    of the snapshot, either serially or in a pool of processes. Each scenario is
+    applied to the network at the branch time and is either None (no changes),
+    a function that takes the water network model as its only argument and
+    changes it (e.g., adds controls or changes attributes), or a dictionary
+    with any of the following keys:
+
+    * 'status': {link name: :class:`~wntr.network.base.LinkStatus` or str}
+    * 'nodes': {node name: {attribute: value}}
+    * 'links': {link name: {attribute: value}}
+
+    Functions must be picklable (e.g., defined at the module level or
+    created with functools.partial) to be run in a pool of processes.
+
+    The results of each continuation include the simulation up to the branch
+    time. A continuation without changes gives the same results as an
+    uninterrupted simulation.
+
+    Parameters
+    ----------
+    wn: WaterNetworkModel
+        Water network model
+    """
+
+    def __init__(self, wn):
+        super(ForkWNTRSimulator, self).__init__(wn)
+        self._run_sim_options = None
+
+    def run_sim(self, branch_time, **kwargs):
+        """
+        Run the simulation up to the branch time and keep a snapshot of its state.
+
+        Parameters
+        ----------
+        branch_time: int
+            The time of the snapshot, in seconds. If branch_time is not a hydraulic timestep, the
+            snapshot is taken at the next hydraulic timestep.
+        kwargs:
+            Passed to :py:meth:`WNTRSimulator.run_sim <wntr.sim.core.WNTRSimulator.run_sim>`. The
+            continuations are run with the same options.
+
+        Returns
+        -------
+        results: SimulationResults
+            The results up to the branch time
+        """
+        if branch_time <= self._wn.sim_time or branch_time > self._wn.options.time.duration:
+            raise ValueError('branch_time must be after the current simulation time and at most the duration '
+                             'of the simulation.')
+        if 'checkpoint_file' in kwargs:
+            raise ValueError('checkpoint_file is not supported by ForkWNTRSimulator.')
+        self._branch_time = branch_time
+        self._snapshot = None
+        try:
+            results = super(ForkWNTRSimulator, self).run_sim(**kwargs)
+        finally:
+            self._branch_time = None
+        if self._snapshot is None:
+            raise RuntimeError('The simulation stopped before the branch time.')
+        self._run_sim_options = kwargs
+        return results
+
+    def run_continuations(self, scenarios, processes=None):
+        """
+        Simulate the rest of the duration from the snapshot for each scenario.
+
+        Parameters
+        ----------
+        scenarios: list
+            The changes to the network at the branch time for each continuation (see
+            :py:class:`ForkWNTRSimulator`)
+        processes: int (optional)
+            The number of worker processes. If None (default), the continuations are run serially
+            in this process.
+
+        Returns
+        -------
+        results: list of SimulationResults
+            One results object for each scenario, in the same order as scenarios
+        """
+        if self._snapshot is None:
+            raise RuntimeError('run_sim must be called before run_continuations.')
+        scenarios = list(scenarios)
+        for scenario in scenarios:
+            check_scenario(self._wn, scenario)
+
+        if processes is None:
+            return [_run_continuation(self._snapshot, scenario, self._run_sim_options) for scenario in scenarios]
+
+        # the snapshot is sent once to each worker instead of with every scenario
+        with ProcessPoolExecutor(max_workers=processes, initializer=init_worker,
+                                 initargs=(_ForkWorker, self._snapshot)) as executor:
+            futures = [executor.submit(run_worker, scenario, self._run_sim_options) for scenario in scenarios]
+            return [future.result() for future in futures]
+
+
+def _run_continuation(snapshot, scenario, options):
+    checkpoint = pickle.loads(snapshot)
+    wn = pickle.loads(checkpoint['network'])
+    if scenario is not None:
+        apply_scenario(wn, scenario, initial=False)
+        checkpoint['modified'] = True
+    sim = WNTRSimulator(wn)
+    sim._checkpoint = checkpoint
+    return sim.run_sim(**options)
+
+
+class _ForkWorker(object):
+    """Runs continuations from the snapshot sent to the process once."""
+
+    def __init__(self, snapshot):
+        self._snapshot = snapshot
+
+    def run(self, scenario, options):
+        return _run_continuation(self._snapshot, scenario, options)
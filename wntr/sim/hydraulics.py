@@ -7,7 +7,7 @@ import math
 import warnings
 import logging
 from wntr.network.model import WaterNetworkModel
-from wntr.network.base import NodeType, LinkType, LinkStatus
+from wntr.network.base import NodeType, LinkType, LinkStatus, Link
 from wntr.network.elements import Junction, Tank, Reservoir, Pipe, Pump, HeadPump, PowerPump, PRValve, PSValve, FCValve, \
     TCValve, GPValve, PBValve
 from collections import OrderedDict
@@ -15,6 +15,7 @@ from wntr.utils.ordered_set import OrderedSet
 from wntr.sim import aml
 from wntr.sim.models import constants, var, param, constraint
 from wntr.sim.models.utils import ModelUpdater
+from wntr.sim.solvers import EliminationLayout
 
 logger = logging.getLogger(__name__)
 
@@ -43,28 +44,12 @@ def create_hydraulic_model(wn, HW_approx='default'):
     constants.leak_constants(m)
     constants.pdd_constants(m)
 
-    param.source_head_param(m, wn)
-    param.expected_demand_param(m, wn)
     mode = wn.options.hydraulic.demand_model
-    if mode in ['DD', 'DDA']:
-        pass
-    elif mode in ['PDD', 'PDA']:
-        param.pmin_param.build(m, wn, model_updater)
-        param.pnom_param.build(m, wn, model_updater)
-        param.pdd_poly_coeffs_param.build(m, wn, model_updater)
-    param.leak_coeff_param.build(m, wn, model_updater)
-    param.leak_area_param.build(m, wn, model_updater)
-    param.leak_poly_coeffs_param.build(m, wn, model_updater)
-    param.elevation_param.build(m, wn, model_updater)
     if wn.options.hydraulic.headloss == 'C-M':
         raise NotImplementedError('C-M headloss is not currently supported in the WNTRSimulator')
     if wn.options.hydraulic.headloss == 'D-W':
         raise NotImplementedError('D-W headloss is not currently supported in the WNTRSimulator')
-    param.hw_resistance_param.build(m, wn, model_updater)
-    param.minor_loss_param.build(m, wn, model_updater)
-    param.tcv_resistance_param.build(m, wn, model_updater)
-    param.pump_power_param.build(m, wn, model_updater)
-    param.valve_setting_param.build(m, wn, model_updater)
+    _build_params(m, wn, model_updater)
 
     if mode in ['DD','DDA']:
         pass
@@ -104,23 +89,164 @@ def create_hydraulic_model(wn, HW_approx='default'):
     return m, model_updater
 
 
-def update_model_for_controls(m, wn, model_updater, change_tracker):
+def _build_params(m, wn, model_updater):
+    """Add the parameters to the model, or set the values of the parameters that already exist."""
+    param.source_head_param(m, wn)
+    param.expected_demand_param(m, wn)
+    if wn.options.hydraulic.demand_model in ['PDD', 'PDA']:
+        param.pmin_param.build(m, wn, model_updater)
+        param.pnom_param.build(m, wn, model_updater)
+        param.pdd_poly_coeffs_param.build(m, wn, model_updater)
+    param.leak_coeff_param.build(m, wn, model_updater)
+    param.leak_area_param.build(m, wn, model_updater)
+    param.leak_poly_coeffs_param.build(m, wn, model_updater)
+    param.elevation_param.build(m, wn, model_updater)
+    param.hw_resistance_param.build(m, wn, model_updater)
+    param.minor_loss_param.build(m, wn, model_updater)
+    param.tcv_resistance_param.build(m, wn, model_updater)
+    param.pump_power_param.build(m, wn, model_updater)
+    param.valve_setting_param.build(m, wn, model_updater)
+
+
+class HydraulicModelCache(object):
     """
+    Keeps the hydraulic model built by :py:func:`create_hydraulic_model` so that it can be reused
+    by later simulations of networks with the same structure.
 
-    Parameters
+    The structure of a network is given by the names, types and connectivity of its nodes and
+    links, the demand model, and the headloss formula and approximation. If the structure of the
+    network passed to :py:meth:`get_model` matches the structure of the cached model, the
+    parameters and initial values of the variables of the cached model are set from the network
+    and only the constraints of the elements whose status, isolation, leak status, or pump curve
+    differ from the state of the cached model are rebuilt. Otherwise, a new model is built.
+
+    A model is only reused after :py:meth:`release` was called at the end of the simulation that
+    used it; a model left by an interrupted simulation is rebuilt.
+
+    The same cache can be passed to :py:meth:`WNTRSimulator.run_sim
+    <wntr.sim.core.WNTRSimulator.run_sim>` by many simulators (e.g., in a criticality or
+    calibration loop). The model is not pickled with the cache.
+
+    Attributes
     ----------
-    m: wntr.sim.aml.aml.Model
-    wn: wntr.network.model.WaterNetworkModel
-    model_updater: wntr.sim.models.utils.ModelUpdater
-    change_tracker: wntr.network.controls.ControlChangeTracker
+    num_builds: int
+        The number of models built
+    num_reuses: int
+        The number of times the cached model was reused
     """
-    for obj, attr in change_tracker.get_changes(ref_point='model'):
-        model_updater.update(m, wn, obj, attr)
-    change_tracker.reset_reference_point(key='model')
+    def __init__(self):
+        self._key = None
+        self._m = None
+        self._model_updater = None
+        self._state = None
+        self.num_builds = 0
+        self.num_reuses = 0
 
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state.update(_key=None, _m=None, _model_updater=None, _state=None)
+        return state
 
-def update_model_for_isolated_junctions_and_links(m, wn, model_updater, prev_isolated_junctions, prev_isolated_links,
-                                                  isolated_junctions, isolated_links):
+    def get_model(self, wn, HW_approx='default'):
+        """
+        Get a hydraulic model for the network, reusing the cached model if possible.
+
+        Parameters
+        ----------
+        wn: WaterNetworkModel
+        HW_approx: str
+            See :py:func:`create_hydraulic_model`
+
+        Returns
+        -------
+        m: wntr.aml.Model
+        model_updater: wntr.models.utils.ModelUpdater
+        """
+        key = self._get_key(wn, HW_approx)
+        state = self._state
+        self._state = None
+        if state is None or key != self._key:
+            logger.debug('building a new hydraulic model')
+            self._m, self._model_updater = create_hydraulic_model(wn, HW_approx=HW_approx)
+            self._key = key
+            self.num_builds += 1
+            return self._m, self._model_updater
+
+        logger.debug('reusing the cached hydraulic model')
+        m = self._m
+        model_updater = self._remap_updater(wn)
+        _build_params(m, wn, model_updater)
+        self._reset_vars(m, wn)
+        for (obj, attr) in self._get_changes(wn, state):
+            model_updater.update(m, wn, obj, attr)
+        self._model_updater = model_updater
+        self.num_reuses += 1
+        return m, model_updater
+
+    def release(self, wn):
+        """
+        Mark the cached model as free to be reused. The model must be consistent with the
+        current state of wn (the network of the simulation that used the model).
+
+        Parameters
+        ----------
+        wn: WaterNetworkModel
+        """
+        self._state = self._get_state(wn)
+
+    def _get_key(self, wn, HW_approx):
+        nodes = tuple((name, type(node).__name__) for name, node in wn.nodes())
+        links = tuple((name, type(link).__name__, link.start_node_name, link.end_node_name)
+                      for name, link in wn.links())
+        return (wn.options.hydraulic.demand_model, wn.options.hydraulic.headloss, HW_approx, nodes, links)
+
+    def _get_state(self, wn):
+        nodes = [(getattr(node, 'leak_status', False), node._is_isolated) for name, node in wn.nodes()]
+        links = list()
+        for name, link in wn.links():
+            if isinstance(link, HeadPump) and link.pump_curve_name is not None:
+                # the coefficients of the pump curve are constants of the headloss constraint
+                curve = (link.pump_curve_name, tuple(tuple(point) for point in link.get_pump_curve().points))
+            else:
+                curve = None
+            links.append((link.status, link._is_isolated, curve))
+        return nodes, links
+
+    def _get_changes(self, wn, state):
+        """The (element, attribute) pairs of wn that do not match the state of the cached model."""
+        node_state, link_state = self._get_state(wn)
+        changes = list()
+        for (name, node), new, old in zip(wn.nodes(), node_state, state[0]):
+            for attr, new_value, old_value in zip(('leak_status', '_is_isolated'), new, old):
+                if new_value != old_value:
+                    changes.append((node, attr))
+        for (name, link), new, old in zip(wn.links(), link_state, state[1]):
+            for attr, new_value, old_value in zip(('status', '_is_isolated', 'pump_curve_name'), new, old):
+                if new_value != old_value:
+                    changes.append((link, attr))
+        return changes
+
+    def _remap_updater(self, wn):
+        """Register the update functions of the cached model with the elements of wn."""
+        model_updater = ModelUpdater()
+        for (obj, attr), funcs in self._model_updater.update_functions.items():
+            if isinstance(obj, Link):
+                obj = wn.get_link(obj.name)
+            else:
+                obj = wn.get_node(obj.name)
+            for func in funcs:
+                model_updater.add(obj, attr, func)
+        return model_updater
+
+    def _reset_vars(self, m, wn):
+        # start from the same values as a newly built model
+        for var_name in ('demand', 'flow', 'head', 'leak_rate'):
+            if hasattr(m, var_name):
+                for name, v in getattr(m, var_name).items():
+                    v.value = var.initial_value(wn, var_name, name)
+
+
+def update_model_for_controls(m, wn, model_updater, change_tracker):
     """
 
     Parameters
@@ -128,24 +254,11 @@ def update_model_for_isolated_junctions_and_links(m, wn, model_updater, prev_iso
     m: wntr.sim.aml.aml.Model
     wn: wntr.network.model.WaterNetworkModel
     model_updater: wntr.sim.models.utils.ModelUpdater
-    prev_isolated_junctions: set
-    prev_isolated_links: set
-    isolated_junctions: set
-    isolated_links: set
+    change_tracker: wntr.network.controls.ControlChangeTracker
     """
-    j1 = prev_isolated_junctions - isolated_junctions
-    j2 = isolated_junctions - prev_isolated_junctions
-    j = j1.union(j2)
-    for _j in j:
-        junction = wn.get_node(_j)
-        model_updater.update(m, wn, junction, '_is_isolated')
-
-    l1 = prev_isolated_links - isolated_links
-    l2 = isolated_links - prev_isolated_links
-    l = l1.union(l2)
-    for _l in l:
-        link = wn.get_link(_l)
-        model_updater.update(m, wn, link, '_is_isolated')
+    for obj, attr in change_tracker.get_changes(ref_point='model'):
+        model_updater.update(m, wn, obj, attr)
+    change_tracker.reset_reference_point(key='model')
 
 
 def update_network_previous_values(wn):
@@ -196,147 +309,841 @@ def update_tank_heads(wn):
             
 
 
-def initialize_results_dict(wn):
+class ResultsIndex(object):
     """
+    Index arrays relating the nodes and links of a network to the hydraulic model, built once
+    per simulation.
+
+    :py:meth:`update` gathers heads, demands, leak demands and flows from the variable vector of
+    the hydraulic model. The net inflow of tanks and reservoirs is computed with one sparse
+    matrix-vector product of the node-link incidence matrix and the flows. Link statuses, settings
+    and diameters and node elevations are kept in arrays and only re-read for elements changed by
+    controls. :py:meth:`store_in_network` writes the values back into the nodes and links.
+
     Parameters
     ----------
     wn: wntr.network.model.WaterNetworkModel
-
-    Returns
-    -------
-    res: dict
+    m: wntr.sim.aml.aml.Model
+    store_elements: iterable of nodes and links (optional)
+        The elements updated by :py:meth:`store_in_network`. Tanks and reservoirs are always
+        updated. If None (default), all nodes and links are updated.
     """
-    node_res = OrderedDict()
-    link_res = OrderedDict()
+    def __init__(self, wn, m, store_elements=None):
+        self._wn = wn
+        self.node_names = wn.junction_name_list + wn.tank_name_list + wn.reservoir_name_list
+        self.link_names = wn.pipe_name_list + wn.head_pump_name_list + wn.power_pump_name_list + wn.valve_name_list
+        self._node_ndx = {name: i for i, name in enumerate(self.node_names)}
+        self._link_ndx = {name: i for i, name in enumerate(self.link_names)}
+        self._num_junctions = wn.num_junctions
+        self._num_tanks = wn.num_tanks
+        self._mode = wn.options.hydraulic.demand_model
 
-    node_res['head'] = OrderedDict((name, list()) for name, obj in wn.nodes())
-    node_res['demand'] = OrderedDict((name, list()) for name, obj in wn.nodes())
-    node_res['pressure'] = OrderedDict((name, list()) for name, obj in wn.nodes())
-    node_res['leak_demand'] = OrderedDict((name, list()) for name, obj in wn.nodes())
+        # node-link incidence of the tanks and reservoirs; inflow and outflow are summed
+        # separately to match the network's own accounting
+        num_sources = len(self.node_names) - self._num_junctions
+        for flag in ['INLET', 'OUTLET']:
+            rows = list()
+            cols = list()
+            for i, name in enumerate(self.node_names[self._num_junctions:]):
+                for link_name in wn.get_links_for_node(name, flag):
+                    rows.append(i)
+                    cols.append(self._link_ndx[link_name])
+            incidence = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(num_sources, wn.num_links))
+            if flag == 'INLET':
+                self._source_inlets = incidence
+            else:
+                self._source_outlets = incidence
 
-    link_res['flowrate'] = OrderedDict((name, list()) for name, obj in wn.links())
-    link_res['velocity'] = OrderedDict((name, list()) for name, obj in wn.links())
-    link_res['status'] = OrderedDict((name, list()) for name, obj in wn.links())
-    link_res['setting'] = OrderedDict((name, list()) for name, obj in wn.links())
+        self.head = np.zeros(wn.num_nodes)
+        self.demand = np.zeros(wn.num_nodes)
+        self.pressure = np.zeros(wn.num_nodes)
+        self.leak_demand = np.zeros(wn.num_nodes)
+        self.flow = np.zeros(wn.num_links)
+        self.velocity = np.zeros(wn.num_links)
+        self.status = np.zeros(wn.num_links, dtype=np.int64)
+        self.setting = np.ones(wn.num_links)
+        self._elevation = np.zeros(wn.num_nodes)
+        self._velocity_coeff = np.zeros(wn.num_links)
+        self.update_elements(wn.get_node(name) for name in self.node_names)
+        self.update_elements(wn.get_link(name) for name in self.link_names)
 
-    return node_res, link_res
+        self._isolated_junction_ndx = np.zeros(0, dtype=int)
+        self._isolated_link_ndx = np.zeros(0, dtype=int)
+        self._presolved_junction_vars = list()
+        self._presolved_junction_ndx = np.zeros(0, dtype=int)
+        self._presolved_link_vars = list()
+        self._presolved_link_ndx = np.zeros(0, dtype=int)
+
+        self._junction_vars = [m.head[name] for name in wn.junction_name_list]
+        if self._mode in ['PDD', 'PDA']:
+            self._junction_vars += [m.demand[name] for name in wn.junction_name_list]
+        self._junction_vars += [m.leak_rate[name] for name in wn.junction_name_list + wn.tank_name_list]
+        self._link_vars = [m.flow[name] for name in self.link_names]
+        self._expected_demands = [m.expected_demand[name] for name in wn.junction_name_list]
+        self._source_heads = [m.source_head[name] for name in wn.tank_name_list + wn.reservoir_name_list]
+        self._structure_version = None
+        self._junction_var_ndx = None
+        self._link_var_ndx = None
+
+        self.set_store_elements(store_elements)
+
+    def set_store_elements(self, store_elements=None):
+        """
+        Select the elements updated by :py:meth:`store_in_network`.
+
+        Parameters
+        ----------
+        store_elements: iterable of nodes and links (optional)
+            Tanks and reservoirs are always updated. If None, all nodes and links are updated.
+        """
+        nj = self._num_junctions
+        if store_elements is None:
+            junction_names = self.node_names[:nj]
+            link_names = self.link_names
+        else:
+            store_elements = set(store_elements)
+            junction_names = [name for name in self.node_names[:nj] if self._wn.get_node(name) in store_elements]
+            link_names = [name for name in self.link_names if self._wn.get_link(name) in store_elements]
+        self._store_junctions = [self._wn.get_node(name) for name in junction_names]
+        self._store_junction_ndx = np.array([self._node_ndx[name] for name in junction_names], dtype=int)
+        self._store_links = [self._wn.get_link(name) for name in link_names]
+        self._store_link_ndx = np.array([self._link_ndx[name] for name in link_names], dtype=int)
+        self._tanks = [self._wn.get_node(name) for name in self.node_names[nj:nj+self._num_tanks]]
+        self._reservoirs = [self._wn.get_node(name) for name in self.node_names[nj+self._num_tanks:]]
+
+    def update_elements(self, objs):
+        """
+        Read the elevation of the given nodes and the status, setting and diameter of the given
+        links from the network.
+
+        Parameters
+        ----------
+        objs: iterable of nodes and links
+        """
+        for obj in objs:
+            if isinstance(obj, (Junction, Tank)):
+                self._elevation[self._node_ndx[obj.name]] = obj.elevation
+            elif isinstance(obj, Link):
+                ndx = self._link_ndx[obj.name]
+                self.status[ndx] = obj.status
+                if isinstance(obj, Pipe):
+                    self.setting[ndx] = obj.roughness
+                elif not isinstance(obj, Pump):
+                    self.setting[ndx] = obj.setting
+                if not isinstance(obj, Pump):
+                    self._velocity_coeff[ndx] = 4.0 / (math.pi*obj.diameter**2)
+
+    def set_isolated(self, isolated_junction_ndx, isolated_link_ndx):
+        """
+        Parameters
+        ----------
+        isolated_junction_ndx: np.ndarray of int
+            Positions of the isolated junctions in node_names
+        isolated_link_ndx: np.ndarray of int
+            Positions of the isolated links in link_names
+        """
+        self._isolated_junction_ndx = isolated_junction_ndx
+        self._isolated_link_ndx = isolated_link_ndx
+
+    def set_presolved(self, eliminated_vars):
+        """
+        Parameters
+        ----------
+        eliminated_vars: list of wntr.sim.aml.aml.Var
+            The variables removed from the model by a :py:class:`ModelPresolve`; their values are
+            read from the variables instead of the variable vector of the model
+        """
+        junction_pos = {v: i for i, v in enumerate(self._junction_vars)}
+        link_pos = {v: i for i, v in enumerate(self._link_vars)}
+        self._presolved_junction_vars = [v for v in eliminated_vars if v in junction_pos]
+        self._presolved_junction_ndx = np.array([junction_pos[v] for v in self._presolved_junction_vars], dtype=int)
+        self._presolved_link_vars = [v for v in eliminated_vars if v in link_pos]
+        self._presolved_link_ndx = np.array([link_pos[v] for v in self._presolved_link_vars], dtype=int)
+
+    def _update_var_ndx(self, m):
+        if self._structure_version is not None and m.structure_version == self._structure_version:
+            return
+        self._junction_var_ndx = np.fromiter((-1 if v.index is None else v.index for v in self._junction_vars),
+                                             dtype=int, count=len(self._junction_vars))
+        self._link_var_ndx = np.fromiter((-1 if v.index is None else v.index for v in self._link_vars),
+                                         dtype=int, count=len(self._link_vars))
+        self._structure_version = m.structure_version
+
+    def update(self, m, change_tracker):
+        """
+        Gather the current solution of the hydraulic model.
+
+        Parameters
+        ----------
+        m: wntr.sim.aml.aml.Model
+        change_tracker: wntr.network.controls.ControlChangeTracker
+            The nodes and links changed since the reference point 'results' are read from the
+            network first; the reference point is then reset.
+        """
+        self.update_elements(set(obj for obj, attr in change_tracker.get_changes(ref_point='results')))
+        change_tracker.reset_reference_point(key='results')
+
+        nj = self._num_junctions
+        nt = self._num_tanks
+        self._update_var_ndx(m)
+        x = m.get_x()
+        junction_values = np.where(self._junction_var_ndx >= 0, x[self._junction_var_ndx], 0.0)
+        self.flow[:] = np.where(self._link_var_ndx >= 0, x[self._link_var_ndx], 0.0)
+        if len(self._presolved_junction_vars) > 0:
+            junction_values[self._presolved_junction_ndx] = [v.value for v in self._presolved_junction_vars]
+        if len(self._presolved_link_vars) > 0:
+            self.flow[self._presolved_link_ndx] = [v.value for v in self._presolved_link_vars]
+        self.flow[self._isolated_link_ndx] = 0
+
+        self.head[:nj] = junction_values[:nj]
+        ndx = nj
+        if self._mode in ['PDD', 'PDA']:
+            self.demand[:nj] = junction_values[ndx:ndx+nj]
+            ndx += nj
+        else:
+            self.demand[:nj] = np.fromiter((p.value for p in self._expected_demands), dtype=float, count=nj)
+        self.leak_demand[:nj+nt] = junction_values[ndx:]
+        self.head[nj:] = np.fromiter((p.value for p in self._source_heads), dtype=float,
+                                     count=len(self._source_heads))
+        self.demand[nj:] = self._source_inlets.dot(self.flow) - self._source_outlets.dot(self.flow)
+        self.demand[nj:nj+nt] -= self.leak_demand[nj:nj+nt]
 
+        self.pressure[:nj+nt] = self.head[:nj+nt] - self._elevation[:nj+nt]
+        self.pressure[nj+nt:] = 0
 
-def save_results(wn, node_res, link_res):
+        ndx = self._isolated_junction_ndx
+        self.head[ndx] = 0
+        self.demand[ndx] = 0
+        self.pressure[ndx] = 0
+        self.leak_demand[ndx] = 0
+
+        self.velocity[:] = np.abs(self.flow) * self._velocity_coeff
+
+    def store_in_network(self):
+        """
+        Write the values gathered by :py:meth:`update` into the nodes and links of the network.
+        """
+        ndx = self._store_link_ndx
+        for link, flow in zip(self._store_links, self.flow[ndx].tolist()):
+            link._flow = flow
+
+        ndx = self._store_junction_ndx
+        for junction, head, pressure, demand, leak_demand in zip(self._store_junctions, self.head[ndx].tolist(),
+                                                                 self.pressure[ndx].tolist(),
+                                                                 self.demand[ndx].tolist(),
+                                                                 self.leak_demand[ndx].tolist()):
+            junction._head = head
+            junction._pressure = pressure
+            junction._demand = demand
+            junction._leak_demand = leak_demand
+
+        nj = self._num_junctions
+        nt = self._num_tanks
+        for tank, demand, leak_demand in zip(self._tanks, self.demand[nj:nj+nt].tolist(),
+                                             self.leak_demand[nj:nj+nt].tolist()):
+            tank._demand = demand
+            tank._leak_demand = leak_demand
+
+        for reservoir, head, demand in zip(self._reservoirs, self.head[nj+nt:].tolist(),
+                                           self.demand[nj+nt:].tolist()):
+            reservoir._head = head
+            reservoir._demand = demand
+            reservoir._leak_demand = 0
+
+
+class ResultsBuffer(object):
     """
+    Preallocated arrays for the node and link results of the WNTRSimulator.
+
+    Each attribute is stored in a (time x element) array sized from the simulation
+    duration and the report timestep. The values are copied from a
+    :py:class:`ResultsIndex` at every report time.
+
     Parameters
     ----------
     wn: wntr.network.model.WaterNetworkModel
-    node_res: collections.OrderedDict
-    link_res: collections.OrderedDict
+    num_times: int
+        The initial number of report times; the arrays grow if more times are saved.
     """
-    for name, node in wn.junctions():
-        node_res['head'][name].append(node.head)
-        node_res['demand'][name].append(node.demand)
-        if node._is_isolated:
-            node_res['pressure'][name].append(0.0)
-        else:
-            node_res['pressure'][name].append(node.head - node.elevation)
-        node_res['leak_demand'][name].append(node.leak_demand)
+    def __init__(self, wn, num_times):
+        self.node_names = wn.junction_name_list + wn.tank_name_list + wn.reservoir_name_list
+        self.link_names = wn.pipe_name_list + wn.head_pump_name_list + wn.power_pump_name_list + wn.valve_name_list
+        self._num_times = 0
 
-    for name, node in wn.tanks():
-        node_res['head'][name].append(node.head)
-        node_res['demand'][name].append(node.demand)
-        node_res['pressure'][name].append(node.head - node.elevation)
-        node_res['leak_demand'][name].append(node.leak_demand)
+        num_times = max(int(num_times), 1)
+        num_nodes = len(self.node_names)
+        num_links = len(self.link_names)
+        self.node = OrderedDict((key, np.zeros((num_times, num_nodes)))
+                                for key in ['head', 'demand', 'pressure', 'leak_demand'])
+        self.link = OrderedDict()
+        self.link['flowrate'] = np.zeros((num_times, num_links))
+        self.link['velocity'] = np.zeros((num_times, num_links))
+        self.link['status'] = np.zeros((num_times, num_links), dtype=np.int64)
+        self.link['setting'] = np.zeros((num_times, num_links))
 
-    for name, node in wn.reservoirs():
-        node_res['head'][name].append(node.head)
-        node_res['demand'][name].append(node.demand)
-        node_res['pressure'][name].append(0.0)
-        node_res['leak_demand'][name].append(0.0)
-
-    for name, link in wn.pipes():
-        link_res['flowrate'][name].append(link.flow)
-        link_res['velocity'][name].append(abs(link.flow)*4.0 / (math.pi*link.diameter**2))
-        link_res['status'][name].append(link.status)
-        link_res['setting'][name].append(link.roughness)
-
-    for name, link in wn.head_pumps():
-        link_res['flowrate'][name].append(link.flow)
-        link_res['velocity'][name].append(0)
-        link_res['status'][name].append(link.status)
-        link_res['setting'][name].append(1)
-        
-        A, B, C = link.get_head_curve_coefficients()
-        if link.flow > (A/B)**(1.0/C):
-            start_node_name = link.start_node_name
-            end_node_name = link.end_node_name
-            start_node = wn.get_node(start_node_name)
-            end_node = wn.get_node(end_node_name)
-            start_head = start_node.head
-            end_head = end_node.head
-            warnings.warn('Pump ' + name + ' has exceeded its maximum flow.')
+        link_ndx = {name: i for i, name in enumerate(self.link_names)}
+        node_ndx = {name: i for i, name in enumerate(self.node_names)}
+        self._head_pumps = [wn.get_link(name) for name in wn.head_pump_name_list]
+        self._head_pump_ndx = np.array([link_ndx[pump.name] for pump in self._head_pumps], dtype=int)
+        self._head_pump_start_ndx = np.array([node_ndx[pump.start_node_name] for pump in self._head_pumps], dtype=int)
+        self._head_pump_end_ndx = np.array([node_ndx[pump.end_node_name] for pump in self._head_pumps], dtype=int)
+        self._max_pump_flow = np.zeros(len(self._head_pumps))
+        for i, pump in enumerate(self._head_pumps):
+            A, B, C = pump.get_head_curve_coefficients()
+            self._max_pump_flow[i] = (A/B)**(1.0/C)
+
+    def _grow(self):
+        num_times = 2 * self.node['head'].shape[0]
+        for res in [self.node, self.link]:
+            for key, value in res.items():
+                new_value = np.zeros((num_times, value.shape[1]), dtype=value.dtype)
+                new_value[:self._num_times] = value[:self._num_times]
+                res[key] = new_value
+
+    def save(self, results_index):
+        """
+        Store the values of results_index as the next report time.
+
+        Parameters
+        ----------
+        results_index: ResultsIndex
+        """
+        if self._num_times == self.node['head'].shape[0]:
+            self._grow()
+        t = self._num_times
+        self.node['head'][t] = results_index.head
+        self.node['demand'][t] = results_index.demand
+        self.node['pressure'][t] = results_index.pressure
+        self.node['leak_demand'][t] = results_index.leak_demand
+        self.link['flowrate'][t] = results_index.flow
+        self.link['velocity'][t] = results_index.velocity
+        self.link['status'][t] = results_index.status
+        self.link['setting'][t] = results_index.setting
+        self._num_times += 1
+
+        flow = results_index.flow[self._head_pump_ndx]
+        for i in np.nonzero(flow > self._max_pump_flow)[0]:
+            pump = self._head_pumps[i]
+            start_head = results_index.head[self._head_pump_start_ndx[i]]
+            end_head = results_index.head[self._head_pump_end_ndx[i]]
+            warnings.warn('Pump ' + pump.name + ' has exceeded its maximum flow.')
             logger.warning(
                 'Pump {0} has exceeded its maximum flow. Pump head: {1}; Pump flow: {2}; Max pump flow: {3}'.format(
-                    name, end_head - start_head, link.flow, (A/B)**(1.0/C)))
+                    pump.name, end_head - start_head, flow[i], self._max_pump_flow[i]))
 
-    for name, link in wn.power_pumps():
-        link_res['flowrate'][name].append(link.flow)
-        link_res['velocity'][name].append(0)
-        link_res['status'][name].append(link.status)
-        link_res['setting'][name].append(1) # power pumps have no speed
+    def get_state(self):
+        """
+        Get a copy of the saved values (used for checkpoints).
+
+        Returns
+        -------
+        state: dict
+        """
+        return {'node': OrderedDict((key, value[:self._num_times].copy()) for key, value in self.node.items()),
+                'link': OrderedDict((key, value[:self._num_times].copy()) for key, value in self.link.items())}
+
+    def set_state(self, state):
+        """
+        Replace the saved values with those of :py:meth:`get_state`.
+
+        Parameters
+        ----------
+        state: dict
+        """
+        num_times = state['node']['head'].shape[0]
+        while self.node['head'].shape[0] < num_times:
+            self._grow()
+        for res, saved in [(self.node, state['node']), (self.link, state['link'])]:
+            for key, value in saved.items():
+                res[key][:num_times] = value
+        self._num_times = num_times
+
+    def get_results(self, results):
+        """
+        Add the saved results to results.node and results.link. The DataFrames are views of the
+        arrays of this buffer; no data is copied.
+
+        Parameters
+        ----------
+        results: wntr.sim.results.SimulationResults
+        """
+        num_times = len(results.time)
+        results.node = OrderedDict((key, pd.DataFrame(data=value[:num_times], index=results.time,
+                                                      columns=self.node_names, copy=False))
+                                   for key, value in self.node.items())
+        results.link = OrderedDict((key, pd.DataFrame(data=value[:num_times], index=results.time,
+                                                      columns=self.link_names, copy=False))
+                                   for key, value in self.link.items())
+
+
+class GGAPartition(object):
+    """
+    The variables eliminated from the Newton steps by :py:class:`~wntr.sim.solvers.GGASolver`.
+
+    The headloss constraint of each link is paired with the flow of the link, the pressure
+    dependent demand constraint of each junction with its demand, and the leak constraint of each
+    junction or tank with its leak rate. The variables of the pairs are eliminated and the system
+    in the junction heads is solved. The :py:class:`~wntr.sim.solvers.EliminationLayout` is
+    computed once for each structure of the model.
+
+    Parameters
+    ----------
+    m: wntr.sim.aml.aml.Model
+        The hydraulic model
+    solver_model: wntr.sim.models.vectorized.VectorizedHydraulicModel (optional)
+        The model passed to the solver, if it is not m
+    """
+    _link_constraints = ['approx_hazen_williams_headloss', 'piecewise_hazen_williams_headloss',
+                         'head_pump_headloss', 'power_pump_headloss', 'prv_headloss', 'psv_headloss',
+                         'tcv_headloss', 'fcv_headloss']
+
+    def __init__(self, m, solver_model=None):
+        self._m = m
+        self._solver_model = solver_model
+        self._structure_version = None
+        self._layout = None
+
+    def get_pairs(self):
+        """
+        Get the rows and columns of the pairs for the current structure of the model.
+
+        Returns
+        -------
+        rows: np.ndarray of int
+        cols: np.ndarray of int
+        """
+        m = self._m
+        pairs = list()
+        for con_name in self._link_constraints:
+            if hasattr(m, con_name):
+                pairs.extend((con, m.flow[link_name]) for link_name, con in getattr(m, con_name).items())
+        if hasattr(m, 'pdd'):
+            pairs.extend((con, m.demand[node_name]) for node_name, con in m.pdd.items())
+        pairs.extend((con, m.leak_rate[node_name]) for node_name, con in m.leak_con.items())
+
+        if self._solver_model is None:
+            indices = [(con.index, v.index) for con, v in pairs]
+        else:
+            indices = [(self._solver_model.get_con_index(con), self._solver_model.get_var_index(v))
+                       for con, v in pairs]
+        indices = [(row, col) for row, col in indices if row is not None and col is not None]
+        rows = np.array([row for row, col in indices], dtype=np.int64)
+        cols = np.array([col for row, col in indices], dtype=np.int64)
+        return rows, cols
+
+    def get_layout(self, J, structure_version):
+        """
+        Get the elimination layout for a jacobian of the model.
+
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+        structure_version: int
+            The structure version of the model J was evaluated from. If None, the layout is
+            always recomputed.
+
+        Returns
+        -------
+        layout: wntr.sim.solvers.EliminationLayout
+        """
+        if structure_version is None or structure_version != self._structure_version:
+            rows, cols = self.get_pairs()
+            self._layout = EliminationLayout(J, rows, cols)
+            self._structure_version = structure_version
+            logger.debug('eliminating {0} variables; reduced system size {1}'.format(
+                self._layout.num_eliminated, self._layout.num_reduced))
+        return self._layout
 
-    for name, link in wn.valves():
-        link_res['flowrate'][name].append(link.flow)
-        link_res['velocity'][name].append(abs(link.flow)*4.0 / (math.pi*link.diameter**2))
-        link_res['status'][name].append(link.status)
-        link_res['setting'][name].append(link.setting)
 
+class _PresolvePlan(object):
+    """The elements removed by a :py:class:`ModelPresolve` and the constraints that replace them."""
+    def __init__(self):
+        self.junctions = list()
+        self.links = list()
+        self.chains = OrderedDict()  # first pipe -> (start node, end node, links, True if the first pipe points along)
+        self.nodes = OrderedDict()  # junction -> (dropped links, flow substitutions, junctions of the branches)
 
-def get_results(wn, results, node_res, link_res):
+    def modify(self, node_name):
+        if node_name not in self.nodes:
+            self.nodes[node_name] = (list(), list(), list())
+        return self.nodes[node_name]
+
+    def freeze(self):
+        # sorted so that plans can be compared node by node
+        for name, (dropped, substitutions, extra_demands) in self.nodes.items():
+            self.nodes[name] = (frozenset(dropped), tuple(sorted(substitutions)), tuple(sorted(extra_demands)))
+
+
+class ModelPresolve(object):
     """
+    Removes dead-end branches and chains of series pipes from the hydraulic model.
+
+    The structures are found in the graph of the open links of the network each time
+    :py:meth:`update` is called, without changing the network itself:
+
+    * Dead-end branches: trees of open pipes (without check valves) and junctions (without leaks)
+      that are only connected to the rest of the network at one node. The flows in a branch are
+      given by the demands downstream of each pipe, so the mass balances and headloss constraints
+      of the branch are removed and the expected demands of the branch are added to the mass
+      balance of the node it hangs from. With pressure dependent demands, only branches without
+      demands are removed.
+    * Series pipes: chains of open pipes (without check valves) joined by junctions without
+      demands or leaks. All pipes of a chain carry the same flow, so the chain is replaced by a
+      single headloss constraint (the sum of the headlosses of the pipes) in the flow of its
+      first pipe.
+
+    The hydraulic model then only contains the remaining network. After each solve,
+    :py:meth:`back_substitute` computes the heads, flows and demands of the removed elements from
+    the solution. If the status of a link or the isolation or leak status of a junction changes,
+    the constraints of the removed elements are restored and the structures are found again.
+
+    Only the default Hazen-Williams headloss approximation is supported.
+
     Parameters
     ----------
+    m: wntr.sim.aml.aml.Model
+        The hydraulic model
     wn: wntr.network.model.WaterNetworkModel
-    results: wntr.sim.results.SimulationResults
-    node_res: collections.OrderedDict
-    link_res: collections.OrderedDict
+        The water network model used to build m
+    model_updater: wntr.sim.models.utils.ModelUpdater
+
+    Attributes
+    ----------
+    num_eliminated_junctions: int
+        The number of junctions removed from the model
+    num_eliminated_links: int
+        The number of links removed from the model
+    num_updates: int
+        The number of times the structures were found
     """
-    ntimes = len(results.time)
-    nnodes = wn.num_nodes
-    nlinks = wn.num_links
-    node_names = wn.junction_name_list + wn.tank_name_list + wn.reservoir_name_list
-    link_names = wn.pipe_name_list + wn.head_pump_name_list + wn.power_pump_name_list + wn.valve_name_list
-
-    for key, value in node_res.items():
-        node_res[key] = pd.DataFrame(data=np.array([node_res[key][name] for name in node_names]).transpose(), index=results.time,
-                                     columns=node_names)
-    results.node = node_res
-
-    for key, value in link_res.items():
-        link_res[key] = pd.DataFrame(data=np.array([link_res[key][name] for name in link_names]).transpose(), index=results.time,
-                                            columns=link_names)
-    results.link = link_res
-    
-    # Add headloss to results.link -- removed for now, this is slow
-    #headloss = pd.DataFrame(data=None, index=results.time, columns=link_names)
-    # for name, link in wn.links():
-    #     start_node = link.start_node_name
-    #     end_node = link.end_node_name
-    #     start_head = results.node['head'].loc[:,start_node]
-    #     end_head = results.node['head'].loc[:,end_node]
-    #     if isinstance(link, Pipe):
-    #         # Unit headloss for pipes
-    #         headloss.loc[:,name] = abs(end_head - start_head)/link.length
-    #     elif isinstance(link, Pump):
-    #         # Negative of head gain for pumps 
-    #         head_gain = -(end_head - start_head)
-    #         head_gain[head_gain > 0] = 0
-    #         headloss.loc[:,name] = head_gain
-    #     else:
-    #         # Total head loss for valves
-    #         headloss.loc[:,name] = (end_head - start_head)
-            
-    #     # Headloss is 0 if the link is closed
-    #     headloss.loc[results.link['status'].loc[:,name] == 0,name] = 0
-        
-    #results.link['headloss'] = headloss
+    def __init__(self, m, wn, model_updater):
+        if not hasattr(m, 'approx_hazen_williams_headloss'):
+            raise NotImplementedError('The presolve does not support the piecewise Hazen-Williams headloss '
+                                      'approximation.')
+        self._m = m
+        self._wn = wn
+        self._model_updater = model_updater
+        self._pdd = wn.options.hydraulic.demand_model in ['PDD', 'PDA']
+        self._junction_names = wn.junction_name_list
+        self._link_names = wn.link_name_list
+        self._links = [wn.get_link(name) for name in self._link_names]
+        self._junctions = [wn.get_node(name) for name in self._junction_names]
+        self._is_junction = set(self._junction_names)
+        self._zero_demand = {name: all(ts.base_value == 0 for ts in junction.demand_timeseries_list)
+                             for name, junction in zip(self._junction_names, self._junctions)}
+        self._series_pipe = [isinstance(link, Pipe) and not link.check_valve for link in self._links]
+        # incident links of each node: (link index, link name, other node, True if the link starts at the node)
+        self._incident = {name: list() for name in wn.node_name_list}
+        for i, link in enumerate(self._links):
+            self._incident[link.start_node_name].append((i, link.name, link.end_node_name, True))
+            self._incident[link.end_node_name].append((i, link.name, link.start_node_name, False))
+
+        self._key = None
+        self._branches = list()  # (junction, pipe, parent node, True if the pipe starts at the parent)
+        self._chains = list()  # (start node, links, link directions, internal junctions)
+        self._plan = _PresolvePlan()
+        self._installed = dict()  # (constraint dict name, key) -> constraint
+        self._eliminated_vars = list()
+        self.num_eliminated_junctions = 0
+        self.num_eliminated_links = 0
+        self.num_updates = 0
+
+    @property
+    def eliminated_vars(self):
+        """The variables of the removed elements (set by :py:meth:`update`)."""
+        return self._eliminated_vars
+
+    def update(self):
+        """
+        Find the structures again if the statuses of the links or junctions changed since the last
+        call (or if the model updater rebuilt any of the replaced constraints).
+
+        Returns
+        -------
+        changed: bool
+            True if the model was changed
+        """
+        link_state = bytes(series and link.status != LinkStatus.Closed and not link._is_isolated
+                           for link, series in zip(self._links, self._series_pipe))
+        junction_state = bytes(not (junction._is_isolated or junction.leak_status) for junction in self._junctions)
+        key = (link_state, junction_state)
+        if key == self._key and self._is_intact():
+            return False
+        if not self._is_intact():
+            # the model updater rebuilt some of the replaced constraints
+            self._apply(_PresolvePlan(), restore_all=True)
+        self._find_structures(link_state, junction_state)
+        self._apply(self._get_plan())
+        self._key = key
+        self.num_updates += 1
+        logger.debug('presolve removed {0} junctions and {1} links ({2} branch junctions, {3} chains)'.format(
+            self.num_eliminated_junctions, self.num_eliminated_links, len(self._branches), len(self._chains)))
+        return True
+
+    def restore(self):
+        """
+        Restore the original constraints of all removed elements, e.g., to reuse the model without
+        the presolve.
+        """
+        self._apply(_PresolvePlan(), restore_all=True)
+        self._branches = list()
+        self._chains = list()
+        self._key = None
+
+    def _is_intact(self):
+        m = self._m
+        return all(getattr(m, con_name).get(key, None) is con for (con_name, key), con in self._installed.items())
+
+    def _find_structures(self, link_state, junction_state):
+        # all links count towards the degree of a junction, whatever their status, so that the
+        # structures only change when the status of one of their own pipes or junctions changes
+        self._branches = list()
+        self._chains = list()
+        removed_links = set()
+
+        def remaining_links(node_name):
+            return [entry for entry in self._incident[node_name] if entry[1] not in removed_links]
+
+        degree = {name: len(remaining_links(name)) for name in self._junction_names}
+        can_remove = {name: bool(junction_state[i]) for i, name in enumerate(self._junction_names)}
+
+        # dead-end branches, pruned from the leaves
+        removable = {name for name in self._junction_names
+                     if can_remove[name] and (not self._pdd or self._zero_demand[name])}
+        eliminated = set()
+        queue = [name for name in self._junction_names if name in removable and degree[name] == 1]
+        pos = 0
+        while pos < len(queue):
+            name = queue[pos]
+            pos += 1
+            if name in eliminated or degree[name] != 1:
+                continue
+            ndx, link_name, parent, starts_at_node = remaining_links(name)[0]
+            if not link_state[ndx] or parent == name or (parent in self._is_junction and degree[parent] < 2):
+                continue
+            self._branches.append((name, link_name, parent, not starts_at_node))
+            eliminated.add(name)
+            removed_links.add(link_name)
+            degree[name] = 0
+            if parent in self._is_junction:
+                degree[parent] -= 1
+                if parent in removable and degree[parent] == 1:
+                    queue.append(parent)
+
+        # chains of series pipes between nodes that are not series junctions
+        roots = {parent for name, link_name, parent, starts_at_parent in self._branches}
+        series = set()
+        for name in self._junction_names:
+            if (can_remove[name] and self._zero_demand[name] and name not in eliminated and name not in roots and
+                    degree[name] == 2 and all(link_state[e[0]] and e[2] != name for e in remaining_links(name))):
+                series.add(name)
+
+        def walk(start, entry):
+            nodes = list()
+            entries = [entry]
+            node = entry[2]
+            while node in series and node != start:
+                nodes.append(node)
+                entry = [e for e in remaining_links(node) if e[1] != entries[-1][1]][0]
+                entries.append(entry)
+                node = entry[2]
+            return nodes, entries, node
+
+        visited = set()
+        for name in self._junction_names:
+            if name not in series or name in visited:
+                continue
+            entry0, entry1 = remaining_links(name)
+            left_nodes, left_entries, start_node = walk(name, entry0)
+            if start_node == name:
+                visited.update(left_nodes)
+                visited.add(name)
+                continue
+            right_nodes, right_entries, end_node = walk(name, entry1)
+            nodes = left_nodes[::-1] + [name] + right_nodes
+            visited.update(nodes)
+            if start_node == end_node:
+                continue
+            # the links from start_node to end_node and whether each link points along the chain
+            links = [e[1] for e in left_entries[::-1]] + [e[1] for e in right_entries]
+            forward = [not e[3] for e in left_entries[::-1]] + [e[3] for e in right_entries]
+            self._chains.append((start_node, links, forward, nodes))
+
+    def _head(self, node_name):
+        if node_name in self._is_junction:
+            return self._m.head[node_name]
+        return self._m.source_head[node_name]
+
+    def _get_plan(self):
+        plan = _PresolvePlan()
+        root = dict()
+        for name, link_name, parent, starts_at_parent in reversed(self._branches):
+            root[name] = root.get(parent, parent)
+        for name, link_name, parent, starts_at_parent in self._branches:
+            plan.junctions.append(name)
+            plan.links.append(link_name)
+            if parent in self._is_junction and parent not in root:
+                plan.modify(parent)[0].append(link_name)
+            if root[name] in self._is_junction and not self._pdd:
+                plan.modify(root[name])[2].append(name)
+
+        for start_node, links, forward, nodes in self._chains:
+            plan.junctions.extend(nodes)
+            plan.links.extend(links[1:])
+            last_link = self._wn.get_link(links[-1])
+            end_node = last_link.end_node_name if forward[-1] else last_link.start_node_name
+            plan.chains[links[0]] = (start_node, end_node, tuple(links), forward[0])
+            if end_node in self._is_junction:
+                # the flow of the last link in terms of the flow of the first link
+                plan.modify(end_node)[1].append((links[-1], links[0], forward[0] == forward[-1]))
+        plan.freeze()
+        return plan
+
+    def _chain_constraint(self, start_node, end_node, links, first_forward):
+        m = self._m
+        f = m.flow[links[0]]
+        # the headloss of each pipe is an odd function of the flow, so the chain is described by
+        # the sums of the resistances in the flow of the first pipe
+        k = m.hw_resistance[links[0]]
+        k_sqrt = m.hw_resistance[links[0]]**0.5
+        minor_k = m.minor_loss[links[0]]
+        for link_name in links[1:]:
+            k = k + m.hw_resistance[link_name]
+            k_sqrt = k_sqrt + m.hw_resistance[link_name]**0.5
+            minor_k = minor_k + m.minor_loss[link_name]
+        expr = -aml.sign(f)*k*aml.abs(f)**m.hw_exp - constants.hw_eps*k_sqrt*f - aml.sign(f)*minor_k*f**m.hw_minor_exp
+        if first_forward:
+            expr = expr + self._head(start_node) - self._head(end_node)
+        else:
+            expr = expr + self._head(end_node) - self._head(start_node)
+        return aml.Constraint(expr)
+
+    def _mass_balance_constraint(self, node_name, dropped, substitutions, extra_demands):
+        m = self._m
+        substitutions = {link_name: (m.flow[first_link] if same_sign else -m.flow[first_link])
+                         for link_name, first_link, same_sign in substitutions}
+        if self._pdd:
+            expr = m.demand[node_name]
+        else:
+            expr = m.expected_demand[node_name]
+        for name in extra_demands:
+            expr += m.expected_demand[name]
+        for link_name in self._wn.get_links_for_node(node_name, flag='INLET'):
+            if link_name not in dropped:
+                expr -= substitutions.get(link_name, m.flow[link_name])
+        for link_name in self._wn.get_links_for_node(node_name, flag='OUTLET'):
+            if link_name not in dropped:
+                expr += substitutions.get(link_name, m.flow[link_name])
+        if self._wn.get_node(node_name).leak_status:
+            expr += m.leak_rate[node_name]
+        return aml.Constraint(expr)
+
+    def _apply(self, plan, restore_all=False):
+        """
+        Change the model from the current plan to the given plan. Only the constraints of the
+        elements whose treatment differs between the plans are rebuilt.
+        """
+        m = self._m
+        old = self._plan
+        mass_balance_name = 'pdd_mass_balance' if self._pdd else 'mass_balance'
+        mass_balance = getattr(m, mass_balance_name)
+        headloss = m.approx_hazen_williams_headloss
+        new_junctions = set(plan.junctions)
+        new_links = set(plan.links)
+
+        # restore the original constraints of the elements that are no longer treated the same way
+        restore_junctions = [name for name in old.junctions if restore_all or name not in new_junctions]
+        restore_nodes = [name for name, mods in old.nodes.items()
+                         if restore_all or plan.nodes.get(name, None) != mods]
+        restore_links = [name for name in old.links if restore_all or name not in new_links]
+        restore_links += [name for name, chain in old.chains.items() if restore_all or plan.chains.get(name, None) != chain]
+        if self._pdd and len(restore_junctions) > 0:
+            constraint.pdd_constraint.build(m, self._wn, self._model_updater, index_over=restore_junctions)
+        mass_balance_def = (constraint.pdd_mass_balance_constraint if self._pdd else
+                            constraint.mass_balance_constraint)
+        if len(restore_junctions) + len(restore_nodes) > 0:
+            mass_balance_def.build(m, self._wn, self._model_updater, index_over=restore_junctions + restore_nodes)
+        if len(restore_links) > 0:
+            constraint.approx_hazen_williams_headloss_constraint.build(m, self._wn, self._model_updater,
+                                                                       index_over=restore_links)
+        for name in restore_nodes:
+            self._installed.pop((mass_balance_name, name), None)
+        for name in restore_links:
+            self._installed.pop(('approx_hazen_williams_headloss', name), None)
+
+        # remove the constraints of the new eliminated elements and install the new replacements
+        old_junctions = set() if restore_all else set(old.junctions)
+        old_links = set() if restore_all else set(old.links)
+        for name in plan.junctions:
+            if name not in old_junctions:
+                del mass_balance[name]
+                if self._pdd:
+                    del m.pdd[name]
+        for name in plan.links:
+            if name not in old_links:
+                del headloss[name]
+        for name, chain in plan.chains.items():
+            if name in restore_links or name not in old.chains:
+                if name in headloss:
+                    del headloss[name]
+                con = self._chain_constraint(*chain)
+                headloss[name] = con
+                self._installed[('approx_hazen_williams_headloss', name)] = con
+        for name, mods in plan.nodes.items():
+            if name in restore_nodes or name not in old.nodes:
+                if name in mass_balance:
+                    del mass_balance[name]
+                con = self._mass_balance_constraint(name, *mods)
+                mass_balance[name] = con
+                self._installed[(mass_balance_name, name)] = con
+
+        self._plan = plan
+        self._eliminated_vars = [m.head[name] for name in plan.junctions]
+        if self._pdd:
+            self._eliminated_vars += [m.demand[name] for name in plan.junctions]
+        self._eliminated_vars += [m.flow[name] for name in plan.links]
+        self.num_eliminated_junctions = len(plan.junctions)
+        self.num_eliminated_links = len(plan.links)
+
+    def _headloss(self, link_name, flow):
+        m = self._m
+        k = m.hw_resistance[link_name].value
+        minor_k = m.minor_loss[link_name].value
+        return (math.copysign(k*abs(flow)**m.hw_exp, flow) + constants.hw_eps*k**0.5*flow +
+                math.copysign(minor_k*flow**m.hw_minor_exp, flow))
+
+    def back_substitute(self):
+        """
+        Compute the heads, flows and demands of the removed elements from the current values of
+        the variables of the model.
+        """
+        m = self._m
+        for start_node, links, forward, nodes in self._chains:
+            q = m.flow[links[0]].value
+            if not forward[0]:
+                q = -q
+            h = self._head(start_node).value
+            for i, link_name in enumerate(links):
+                if i > 0:
+                    m.flow[link_name].value = q if forward[i] else -q
+                h -= self._headloss(link_name, q)
+                if i < len(nodes):
+                    m.head[nodes[i]].value = h
+                    if self._pdd:
+                        m.demand[nodes[i]].value = 0.0
+
+        branch_demand = OrderedDict()
+        for name, link_name, parent, starts_at_parent in self._branches:
+            # the children of a junction are removed before the junction
+            branch_demand[name] = branch_demand.get(name, 0.0) + (0.0 if self._pdd else m.expected_demand[name].value)
+            branch_demand[parent] = branch_demand.get(parent, 0.0) + branch_demand[name]
+        for name, link_name, parent, starts_at_parent in reversed(self._branches):
+            q = branch_demand[name]
+            m.flow[link_name].value = q if starts_at_parent else -q
+            m.head[name].value = self._head(parent).value - self._headloss(link_name, q)
+            if self._pdd:
+                m.demand[name].value = 0.0
+
 
 def store_results_in_network(wn, m):
     """
@@ -1,3 +1,3 @@
 """Elements of the WNTRSimulator model."""
 
-from wntr.sim.models import constants, param, var, constraint
+from wntr.sim.models import constants, param, var, constraint, vectorized
@@ -5,6 +5,10 @@ from wntr.utils.polynomial_interpolation import cubic_spline
 
 logger = logging.getLogger(__name__)
 
+# coefficient of the linear term added to the Hazen-Williams headloss so that its
+# derivative is not zero at zero flow
+hw_eps = 1e-5
+
 
 def hazen_williams_constants(m):
     m.hw_k = 10.666829500036352
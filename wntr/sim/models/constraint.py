@@ -7,6 +7,7 @@ import warnings
 from wntr.utils.polynomial_interpolation import cubic_spline
 from wntr.network import LinkStatus
 from wntr.sim.models.utils import ModelUpdater, Definition
+from wntr.sim.models.constants import hw_eps
 
 logger = logging.getLogger(__name__)
 
@@ -182,7 +183,6 @@ class approx_hazen_williams_headloss_constraint(Definition):
             if status == LinkStatus.Closed or link._is_isolated:
                 con = aml.Constraint(f)
             else:
-                eps = 1e-5  # Need to provide an options for this
                 start_node_name = link.start_node_name
                 end_node_name = link.end_node_name
                 start_node = wn.get_node(start_node_name)
@@ -198,7 +198,7 @@ class approx_hazen_williams_headloss_constraint(Definition):
                 k = m.hw_resistance[link_name]
                 minor_k = m.minor_loss[link_name]
 
-                con = aml.Constraint(expr=-aml.sign(f)*k*aml.abs(f)**m.hw_exp - eps*k**0.5*f - aml.sign(f)*minor_k*f**m.hw_minor_exp + start_h - end_h)
+                con = aml.Constraint(expr=-aml.sign(f)*k*aml.abs(f)**m.hw_exp - hw_eps*k**0.5*f - aml.sign(f)*minor_k*f**m.hw_minor_exp + start_h - end_h)
 
             m.approx_hazen_williams_headloss[link_name] = con
 
@@ -1,6 +1,9 @@
 """Model parameters for the WNTRSimulator."""
 
 import logging
+from collections import OrderedDict
+import numpy as np
+import scipy.sparse as sparse
 from wntr.sim import aml
 from wntr.utils.polynomial_interpolation import cubic_spline
 import math
@@ -56,6 +59,129 @@ def expected_demand_param(m, wn):
             m.expected_demand[node_name].value = node.demand_timeseries_list.at(wn.sim_time+pattern_start, multiplier=demand_multiplier)
 
 
+class ParamSchedule(object):
+    """
+    The expected demands of the junctions and the heads of the reservoirs for a whole simulation.
+
+    The patterns are evaluated once at every pattern timestep between start_time and end_time and
+    combined with the base values of all demand categories into (pattern timestep x element)
+    arrays. :py:meth:`update` then replaces :py:func:`source_head_param` and
+    :py:func:`expected_demand_param`: it takes one row of each array (interpolated within the
+    pattern timestep if pattern_interpolation is True) and only sets the parameters whose value
+    changed.
+
+    Parameters
+    ----------
+    wn: wntr.network.model.WaterNetworkModel
+    start_time: int
+    end_time: int
+    """
+    def __init__(self, wn, start_time, end_time):
+        self._pattern_start = wn.options.time.pattern_start
+        self._pattern_timestep = wn.options.time.pattern_timestep
+        self._interpolation = wn.options.time.pattern_interpolation
+        demand_multiplier = wn.options.hydraulic.demand_multiplier
+
+        self._tank_names = wn.tank_name_list
+        self._junction_names = wn.junction_name_list
+        self._reservoir_names = wn.reservoir_name_list
+        demands = [[(ts.base_value * demand_multiplier, ts.pattern) for ts in node.demand_timeseries_list]
+                   for name, node in wn.junctions()]
+        heads = [[(node.head_timeseries.base_value, node.head_timeseries.pattern)] for name, node in wn.reservoirs()]
+        self._demands = self._tabulate(demands, self._pattern_start, start_time, end_time)
+        self._heads = self._tabulate(heads, 0, start_time, end_time)
+        self._demand_values = np.full(len(self._junction_names), np.nan)
+        self._head_values = np.full(len(self._reservoir_names), np.nan)
+        self._model = None
+
+    def _tabulate(self, series, offset, start_time, end_time):
+        """
+        Returns the first pattern step, the values at the start of every pattern step, and the
+        slopes within every pattern step (None without interpolation).
+        """
+        pattern_timestep = self._pattern_timestep
+        first_step = int((start_time + offset) // pattern_timestep)
+        last_step = int((end_time + offset) // pattern_timestep) + 1
+        times = [step * pattern_timestep for step in range(first_step, last_step + 1)]
+
+        patterns = OrderedDict()
+        rows = list()
+        cols = list()
+        vals = list()
+        for j, ts_list in enumerate(series):
+            for base, pattern in ts_list:
+                if not pattern:
+                    pattern = None
+                if id(pattern) not in patterns:
+                    patterns[id(pattern)] = (len(patterns), pattern)
+                rows.append(patterns[id(pattern)][0])
+                cols.append(j)
+                vals.append(base)
+        base = sparse.csr_matrix((vals, (rows, cols)), shape=(len(patterns), len(series)))
+
+        multipliers = np.ones((len(times), len(patterns)))
+        mid_multipliers = np.ones((len(times), len(patterns)))
+        for i, pattern in patterns.values():
+            if pattern is None:
+                continue
+            multipliers[:, i] = [pattern.at(t) for t in times]
+            if self._interpolation:
+                # patterns are linear within a pattern step (or constant if they do not wrap)
+                mid_multipliers[:, i] = [pattern.at(t + 0.5 * pattern_timestep) for t in times]
+        values = np.ascontiguousarray(base.T.dot(multipliers.T).T)
+        if self._interpolation:
+            mid_values = base.T.dot(mid_multipliers.T).T
+            slopes = np.ascontiguousarray(2.0 * (mid_values - values) / pattern_timestep)
+        else:
+            slopes = None
+        return first_step, values, slopes
+
+    def _at(self, table, time):
+        first_step, values, slopes = table
+        step = int(time // self._pattern_timestep)
+        if step < first_step or step - first_step >= values.shape[0]:
+            return None
+        row = values[step - first_step]
+        if slopes is not None:
+            row = row + slopes[step - first_step] * (time - step * self._pattern_timestep)
+        return row
+
+    def update(self, m, wn):
+        """
+        Set the source_head and expected_demand parameters of the model for the current
+        simulation time. Outside of the tabulated times, the patterns are evaluated directly.
+
+        Parameters
+        ----------
+        m: wntr.sim.aml.aml.Model
+        wn: wntr.network.model.WaterNetworkModel
+        """
+        demands = self._at(self._demands, wn.sim_time + self._pattern_start)
+        heads = self._at(self._heads, wn.sim_time)
+        if demands is None or heads is None or not hasattr(m, 'expected_demand'):
+            source_head_param(m, wn)
+            expected_demand_param(m, wn)
+            self._demand_values[:] = np.nan
+            self._head_values[:] = np.nan
+            return
+
+        if m is not self._model:
+            self._model = m
+            self._demand_params = [m.expected_demand[name] for name in self._junction_names]
+            self._head_params = [m.source_head[name] for name in self._reservoir_names]
+            self._demand_values[:] = np.nan
+            self._head_values[:] = np.nan
+
+        for name in self._tank_names:
+            m.source_head[name].value = wn.get_node(name).head
+        for i in np.flatnonzero(heads != self._head_values).tolist():
+            self._head_params[i].value = heads[i]
+        self._head_values[:] = heads
+        for i in np.flatnonzero(demands != self._demand_values).tolist():
+            self._demand_params[i].value = demands[i]
+        self._demand_values[:] = demands
+
+
 class pmin_param(Definition):
     @classmethod
     def build(cls, m, wn, updater, index_over=None):
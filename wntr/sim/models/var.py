@@ -6,6 +6,31 @@ from wntr.sim import aml
 logger = logging.getLogger(__name__)
 
 
+def initial_value(wn, var_name, name):
+    """
+    The value a variable is initialized to when the model is built
+
+    Parameters
+    ----------
+    wn: wntr.network.model.WaterNetworkModel
+    var_name: str
+        name of the VarDict ('demand', 'flow', 'head' or 'leak_rate')
+    name: str
+        name of the node or link of the variable
+    """
+    if var_name == 'demand':
+        node = wn.get_node(name)
+        return node.demand_timeseries_list.at(wn.sim_time + wn.options.time.pattern_start,
+                                              multiplier=wn.options.hydraulic.demand_multiplier)
+    elif var_name == 'flow':
+        return 0.001
+    elif var_name == 'head':
+        return wn.get_node(name).elevation
+    elif var_name == 'leak_rate':
+        return 0
+    raise ValueError('Unrecognized variable: ' + str(var_name))
+
+
 def demand_var(m, wn, index_over=None):
     """
     Add a demand variable to the model
@@ -23,12 +48,8 @@ def demand_var(m, wn, index_over=None):
     if index_over is None:
         index_over = wn.junction_name_list
 
-    demand_multiplier = wn.options.hydraulic.demand_multiplier
-    pattern_start = wn.options.time.pattern_start
-    
     for node_name in index_over:
-        node = wn.get_node(node_name)
-        m.demand[node_name] = aml.Var(node.demand_timeseries_list.at(wn.sim_time+pattern_start, multiplier=demand_multiplier))
+        m.demand[node_name] = aml.Var(initial_value(wn, 'demand', node_name))
 
 
 def flow_var(m, wn, index_over=None):
@@ -49,8 +70,7 @@ def flow_var(m, wn, index_over=None):
         index_over = wn.link_name_list
 
     for link_name in index_over:
-        link = wn.get_link(link_name)
-        m.flow[link_name] = aml.Var(0.001)
+        m.flow[link_name] = aml.Var(initial_value(wn, 'flow', link_name))
 
 
 def head_var(m, wn, index_over=None):
@@ -71,8 +91,7 @@ def head_var(m, wn, index_over=None):
         index_over = wn.junction_name_list
 
     for node_name in index_over:
-        node = wn.get_node(node_name)
-        m.head[node_name] = aml.Var(node.elevation)
+        m.head[node_name] = aml.Var(initial_value(wn, 'head', node_name))
 
 
 def leak_rate_var(m, wn, index_over=None):
@@ -93,6 +112,6 @@ def leak_rate_var(m, wn, index_over=None):
         index_over = wn.junction_name_list + wn.tank_name_list
 
     for node_name in index_over:
-        m.leak_rate[node_name] = aml.Var(0)
+        m.leak_rate[node_name] = aml.Var(initial_value(wn, 'leak_rate', node_name))
 
 
@@ -0,0 +1,721 @@
+"""Vectorized evaluation of the WNTRSimulator hydraulic model.
+
+The constraints built by :py:mod:`wntr.sim.models.constraint` are grouped into
+families (mass balance, headloss for each link type, pressure dependent demand,
+and leaks). Each family is evaluated with array operations over index arrays
+instead of interpreting each constraint with the RPN evaluator of
+:py:mod:`wntr.sim.aml`.
+"""
+
+import logging
+import numpy as np
+import scipy.sparse as sp
+import wntr.network
+from wntr.network import LinkStatus
+from wntr.sim.aml import new_structure_version
+from wntr.sim.models.constants import hw_eps
+from wntr.sim.models.constraint import get_pump_poly_coefficients, get_pump_line_params
+
+logger = logging.getLogger(__name__)
+
+_g = 9.81
+
+
+def _param_values(params):
+    # Param._value is kept in sync with the evaluator by the Param.value setter
+    return np.fromiter((p._value for p in params), dtype=float, count=len(params))
+
+
+class _HeadRefs(object):
+    """
+    The heads at one end of a set of links. Heads of junctions are variables; heads of tanks and
+    reservoirs are the source_head parameters.
+    """
+    def __init__(self, cols, params):
+        self.cols = np.array(cols, dtype=np.int64)
+        self.mask = self.cols >= 0
+        self.var_cols = self.cols[self.mask]
+        self.params = params
+        self.param_mask = ~self.mask
+        self.values = np.zeros(len(cols))
+
+    def update_params(self):
+        self.values[self.param_mask] = _param_values([p for p in self.params if p is not None])
+
+    def evaluate(self, x):
+        h = self.values.copy()
+        h[self.mask] = x[self.var_cols]
+        return h
+
+
+class _Family(object):
+    """
+    Base class for a group of constraints with the same functional form.
+
+    Attributes
+    ----------
+    rows: np.ndarray
+        The rows of the constraints in the residual vector
+    jac_rows: np.ndarray
+    jac_cols: np.ndarray
+        The sparsity pattern of the jacobian entries of the family; jacobian_data returns the values
+        in the same order
+    """
+    rows = None
+    jac_rows = None
+    jac_cols = None
+
+    def finalize(self, n_vars):
+        pass
+
+    def update_params(self):
+        pass
+
+    def evaluate(self, x, r):
+        raise NotImplementedError('evaluate must be implemented by the derived class')
+
+    def jacobian_data(self, x):
+        raise NotImplementedError('jacobian_data must be implemented by the derived class')
+
+
+class _LinearFamily(_Family):
+    """
+    Constraints that are linear in the variables with constant terms given by parameters
+    (mass balances, closed links, and active valves).
+    """
+    def __init__(self):
+        self._rows = list()
+        self._term_rows = list()
+        self._term_cols = list()
+        self._term_coefs = list()
+        self._const_rows = list()
+        self._const_params = list()
+        self._const_signs = list()
+
+    def add(self, row, terms, consts):
+        local_row = len(self._rows)
+        self._rows.append(row)
+        for col, coef in terms:
+            self._term_rows.append(local_row)
+            self._term_cols.append(col)
+            self._term_coefs.append(coef)
+        for param, sign in consts:
+            self._const_rows.append(local_row)
+            self._const_params.append(param)
+            self._const_signs.append(sign)
+
+    def finalize(self, n_vars):
+        n = len(self._rows)
+        self.rows = np.array(self._rows, dtype=np.int64)
+        self.jac_rows = self.rows[np.array(self._term_rows, dtype=np.int64)]
+        self.jac_cols = np.array(self._term_cols, dtype=np.int64)
+        self._coefs = np.array(self._term_coefs, dtype=float)
+        self._matrix = sp.csr_matrix((self._coefs, (np.array(self._term_rows, dtype=np.int64), self.jac_cols)),
+                                     shape=(n, n_vars))
+        self._const_local_rows = np.array(self._const_rows, dtype=np.int64)
+        self._const_sign_array = np.array(self._const_signs, dtype=float)
+        self._n = n
+        self._const = np.zeros(n)
+
+    def update_params(self):
+        values = _param_values(self._const_params) * self._const_sign_array
+        self._const = np.bincount(self._const_local_rows, weights=values, minlength=self._n)
+
+    def evaluate(self, x, r):
+        r[self.rows] = self._matrix.dot(x) + self._const
+
+    def jacobian_data(self, x):
+        return self._coefs
+
+
+class _LinkFamily(_Family):
+    """
+    Base class for link constraints of the form g(f) + c_s*h_start + c_e*h_end.
+    """
+    def __init__(self):
+        self._rows = list()
+        self._flow_cols = list()
+        self._start_cols = list()
+        self._start_params = list()
+        self._end_cols = list()
+        self._end_params = list()
+
+    def add_link(self, row, flow_col, start, end):
+        self._rows.append(row)
+        self._flow_cols.append(flow_col)
+        self._start_cols.append(start[0])
+        self._start_params.append(start[1])
+        self._end_cols.append(end[0])
+        self._end_params.append(end[1])
+
+    def finalize(self, n_vars):
+        self.rows = np.array(self._rows, dtype=np.int64)
+        self._f = np.array(self._flow_cols, dtype=np.int64)
+        self._start = _HeadRefs(self._start_cols, self._start_params)
+        self._end = _HeadRefs(self._end_cols, self._end_params)
+        self.jac_rows = np.concatenate([self.rows, self.rows[self._start.mask], self.rows[self._end.mask]])
+        self.jac_cols = np.concatenate([self._f, self._start.var_cols, self._end.var_cols])
+
+    def update_params(self):
+        self._start.update_params()
+        self._end.update_params()
+
+
+class _HazenWilliamsFamily(_LinkFamily):
+    """approx_hazen_williams_headloss_constraint for open pipes"""
+    def __init__(self, m):
+        super(_HazenWilliamsFamily, self).__init__()
+        self._m = m
+        self._k_params = list()
+        self._minor_params = list()
+
+    def add(self, row, flow_col, start, end, k, minor_k):
+        self.add_link(row, flow_col, start, end)
+        self._k_params.append(k)
+        self._minor_params.append(minor_k)
+
+    def update_params(self):
+        super(_HazenWilliamsFamily, self).update_params()
+        self._k = _param_values(self._k_params)
+        self._minor_k = _param_values(self._minor_params)
+        self._eps_k = hw_eps * self._k ** 0.5
+        self._exp = self._m.hw_exp
+        self._minor_exp = self._m.hw_minor_exp
+
+    def evaluate(self, x, r):
+        f = x[self._f]
+        s = np.where(f >= 0, 1.0, -1.0)
+        r[self.rows] = (-s * self._k * np.abs(f) ** self._exp - self._eps_k * f
+                        - s * self._minor_k * f ** self._minor_exp
+                        + self._start.evaluate(x) - self._end.evaluate(x))
+
+    def jacobian_data(self, x):
+        f = x[self._f]
+        s = np.where(f >= 0, 1.0, -1.0)
+        df = (-self._k * self._exp * np.abs(f) ** (self._exp - 1) - self._eps_k
+              - s * self._minor_k * self._minor_exp * f ** (self._minor_exp - 1))
+        return np.concatenate([df, np.ones(self._start.mask.sum()), -np.ones(self._end.mask.sum())])
+
+
+class _HeadPumpFamily(_LinkFamily):
+    """head_pump_headloss_constraint for open head pumps"""
+    def __init__(self, m):
+        super(_HeadPumpFamily, self).__init__()
+        self._m = m
+        self._coeffs = list()
+
+    def add(self, row, flow_col, start, end, A, B, C):
+        self.add_link(row, flow_col, start, end)
+        m = self._m
+        if C <= 1:
+            a, b, c, d = get_pump_poly_coefficients(A, B, C, m)
+            self._coeffs.append((A, B, C, m.pump_q1, m.pump_q2, A, a, b, c, d))
+        else:
+            q_bar, h_bar = get_pump_line_params(A, B, C, m)
+            self._coeffs.append((A, B, C, q_bar, q_bar, h_bar - m.pump_slope * q_bar, 0.0, 0.0, 0.0, 0.0))
+
+    def finalize(self, n_vars):
+        super(_HeadPumpFamily, self).finalize(n_vars)
+        coeffs = np.array(self._coeffs, dtype=float).reshape((len(self._coeffs), 10))
+        (self._A, self._B, self._C, self._t1, self._t2, self._offset,
+         self._a, self._b, self._c, self._d) = coeffs.T
+        self._slope = self._m.pump_slope
+
+    def _regions(self, f):
+        m1 = f <= self._t1
+        m2 = ~m1 & (f <= self._t2)
+        m3 = ~(m1 | m2)
+        return m1, m2, m3
+
+    def evaluate(self, x, r):
+        f = x[self._f]
+        m1, m2, m3 = self._regions(f)
+        g = np.empty(len(f))
+        g[m1] = self._slope * f[m1] + self._offset[m1]
+        f2 = f[m2]
+        g[m2] = self._a[m2] * f2 ** 3 + self._b[m2] * f2 ** 2 + self._c[m2] * f2 + self._d[m2]
+        g[m3] = self._A[m3] - self._B[m3] * f[m3] ** self._C[m3]
+        r[self.rows] = g - self._end.evaluate(x) + self._start.evaluate(x)
+
+    def jacobian_data(self, x):
+        f = x[self._f]
+        m1, m2, m3 = self._regions(f)
+        df = np.empty(len(f))
+        df[m1] = self._slope
+        f2 = f[m2]
+        df[m2] = 3 * self._a[m2] * f2 ** 2 + 2 * self._b[m2] * f2 + self._c[m2]
+        df[m3] = -self._B[m3] * self._C[m3] * f[m3] ** (self._C[m3] - 1)
+        return np.concatenate([df, np.ones(self._start.mask.sum()), -np.ones(self._end.mask.sum())])
+
+
+class _PowerPumpFamily(_LinkFamily):
+    """power_pump_headloss_constraint for open power pumps"""
+    def __init__(self):
+        super(_PowerPumpFamily, self).__init__()
+        self._power_params = list()
+
+    def add(self, row, flow_col, start, end, power):
+        self.add_link(row, flow_col, start, end)
+        self._power_params.append(power)
+
+    def update_params(self):
+        super(_PowerPumpFamily, self).update_params()
+        self._power = _param_values(self._power_params)
+
+    def evaluate(self, x, r):
+        f = x[self._f]
+        r[self.rows] = self._power + (self._start.evaluate(x) - self._end.evaluate(x)) * f * (_g * 1000.0)
+
+    def jacobian_data(self, x):
+        f = x[self._f]
+        dh = self._start.evaluate(x) - self._end.evaluate(x)
+        return np.concatenate([dh * (_g * 1000.0), f[self._start.mask] * (_g * 1000.0),
+                               -f[self._end.mask] * (_g * 1000.0)])
+
+
+class _ValveHeadlossFamily(_LinkFamily):
+    """
+    Open PRVs and PSVs (K*f**2 - h_start + h_end) and open/active FCVs and TCVs
+    (sign(f)*K*f**2 - h_start + h_end, with sign(0) = -1).
+    """
+    def __init__(self):
+        super(_ValveHeadlossFamily, self).__init__()
+        self._k_params = list()
+        self._signed = list()
+
+    def add(self, row, flow_col, start, end, k, signed):
+        self.add_link(row, flow_col, start, end)
+        self._k_params.append(k)
+        self._signed.append(signed)
+
+    def finalize(self, n_vars):
+        super(_ValveHeadlossFamily, self).finalize(n_vars)
+        self._signed_array = np.array(self._signed, dtype=bool)
+
+    def update_params(self):
+        super(_ValveHeadlossFamily, self).update_params()
+        self._k = _param_values(self._k_params)
+
+    def _sign(self, f):
+        return np.where(self._signed_array & (f <= 0), -1.0, 1.0)
+
+    def evaluate(self, x, r):
+        f = x[self._f]
+        r[self.rows] = self._sign(f) * self._k * f ** 2 - self._start.evaluate(x) + self._end.evaluate(x)
+
+    def jacobian_data(self, x):
+        f = x[self._f]
+        return np.concatenate([2 * self._sign(f) * self._k * f, -np.ones(self._start.mask.sum()),
+                               np.ones(self._end.mask.sum())])
+
+
+class _PDDFamily(_Family):
+    """pdd_constraint for junctions that are not isolated"""
+    _param_names = ('expected_demand', 'pmin', 'pnom', 'elevation', 'pdd_poly1_coeffs_a', 'pdd_poly1_coeffs_b',
+                    'pdd_poly1_coeffs_c', 'pdd_poly1_coeffs_d', 'pdd_poly2_coeffs_a', 'pdd_poly2_coeffs_b',
+                    'pdd_poly2_coeffs_c', 'pdd_poly2_coeffs_d')
+
+    def __init__(self, m):
+        self._m = m
+        self._rows = list()
+        self._h = list()
+        self._d = list()
+        self._params = list()
+        self._exponents = list()
+
+    def add(self, row, head_col, demand_col, node_name, pressure_exponent):
+        self._rows.append(row)
+        self._h.append(head_col)
+        self._d.append(demand_col)
+        self._params.append([getattr(self._m, name)[node_name] for name in self._param_names])
+        self._exponents.append(pressure_exponent)
+
+    def finalize(self, n_vars):
+        self.rows = np.array(self._rows, dtype=np.int64)
+        self._h_cols = np.array(self._h, dtype=np.int64)
+        self._d_cols = np.array(self._d, dtype=np.int64)
+        self._pe = np.array(self._exponents, dtype=float)
+        self._flat_params = [p for params in self._params for p in params]
+        self.jac_rows = np.concatenate([self.rows, self.rows])
+        self.jac_cols = np.concatenate([self._h_cols, self._d_cols])
+
+    def update_params(self):
+        values = _param_values(self._flat_params).reshape((len(self._rows), len(self._param_names)))
+        (self._de, self._pmin, self._pnom, self._elev, self._a1, self._b1, self._c1, self._d1,
+         self._a2, self._b2, self._c2, self._d2) = values.T
+        self._delta = self._m.pdd_smoothing_delta
+        self._slope = self._m.pdd_slope
+
+    def _regions(self, p):
+        m1 = p - self._pmin <= 0
+        m2 = ~m1 & (p - self._pmin - self._delta <= 0)
+        m3 = ~(m1 | m2) & (p - self._pnom + self._delta <= 0)
+        m4 = ~(m1 | m2 | m3) & (p - self._pnom <= 0)
+        m5 = ~(m1 | m2 | m3 | m4)
+        return m1, m2, m3, m4, m5
+
+    def _fraction(self, p):
+        """The fraction of the expected demand that is delivered and its derivative with respect to head"""
+        m1, m2, m3, m4, m5 = self._regions(p)
+        frac = np.empty(len(p))
+        dfrac = np.empty(len(p))
+        frac[m1] = self._slope * (p[m1] - self._pmin[m1])
+        dfrac[m1] = self._slope
+        for mask, a, b, c, d in ((m2, self._a1, self._b1, self._c1, self._d1),
+                                 (m4, self._a2, self._b2, self._c2, self._d2)):
+            _p = p[mask]
+            frac[mask] = a[mask] * _p ** 3 + b[mask] * _p ** 2 + c[mask] * _p + d[mask]
+            dfrac[mask] = 3 * a[mask] * _p ** 2 + 2 * b[mask] * _p + c[mask]
+        span = self._pnom[m3] - self._pmin[m3]
+        ratio = (p[m3] - self._pmin[m3]) / span
+        frac[m3] = ratio ** self._pe[m3]
+        dfrac[m3] = self._pe[m3] * ratio ** (self._pe[m3] - 1) / span
+        frac[m5] = self._slope * (p[m5] - self._pnom[m5]) + 1.0
+        dfrac[m5] = self._slope
+        return frac, dfrac
+
+    def evaluate(self, x, r):
+        frac, dfrac = self._fraction(x[self._h_cols] - self._elev)
+        r[self.rows] = x[self._d_cols] - self._de * frac
+
+    def jacobian_data(self, x):
+        frac, dfrac = self._fraction(x[self._h_cols] - self._elev)
+        return np.concatenate([-self._de * dfrac, np.ones(len(self.rows))])
+
+
+class _LeakFamily(_Family):
+    """leak_constraint for leaking nodes that are not isolated"""
+    _param_names = ('elevation', 'leak_poly_coeffs_a', 'leak_poly_coeffs_b', 'leak_poly_coeffs_c',
+                    'leak_poly_coeffs_d', 'leak_area', 'leak_coeff')
+
+    def __init__(self, m):
+        self._m = m
+        self._rows = list()
+        self._h = list()
+        self._q = list()
+        self._params = list()
+
+    def add(self, row, head_col, leak_col, node_name):
+        self._rows.append(row)
+        self._h.append(head_col)
+        self._q.append(leak_col)
+        self._params.append([getattr(self._m, name)[node_name] for name in self._param_names])
+
+    def finalize(self, n_vars):
+        self.rows = np.array(self._rows, dtype=np.int64)
+        self._h_cols = np.array(self._h, dtype=np.int64)
+        self._q_cols = np.array(self._q, dtype=np.int64)
+        self._flat_params = [p for params in self._params for p in params]
+        self.jac_rows = np.concatenate([self.rows, self.rows])
+        self.jac_cols = np.concatenate([self._h_cols, self._q_cols])
+
+    def update_params(self):
+        values = _param_values(self._flat_params).reshape((len(self._rows), len(self._param_names)))
+        self._elev, self._a, self._b, self._c, self._d, self._area, self._cd = values.T
+        self._delta = self._m.leak_delta
+        self._slope = self._m.leak_slope
+
+    def _rate(self, h):
+        p = h - self._elev
+        m1 = h <= self._elev
+        m2 = ~m1 & (p <= self._delta)
+        m3 = ~(m1 | m2)
+        rate = np.empty(len(p))
+        drate = np.empty(len(p))
+        rate[m1] = self._slope * p[m1]
+        drate[m1] = self._slope
+        _p = p[m2]
+        rate[m2] = self._a[m2] * _p ** 3 + self._b[m2] * _p ** 2 + self._c[m2] * _p + self._d[m2]
+        drate[m2] = 3 * self._a[m2] * _p ** 2 + 2 * self._b[m2] * _p + self._c[m2]
+        k = self._cd[m3] * self._area[m3]
+        root = (2.0 * _g * p[m3]) ** 0.5
+        rate[m3] = k * root
+        drate[m3] = k * _g / root
+        return rate, drate
+
+    def evaluate(self, x, r):
+        rate, drate = self._rate(x[self._h_cols])
+        r[self.rows] = x[self._q_cols] - rate
+
+    def jacobian_data(self, x):
+        rate, drate = self._rate(x[self._h_cols])
+        return np.concatenate([-drate, np.ones(len(self.rows))])
+
+
+class VectorizedHydraulicModel(object):
+    """
+    A vectorized evaluator for the hydraulic model built by
+    :py:func:`~wntr.sim.hydraulics.create_hydraulic_model`.
+
+    This class provides the same interface as :py:class:`~wntr.sim.aml.aml.Model` for
+    solvers (set_structure, structure_version, get_x, load_var_values_from_x,
+    evaluate_residuals, and evaluate_jacobian). The variables and constraints are ordered
+    by family rather than in the order used by the aml evaluator. The constraints are
+    determined from the constraint dictionaries of the model and the status of the
+    network elements, so set_structure must be called after the model is updated.
+    The values of the parameters are read when set_structure is called.
+
+    Values loaded with load_var_values_from_x (or passed to evaluate_residuals and
+    evaluate_jacobian) are only written to the variables of the aml model by
+    store_var_values.
+
+    The piecewise Hazen-Williams approximation is not supported.
+
+    Parameters
+    ----------
+    m: wntr.sim.aml.aml.Model
+        The hydraulic model
+    wn: wntr.network.model.WaterNetworkModel
+        The water network model used to build m
+    """
+    def __init__(self, m, wn):
+        self._m = m
+        self._wn = wn
+        self._vars = list()
+        self._var_ndx = dict()
+        self._constraints = list()
+        self._con_ndx = dict()
+        self._families = list()
+        self._x = np.zeros(0)
+        self._n_cons = 0
+        self._structure_version = None
+        self._model_structure_version = None
+        if hasattr(m, 'piecewise_hazen_williams_headloss'):
+            raise NotImplementedError('The vectorized evaluator does not support the piecewise Hazen-Williams '
+                                      'headloss approximation.')
+
+    @property
+    def structure_version(self):
+        """
+        An integer identifying the ordering of the variables and constraints; see
+        :py:attr:`Model.structure_version <wntr.sim.aml.aml.Model.structure_version>`.
+        """
+        return self._structure_version
+
+    def set_structure(self):
+        """
+        Rebuild the index arrays if the structure of the aml model changed and read the current
+        values of the parameters.
+        """
+        self._m.set_structure()
+        if self._structure_version is None or self._m.structure_version != self._model_structure_version:
+            self._build()
+            self._model_structure_version = self._m.structure_version
+            self._structure_version = new_structure_version()
+        for family in self._families:
+            family.update_params()
+
+    def get_x(self):
+        """
+        Get the current values of the variables of the aml model.
+
+        Returns
+        -------
+        x: np.ndarray
+        """
+        self._x = np.fromiter((v.value for v in self._vars), dtype=float, count=len(self._vars))
+        return self._x.copy()
+
+    def load_var_values_from_x(self, x):
+        """
+        Parameters
+        ----------
+        x: np.ndarray
+        """
+        self._x = np.array(x, dtype=float)
+
+    def store_var_values(self):
+        """
+        Write the values of the variables to the aml model.
+        """
+        for v, val in zip(self._vars, self._x.tolist()):
+            v.value = val
+
+    def evaluate_residuals(self, x=None):
+        """
+        Parameters
+        ----------
+        x: np.ndarray, optional
+
+        Returns
+        -------
+        r: np.ndarray
+        """
+        if x is not None:
+            self.load_var_values_from_x(x)
+        r = np.empty(self._n_cons)
+        for family in self._families:
+            family.evaluate(self._x, r)
+        return r
+
+    def evaluate_jacobian(self, x=None):
+        """
+        Parameters
+        ----------
+        x: np.ndarray, optional
+
+        Returns
+        -------
+        J: scipy.sparse.csr_matrix
+        """
+        if len(self._vars) != self._n_cons:
+            raise ValueError('The number of constraints and variables must be equal.')
+        if x is not None:
+            self.load_var_values_from_x(x)
+        data = np.concatenate([family.jacobian_data(self._x) for family in self._families])[self._jac_order]
+        if self._jac_starts is not None:
+            data = np.add.reduceat(data, self._jac_starts)
+        return sp.csr_matrix((data, self._jac_indices, self._jac_indptr), shape=(self._n_cons, len(self._vars)))
+
+    def get_var_index(self, var):
+        """
+        Get the column of a variable of the aml model, or None if it is not in the model.
+        """
+        return self._var_ndx.get(var, None)
+
+    def get_con_index(self, con):
+        """
+        Get the row of a constraint of the aml model, or None if it is not in the model.
+        """
+        return self._con_ndx.get(con, None)
+
+    def _col(self, var):
+        ndx = self._var_ndx.get(var, None)
+        if ndx is None:
+            ndx = len(self._vars)
+            self._var_ndx[var] = ndx
+            self._vars.append(var)
+        return ndx
+
+    def _head(self, node_name):
+        if isinstance(self._wn.get_node(node_name), wntr.network.Junction):
+            return self._col(self._m.head[node_name]), None
+        return -1, self._m.source_head[node_name]
+
+    def _build(self):
+        m = self._m
+        wn = self._wn
+        self._vars = list()
+        self._var_ndx = dict()
+        self._constraints = list()
+        linear = _LinearFamily()
+        hw = _HazenWilliamsFamily(m)
+        head_pumps = _HeadPumpFamily(m)
+        power_pumps = _PowerPumpFamily()
+        valves = _ValveHeadlossFamily()
+        pdd = _PDDFamily(m)
+        leaks = _LeakFamily(m)
+        row = 0
+
+        pdd_mode = hasattr(m, 'pdd_mass_balance')
+        mass_balance = m.pdd_mass_balance if pdd_mode else m.mass_balance
+        for node_name in mass_balance.keys():
+            node = wn.get_node(node_name)
+            terms = list()
+            if pdd_mode:
+                terms.append((self._col(m.demand[node_name]), 1.0))
+                consts = list()
+            else:
+                consts = [(m.expected_demand[node_name], 1.0)]
+            for link_name in wn.get_links_for_node(node_name, flag='INLET'):
+                terms.append((self._col(m.flow[link_name]), -1.0))
+            for link_name in wn.get_links_for_node(node_name, flag='OUTLET'):
+                terms.append((self._col(m.flow[link_name]), 1.0))
+            if node.leak_status:
+                terms.append((self._col(m.leak_rate[node_name]), 1.0))
+            linear.add(row, terms, consts)
+            self._constraints.append(mass_balance[node_name])
+            row += 1
+
+        if pdd_mode:
+            for node_name in m.pdd.keys():
+                node = wn.get_node(node_name)
+                if node.pressure_exponent is None:
+                    pressure_exponent = wn.options.hydraulic.pressure_exponent
+                else:
+                    pressure_exponent = node.pressure_exponent
+                pdd.add(row, self._col(m.head[node_name]), self._col(m.demand[node_name]), node_name,
+                        pressure_exponent)
+                self._constraints.append(m.pdd[node_name])
+                row += 1
+
+        for con_name, link_names in (('approx_hazen_williams_headloss', wn.pipe_name_list),
+                                     ('head_pump_headloss', wn.head_pump_name_list),
+                                     ('power_pump_headloss', wn.power_pump_name_list),
+                                     ('prv_headloss', wn.prv_name_list),
+                                     ('psv_headloss', wn.psv_name_list),
+                                     ('tcv_headloss', wn.tcv_name_list),
+                                     ('fcv_headloss', wn.fcv_name_list)):
+            con_dict = getattr(m, con_name)
+            for link_name in link_names:
+                if link_name not in con_dict:
+                    continue
+                link = wn.get_link(link_name)
+                status = link.status
+                f = self._col(m.flow[link_name])
+                self._constraints.append(con_dict[link_name])
+                if status == LinkStatus.Closed or link._is_isolated:
+                    linear.add(row, [(f, 1.0)], [])
+                    row += 1
+                    continue
+                start = self._head(link.start_node_name)
+                end = self._head(link.end_node_name)
+                if con_name == 'approx_hazen_williams_headloss':
+                    hw.add(row, f, start, end, m.hw_resistance[link_name], m.minor_loss[link_name])
+                elif con_name == 'head_pump_headloss':
+                    A, B, C = link.get_head_curve_coefficients()
+                    head_pumps.add(row, f, start, end, A, B, C)
+                elif con_name == 'power_pump_headloss':
+                    power_pumps.add(row, f, start, end, m.pump_power[link_name])
+                elif con_name in {'prv_headloss', 'psv_headloss'}:
+                    if status is LinkStatus.Active:
+                        node_name, (col, source_head) = ((link.end_node_name, end) if con_name == 'prv_headloss'
+                                                         else (link.start_node_name, start))
+                        consts = [(m.valve_setting[link_name], -1.0), (m.elevation[node_name], -1.0)]
+                        if col < 0:
+                            linear.add(row, [], consts + [(source_head, 1.0)])
+                        else:
+                            linear.add(row, [(col, 1.0)], consts)
+                    else:
+                        valves.add(row, f, start, end, m.minor_loss[link_name], False)
+                elif con_name == 'fcv_headloss' and status == LinkStatus.Active:
+                    linear.add(row, [(f, 1.0)], [(m.valve_setting[link_name], -1.0)])
+                elif con_name == 'tcv_headloss' and status == LinkStatus.Active:
+                    valves.add(row, f, start, end, m.tcv_resistance[link_name], True)
+                else:
+                    valves.add(row, f, start, end, m.minor_loss[link_name], True)
+                row += 1
+
+        for node_name in m.leak_con.keys():
+            leaks.add(row, self._col(m.head[node_name]), self._col(m.leak_rate[node_name]), node_name)
+            self._constraints.append(m.leak_con[node_name])
+            row += 1
+
+        self._n_cons = row
+        self._con_ndx = {con: i for i, con in enumerate(self._constraints)}
+        n_vars = len(self._vars)
+        self._families = [family for family in (linear, pdd, hw, head_pumps, power_pumps, valves, leaks)
+                          if len(family._rows) > 0]
+        for family in self._families:
+            family.finalize(n_vars)
+
+        if len(self._families) == 0:
+            rows = np.zeros(0, dtype=np.int64)
+            cols = np.zeros(0, dtype=np.int64)
+        else:
+            rows = np.concatenate([family.jac_rows for family in self._families])
+            cols = np.concatenate([family.jac_cols for family in self._families])
+        self._jac_order = np.lexsort((cols, rows))
+        keys = rows[self._jac_order] * max(n_vars, 1) + cols[self._jac_order]
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        if first.all():
+            self._jac_starts = None
+        else:
+            self._jac_starts = np.nonzero(first)[0]
+        self._jac_indices = cols[self._jac_order][first]
+        self._jac_indptr = np.concatenate([[0], np.cumsum(np.bincount(rows[self._jac_order][first],
+                                                                       minlength=row))])
+        self._x = np.zeros(n_vars)
+        logger.debug('built vectorized hydraulic model with {0} variables and {1} jacobian entries'.format(
+            n_vars, len(self._jac_indices)))
@@ -0,0 +1,118 @@
+"""
+Detection of junctions and links isolated from all tanks and reservoirs using array-based
+connected component labelling.
+"""
+import numpy as np
+import scipy.sparse
+from scipy.sparse.csgraph import connected_components
+
+from wntr.network.base import LinkStatus
+
+
+class NetworkConnectivity(object):
+    """
+    Incremental detection of isolated junctions and links.
+
+    The open/closed state of every link is kept in an array. The connected components of the
+    open links are only relabelled when a link status changes from closed to open or vice
+    versa, so time steps without such changes do not traverse the network. A junction is
+    isolated if its component contains no tank or reservoir; a link is isolated if either of
+    its end nodes is isolated.
+
+    Nodes are ordered junctions, tanks, reservoirs and links are ordered pipes, head pumps,
+    power pumps, valves, the same ordering used by :py:class:`wntr.sim.hydraulics.ResultsIndex`.
+
+    Parameters
+    ----------
+    wn: wntr.network.model.WaterNetworkModel
+    """
+    def __init__(self, wn):
+        self.node_names = wn.junction_name_list + wn.tank_name_list + wn.reservoir_name_list
+        self.link_names = wn.pipe_name_list + wn.head_pump_name_list + wn.power_pump_name_list + wn.valve_name_list
+        self.nodes = [wn.get_node(name) for name in self.node_names]
+        self.links = [wn.get_link(name) for name in self.link_names]
+        self._link_ndx = {name: i for i, name in enumerate(self.link_names)}
+        self._num_junctions = wn.num_junctions
+
+        node_ndx = {name: i for i, name in enumerate(self.node_names)}
+        num_links = len(self.links)
+        self._start = np.fromiter((node_ndx[link.start_node_name] for link in self.links), dtype=int, count=num_links)
+        self._end = np.fromiter((node_ndx[link.end_node_name] for link in self.links), dtype=int, count=num_links)
+        self._open = np.fromiter((link.status != LinkStatus.Closed for link in self.links), dtype=bool,
+                                 count=num_links)
+
+        self._isolated_junctions = np.zeros(self._num_junctions, dtype=bool)
+        self._isolated_links = np.zeros(num_links, dtype=bool)
+        self._stale = True
+        self.num_labellings = 0
+
+    def set_status(self, link):
+        """
+        Read the status of a link from the network.
+
+        Parameters
+        ----------
+        link: wntr.network.base.Link
+        """
+        ndx = self._link_ndx[link.name]
+        is_open = link.status != LinkStatus.Closed
+        if is_open != self._open[ndx]:
+            self._open[ndx] = is_open
+            self._stale = True
+
+    def update(self, change_tracker, ref_point='graph'):
+        """
+        Read the status of the links changed since a reference point of the change tracker;
+        the reference point is then reset.
+
+        Parameters
+        ----------
+        change_tracker: wntr.network.controls.ControlChangeTracker
+        ref_point: str
+        """
+        for obj, attr in change_tracker.get_changes(ref_point=ref_point):
+            if attr == 'status':
+                self.set_status(obj)
+        change_tracker.reset_reference_point(key=ref_point)
+
+    def label_components(self):
+        """
+        Label the connected components of the network formed by the open links.
+
+        Returns
+        -------
+        labels: np.ndarray of int
+            The component of each node
+        has_source: np.ndarray of bool
+            Whether each component contains a tank or reservoir
+        """
+        num_nodes = len(self.nodes)
+        start = self._start[self._open]
+        end = self._end[self._open]
+        graph = scipy.sparse.csr_matrix((np.ones(len(start), dtype=np.int8), (start, end)),
+                                        shape=(num_nodes, num_nodes))
+        num_components, labels = connected_components(graph, directed=False)
+        has_source = np.zeros(num_components, dtype=bool)
+        has_source[labels[self._num_junctions:]] = True
+        self.num_labellings += 1
+        return labels, has_source
+
+    def find_isolated(self):
+        """
+        Find the isolated junctions and links, relabelling the components only if a link
+        status changed since the last call.
+
+        Returns
+        -------
+        isolated_junctions: np.ndarray of bool
+            Mask over the junctions
+        isolated_links: np.ndarray of bool
+            Mask over the links
+        """
+        if self._stale:
+            labels, has_source = self.label_components()
+            isolated_nodes = ~has_source[labels]
+            self._isolated_junctions = isolated_nodes[:self._num_junctions]
+            self._isolated_links = isolated_nodes[self._start] | isolated_nodes[self._end]
+            self._stale = False
+        return self._isolated_junctions, self._isolated_links
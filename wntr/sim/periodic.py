@@ -0,0 +1,148 @@
+"""
+Detection of a periodic state (e.g., a daily tank cycle) to end extended
+period simulations early.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class PeriodicStateDetector(object):
+    """
+    Detects when a simulation has reached a periodic state.
+
+    At every report time, the tank levels and link statuses are compared with
+    those one period earlier (by default, at the same time of the previous
+    day). The state is periodic once the levels agree within
+    ``level_tolerance`` and the statuses are equal at every report time over
+    a full period. The simulators then stop at that time instead of simulating
+    the rest of the duration. The results record the early exit in
+    ``results.early_exit`` and, if ``tile`` is True, the last period of the
+    results is repeated out to the duration of the simulation.
+
+    The state only repeats if the inputs of the simulation do; controls at
+    absolute simulation times (e.g., Net3, where the last time control acts on
+    the sixth day) or patterns that do not repeat with the period can change
+    the simulation after the detector has stopped it.
+
+    Pass the detector to :py:meth:`WNTRSimulator.run_sim
+    <wntr.sim.core.WNTRSimulator.run_sim>` or
+    :py:meth:`StepwiseEpanetSimulator.open
+    <wntr.sim.epanet.StepwiseEpanetSimulator.open>`.
+
+    Parameters
+    ----------
+    period: int
+        The period of the state, in seconds. Default = 86400.
+    level_tolerance: float
+        The largest difference in tank level, in meters, between two states
+        that are considered equal. Default = 1e-3.
+    tile: bool
+        If True, the results of the last period are repeated out to the
+        duration of the simulation. Default = False.
+    """
+
+    def __init__(self, period=86400, level_tolerance=1e-3, tile=False):
+        if period <= 0:
+            raise ValueError('period must be positive.')
+        self.period = int(period)
+        self.level_tolerance = level_tolerance
+        self.tile = tile
+        self.reset()
+
+    def reset(self):
+        """
+        Forget the recorded states.
+        """
+        self._states = dict()
+        self._first_match = None
+        self.detected_time = None
+
+    @property
+    def detected(self):
+        """bool: True if a periodic state was detected"""
+        return self.detected_time is not None
+
+    def record(self, time, levels, statuses):
+        """
+        Record the state at a report time and compare it with the state one period earlier.
+
+        Parameters
+        ----------
+        time: int
+            The simulation time, in seconds
+        levels: array_like
+            The tank levels, in meters, in the same order at every report time
+        statuses: array_like
+            The link statuses, in the same order at every report time
+
+        Returns
+        -------
+        detected: bool
+            True if the state has been periodic for a full period
+        """
+        time = int(time)
+        levels = np.asarray(levels, dtype=float)
+        statuses = np.asarray(statuses, dtype=int)
+        previous = self._states.get(time - self.period)
+        if previous is not None and self._matches(previous, levels, statuses):
+            if self._first_match is None:
+                self._first_match = time
+        else:
+            self._first_match = None
+        self._states[time] = (levels, statuses)
+        for t in [t for t in self._states if t <= time - self.period]:
+            del self._states[t]
+        if self.detected_time is None and self._first_match is not None and \
+                time - self._first_match >= self.period:
+            self.detected_time = time
+            logger.info('periodic state with period {0} detected at time {1}'.format(self.period, time))
+        return self.detected
+
+    def _matches(self, previous, levels, statuses):
+        prev_levels, prev_statuses = previous
+        if prev_levels.shape != levels.shape or prev_statuses.shape != statuses.shape:
+            return False
+        if levels.size > 0 and np.abs(levels - prev_levels).max() > self.level_tolerance:
+            return False
+        return bool(np.array_equal(statuses, prev_statuses))
+
+    def finish(self, results, duration):
+        """
+        Record the early exit in the results and, if tile is True, repeat the
+        last period of the results out to the duration.
+
+        Nothing is changed if no periodic state was detected before the end of
+        the simulation.
+
+        Parameters
+        ----------
+        results: SimulationResults
+        duration: int
+            The requested duration of the simulation, in seconds
+        """
+        if self.detected_time is None or self.detected_time >= duration:
+            return
+        end = self.detected_time
+        if self.tile:
+            for frames in [results.node, results.link]:
+                for key, df in list(frames.items()):
+                    frames[key] = self._tile(df, end, duration)
+            if getattr(results, 'time', None) is not None:
+                results.time = [int(t) for t in results.node['head'].index]
+        results.early_exit = dict(time=end, period=self.period, duration=int(duration), tiled=bool(self.tile))
+
+    def _tile(self, df, end, duration):
+        cycle = df.loc[(df.index > end - self.period) & (df.index <= end)]
+        parts = [df.loc[df.index <= end]]
+        offset = self.period
+        while end + offset - self.period < duration:
+            part = cycle.copy()
+            part.index = cycle.index + offset
+            parts.append(part)
+            offset += self.period
+        tiled = pd.concat(parts)
+        return tiled.loc[tiled.index <= duration]
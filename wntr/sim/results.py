@@ -12,6 +12,28 @@ class ResultsStatus(enum.IntEnum):
 class SimulationResults(object):
     """
     Water network simulation results class.
+
+    The WNTRSimulator also stores solver statistics in ``solver_statistics``, a
+    DataFrame with one row per solve (time, trial, Newton iterations, and the
+    number of LU factorizations that computed a new ordering, ``lu_symbolic``,
+    or reused the cached one, ``lu_numeric``, and the number of chord steps that
+    reused an earlier factorization, ``lu_reused``). The number of times the
+    structure of the hydraulic model was rebuilt from scratch or only patched
+    where it changed is stored in ``full_restructures`` and
+    ``incremental_restructures``. If a predictor is used, the
+    statistics also include the chosen starting point, ``start_point``, and the
+    number of Newton iterations the solve would have taken from the previous
+    solution, ``iterations_without_predictor``.
+
+    If run_sim is called with ``profile=True``, the WNTRSimulator stores the
+    wall-clock time spent in each phase of every trial and the number of Newton
+    iterations, line search steps and model restructures in ``profile``, a
+    DataFrame with one row per trial.
+
+    If a :py:class:`~wntr.sim.periodic.PeriodicStateDetector` ended the
+    simulation early, ``early_exit`` is a dictionary with the time the
+    simulation stopped, the detected period, the requested duration, and
+    whether the results were tiled out to the duration; otherwise it is None.
     """
 
     def __init__(self):
@@ -21,3 +43,6 @@ class SimulationResults(object):
         self.network_name = None
         self.link = None
         self.node = None
+        self.solver_statistics = None
+        self.profile = None
+        self.early_exit = None
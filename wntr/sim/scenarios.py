@@ -0,0 +1,112 @@
+"""
+Scenarios (changes to a copy of a water network model) shared by the
+simulators that run many variations of the same model, and the worker
+state of the process pools that run them.
+"""
+import logging
+from multiprocessing.util import Finalize
+
+from wntr.network import LinkStatus
+from wntr.network.controls import ControlAction
+
+logger = logging.getLogger(__name__)
+
+scenario_keys = ('status', 'nodes', 'links')
+
+
+def check_scenario(wn, scenario, keys=scenario_keys, functions=True):
+    """
+    Check that a scenario is valid for a water network model.
+
+    A scenario is either None (no changes), a function that takes the water
+    network model as its only argument and changes it, or a dictionary with
+    any of the following keys:
+
+    * 'status': {link name: :class:`~wntr.network.base.LinkStatus` or str}
+    * 'nodes': {node name: {attribute: value}}
+    * 'links': {link name: {attribute: value}}
+
+    Parameters
+    ----------
+    wn: WaterNetworkModel
+        Water network model
+    scenario: None, function, or dict
+        The scenario
+    keys: tuple of str
+        The allowed keys of a dictionary scenario; keys other than the ones
+        above must be checked by the caller
+    functions: bool
+        If False, the scenario must be a dictionary
+    """
+    if functions and (scenario is None or callable(scenario)):
+        return
+    if not isinstance(scenario, dict):
+        if functions:
+            raise ValueError('Each scenario must be None, a function, or a dict; got {0}'.format(scenario))
+        raise ValueError('Each scenario must be a dict; got {0}'.format(scenario))
+    for key in scenario.keys():
+        if key not in keys:
+            raise ValueError('Unrecognized scenario key: {0}. Options are {1}.'.format(key, keys))
+    for name in scenario.get('status', dict()).keys():
+        wn.get_link(name)
+    for name in scenario.get('nodes', dict()).keys():
+        wn.get_node(name)
+    for name in scenario.get('links', dict()).keys():
+        wn.get_link(name)
+
+
+def apply_scenario(wn, scenario, initial):
+    """
+    Apply a scenario (see :py:func:`check_scenario`) to a water network model.
+
+    Parameters
+    ----------
+    wn: WaterNetworkModel
+        Water network model
+    scenario: function or dict
+        The scenario
+    initial: bool
+        If True, the scenario is applied before the simulation starts: a
+        status sets the initial status of the link, and the attributes are set
+        directly. If False, the scenario is applied during a simulation: the
+        status and the attributes are set with control actions, so that the
+        simulator sees the changes.
+    """
+    if callable(scenario):
+        scenario(wn)
+        return
+    for name, status in scenario.get('status', dict()).items():
+        if isinstance(status, str):
+            status = LinkStatus[status]
+        if initial:
+            wn.get_link(name).initial_status = LinkStatus(status)
+        else:
+            ControlAction(wn.get_link(name), 'status', LinkStatus(status)).run_control_action()
+    for key, get in (('nodes', wn.get_node), ('links', wn.get_link)):
+        for name, attrs in scenario.get(key, dict()).items():
+            obj = get(name)
+            for attr, value in attrs.items():
+                if initial:
+                    setattr(obj, attr, value)
+                else:
+                    ControlAction(obj, attr, value).run_control_action()
+
+
+_worker = None
+
+
+def init_worker(worker_class, *args):
+    """
+    Initializer of the processes of a pool. Creates the worker of the process
+    with ``worker_class(*args)``; its close method, if any, is called when
+    the process exits.
+    """
+    global _worker
+    _worker = worker_class(*args)
+    if hasattr(_worker, 'close'):
+        Finalize(_worker, _worker.close, exitpriority=10)
+
+
+def run_worker(*args):
+    """Run a scenario with the worker of this process (``worker.run(*args)``)."""
+    return _worker.run(*args)
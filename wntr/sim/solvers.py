@@ -2,6 +2,9 @@
 """
 import numpy as np
 import scipy.sparse as sp
+import scipy.sparse.linalg
+import scipy.sparse.csgraph
+import scipy.linalg
 import warnings
 import logging
 import enum
@@ -20,6 +23,532 @@ class SolverStatus(enum.IntEnum):
     error = 0
 
 
+class SparseLUCache(object):
+    """
+    Cache for the structural part of a sparse LU factorization.
+
+    The column ordering (COLAMD) and the mapping from the CSR Jacobian
+    returned by :py:meth:`wntr.sim.aml.aml.Model.evaluate_jacobian` to the
+    column-permuted CSC matrix handed to SuperLU only depend on the sparsity
+    pattern of the Jacobian. They are computed once for each model structure
+    (see :py:attr:`wntr.sim.aml.aml.Model.structure_version`) and reused for
+    every later factorization, so that only the numeric factorization is
+    repeated while the structure is unchanged. When the structure changes, the
+    factorization that computed the new ordering is used for the current solve.
+
+    The ordering can be saved with :py:meth:`get_state` and restored with
+    :py:meth:`set_state` (used for checkpoints), so that a resumed simulation
+    factorizes its Jacobians exactly as the original one.
+
+    Attributes
+    ----------
+    structure_version: int
+        The structure version the cached ordering belongs to
+    num_symbolic: int
+        Number of factorizations that required a new ordering (cache misses)
+    num_numeric: int
+        Number of factorizations that reused the cached ordering (cache hits)
+    num_reused: int
+        Number of linear solves that reused a previously computed factorization
+        (see the chord option of :py:class:`NewtonSolver`)
+    num_linear_solves: int
+        Number of linear systems solved by :py:class:`NewtonSolver` with this cache
+    linear_solve_time: float
+        Wall-clock time (in seconds) spent factorizing and solving those linear systems
+    fill_in: float
+        Number of nonzeros stored in the most recent (incomplete) factorization divided
+        by the number of nonzeros of the factorized matrix; nan if unknown
+    num_krylov_iterations: int
+        Number of iterations of the iterative linear solvers (see :py:class:`IterativeSolver`)
+    block_form: BlockTriangularForm
+        The block triangular form of the Jacobian of the cached structure (only computed for
+        :py:class:`BlockTriangularSolver`)
+    """
+
+    def __init__(self):
+        self.structure_version = None
+        self.num_symbolic = 0
+        self.num_numeric = 0
+        self.num_reused = 0
+        self.num_linear_solves = 0
+        self.linear_solve_time = 0.0
+        self.fill_in = np.nan
+        self.num_krylov_iterations = 0
+        self.block_form = None
+        self._last_factor = None
+        self._block_layouts = dict()
+        self._shape = None
+        self._col_order = None
+        self._data_ndx = None
+        self._indices = None
+        self._indptr = None
+        self._restored = None
+
+    def clear(self):
+        """Discard the cached ordering; the next factorization recomputes it."""
+        self.structure_version = None
+        self.block_form = None
+        self._last_factor = None
+        self._block_layouts = dict()
+        self._shape = None
+        self._col_order = None
+        self._data_ndx = None
+        self._indices = None
+        self._indptr = None
+        self._restored = None
+
+    def get_state(self):
+        """
+        Get the cached ordering and the sparsity pattern it belongs to.
+
+        Returns
+        -------
+        state: dict or None
+            None if no ordering is cached
+        """
+        if self._col_order is None:
+            return None
+        return {'shape': self._shape, 'col_order': self._col_order, 'indices': self._indices,
+                'indptr': self._indptr}
+
+    def set_state(self, state):
+        """
+        Restore an ordering from :py:meth:`get_state`. The ordering is used by the next
+        factorization that needs a new ordering if the Jacobian has exactly the same sparsity
+        pattern; otherwise it is ignored.
+
+        Parameters
+        ----------
+        state: dict or None
+        """
+        self.clear()
+        self._restored = state
+
+    def discard_last_factor(self):
+        """Discard the most recent factorization (see :py:meth:`get_last_factor`)."""
+        self._last_factor = None
+
+    def _is_valid(self, J, structure_version):
+        return (structure_version is not None and
+                structure_version == self.structure_version and
+                J.shape == self._shape and
+                J.nnz == len(self._data_ndx))
+
+    @staticmethod
+    def _permuted_layout(J, col_order):
+        # Track where each nonzero of the CSR Jacobian ends up in the
+        # column-permuted CSC matrix
+        template = sp.csr_matrix((np.arange(1, J.nnz + 1, dtype=float), J.indices, J.indptr), shape=J.shape)
+        template = template.tocsc()[:, col_order]
+        template.sort_indices()
+        return template.data.astype(np.int64) - 1, template.indices, template.indptr
+
+    def _set_ordering(self, J, structure_version, col_order):
+        self.structure_version = structure_version
+        self._shape = J.shape
+        self._col_order = col_order
+        self._data_ndx, self._indices, self._indptr = self._permuted_layout(J, col_order)
+        self._block_layouts = dict()
+
+    def _restore(self, J, structure_version):
+        state = self._restored
+        self._restored = None
+        if state['shape'] != J.shape or len(state['indices']) != J.nnz:
+            return False
+        # the nonzeros of a row may be stored in a different order, so the layout is recomputed
+        # and compared with the saved one
+        data_ndx, indices, indptr = self._permuted_layout(J, state['col_order'])
+        if not np.array_equal(indptr, state['indptr']) or not np.array_equal(indices, state['indices']):
+            return False
+        self._set_ordering(J, structure_version, state['col_order'])
+        return True
+
+    def _analyze(self, J, structure_version):
+        """
+        Compute the ordering for the structure of J.
+
+        Returns
+        -------
+        lu: scipy.sparse.linalg.SuperLU or None
+            The factorization of J computed along with the ordering, or None if a restored
+            ordering (see :py:meth:`set_state`) was used
+        """
+        if self._restored is not None and self._restore(J, structure_version):
+            return None
+        n = J.shape[0]
+        A = sp.csc_matrix(J)
+        lu = sp.linalg.splu(A, permc_spec="COLAMD")
+        # SuperLU returns the ordering after the column etree postorder, so
+        # reusing it with NATURAL reproduces the same factorization pattern
+        self._set_ordering(J, structure_version, np.argsort(lu.perm_c))
+        self.num_symbolic += 1
+        logger.debug('computed new LU ordering for structure version {0} (n = {1}, nnz = {2})'.format(
+            structure_version, n, J.nnz))
+        return lu
+
+    def factorize(self, J, structure_version=None):
+        """
+        Factorize J, reusing the cached ordering if the structure is unchanged.
+
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+            The Jacobian
+        structure_version: int
+            The structure version of the model J was evaluated from. If None,
+            the ordering is always recomputed.
+
+        Returns
+        -------
+        factor: _PermutedLU
+            An object with a solve method
+        """
+        if self._is_valid(J, structure_version):
+            self.num_numeric += 1
+        else:
+            lu = self._analyze(J, structure_version)
+            if lu is not None:
+                # the factorization that computed the ordering is used for this solve
+                self.fill_in = lu.nnz / max(J.nnz, 1)
+                factor = _PermutedLU(lu, None)
+                self._last_factor = factor
+                return factor
+            self.num_numeric += 1
+        A = sp.csc_matrix((J.data[self._data_ndx], self._indices, self._indptr), shape=self._shape)
+        lu = sp.linalg.splu(A, permc_spec="NATURAL")
+        self.fill_in = lu.nnz / max(J.nnz, 1)
+        factor = _PermutedLU(lu, self._col_order)
+        self._last_factor = factor
+        return factor
+
+    def factorize_block_diagonal(self, blocks, structure_version=None):
+        """
+        Factorize the block diagonal matrix with the given diagonal blocks.
+
+        All blocks must share the sparsity pattern of the model structure given by
+        structure_version. The ordering is computed for a single block and repeated
+        for every block, so the cost of the ordering does not grow with the number
+        of blocks.
+
+        Parameters
+        ----------
+        blocks: list of scipy.sparse.csr_matrix
+            The diagonal blocks
+        structure_version: int
+            The structure version of the model the blocks were evaluated from
+
+        Returns
+        -------
+        factor: _PermutedLU
+            An object with a solve method for the stacked right hand side
+        """
+        J = blocks[0]
+        if not self._is_valid(J, structure_version):
+            self._analyze(J, structure_version)
+        n_blocks = len(blocks)
+        if n_blocks not in self._block_layouts:
+            n = self._shape[0]
+            nnz = len(self._data_ndx)
+            offsets = np.arange(n_blocks)
+            col_order = (self._col_order[None, :] + n * offsets[:, None]).ravel()
+            data_ndx = (self._data_ndx[None, :] + nnz * offsets[:, None]).ravel()
+            indices = (self._indices[None, :] + n * offsets[:, None]).ravel()
+            indptr = np.concatenate([self._indptr[:-1] + nnz * offsets[:, None], [[nnz * n_blocks]]], axis=None)
+            self._block_layouts[n_blocks] = (col_order, data_ndx, indices, indptr)
+        col_order, data_ndx, indices, indptr = self._block_layouts[n_blocks]
+        data = np.concatenate([b.data for b in blocks])
+        n = self._shape[0] * n_blocks
+        A = sp.csc_matrix((data[data_ndx], indices, indptr), shape=(n, n))
+        lu = sp.linalg.splu(A, permc_spec="NATURAL")
+        self.num_numeric += 1
+        return _PermutedLU(lu, col_order)
+
+    def get_block_triangular_form(self, J, structure_version=None):
+        """
+        Get the block triangular form of J, computing it only if the structure changed.
+
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+        structure_version: int
+            The structure version of the model J was evaluated from. If None, the form is always
+            recomputed.
+
+        Returns
+        -------
+        form: BlockTriangularForm
+        """
+        form = self.block_form
+        if (form is None or structure_version is None or form.structure_version != structure_version or
+                form.shape != J.shape or form.nnz != J.nnz):
+            form = BlockTriangularForm(J)
+            form.structure_version = structure_version
+            self.block_form = form
+            logger.debug('block triangular form of structure version {0}: {1} blocks, core size {2} of {3}'.format(
+                structure_version, form.num_blocks, form.core_size, form.size))
+        return form
+
+    def get_last_factor(self, structure_version):
+        """
+        Get the most recent factorization if it belongs to structure_version.
+
+        Parameters
+        ----------
+        structure_version: int
+
+        Returns
+        -------
+        factor: _PermutedLU or None
+        """
+        if structure_version is None or structure_version != self.structure_version:
+            return None
+        return self._last_factor
+
+
+class _PermutedLU(object):
+    __slots__ = ('lu', 'col_order')
+
+    def __init__(self, lu, col_order):
+        self.lu = lu
+        self.col_order = col_order
+
+    def solve(self, b):
+        y = self.lu.solve(b)
+        if self.col_order is None:
+            return y
+        x = np.empty_like(y)
+        x[self.col_order] = y
+        return x
+
+
+class LinearSolver(object):
+    """
+    Base class of the linear solver backends of :py:class:`NewtonSolver`.
+
+    A backend computes x such that J x = b for the Jacobian J of each Newton
+    iteration. Backends must implement factorize, which returns an object with
+    a solve method (used directly by the chord option of NewtonSolver, which
+    reuses the returned object for later right hand sides). Backends that do
+    not have a reusable factorization may also override solve.
+
+    The lu_cache passed to both methods belongs to the simulation (see
+    :py:class:`SparseLUCache`). Backends can keep structural information in it
+    and should set lu_cache.fill_in when they compute a factorization.
+    """
+
+    def factorize(self, J, structure_version, lu_cache):
+        """
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+            The Jacobian
+        structure_version: int
+            The structure version of the model J was evaluated from (None if unknown)
+        lu_cache: SparseLUCache
+
+        Returns
+        -------
+        factor: object
+            An object with a solve(b) method
+        """
+        raise NotImplementedError('factorize is not implemented by {0}'.format(type(self).__name__))
+
+    def solve(self, J, b, structure_version, lu_cache):
+        """
+        Solve J x = b.
+
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+            The Jacobian
+        b: numpy.ndarray
+            The right hand side
+        structure_version: int
+            The structure version of the model J was evaluated from (None if unknown)
+        lu_cache: SparseLUCache
+
+        Returns
+        -------
+        x: numpy.ndarray
+        """
+        return self.factorize(J, structure_version, lu_cache).solve(b)
+
+
+class DirectLUSolver(LinearSolver):
+    """
+    Sparse LU factorization with SuperLU (the default backend of :py:class:`NewtonSolver`).
+
+    Parameters
+    ----------
+    reuse_symbolic: bool
+        If True (default), the COLAMD ordering is computed once for each model structure
+        and kept in the :py:class:`SparseLUCache`. If False, the ordering is recomputed for
+        every factorization.
+    """
+
+    def __init__(self, reuse_symbolic=True):
+        self.reuse_symbolic = reuse_symbolic
+
+    def factorize(self, J, structure_version, lu_cache):
+        try:
+            if self.reuse_symbolic:
+                return lu_cache.factorize(J, structure_version)
+            lu = sp.linalg.splu(sp.csc_matrix(J), permc_spec="COLAMD")
+            lu_cache.fill_in = lu.nnz / max(J.nnz, 1)
+            return _PermutedLU(lu, None)
+        except RuntimeError as e:
+            if 'singular' in str(e):
+                raise sp.linalg.MatrixRankWarning(str(e))
+            raise
+
+    def solve(self, J, b, structure_version, lu_cache):
+        if self.reuse_symbolic:
+            return self.factorize(J, structure_version, lu_cache).solve(b)
+        return sp.linalg.spsolve(J, b, permc_spec="COLAMD", use_umfpack=False)
+
+
+class DenseLUSolver(LinearSolver):
+    """
+    Dense LU factorization with LAPACK.
+
+    For very small models (a few dozen variables), the overhead of the sparse
+    data structures is larger than the cost of a dense factorization.
+
+    Parameters
+    ----------
+    max_size: int
+        The largest number of variables for which the dense factorization is used;
+        larger systems are solved with a :py:class:`DirectLUSolver`.
+    """
+
+    def __init__(self, max_size=200):
+        self.max_size = max_size
+        self._sparse = DirectLUSolver()
+
+    def factorize(self, J, structure_version, lu_cache):
+        if J.shape[0] > self.max_size:
+            return self._sparse.factorize(J, structure_version, lu_cache)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', scipy.linalg.LinAlgWarning)
+            lu, piv = scipy.linalg.lu_factor(J.toarray(), check_finite=False)
+        if np.any(np.diag(lu) == 0):
+            raise sp.linalg.MatrixRankWarning('Matrix is exactly singular')
+        lu_cache.fill_in = J.shape[0] ** 2 / max(J.nnz, 1)
+        return _DenseLU(lu, piv)
+
+
+class _DenseLU(object):
+    __slots__ = ('lu', 'piv')
+
+    def __init__(self, lu, piv):
+        self.lu = lu
+        self.piv = piv
+
+    def solve(self, b):
+        return scipy.linalg.lu_solve((self.lu, self.piv), b, check_finite=False)
+
+
+class IterativeSolver(LinearSolver):
+    """
+    Preconditioned Krylov solver for very large models.
+
+    Direct factorizations of the Jacobian of very large networks can require
+    more memory and time than a Krylov method with a cheap preconditioner. The
+    Jacobian of the hydraulic model is not symmetric, so a method for general
+    matrices (GMRES or BiCGSTAB) is used.
+
+    If the Krylov method does not reach the tolerance within maxiter
+    iterations, the approximate solution is returned (an inexact Newton step)
+    and the line search of :py:class:`NewtonSolver` decides whether to accept it.
+
+    Parameters
+    ----------
+    method: str
+        'gmres' (default) or 'bicgstab'
+    preconditioner: str
+        'ilu' (incomplete LU, default) or None. The Jacobian has zero diagonal
+        entries (e.g., the mass balances do not depend on the head of their own
+        junction), so diagonal preconditioners cannot be used.
+    rtol: float
+        The relative tolerance of the Krylov method
+    maxiter: int
+        The maximum number of iterations (restart cycles for GMRES)
+    restart: int
+        The number of iterations between restarts of GMRES
+    drop_tol: float
+        The drop tolerance of the incomplete LU factorization
+    fill_factor: float
+        The maximum fill-in of the incomplete LU factorization
+    """
+
+    _methods = ('gmres', 'bicgstab')
+    _preconditioners = ('ilu', None)
+
+    def __init__(self, method='gmres', preconditioner='ilu', rtol=1e-10, maxiter=100, restart=50,
+                 drop_tol=1e-5, fill_factor=10):
+        if method not in self._methods:
+            raise ValueError('Unrecognized method: {0}. Options are {1}.'.format(method, self._methods))
+        if preconditioner not in self._preconditioners:
+            raise ValueError('Unrecognized preconditioner: {0}. Options are {1}.'.format(
+                preconditioner, self._preconditioners))
+        self.method = method
+        self.preconditioner = preconditioner
+        self.rtol = rtol
+        self.maxiter = maxiter
+        self.restart = restart
+        self.drop_tol = drop_tol
+        self.fill_factor = fill_factor
+
+    def _get_preconditioner(self, J, lu_cache):
+        n = J.shape[0]
+        if self.preconditioner == 'ilu':
+            try:
+                ilu = sp.linalg.spilu(sp.csc_matrix(J), drop_tol=self.drop_tol, fill_factor=self.fill_factor)
+            except RuntimeError as e:
+                if 'singular' in str(e):
+                    raise sp.linalg.MatrixRankWarning(str(e))
+                raise
+            lu_cache.fill_in = ilu.nnz / max(J.nnz, 1)
+            return sp.linalg.LinearOperator((n, n), matvec=ilu.solve)
+        lu_cache.fill_in = np.nan
+        return None
+
+    def factorize(self, J, structure_version, lu_cache):
+        J = sp.csr_matrix(J)
+        return _KrylovFactor(self, J, self._get_preconditioner(J, lu_cache), lu_cache)
+
+
+class _KrylovFactor(object):
+    __slots__ = ('solver', 'J', 'M', 'lu_cache')
+
+    def __init__(self, solver, J, M, lu_cache):
+        self.solver = solver
+        self.J = J
+        self.M = M
+        self.lu_cache = lu_cache
+
+    def solve(self, b):
+        solver = self.solver
+        num_iter = [0]
+
+        def callback(xk):
+            num_iter[0] += 1
+
+        if solver.method == 'gmres':
+            x, info = sp.linalg.gmres(self.J, b, rtol=solver.rtol, atol=0.0, restart=solver.restart,
+                                      maxiter=solver.maxiter, M=self.M, callback=callback,
+                                      callback_type='pr_norm')
+        else:
+            x, info = sp.linalg.bicgstab(self.J, b, rtol=solver.rtol, atol=0.0, maxiter=solver.maxiter,
+                                         M=self.M, callback=callback)
+        self.lu_cache.num_krylov_iterations += num_iter[0]
+        if info < 0:
+            raise sp.linalg.MatrixRankWarning('{0} breakdown'.format(solver.method))
+        if info > 0:
+            logger.debug('{0} did not converge in {1} iterations'.format(solver.method, num_iter[0]))
+        return x
+
+
 class NewtonSolver(object):
     """
     Newton Solver class.
@@ -45,6 +574,28 @@ class NewtonSolver(object):
         If False, a line search will not be used.
     bt_start_iter: int
         A line search will not be used for any iteration prior to bt_start_iter
+    reuse_symbolic: bool
+        If True, the column ordering of the sparse LU factorization is computed once for each model
+        structure and only the numeric factorization is repeated (see :py:class:`SparseLUCache`).
+    lu_cache: SparseLUCache
+        The cache used when reuse_symbolic is True. Keeping the same solver (or passing the same
+        cache to solve) across calls allows the ordering to be reused across timesteps.
+    chord: bool
+        If True, the solver reuses the most recent LU factorization of the jacobian (from an earlier
+        iteration or an earlier call to solve with the same lu_cache) instead of evaluating and
+        factorizing the jacobian every iteration. A chord step is accepted if it reduces the
+        infinity norm of the constraint violation by at least a factor of chord_rate. Otherwise,
+        the jacobian is refactorized and a regular Newton step (with backtracking) is taken.
+    chord_rate: float
+        The required reduction of the constraint violation for a chord step to be accepted. It
+        should be strictly between 0 and 1.
+    linear_solver: LinearSolver
+        The backend used to solve the linear system of each iteration. The LINEAR_SOLVER option
+        is either a :py:class:`LinearSolver` or one of 'lu' (:py:class:`DirectLUSolver`, default),
+        'dense' (:py:class:`DenseLUSolver`), 'gmres' and 'bicgstab' (:py:class:`IterativeSolver`
+        with an incomplete LU preconditioner).
+    num_line_search_steps: int
+        The number of trial points evaluated by the line search over all calls to solve
     """
 
     def __init__(self, options=None):
@@ -65,6 +616,10 @@ class NewtonSolver(object):
                 | "BT_MAXITER" (NewtonSolver.bt_maxiter)
                 | "BACKTRACKING" (NewtonSolver.bt)
                 | "BT_START_ITER" (NewtonSolver.bt_start_iter)
+                | "REUSE_SYMBOLIC" (NewtonSolver.reuse_symbolic)
+                | "CHORD" (NewtonSolver.chord)
+                | "CHORD_RATE" (NewtonSolver.chord_rate)
+                | "LINEAR_SOLVER" (NewtonSolver.linear_solver)
         """
         if options is None:
             options = {}
@@ -115,12 +670,58 @@ class NewtonSolver(object):
         else:
             self.bt_start_iter = self._options["BT_START_ITER"]
 
-    def solve(self, model, ostream=None):
+        if "REUSE_SYMBOLIC" not in self._options:
+            self.reuse_symbolic = True
+        else:
+            self.reuse_symbolic = self._options["REUSE_SYMBOLIC"]
+
+        if "CHORD" not in self._options:
+            self.chord = False
+        else:
+            self.chord = self._options["CHORD"]
+
+        if "CHORD_RATE" not in self._options:
+            self.chord_rate = 0.5
+        else:
+            self.chord_rate = self._options["CHORD_RATE"]
+
+        if "LINEAR_SOLVER" not in self._options:
+            linear_solver = 'lu'
+        else:
+            linear_solver = self._options["LINEAR_SOLVER"]
+        if isinstance(linear_solver, LinearSolver):
+            self.linear_solver = linear_solver
+        elif linear_solver == 'lu':
+            self.linear_solver = DirectLUSolver(self.reuse_symbolic)
+        elif linear_solver == 'dense':
+            self.linear_solver = DenseLUSolver()
+        elif linear_solver in IterativeSolver._methods:
+            self.linear_solver = IterativeSolver(linear_solver)
+        else:
+            raise ValueError('Unrecognized linear solver: {0}. Options are a LinearSolver, "lu", "dense", '
+                             '"gmres" and "bicgstab".'.format(linear_solver))
+
+        self.lu_cache = SparseLUCache()
+        self.num_line_search_steps = 0
+
+    def _factorize(self, J, structure_version, lu_cache):
+        return self.linear_solver.factorize(J, structure_version, lu_cache)
+
+    def _solve_linear_system(self, J, r, structure_version, lu_cache):
+        if self.chord:
+            return -self._factorize(J, structure_version, lu_cache).solve(r)
+        return -self.linear_solver.solve(J, r, structure_version, lu_cache)
+
+    def solve(self, model, ostream=None, lu_cache=None):
         """
 
         Parameters
         ----------
         model: wntr.aml.Model
+        ostream: file-like object, optional
+            If provided, progress is written to ostream each iteration
+        lu_cache: SparseLUCache, optional
+            Cache used to reuse the LU ordering. If None, NewtonSolver.lu_cache is used.
 
         Returns
         -------
@@ -139,6 +740,13 @@ class NewtonSolver(object):
             )
 
         use_r_ = False
+        if lu_cache is None:
+            lu_cache = self.lu_cache
+        structure_version = getattr(model, 'structure_version', None)
+        if self.chord:
+            factor = lu_cache.get_last_factor(structure_version)
+        else:
+            factor = None
 
         # MAIN NEWTON LOOP
         for outer_iter in range(self.maxiter):
@@ -171,23 +779,57 @@ class NewtonSolver(object):
                     outer_iter,
                 )
 
+            if factor is not None:
+                # Chord step with the factorization from an earlier iteration or timestep
+                t_linear = time.perf_counter()
+                d = -factor.solve(r)
+                lu_cache.linear_solve_time += time.perf_counter() - t_linear
+                lu_cache.num_linear_solves += 1
+                x_ = x + d
+                model.load_var_values_from_x(x_)
+                r_ = model.evaluate_residuals()
+                new_norm = np.max(abs(r_))
+                if new_norm <= self.chord_rate * r_norm:
+                    x = x_
+                    use_r_ = True
+                    lu_cache.num_reused += 1
+                    if self.log_progress or ostream is not None:
+                        msg = f"iter: {outer_iter:<4d} norm: {new_norm:<10.2e} chord step time: {time.time() - t0:<8.4f}"
+                        if self.log_progress:
+                            logger.log(self.log_level, msg)
+                        if ostream is not None:
+                            ostream.write(msg + "\n")
+                    continue
+                # not enough progress; refactorize and take a regular Newton step
+                model.load_var_values_from_x(x)
+                factor = None
+
             J = model.evaluate_jacobian(x=None)
 
             # Call Linear solver
+            t_linear = time.perf_counter()
             try:
-                d = -sp.linalg.spsolve(J, r, permc_spec="COLAMD", use_umfpack=False)
+                if self.chord:
+                    factor = self._factorize(J, structure_version, lu_cache)
+                    d = -factor.solve(r)
+                else:
+                    d = self._solve_linear_system(J, r, structure_version, lu_cache)
             except sp.linalg.MatrixRankWarning:
+                lu_cache.linear_solve_time += time.perf_counter() - t_linear
                 return (
                     SolverStatus.error,
                     "Jacobian is singular at iteration " + str(outer_iter),
                     outer_iter,
                 )
+            lu_cache.linear_solve_time += time.perf_counter() - t_linear
+            lu_cache.num_linear_solves += 1
 
             # Backtracking
             alpha = 1.0
             if self.bt and outer_iter >= self.bt_start_iter:
                 use_r_ = True
                 for iter_bt in range(self.bt_maxiter):
+                    self.num_line_search_steps += 1
                     x_ = x + alpha * d
                     model.load_var_values_from_x(x_)
                     r_ = model.evaluate_residuals()
@@ -211,6 +853,7 @@ class NewtonSolver(object):
                     if ostream is not None:
                         ostream.write(msg + "\n")
             else:
+                use_r_ = False
                 x += d
                 model.load_var_values_from_x(x)
 
@@ -219,3 +862,480 @@ class NewtonSolver(object):
             "Reached maximum number of iterations: " + str(outer_iter),
             outer_iter,
         )
+
+
+class EliminationLayout(object):
+    """
+    Index arrays for eliminating pairs of rows and columns from a sparse
+    linear system.
+
+    Each pair (row i, column j) is eliminated with the Schur complement of the
+    block of the pairs, which must be diagonal: row i must not contain any of
+    the other eliminated columns. Pairs whose row does not contain its column
+    or that violate this condition are not eliminated. The remaining rows and
+    columns form the reduced system. The layout only depends on the sparsity
+    pattern of the matrix.
+
+    Parameters
+    ----------
+    J: scipy.sparse.csr_matrix
+        A matrix with the sparsity pattern of the system
+    rows: np.ndarray of int
+        The rows of the pairs to eliminate
+    cols: np.ndarray of int
+        The columns of the pairs to eliminate
+
+    Attributes
+    ----------
+    num_eliminated: int
+        The number of eliminated pairs
+    num_reduced: int
+        The size of the reduced system
+    """
+
+    def __init__(self, J, rows, cols):
+        n = J.shape[0]
+        nnz = J.nnz
+        entry_rows = np.repeat(np.arange(n), np.diff(J.indptr))
+        entry_cols = J.indices
+        rows = np.asarray(rows, dtype=np.int64)
+        cols = np.asarray(cols, dtype=np.int64)
+
+        # keep the pairs that have an entry (row, col)
+        keys = entry_rows.astype(np.int64) * n + entry_cols
+        order = np.argsort(keys)
+        pair_keys = rows * n + cols
+        loc = np.searchsorted(keys[order], pair_keys)
+        loc[loc == nnz] = 0
+        keep = (nnz > 0) & (keys[order][loc] == pair_keys)
+        rows = rows[keep]
+        cols = cols[keep]
+
+        # drop pairs whose row contains another eliminated column
+        while True:
+            col_pair = np.full(n, -1, dtype=np.int64)
+            col_pair[cols] = np.arange(len(cols))
+            row_pair = np.full(n, -1, dtype=np.int64)
+            row_pair[rows] = np.arange(len(rows))
+            entry_row_pair = row_pair[entry_rows]
+            entry_col_pair = col_pair[entry_cols]
+            bad = (entry_row_pair >= 0) & (entry_col_pair >= 0) & (entry_row_pair != entry_col_pair)
+            if not bad.any():
+                break
+            keep = np.ones(len(rows), dtype=bool)
+            keep[np.unique(entry_row_pair[bad])] = False
+            rows = rows[keep]
+            cols = cols[keep]
+
+        reduced_rows = np.flatnonzero(row_pair < 0)
+        reduced_cols = np.flatnonzero(col_pair < 0)
+        row_ndx = np.full(n, -1, dtype=np.int64)
+        row_ndx[reduced_rows] = np.arange(len(reduced_rows))
+        col_ndx = np.full(n, -1, dtype=np.int64)
+        col_ndx[reduced_cols] = np.arange(len(reduced_cols))
+        num_reduced = len(reduced_rows)
+        pos = np.arange(nnz)
+
+        is_p_row = entry_row_pair >= 0
+        is_p_col = entry_col_pair >= 0
+        diag = is_p_row & is_p_col
+        self._diag_pos = np.empty(len(rows), dtype=np.int64)
+        self._diag_pos[entry_row_pair[diag]] = pos[diag]
+        # entries of the eliminated rows in the reduced columns
+        pt = is_p_row & ~is_p_col
+        self._pt_pos = pos[pt]
+        self._pt_pair = entry_row_pair[pt]
+        self._pt_col = col_ndx[entry_cols[pt]]
+        # entries of the reduced rows in the eliminated columns
+        p_only = ~is_p_row & is_p_col
+        self._sp_pos = pos[p_only]
+        self._sp_pair = entry_col_pair[p_only]
+        self._sp_row = row_ndx[entry_rows[p_only]]
+        # entries of the reduced rows in the reduced columns
+        st = ~is_p_row & ~is_p_col
+        st_pos = pos[st]
+        st_keys = row_ndx[entry_rows[st]] * max(num_reduced, 1) + col_ndx[entry_cols[st]]
+
+        # fill-in of the Schur complement: every (sp, pt) combination of the same pair
+        sp_order = np.argsort(self._sp_pair, kind='stable')
+        pt_order = np.argsort(self._pt_pair, kind='stable')
+        sp_counts = np.bincount(self._sp_pair, minlength=len(rows))
+        pt_counts = np.bincount(self._pt_pair, minlength=len(rows))
+        sp_starts = np.concatenate([[0], np.cumsum(sp_counts)[:-1]]).astype(np.int64)
+        pt_starts = np.concatenate([[0], np.cumsum(pt_counts)[:-1]]).astype(np.int64)
+        num_combos = sp_counts * pt_counts
+        combo_pair = np.repeat(np.arange(len(rows)), num_combos)
+        combo_offset = np.arange(num_combos.sum()) - np.repeat(np.cumsum(num_combos) - num_combos, num_combos)
+        combo_sp = sp_order[sp_starts[combo_pair] + combo_offset // np.maximum(pt_counts[combo_pair], 1)]
+        combo_pt = pt_order[pt_starts[combo_pair] + combo_offset % np.maximum(pt_counts[combo_pair], 1)]
+        self._combo_sp_pos = self._sp_pos[combo_sp]
+        self._combo_pt_pos = self._pt_pos[combo_pt]
+        self._combo_pair = combo_pair
+        combo_keys = self._sp_row[combo_sp] * max(num_reduced, 1) + self._pt_col[combo_pt]
+
+        unique_keys, target = np.unique(np.concatenate([st_keys, combo_keys]), return_inverse=True)
+        self._st_pos = st_pos
+        self._target = target
+        self._num_entries = len(unique_keys)
+        self._indices = unique_keys % max(num_reduced, 1)
+        self._indptr = np.searchsorted(unique_keys // max(num_reduced, 1), np.arange(num_reduced + 1))
+
+        self._n = n
+        self._rows = rows
+        self._cols = cols
+        self._reduced_rows = reduced_rows
+        self._reduced_cols = reduced_cols
+        self.num_eliminated = len(rows)
+        self.num_reduced = num_reduced
+
+    def reduce(self, J, r, min_diag=0.0):
+        """
+        Form the reduced system for the step d of J d = -r.
+
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+            A matrix with the sparsity pattern of the layout
+        r: np.ndarray
+        min_diag: float
+            Diagonal entries of the eliminated pairs with an absolute value smaller than min_diag
+            are replaced by min_diag (with the same sign).
+
+        Returns
+        -------
+        A: scipy.sparse.csr_matrix
+            The reduced matrix
+        b: np.ndarray
+            The reduced right hand side
+        diag: np.ndarray
+            The diagonal entries of the eliminated pairs
+        """
+        data = J.data
+        diag = data[self._diag_pos]
+        small = np.abs(diag) < min_diag
+        if small.any():
+            diag = np.where(small, np.where(diag < 0, -min_diag, min_diag), diag)
+        fill = -data[self._combo_sp_pos] * data[self._combo_pt_pos] / diag[self._combo_pair]
+        values = np.bincount(self._target, weights=np.concatenate([data[self._st_pos], fill]),
+                             minlength=self._num_entries)
+        A = sp.csr_matrix((values, self._indices, self._indptr), shape=(self.num_reduced, self.num_reduced))
+        w = r[self._rows] / diag
+        b = -r[self._reduced_rows] + np.bincount(self._sp_row, weights=data[self._sp_pos] * w[self._sp_pair],
+                                                 minlength=self.num_reduced)
+        return A, b, diag
+
+    def expand(self, J, r, diag, y):
+        """
+        Compute the full step from the solution of the reduced system.
+
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+        r: np.ndarray
+        diag: np.ndarray
+            The diagonal returned by :py:meth:`reduce`
+        y: np.ndarray
+            The solution of the reduced system
+
+        Returns
+        -------
+        d: np.ndarray
+        """
+        Jy = np.bincount(self._pt_pair, weights=J.data[self._pt_pos] * y[self._pt_col],
+                         minlength=self.num_eliminated)
+        d = np.empty(self._n)
+        d[self._reduced_cols] = y
+        d[self._cols] = (-r[self._rows] - Jy) / diag
+        return d
+
+
+class GGASolver(NewtonSolver):
+    """
+    Newton solver that computes each step with the Global Gradient Algorithm.
+
+    The Newton system of the hydraulic model is solved by eliminating the link
+    flows (and the demands and leak rates of pressure dependent demand and leak
+    models) with their headloss (demand, leak) constraints, as in the Global
+    Gradient Algorithm of Todini and Pilati used by EPANET. Only the much
+    smaller system in the junction heads is solved, with the linear solver
+    backend of the LINEAR_SOLVER option (sparse LU by default, since the system
+    is not symmetric when PRVs or PSVs are active).
+    Constraints that do not contain the flow of their link (active PRVs and
+    PSVs) are kept in the reduced system together with the flow. The eliminated
+    variables are then updated from the new heads. The steps are the Newton
+    steps of the full system, so the iterations (including the line search) are
+    the same as those of :py:class:`NewtonSolver`.
+
+    The variables to eliminate are given by a partition (see
+    :py:class:`~wntr.sim.hydraulics.GGAPartition`), which caches the
+    :py:class:`EliminationLayout` for each model structure.
+
+    The options of :py:class:`NewtonSolver` are supported except for CHORD.
+    The additional option "MIN_GRADIENT" (GGASolver.min_gradient, default
+    1e-7) is the smallest absolute derivative of an eliminated constraint with
+    respect to its variable (e.g., the headloss gradient of an open valve
+    without minor loss at zero flow); smaller derivatives are replaced by
+    min_gradient.
+
+    Parameters
+    ----------
+    options: dict
+        See :py:class:`NewtonSolver`
+    partition: wntr.sim.hydraulics.GGAPartition
+        The variables to eliminate
+    """
+
+    def __init__(self, options=None, partition=None):
+        super(GGASolver, self).__init__(options)
+        if self.chord:
+            raise ValueError('The CHORD option is not supported by the GGASolver.')
+        if partition is None:
+            raise ValueError('The GGASolver requires a partition of the variables.')
+        self.partition = partition
+        if "MIN_GRADIENT" not in self._options:
+            self.min_gradient = 1e-7
+        else:
+            self.min_gradient = self._options["MIN_GRADIENT"]
+
+    def _solve_linear_system(self, J, r, structure_version, lu_cache):
+        layout = self.partition.get_layout(J, structure_version)
+        A, b, diag = layout.reduce(J, r, self.min_gradient)
+        y = self.linear_solver.solve(A, b, structure_version, lu_cache)
+        return layout.expand(J, r, diag, y)
+
+
+class BlockTriangularForm(object):
+    """
+    Block triangular form of a sparse square matrix.
+
+    The rows are matched with the columns by a maximum bipartite matching so that the matched
+    entries form a zero-free diagonal. The strongly connected components of the graph of the
+    matrix with that diagonal are the diagonal blocks (the Dulmage-Mendelsohn decomposition of a
+    structurally nonsingular matrix), and the blocks are ordered so that the rows of each block
+    only contain columns of the same block or of earlier blocks. Tree-like parts of a hydraulic
+    network (e.g., the flows and heads of dead-end branches) form small blocks before or after
+    the largest block, the core.
+
+    The rows and columns are split into three stages that can be solved one after the other: the
+    blocks before the core, the core, and the blocks after the core. The form only depends on the
+    sparsity pattern of the matrix.
+
+    Parameters
+    ----------
+    J: scipy.sparse.csr_matrix
+        A matrix with the sparsity pattern of the system
+
+    Attributes
+    ----------
+    row_order: np.ndarray of int
+        The rows in block triangular order
+    col_order: np.ndarray of int
+        The columns in block triangular order; col_order[i] is matched with row_order[i]
+    block_ptr: np.ndarray of int
+        Block k consists of positions block_ptr[k] to block_ptr[k+1] of row_order and col_order
+    num_blocks: int
+        The number of diagonal blocks
+    size: int
+        The size of the matrix
+    core: int
+        The index of the largest block
+    core_size: int
+        The size of the largest block
+    stages: list of tuple
+        The (rows, columns) of the nonempty stages, in the order they are solved
+    core_stage: int
+        The index of the stage of the core in :py:attr:`stages` (None for an empty matrix)
+    structure_version: int
+        The structure version of the model the form was computed for (set by
+        :py:meth:`SparseLUCache.get_block_triangular_form`)
+    """
+
+    def __init__(self, J):
+        J = sp.csr_matrix(J)
+        n = J.shape[0]
+        if J.shape[1] != n:
+            raise ValueError('The matrix must be square.')
+        pattern = sp.csr_matrix((np.ones(J.nnz), J.indices, J.indptr), shape=J.shape)
+        match = sp.csgraph.maximum_bipartite_matching(pattern, perm_type='column')
+        if np.any(match < 0):
+            raise ValueError('The matrix is structurally singular.')
+
+        # pair i is (row i, column match[i]); pair i depends on pair j if row i contains column match[j]
+        A = pattern[:, match]
+        num_components, labels = sp.csgraph.connected_components(A, directed=True, connection='strong')
+        A = A.tocoo()
+        dependency = labels[A.col]
+        dependent = labels[A.row]
+        keep = dependency != dependent
+        edges = np.unique(dependency[keep].astype(np.int64) * num_components + dependent[keep])
+        dependency = edges // num_components
+        dependent = edges % num_components
+
+        # order the blocks so that every block comes after the blocks it depends on
+        num_dependencies = np.bincount(dependent, minlength=num_components)
+        successor_ptr = np.searchsorted(dependency, np.arange(num_components + 1))
+        ready = list(np.flatnonzero(num_dependencies == 0)[::-1])
+        block_order = list()
+        while ready:
+            block = ready.pop()
+            block_order.append(block)
+            for successor in dependent[successor_ptr[block]:successor_ptr[block + 1]]:
+                num_dependencies[successor] -= 1
+                if num_dependencies[successor] == 0:
+                    ready.append(successor)
+        position = np.empty(num_components, dtype=np.int64)
+        position[block_order] = np.arange(num_components)
+
+        pairs = np.argsort(position[labels], kind='stable')
+        block_sizes = np.bincount(position[labels], minlength=num_components)
+        self.row_order = pairs
+        self.col_order = match[pairs]
+        self.block_ptr = np.concatenate([[0], np.cumsum(block_sizes)])
+        self.num_blocks = num_components
+        self.size = n
+        self.core = int(np.argmax(block_sizes)) if n > 0 else 0
+        self.core_size = int(block_sizes[self.core]) if n > 0 else 0
+        self.shape = J.shape
+        self.nnz = J.nnz
+        self.structure_version = None
+
+        # index of each entry of J in the CSR block of each stage
+        template = sp.csr_matrix((np.arange(1, J.nnz + 1, dtype=float), J.indices, J.indptr), shape=J.shape)
+        start = self.block_ptr[self.core]
+        end = self.block_ptr[self.core + 1]
+        self.stages = list()
+        self.core_stage = None
+        self._stage_layouts = list()
+        for first, last in [(0, start), (start, end), (end, n)]:
+            if last <= first:
+                continue
+            if first == start:
+                self.core_stage = len(self.stages)
+            rows = self.row_order[first:last]
+            cols = self.col_order[first:last]
+            block = template[rows][:, cols].tocsr()
+            block.sort_indices()
+            self.stages.append((rows, cols))
+            self._stage_layouts.append((block.data.astype(np.int64) - 1, block.indices, block.indptr))
+        self.stage_caches = [SparseLUCache() for stage in self.stages]
+
+    def get_stage_jacobian(self, J, stage):
+        """
+        Get the block of J in the rows and columns of a stage.
+
+        Parameters
+        ----------
+        J: scipy.sparse.csr_matrix
+            A matrix with the sparsity pattern of the form
+        stage: int
+            The index of the stage in :py:attr:`stages`
+
+        Returns
+        -------
+        J_stage: scipy.sparse.csr_matrix
+        """
+        data_ndx, indices, indptr = self._stage_layouts[stage]
+        n = len(self.stages[stage][0])
+        return sp.csr_matrix((J.data[data_ndx], indices, indptr), shape=(n, n))
+
+
+class _StageModel(object):
+    """
+    The rows and columns of one stage of a model in block triangular form. The variables of the
+    other stages are fixed at their values in x, which is shared by the stages and updated in
+    place.
+    """
+    def __init__(self, model, form, stage, x, structure_version):
+        self._model = model
+        self._form = form
+        self._stage = stage
+        self._rows, self._cols = form.stages[stage]
+        self._x = x
+        self.structure_version = structure_version
+
+    def get_x(self):
+        return self._x[self._cols]
+
+    def load_var_values_from_x(self, x):
+        self._x[self._cols] = x
+        self._model.load_var_values_from_x(self._x)
+
+    def evaluate_residuals(self):
+        return self._model.evaluate_residuals()[self._rows]
+
+    def evaluate_jacobian(self, x=None):
+        return self._form.get_stage_jacobian(self._model.evaluate_jacobian(), self._stage)
+
+
+class BlockTriangularSolver(NewtonSolver):
+    """
+    Newton solver that solves a model in block triangular form one stage at a time.
+
+    The block triangular form of the Jacobian (see :py:class:`BlockTriangularForm`) is computed
+    once for each model structure and kept in the :py:class:`SparseLUCache`. The equations of the
+    blocks before the largest block (the core) do not depend on the variables of the core or of
+    later blocks, so they are solved first with Newton's method while the other variables are
+    fixed. The core is then solved with the earlier variables fixed, and finally the blocks after
+    the core. In a hydraulic model with dead-end branches, the branch flows (with demand driven
+    demands) come before the core and the branch heads after it, so the linear systems of the
+    Newton iterations on the core are smaller than those of the whole model. The blocks before
+    and after the core are usually solved in one iteration.
+
+    Each stage has its own :py:class:`SparseLUCache` so that the LU ordering of each stage is
+    reused; the statistics of the stage caches are added to the cache passed to :py:meth:`solve`.
+    The number of iterations is the sum over the stages.
+
+    The options are those of :py:class:`NewtonSolver`; they apply to each stage.
+
+    Parameters
+    ----------
+    options: dict
+        See :py:class:`NewtonSolver`
+    """
+
+    def solve(self, model, ostream=None, lu_cache=None):
+        """
+
+        Parameters
+        ----------
+        model: wntr.aml.Model
+        ostream: file-like object, optional
+            If provided, progress is written to ostream each iteration
+        lu_cache: SparseLUCache, optional
+            Cache used to keep the block triangular form. If None, BlockTriangularSolver.lu_cache
+            is used.
+
+        Returns
+        -------
+        status: SolverStatus
+        message: str
+        iter_count: int
+        """
+        x = model.get_x()
+        if len(x) == 0:
+            return SolverStatus.converged, "No variables or constraints", 0
+        if lu_cache is None:
+            lu_cache = self.lu_cache
+        structure_version = getattr(model, 'structure_version', None)
+        try:
+            form = lu_cache.get_block_triangular_form(model.evaluate_jacobian(), structure_version)
+        except ValueError:
+            return SolverStatus.error, "Jacobian is structurally singular", 0
+
+        iter_count = 0
+        for stage, stage_cache in enumerate(form.stage_caches):
+            counts = [getattr(stage_cache, name) for name in _lu_cache_counters]
+            stage_model = _StageModel(model, form, stage, x, structure_version)
+            status, message, iterations = super(BlockTriangularSolver, self).solve(stage_model, ostream, stage_cache)
+            iter_count += iterations
+            for name, count in zip(_lu_cache_counters, counts):
+                setattr(lu_cache, name, getattr(lu_cache, name) + getattr(stage_cache, name) - count)
+            if stage == form.core_stage:
+                lu_cache.fill_in = stage_cache.fill_in
+            if status != SolverStatus.converged:
+                return status, message, iter_count
+        return SolverStatus.converged, "Solved Successfully", iter_count
+
+
+_lu_cache_counters = ('num_symbolic', 'num_numeric', 'num_reused', 'num_linear_solves', 'linear_solve_time',
+                      'num_krylov_iterations')
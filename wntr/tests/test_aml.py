@@ -41,6 +41,125 @@ class TestModel(unittest.TestCase):
         self.assertEqual(status, SolverStatus.converged)
         self.assertAlmostEqual(m.x.value, 4)
 
+    def test_structure_version(self):
+        m = aml.Model()
+        m.x = aml.Var(1)
+        m.y = aml.Var(1)
+        m.p = aml.Param(val=2)
+        m.c1 = aml.Constraint(m.x - m.p)
+        m.c2 = aml.Constraint(m.x * m.y - m.p)
+        self.assertIsNone(m.structure_version)
+        m.set_structure()
+        v1 = m.structure_version
+        self.assertIsNotNone(v1)
+        m.p.value = 3
+        m.set_structure()
+        self.assertEqual(m.structure_version, v1)
+        del m.c2
+        self.assertIsNone(m.structure_version)
+        m.c2 = aml.Constraint(m.x + m.y - m.p)
+        m.set_structure()
+        self.assertNotEqual(m.structure_version, v1)
+
+    def test_incremental_structure(self):
+        m = aml.Model()
+        m.x = aml.Var(2.0)
+        m.y = aml.Var(3.0)
+        m.z = aml.Var(4.0)
+        m.w = aml.Var(5.0)
+        m.c1 = aml.Constraint(m.x + m.y)
+        m.c2 = aml.Constraint(m.x * m.y)
+        m.c3 = aml.Constraint(m.z ** 2)
+        m.c4 = aml.Constraint(m.w - 1)
+        m.set_structure()
+        self.assertEqual(m.num_full_restructures, 1)
+        self.assertEqual(m.num_incremental_restructures, 0)
+        con_ndx = {c.name: c.index for c in m.cons()}
+        var_ndx = {v.name: v.index for v in m.vars()}
+
+        # replace a constraint with a conditional one
+        del m.c3
+        e = aml.ConditionalExpression()
+        e.add_condition(aml.inequality(body=m.z, ub=1), m.z)
+        e.add_final_expr(m.z ** 3)
+        m.c3 = aml.Constraint(e)
+        m.set_structure()
+        self.assertEqual(m.num_full_restructures, 1)
+        self.assertEqual(m.num_incremental_restructures, 1)
+        self.assertEqual({c.name: c.index for c in m.cons()}, con_ndx)
+        self.assertEqual({v.name: v.index for v in m.vars()}, var_ndx)
+        r = m.evaluate_residuals()
+        j = m.evaluate_jacobian().toarray()
+        self.assertEqual(r[m.c3.index], 64.0)
+        self.assertEqual(j[m.c3.index, m.z.index], 48.0)
+
+        # nothing changed
+        m.set_structure()
+        self.assertEqual(m.num_incremental_restructures, 1)
+
+        # removing a variable and a constraint keeps the model compact
+        del m.c1
+        del m.z
+        del m.c3
+        m.c3 = aml.Constraint(m.y - 1)
+        m.set_structure()
+        self.assertEqual(m.num_incremental_restructures, 2)
+        self.assertEqual(sorted(c.index for c in m.cons()), [0, 1, 2])
+        self.assertEqual(sorted(v.index for v in m.vars()), [0, 1, 2])
+        r = m.evaluate_residuals()
+        j = m.evaluate_jacobian().toarray()
+        self.assertEqual(j.shape, (3, 3))
+        self.assertEqual(r[m.c3.index], 2.0)
+        self.assertEqual(j[m.c2.index, m.x.index], 3.0)
+
+        # compare with a structure built from scratch
+        m.set_structure(incremental=False)
+        self.assertEqual(m.num_full_restructures, 2)
+        self.assertTrue(np.array_equal(np.sort(m.evaluate_residuals()), np.sort(r)))
+
+    def test_load_structure(self):
+        def build():
+            m = aml.Model()
+            m.x = aml.Var(2.0)
+            m.y = aml.Var(3.0)
+            m.z = aml.Var(4.0)
+            m.c1 = aml.Constraint(m.x + m.y)
+            m.c2 = aml.Constraint(m.x * m.y)
+            m.c3 = aml.Constraint(m.z ** 2)
+            return m
+
+        m1 = build()
+        m1.set_structure()
+        # the structure follows the order in which constraints were added
+        self.assertEqual([c.index for c in [m1.c1, m1.c2, m1.c3]], [0, 1, 2])
+        del m1.c1
+        m1.c1 = aml.Constraint(m1.x - m1.y)
+        m1.set_structure()
+        structure = m1.get_structure()
+
+        m2 = build()
+        del m2.c1
+        m2.c1 = aml.Constraint(m2.x - m2.y)
+        m2.load_structure(structure)
+        self.assertEqual({c.name: c.index for c in m2.cons()}, {c.name: c.index for c in m1.cons()})
+        self.assertEqual({v.name: v.index for v in m2.vars()}, {v.name: v.index for v in m1.vars()})
+        self.assertTrue(np.array_equal(m1.evaluate_residuals(), m2.evaluate_residuals()))
+
+        # later changes are ordered the same way in both models
+        for m in [m1, m2]:
+            del m.c2
+            del m.c3
+            m.c3 = aml.Constraint(m.z ** 3)
+            m.c2 = aml.Constraint(m.x * m.y * m.z)
+            m.set_structure()
+        self.assertEqual({c.name: c.index for c in m2.cons()}, {c.name: c.index for c in m1.cons()})
+
+        m3 = build()
+        m3.w = aml.Var(1.0)
+        m3.c4 = aml.Constraint(m3.w - 1)
+        with self.assertRaises(ValueError):
+            m3.load_structure(m1.get_structure())
+
 
 class TestExpression(unittest.TestCase):
     def test_add(self):
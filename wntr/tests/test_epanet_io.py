@@ -739,6 +739,156 @@ class TestNet3InpUnitsResults(unittest.TestCase):
         with self.assertRaises(NotImplementedError):
             results = sim.run_sim()
         
-            
+
+
+class TestLazyBinFile(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        import tempfile
+
+        import wntr
+
+        self.wntr = wntr
+        self.tmpdir = tempfile.TemporaryDirectory()
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+        wn.options.quality.parameter = "CHEMICAL"
+        self.binfile = join(self.tmpdir.name, "lazy.bin")
+        wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=join(self.tmpdir.name, "lazy"))
+        self.expected = wntr.epanet.io.BinFile().read(self.binfile)
+
+    @classmethod
+    def tearDownClass(self):
+        self.tmpdir.cleanup()
+
+    def test_read(self):
+        with self.wntr.epanet.io.LazyBinFile(self.binfile) as binfile:
+            results = binfile.read()
+        self.assertIsNone(results.error_code)
+        for key in ["node", "link"]:
+            expected = getattr(self.expected, key)
+            self.assertEqual(set(getattr(results, key).keys()), set(expected.keys()))
+            for attribute, df in getattr(results, key).items():
+                self.assertTrue(df.equals(expected[attribute]), attribute)
+
+    def test_selection(self):
+        import numpy as np
+
+        with self.wntr.epanet.io.LazyBinFile(self.binfile) as binfile:
+            names = binfile.node_names[10:20]
+            values = binfile.node_values("pressure", names=names, start=3600, end=7200, convert=False)
+            self.assertIsInstance(values, np.memmap)
+            self.assertEqual(values.shape, (2, 10))
+            expected = self.expected.node["pressure"].loc[3600:7200, names]
+            values = self.wntr.epanet.util.HydParam.Pressure._to_si(binfile.flow_units, values)
+            self.assertTrue(np.array_equal(values, expected.values))
+
+            names = ["20", "10", "335"]
+            values = binfile.link_values("setting", names=names, start=24 * 3600)
+            expected = self.expected.link["setting"].loc[24 * 3600:, names]
+            self.assertTrue(np.array_equal(values, expected.values))
+
+            results = binfile.read(node_attributes=["head"], link_attributes=[], nodes=["10", "15"], end=0)
+            self.assertEqual(list(results.node.keys()), ["head"])
+            self.assertEqual(results.link, dict())
+            self.assertTrue(results.node["head"].equals(self.expected.node["head"].loc[0:0, ["10", "15"]]))
+            with self.assertRaises(ValueError):
+                binfile.node_values("flowrate")
+
+    def test_incomplete(self):
+        import os
+        import shutil
+        import warnings
+
+        binfile = join(self.tmpdir.name, "incomplete.bin")
+        shutil.copy(self.binfile, binfile)
+        with open(binfile, "r+b") as f:
+            f.truncate(os.path.getsize(binfile) // 2)
+        with self.assertRaises(RuntimeError):
+            self.wntr.epanet.io.LazyBinFile(binfile, convergence_error=True)
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            reader = self.wntr.epanet.io.LazyBinFile(binfile)
+        self.assertIn("did not converge", str(w[-1].message))
+        results = reader.read()
+        reader.close()
+        num_periods = len(results.node["head"].index)
+        self.assertGreater(num_periods, 0)
+        self.assertLess(num_periods, len(self.expected.node["head"].index))
+        self.assertEqual(results.error_code, self.wntr.sim.results.ResultsStatus.error)
+        self.assertTrue(results.node["head"].equals(self.expected.node["head"].iloc[:num_periods]))
+
+    def test_read_periods(self):
+        import numpy as np
+
+        reader = self.wntr.epanet.io.BinFile()
+        times = []
+        for t, nodes, links in reader.read_periods(self.binfile):
+            times.append(t)
+            self.assertEqual(set(nodes.keys()), set(self.expected.node.keys()))
+            self.assertEqual(set(links.keys()), set(self.expected.link.keys()))
+            for attribute, values in nodes.items():
+                self.assertTrue(np.array_equal(values, self.expected.node[attribute].loc[t].values), attribute)
+            for attribute, values in links.items():
+                self.assertTrue(np.array_equal(values, self.expected.link[attribute].loc[t].values), attribute)
+        self.assertEqual(times, list(self.expected.node["head"].index))
+        self.assertIsNone(reader.results.error_code)
+        self.assertEqual(list(reader.node_names), list(self.expected.node["head"].columns))
+
+        t, nodes, links = next(reader.read_periods(self.binfile, convert=False, node_attributes=["pressure"],
+                                                   link_attributes=[]))
+        self.assertEqual(list(nodes.keys()), ["pressure"])
+        self.assertEqual(links, dict())
+        values = self.wntr.epanet.util.HydParam.Pressure._to_si(reader.flow_units, nodes["pressure"])
+        self.assertTrue(np.array_equal(values, self.expected.node["pressure"].loc[t].values))
+        with self.assertRaises(ValueError):
+            next(reader.read_periods(self.binfile, node_attributes=["flowrate"]))
+
+    def test_read_periods_incomplete(self):
+        import os
+        import shutil
+        import warnings
+
+        binfile = join(self.tmpdir.name, "incomplete_periods.bin")
+        shutil.copy(self.binfile, binfile)
+        with open(binfile, "r+b") as f:
+            f.truncate(os.path.getsize(binfile) // 2)
+        reader = self.wntr.epanet.io.BinFile()
+        with self.assertRaises(RuntimeError):
+            list(reader.read_periods(binfile, convergence_error=True))
+        with warnings.catch_warnings(record=True) as w:
+            warnings.simplefilter("always")
+            times = [t for t, nodes, links in reader.read_periods(binfile)]
+        self.assertIn("did not converge", str(w[-1].message))
+        self.assertGreater(len(times), 0)
+        self.assertEqual(times, list(self.expected.node["head"].index[:len(times)]))
+        self.assertEqual(reader.results.error_code, self.wntr.sim.results.ResultsStatus.error)
+
+    def test_read_periods_follow(self):
+        import threading
+        import time
+
+        # write the file in blocks while it is read, as EPANET does
+        binfile = join(self.tmpdir.name, "follow.bin")
+        with open(self.binfile, "rb") as f:
+            data = f.read()
+
+        def write():
+            with open(binfile, "wb") as f:
+                for i in range(0, len(data), 4096):
+                    f.write(data[i:i + 4096])
+                    f.flush()
+                    time.sleep(0.001)
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        reader = self.wntr.epanet.io.BinFile()
+        try:
+            times = [t for t, nodes, links in reader.read_periods(binfile, timeout=10, poll_interval=0.001)]
+        finally:
+            writer.join()
+        self.assertEqual(times, list(self.expected.node["head"].index))
+        self.assertIsNone(reader.results.error_code)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,176 @@
+import tempfile
+import unittest
+from os.path import abspath, dirname, exists, join
+
+import numpy as np
+import wntr
+from wntr.epanet.project import EpanetSession
+from wntr.network import LinkStatus
+from wntr.network.controls import Control, ControlAction, SimTimeCondition, ValueCondition
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def get_network(name="Net3", hours=24):
+    wn = wntr.network.WaterNetworkModel(join(ex_datadir, name + ".inp"))
+    wn.options.time.duration = hours * 3600
+    return wn
+
+
+class TestProjectReuse(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.prefix = join(self.tmpdir.name, "reuse")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_same_results(self, sim, wn):
+        results = sim.run_sim(file_prefix=self.prefix, reuse_project=True)
+        expected = wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=join(self.tmpdir.name, "fresh"))
+        for key in ["head", "demand", "pressure"]:
+            self.assertLess(np.abs(results.node[key].values - expected.node[key].values).max(), 1e-3)
+        for key in ["flowrate", "status"]:
+            self.assertLess(np.abs(results.link[key].values - expected.link[key].values).max(), 1e-3)
+
+    def test_updates(self):
+        wn = get_network()
+        sim = wntr.sim.EpanetSimulator(wn)
+        self.assert_same_results(sim, wn)
+        project = sim._project
+
+        wn.get_link("177").initial_status = LinkStatus.Closed
+        self.assert_same_results(sim, wn)
+        self.assertEqual(sim._project_updater.num_changes, 1)
+
+        node = wn.get_node("197")
+        node.add_fire_fighting_demand(wn, 0.252, 10 * 3600, 20 * 3600)
+        self.assert_same_results(sim, wn)
+        node.remove_fire_fighting_demand(wn)
+        wn.get_link("177").initial_status = LinkStatus.Open
+        self.assert_same_results(sim, wn)
+
+        pipe = wn.get_link("20")
+        pipe.diameter *= 0.8
+        pipe.roughness = 90.0
+        wn.get_node("10").elevation += 5.0
+        tank = wn.get_node("1")
+        tank.init_level += 1.0
+        tank.max_level += 1.0
+        wn.get_node("River").base_head += 2.0
+        wn.get_pattern("1").multipliers[3] *= 1.5
+        pump = wn.get_link("335")
+        pump.speed_timeseries.base_value = 0.9
+        pump.initial_setting = 0.9
+        self.assert_same_results(sim, wn)
+        self.assertEqual(sim._project_updater.num_changes, 6)
+
+        action = ControlAction(wn.get_link("177"), "status", LinkStatus.Closed)
+        wn.add_control("close", Control(SimTimeCondition(wn, "=", "12:00:00"), action))
+        action = ControlAction(wn.get_link("20"), "status", LinkStatus.Closed)
+        wn.add_control("level", Control(ValueCondition(wn.get_node("1"), "level", "<", 5.0), action))
+        self.assert_same_results(sim, wn)
+        wn.remove_control("close")
+        wn.options.time.duration = 12 * 3600
+        self.assert_same_results(sim, wn)
+        self.assertIs(sim._project, project)
+        sim.close_project()
+        self.assertIsNone(sim._project)
+
+    def test_reload(self):
+        wn = get_network()
+        sim = wntr.sim.EpanetSimulator(wn)
+        sim.run_sim(file_prefix=self.prefix, reuse_project=True)
+        project = sim._project
+        wn.options.hydraulic.demand_model = "PDD"
+        self.assert_same_results(sim, wn)
+        self.assertIsNot(sim._project, project)
+        project = sim._project
+        wn.add_junction("new", elevation=10.0)
+        wn.add_pipe("new", "new", "10", length=100.0, diameter=0.3)
+        self.assert_same_results(sim, wn)
+        self.assertIsNot(sim._project, project)
+        sim.close_project()
+
+    def test_valves(self):
+        wn = get_network("Net6", hours=4)
+        sim = wntr.sim.EpanetSimulator(wn)
+        sim.run_sim(file_prefix=self.prefix, reuse_project=True)
+        for name in wn.valve_name_list:
+            wn.get_link(name).initial_setting *= 0.7
+        self.assert_same_results(sim, wn)
+        self.assertEqual(sim._project_updater.num_changes, len(wn.valve_name_list))
+        sim.close_project()
+
+    def test_save_inp(self):
+        wn = get_network()
+        sim = wntr.sim.EpanetSimulator(wn)
+        sim.run_sim(file_prefix=self.prefix, reuse_project=True)
+        self.assertFalse(exists(self.prefix + ".inp"))
+        wn.get_link("177").initial_status = LinkStatus.Closed
+        sim.run_sim(file_prefix=self.prefix, reuse_project=True, save_inp=True)
+        sim.close_project()
+        wn2 = wntr.network.WaterNetworkModel(self.prefix + ".inp")
+        self.assertEqual(wn2.get_link("177").initial_status, LinkStatus.Closed)
+
+
+class TestEpanetSession(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def assert_same_results(self, results, wn):
+        expected = wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=join(self.tmpdir.name, "fresh"))
+        self.assertEqual(list(results.node["head"].index), list(expected.node["head"].index))
+        self.assertEqual(list(results.link["flowrate"].columns), list(expected.link["flowrate"].columns))
+        for key in ["head", "demand", "pressure"]:
+            self.assertLess(np.abs(results.node[key].values - expected.node[key].values).max(), 1e-3)
+        for key in ["flowrate", "velocity"]:
+            self.assertLess(np.abs(results.link[key].values - expected.link[key].values).max(), 1e-3)
+        status = expected.link["status"].values.copy()
+        status[status == LinkStatus.Active] = LinkStatus.Open
+        self.assertTrue((results.link["status"].values == status).all())
+
+    def test_scenarios(self):
+        wn = get_network()
+        with EpanetSession(wn) as session:
+            baseline = session.solve()
+            self.assert_same_results(baseline, wn)
+
+            pipe = wn.get_link("177")
+            pipe.initial_status = LinkStatus.Closed
+            self.assert_same_results(session.solve(wn), wn)
+            pipe.initial_status = LinkStatus.Open
+            session.reset()
+            results = session.solve()
+            self.assertLess(np.abs(results.node["pressure"].values - baseline.node["pressure"].values).max(), 1e-6)
+
+            node = wn.get_node("197")
+            node.add_fire_fighting_demand(wn, 0.252, 10 * 3600, 20 * 3600)
+            self.assertEqual(session.apply(wn), 2)
+            self.assert_same_results(session.solve(), wn)
+            node.remove_fire_fighting_demand(wn)
+            session.reset()
+            self.assertEqual(session.apply(wn), 0)
+
+            wn.add_junction("new", elevation=10.0)
+            with self.assertRaises(ValueError):
+                session.apply(wn)
+        self.assertIsNone(session._en)
+
+    def test_attributes(self):
+        wn = get_network(hours=0)
+        with EpanetSession(wn, node_attributes=["pressure"], link_attributes=[]) as session:
+            results = session.solve()
+        self.assertEqual(list(results.node.keys()), ["pressure"])
+        self.assertEqual(results.link, dict())
+        self.assertEqual(list(results.node["pressure"].index), [0])
+        with self.assertRaises(ValueError):
+            EpanetSession(wn, node_attributes=["quality"])
+
+
+if __name__ == "__main__":
+    unittest.main()
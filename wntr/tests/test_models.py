@@ -9,6 +9,8 @@ from wntr.sim.models.utils import ModelUpdater
 
 testdir = dirname(abspath(str(__file__)))
 test_data_dir = join(testdir, "data_for_testing")
+test_datadir = join(testdir, "networks_for_testing")
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
 
 
 def compare_floats(a, b, tol=1e-5, rel_tol=1e-3):
@@ -381,5 +383,97 @@ class TestPDD(unittest.TestCase):
             self.assertAlmostEqual(der1, der3, 6)
 
 
+class TestParamSchedule(unittest.TestCase):
+    def test_matches_patterns(self):
+        for interpolation, pattern_start in [(False, 0), (True, 3 * 3600 + 600)]:
+            wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+            wn.options.time.pattern_interpolation = interpolation
+            wn.options.time.pattern_start = pattern_start
+            wn.options.hydraulic.demand_multiplier = 1.3
+            junction = wn.get_node(wn.junction_name_list[3])
+            junction.demand_timeseries_list.append((0.01, "1", "fire"))
+            m1, updater1 = wntr.sim.hydraulics.create_hydraulic_model(wn)
+            m2, updater2 = wntr.sim.hydraulics.create_hydraulic_model(wn)
+            schedule = wntr.sim.models.param.ParamSchedule(wn, 0, 24 * 3600)
+            for t in list(range(0, 24 * 3600 + 1, 1800)) + [1234, 5000.5, 30 * 3600]:
+                wn.sim_time = t
+                schedule.update(m1, wn)
+                wntr.sim.models.param.source_head_param(m2, wn)
+                wntr.sim.models.param.expected_demand_param(m2, wn)
+                for name in wn.junction_name_list:
+                    self.assertAlmostEqual(m1.expected_demand[name].value, m2.expected_demand[name].value, 12)
+                for name in wn.tank_name_list + wn.reservoir_name_list:
+                    self.assertAlmostEqual(m1.source_head[name].value, m2.source_head[name].value, 12)
+
+
+class TestVectorizedHydraulicModel(unittest.TestCase):
+    def compare_evaluators(self, wn, perturbation=0.5):
+        from wntr.sim.models.vectorized import VectorizedHydraulicModel
+
+        m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn)
+        vm = VectorizedHydraulicModel(m, wn)
+        vm.set_structure()
+        np.random.seed(0)
+        x = vm.get_x() + perturbation * np.random.randn(len(vm.get_x()))
+        vm.load_var_values_from_x(x)
+        vm.store_var_values()
+        rows = [con.index for con in vm._constraints]
+        cols = [var.index for var in vm._vars]
+        r1 = m.evaluate_residuals()[rows]
+        r2 = vm.evaluate_residuals()
+        J1 = m.evaluate_jacobian().toarray()[np.ix_(rows, cols)]
+        J2 = vm.evaluate_jacobian().toarray()
+        self.assertEqual(len(rows), len(set(rows)))
+        self.assertEqual(len(cols), len(set(cols)))
+        self.assertLess(np.abs(r1 - r2).max(), 1e-8 * max(1.0, np.abs(r1).max()))
+        self.assertLess(np.abs(J1 - J2).max(), 1e-8 * max(1.0, np.abs(J1).max()))
+
+    def test_residuals_and_jacobian(self):
+        for inp_file in [join(ex_datadir, "Net3.inp"), join(ex_datadir, "Net6.inp"),
+                         join(test_datadir, "Anytown.inp"),
+                         join(test_datadir, "prv_open_no_upstream_sources.inp"),
+                         join(test_datadir, "psv_open_no_downstream_sources.inp"),
+                         join(test_datadir, "fcv_open_no_upstream_sources.inp")]:
+            for mode in ["DD", "PDD"]:
+                wn = wntr.network.WaterNetworkModel(inp_file)
+                wn.options.hydraulic.demand_model = mode
+                self.compare_evaluators(wn)
+
+    def test_closed_links_leaks_and_valve_status(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net6.inp"))
+        wn.options.hydraulic.demand_model = "PDD"
+        wn.get_link(wn.pipe_name_list[10]).initial_status = "Closed"
+        wn.get_link(wn.pump_name_list[0]).initial_status = "Closed"
+        for valve_name, valve in wn.valves():
+            valve._internal_status = wntr.network.LinkStatus.Active
+        junction = wn.get_node(wn.junction_name_list[5])
+        junction.add_leak(wn, area=0.01, start_time=0)
+        junction._leak_status = True
+        self.compare_evaluators(wn, perturbation=0.1)
+
+    def test_simulation(self):
+        for mode in ["DD", "PDD"]:
+            wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+            wn.options.hydraulic.demand_model = mode
+            wn.options.time.duration = 12 * 3600
+            res1 = wntr.sim.WNTRSimulator(wn).run_sim()
+            wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+            wn.options.hydraulic.demand_model = mode
+            wn.options.time.duration = 12 * 3600
+            res2 = wntr.sim.WNTRSimulator(wn).run_sim(evaluator="vectorized")
+            self.assertEqual(list(res1.time), list(res2.time))
+            self.assertLess((res1.node["head"] - res2.node["head"]).abs().max().max(), 1e-6)
+            self.assertLess((res1.link["flowrate"] - res2.link["flowrate"]).abs().max().max(), 1e-8)
+
+    def test_not_supported(self):
+        from wntr.sim.models.vectorized import VectorizedHydraulicModel
+
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net1.inp"))
+        m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn, HW_approx="piecewise")
+        self.assertRaises(NotImplementedError, VectorizedHydraulicModel, m, wn)
+        sim = wntr.sim.WNTRSimulator(wn)
+        self.assertRaises(ValueError, sim.run_sim, evaluator="numba")
+
+
 if __name__ == "__main__":
     unittest.main()
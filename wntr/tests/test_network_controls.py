@@ -825,5 +825,98 @@ class TestControlParsing(unittest.TestCase):
         self.assertEqual(control._condition._relation, self.wntr.network.controls.Comparison.lt)
 
 
+class TestControlIndex(unittest.TestCase):
+    def get_controls(self, wn):
+        from wntr.network.controls import Comparison, Control, ControlAction, Rule, SimTimeCondition, \
+            TimeOfDayCondition, ValueCondition
+        pipe = wn.get_link("p1")
+        junction = wn.get_node("j1")
+        tank = wn.get_node("t1")
+        action = ControlAction(pipe, "status", wntr.network.LinkStatus.Open)
+        controls = []
+        for i, threshold in enumerate([10.0, 20.0, 20.0, 30.0]):
+            relation = [Comparison.lt, Comparison.ge, Comparison.eq, Comparison.gt][i]
+            controls.append(Control(ValueCondition(junction, "pressure", relation, threshold), action))
+        for threshold in [5.0, 6.0, 7.0]:
+            controls.append(Control(ValueCondition(tank, "level", Comparison.le, threshold), action))
+            controls.append(Control(ValueCondition(tank, "level", Comparison.ge, threshold), action))
+        for t in [3600, 7200, 7200, 10800]:
+            controls.append(Control(SimTimeCondition(wn, None, t), action))
+        for t, repeat in [("01:00:00", True), ("04:30:00", True), ("13:00:00", True), ("03:00:00", False)]:
+            controls.append(Control(TimeOfDayCondition(wn, None, t, repeat=repeat), action))
+        controls.append(Rule(ValueCondition(junction, "pressure", Comparison.gt, 15.0), [action], [action]))
+        return controls
+
+    def test_checker(self):
+        import numpy as np
+        wn = wntr.network.WaterNetworkModel()
+        wn.add_reservoir("r1", base_head=50)
+        wn.add_junction("j1", base_demand=0.01)
+        wn.add_tank("t1", elevation=10.0, init_level=6.0, min_level=0.0, max_level=12.0)
+        wn.add_pipe("p1", "r1", "j1")
+        wn.add_pipe("p2", "j1", "t1")
+        junction = wn.get_node("j1")
+        tank = wn.get_node("t1")
+        tank._demand = 0.01
+
+        checkers = []
+        for indexed in [False, True]:
+            checker = wntr.network.ControlChecker(indexed)
+            controls = self.get_controls(wn)
+            for control in controls:
+                checker.register_control(control)
+            checkers.append((checker, controls))
+
+        rng = np.random.default_rng(0)
+        wn._prev_sim_time = -1
+        wn.sim_time = 0
+        for step in range(400):
+            junction._pressure = float(rng.choice([9.0, 10.0, 15.0, 20.0, 25.0, 30.0, 35.0]))
+            tank._head = tank.elevation + float(rng.uniform(4.0, 8.0))
+            if step % 5 == 0:
+                wn._prev_sim_time = wn.sim_time
+                wn.sim_time += 1800
+            elif step % 37 == 0:
+                # backtrack within the timestep
+                wn.sim_time -= 900
+            results = []
+            for checker, controls in checkers:
+                results.append([(controls.index(c), back) for c, back in checker.check()])
+            self.assertEqual(results[0], results[1])
+
+    def test_simulation(self):
+        import numpy as np
+        from wntr.network.controls import Comparison, Control, ControlAction
+
+        def build_network():
+            wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+            wn.options.time.duration = 48 * 3600
+            rng = np.random.default_rng(1)
+            pipes = wn.pipe_name_list
+            junctions = wn.junction_name_list
+            for i in range(200):
+                pipe = wn.get_link(pipes[rng.integers(len(pipes))])
+                status = [wntr.network.LinkStatus.Open, wntr.network.LinkStatus.Closed][i % 2]
+                t = int(rng.integers(1, 48)) * 1800
+                wn.add_control("t{0}".format(i), Control._time_control(wn, t, "SIM_TIME", False,
+                                                                       ControlAction(pipe, "status", status)))
+                t = int(rng.integers(1, 48)) * 1800
+                wn.add_control("c{0}".format(i), Control._time_control(wn, t, "CLOCK_TIME", i % 3 > 0,
+                                                                       ControlAction(pipe, "status", status)))
+                junction = wn.get_node(junctions[rng.integers(len(junctions))])
+                wn.add_control("v{0}".format(i), Control._conditional_control(
+                    junction, "pressure", Comparison.lt, float(rng.uniform(20, 60)),
+                    ControlAction(pipe, "status", wntr.network.LinkStatus.Open)))
+            return wn
+
+        results1 = wntr.sim.WNTRSimulator(build_network()).run_sim(index_controls=False)
+        results2 = wntr.sim.WNTRSimulator(build_network()).run_sim(index_controls=True)
+        self.assertEqual(results1.time, results2.time)
+        for key in ["head", "demand"]:
+            self.assertTrue((results1.node[key] == results2.node[key]).all().all())
+        for key in ["flowrate", "status"]:
+            self.assertTrue((results1.link[key] == results2.link[key]).all().all())
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from os.path import abspath, dirname, join
+
+import numpy as np
+import scipy.sparse as sp
+import wntr
+from wntr.sim.solvers import SparseLUCache
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def run_single(inp_file, scenario):
+    wn = wntr.network.WaterNetworkModel(inp_file)
+    wn.options.time.duration = 0
+    if len(scenario.get("demand", {})) > 0:
+        wn.add_pattern("constant", [1.0])
+    for name, value in scenario.get("demand", {}).items():
+        junction = wn.get_node(name)
+        junction.demand_timeseries_list.clear()
+        junction.demand_timeseries_list.append((value, "constant"))
+    for name, value in scenario.get("head", {}).items():
+        wn.get_node(name).base_head = value
+    for name, status in scenario.get("status", {}).items():
+        wn.get_link(name).initial_status = status
+    for name, attrs in scenario.get("links", {}).items():
+        for attr, value in attrs.items():
+            setattr(wn.get_link(name), attr, value)
+    sim = wntr.sim.WNTRSimulator(wn)
+    return sim.run_sim()
+
+
+class TestBlockDiagonalFactorization(unittest.TestCase):
+    def test_factorize_block_diagonal(self):
+        np.random.seed(0)
+        A = (sp.random(30, 30, density=0.1, format="csr") + 4 * sp.eye(30)).tocsr()
+        B = A.copy()
+        B.data = 2.0 * B.data + 0.5
+        cache = SparseLUCache()
+        b = np.random.rand(90)
+        x = cache.factorize_block_diagonal([A, B, A], structure_version=1).solve(b)
+        self.assertAlmostEqual(np.abs(sp.block_diag([A, B, A]) @ x - b).max(), 0, 12)
+        cache.factorize_block_diagonal([B, A, B], structure_version=1)
+        self.assertEqual(cache.num_symbolic, 1)
+        self.assertEqual(cache.num_numeric, 2)
+
+
+class TestBatchWNTRSimulator(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.inp_file = join(ex_datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(cls.inp_file)
+        wn.options.time.duration = 0
+        rng = np.random.RandomState(0)
+        cls.scenarios = [
+            {},
+            {"demand": {"15": 0.02, "35": 0.01}},
+            {"links": {"20": {"roughness": 90.0}, "40": {"diameter": 0.5}}},
+            {"head": {"River": wn.get_node("River").base_head + 3.0}},
+            {"status": {"101": "Closed"}},
+            {"status": {"101": "Closed"}, "demand": {"15": 0.03}},
+        ]
+        for i in range(4):
+            demand = dict()
+            for name in wn.junction_name_list[:20]:
+                base = wn.get_node(name).demand_timeseries_list.at(0)
+                demand[name] = base * rng.uniform(0.5, 1.5)
+            cls.scenarios.append({"demand": demand})
+        cls.results = wntr.sim.BatchWNTRSimulator(wn).run_sim(cls.scenarios)
+        cls.wn = wn
+
+    def test_results_match_individual_simulations(self):
+        self.assertEqual(len(self.results), len(self.scenarios))
+        for scenario, results in zip(self.scenarios, self.results):
+            expected = run_single(self.inp_file, scenario)
+            self.assertEqual(list(results.time), [0])
+            for key in ["head", "demand", "pressure"]:
+                diff = (results.node[key] - expected.node[key]).abs().max().max()
+                self.assertLess(diff, 1e-4)
+            diff = (results.link["flowrate"] - expected.link["flowrate"]).abs().max().max()
+            self.assertLess(diff, 1e-6)
+            self.assertTrue((results.link["status"] == expected.link["status"]).all().all())
+
+    def test_scenarios_share_factorizations(self):
+        batch_size = [int(res.solver_statistics["batch_size"].iloc[0]) for res in self.results]
+        self.assertEqual(batch_size, [8, 8, 8, 8, 2, 2, 8, 8, 8, 8])
+        lu_symbolic = [int(res.solver_statistics["lu_symbolic"].iloc[0]) for res in self.results]
+        self.assertLessEqual(sum(lu_symbolic[:4]), 4)
+
+    def test_network_is_restored(self):
+        wn = wntr.network.WaterNetworkModel(self.inp_file)
+        self.assertEqual(self.wn.sim_time, 0)
+        self.assertEqual(self.wn.get_link("101").initial_status, wn.get_link("101").initial_status)
+        self.assertEqual(self.wn.get_link("20").roughness, wn.get_link("20").roughness)
+        self.assertEqual(self.wn.get_node("River").base_head, wn.get_node("River").base_head)
+
+    def test_invalid_scenarios(self):
+        wn = wntr.network.WaterNetworkModel(self.inp_file)
+        sim = wntr.sim.BatchWNTRSimulator(wn)
+        self.assertRaises(ValueError, sim.run_sim, [{}])
+        wn.options.time.duration = 0
+        self.assertRaises(ValueError, sim.run_sim, [{"pattern": {}}])
+        self.assertRaises(ValueError, sim.run_sim, [None])
+        self.assertRaises(ValueError, sim.run_sim, [{"demand": {"River": 1.0}}])
+        self.assertRaises(ValueError, sim.run_sim, [{"links": {"20": {"name": "x"}}}])
+        wn.sim_time = 3600
+        self.assertRaises(ValueError, sim.run_sim, [{}])
+
+
+if __name__ == "__main__":
+    unittest.main()
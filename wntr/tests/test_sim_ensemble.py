@@ -0,0 +1,79 @@
+import functools
+import os
+import tempfile
+import unittest
+from os.path import abspath, dirname, join
+
+import numpy as np
+import wntr
+from wntr.network import LinkStatus
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def add_fire_flow(wn, name, demand):
+    wn.get_node(name).add_fire_fighting_demand(wn, demand, 6 * 3600, 12 * 3600)
+
+
+class TestEnsembleEpanetSimulator(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+        self.wn.options.time.duration = 24 * 3600
+        self.scenarios = [None, {"status": {"177": "Closed"}}, {"links": {"20": {"diameter": 0.5}}},
+                          functools.partial(add_fire_flow, name="197", demand=0.1), {"status": {"10": LinkStatus.Closed}}]
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.expected = []
+        for i, scenario in enumerate(self.scenarios):
+            wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+            wn.options.time.duration = 24 * 3600
+            if scenario is not None:
+                wntr.sim.scenarios.apply_scenario(wn, scenario, initial=True)
+            self.expected.append(wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=join(self.tmpdir.name, str(i))))
+
+    @classmethod
+    def tearDownClass(self):
+        self.tmpdir.cleanup()
+
+    def assert_same_results(self, results, expected):
+        for key in ["head", "demand", "pressure"]:
+            self.assertLess(np.abs(results.node[key].values - expected.node[key].values).max(), 1e-3)
+        self.assertLess(np.abs(results.link["flowrate"].values - expected.link["flowrate"].values).max(), 1e-3)
+
+    def test_serial(self):
+        scratch = tempfile.TemporaryDirectory()
+        sim = wntr.sim.EnsembleEpanetSimulator(self.wn)
+        results = sim.run_ensemble(self.scenarios, scratch_dir=scratch.name)
+        for res, expected in zip(results, self.expected):
+            self.assert_same_results(res, expected)
+        self.assertEqual(os.listdir(scratch.name), [])
+        results = sim.run_ensemble(self.scenarios[:2], reuse_project=False, scratch_dir=scratch.name)
+        self.assert_same_results(results[1], self.expected[1])
+        self.assertEqual(os.listdir(scratch.name), [])
+        scratch.cleanup()
+        self.assertEqual(self.wn.get_link("177").initial_status, LinkStatus.Open)
+
+    def test_processes(self):
+        scratch = tempfile.TemporaryDirectory()
+        sim = wntr.sim.EnsembleEpanetSimulator(self.wn)
+        indexes = []
+        for i, res in sim.iter_results(self.scenarios, processes=2, scratch_dir=scratch.name):
+            self.assert_same_results(res, self.expected[i])
+            indexes.append(i)
+        self.assertEqual(sorted(indexes), list(range(len(self.scenarios))))
+        self.assertEqual(os.listdir(scratch.name), [])
+        scratch.cleanup()
+
+    def test_errors(self):
+        sim = wntr.sim.EnsembleEpanetSimulator(self.wn)
+        with self.assertRaises(ValueError):
+            sim.run_ensemble([{"demand": {"197": 0.1}}])
+        with self.assertRaises(KeyError):
+            sim.run_ensemble([{"status": {"not a link": "Closed"}}])
+        with self.assertRaises(ValueError):
+            sim.run_ensemble([None], file_prefix="temp")
+
+
+if __name__ == "__main__":
+    unittest.main()
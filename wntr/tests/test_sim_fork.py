@@ -0,0 +1,76 @@
+import functools
+import unittest
+from os.path import abspath, dirname, join
+
+import wntr
+from wntr.network import LinkStatus
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def close_link(wn, name, t):
+    action = wntr.network.ControlAction(wn.get_link(name), "status", LinkStatus.Closed)
+    condition = wntr.network.SimTimeCondition(wn, "=", t)
+    wn.add_control("close " + name, wntr.network.Control(condition, action))
+
+
+def run_full(inp_file, duration, modify=None):
+    wn = wntr.network.WaterNetworkModel(inp_file)
+    wn.options.time.duration = duration
+    if modify is not None:
+        modify(wn)
+    return wntr.sim.WNTRSimulator(wn).run_sim()
+
+
+class TestForkWNTRSimulator(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.inp_file = join(ex_datadir, "Net3.inp")
+        self.duration = 24 * 3600
+        self.branch_time = 6 * 3600
+        wn = wntr.network.WaterNetworkModel(self.inp_file)
+        wn.options.time.duration = self.duration
+        self.sim = wntr.sim.ForkWNTRSimulator(wn)
+        self.prefix = self.sim.run_sim(self.branch_time)
+
+    def test_prefix(self):
+        self.assertEqual(self.prefix.node["head"].index[-1], self.branch_time - 3600)
+
+    def test_continuations(self):
+        scenarios = [None, {"status": {"10": "Closed"}}, functools.partial(close_link, name="10", t=self.branch_time)]
+        results = self.sim.run_continuations(scenarios)
+        self.assertEqual(len(results), 3)
+
+        expected = run_full(self.inp_file, self.duration)
+        self.assertTrue(results[0].node["head"].equals(expected.node["head"]))
+        self.assertTrue(results[0].link["flowrate"].equals(expected.link["flowrate"]))
+
+        expected = run_full(self.inp_file, self.duration, functools.partial(close_link, name="10", t=self.branch_time))
+        for res in results[1:]:
+            self.assertLess(abs(res.node["head"] - expected.node["head"]).max().max(), 1e-6)
+            self.assertLess(abs(res.link["flowrate"] - expected.link["flowrate"]).max().max(), 1e-8)
+            self.assertEqual(res.link["flowrate"].at[self.branch_time, "10"], 0)
+        self.assertTrue(results[0].node["head"].loc[:self.branch_time - 3600].equals(
+            results[1].node["head"].loc[:self.branch_time - 3600]))
+
+    def test_processes(self):
+        scenarios = [None, {"status": {"10": LinkStatus.Closed}}, {"links": {"20": {"diameter": 0.5}}}]
+        serial = self.sim.run_continuations(scenarios)
+        parallel = self.sim.run_continuations(scenarios, processes=2)
+        for res1, res2 in zip(serial, parallel):
+            self.assertTrue(res1.node["head"].equals(res2.node["head"]))
+            self.assertTrue(res1.link["flowrate"].equals(res2.link["flowrate"]))
+
+    def test_errors(self):
+        self.assertRaises(ValueError, self.sim.run_continuations, [{"demand": {"10": 0.1}}])
+        self.assertRaises(KeyError, self.sim.run_continuations, [{"status": {"not a link": "Closed"}}])
+        wn = wntr.network.WaterNetworkModel(self.inp_file)
+        wn.options.time.duration = self.duration
+        sim = wntr.sim.ForkWNTRSimulator(wn)
+        self.assertRaises(RuntimeError, sim.run_continuations, [None])
+        self.assertRaises(ValueError, sim.run_sim, self.duration + 3600)
+
+
+if __name__ == "__main__":
+    unittest.main()
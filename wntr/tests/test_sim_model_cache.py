@@ -0,0 +1,103 @@
+import pickle
+import unittest
+from os.path import abspath, dirname, join
+
+import wntr
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def get_network(name="Net3", hours=12):
+    wn = wntr.network.WaterNetworkModel(join(ex_datadir, name + ".inp"))
+    wn.options.time.duration = hours * 3600
+    return wn
+
+
+class TestHydraulicModelCache(unittest.TestCase):
+    def assert_results_equal(self, results1, results2, tol=1e-8):
+        self.assertEqual(results1.time, results2.time)
+        self.assertLess(abs(results1.node["head"] - results2.node["head"]).max().max(), tol)
+        self.assertLess(abs(results1.node["demand"] - results2.node["demand"]).max().max(), tol)
+        self.assertLess(abs(results1.link["flowrate"] - results2.link["flowrate"]).max().max(), tol)
+
+    def test_criticality_loop(self):
+        cache = wntr.sim.HydraulicModelCache()
+        scenarios = [("10", "initial_status", "Closed"), ("20", "roughness", 50.0), ("101", "diameter", 0.2),
+                     ("10", "initial_status", "Open")]
+        for name, attr, value in scenarios:
+            wn = get_network()
+            setattr(wn.get_link(name), attr, value)
+            expected = wntr.sim.WNTRSimulator(wn).run_sim()
+            wn = get_network()
+            setattr(wn.get_link(name), attr, value)
+            results = wntr.sim.WNTRSimulator(wn).run_sim(model_cache=cache)
+            self.assert_results_equal(expected, results)
+        self.assertEqual(cache.num_builds, 1)
+        self.assertEqual(cache.num_reuses, len(scenarios) - 1)
+
+    def test_same_network(self):
+        wn = get_network()
+        cache = wntr.sim.HydraulicModelCache()
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim(model_cache=cache)
+        wn.reset_initial_values()
+        results2 = wntr.sim.WNTRSimulator(wn).run_sim(model_cache=cache)
+        self.assert_results_equal(results1, results2)
+        self.assertEqual(cache.num_reuses, 1)
+
+    def test_structure_changes(self):
+        cache = wntr.sim.HydraulicModelCache()
+        wn = get_network(hours=1)
+        wntr.sim.WNTRSimulator(wn).run_sim(model_cache=cache)
+
+        wn = get_network(hours=1)
+        wn.options.hydraulic.demand_model = "PDD"
+        expected = wntr.sim.WNTRSimulator(wn).run_sim()
+        wn = get_network(hours=1)
+        wn.options.hydraulic.demand_model = "PDD"
+        results = wntr.sim.WNTRSimulator(wn).run_sim(model_cache=cache)
+        self.assert_results_equal(expected, results)
+        self.assertEqual(cache.num_builds, 2)
+
+        wn = get_network(hours=1)
+        wn.options.hydraulic.demand_model = "PDD"
+        wn.add_junction("new", base_demand=0.001, elevation=10.0)
+        wn.add_pipe("new", "10", "new", length=100.0, diameter=0.2, roughness=100)
+        wntr.sim.WNTRSimulator(wn).run_sim(model_cache=cache)
+        self.assertEqual(cache.num_builds, 3)
+        self.assertEqual(cache.num_reuses, 0)
+
+    def test_interrupted(self):
+        class Interrupt(Exception):
+            pass
+
+        def interrupt(record):
+            if record["time"] >= 3 * 3600:
+                raise Interrupt()
+
+        cache = wntr.sim.HydraulicModelCache()
+        with self.assertRaises(Interrupt):
+            wntr.sim.WNTRSimulator(get_network()).run_sim(model_cache=cache, profile_callback=interrupt)
+        results = wntr.sim.WNTRSimulator(get_network()).run_sim(model_cache=cache)
+        self.assertEqual(cache.num_builds, 2)
+        self.assert_results_equal(wntr.sim.WNTRSimulator(get_network()).run_sim(), results)
+
+    def test_presolve(self):
+        cache = wntr.sim.HydraulicModelCache()
+        expected = wntr.sim.WNTRSimulator(get_network()).run_sim()
+        results1 = wntr.sim.WNTRSimulator(get_network()).run_sim(model_cache=cache, presolve=True)
+        results2 = wntr.sim.WNTRSimulator(get_network()).run_sim(model_cache=cache)
+        self.assert_results_equal(expected, results1, 1e-6)
+        self.assert_results_equal(expected, results2)
+        self.assertEqual(cache.num_reuses, 1)
+
+    def test_pickle(self):
+        cache = wntr.sim.HydraulicModelCache()
+        wntr.sim.WNTRSimulator(get_network(hours=1)).run_sim(model_cache=cache)
+        cache = pickle.loads(pickle.dumps(cache))
+        wntr.sim.WNTRSimulator(get_network(hours=1)).run_sim(model_cache=cache)
+        self.assertEqual(cache.num_builds, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+from os.path import abspath, dirname, join
+
+import numpy as np
+import wntr
+from wntr.network import LinkStatus
+from wntr.sim.network_isolation import NetworkConnectivity
+
+testdir = dirname(abspath(str(__file__)))
+datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def _branched_network():
+    wn = wntr.network.WaterNetworkModel()
+    wn.add_reservoir("r", base_head=50)
+    wn.add_junction("a", base_demand=0.01, elevation=10)
+    wn.add_junction("b", base_demand=0.01, elevation=10)
+    wn.add_junction("c", base_demand=0.01, elevation=10)
+    wn.add_junction("d", base_demand=0.01, elevation=10)
+    wn.add_pipe("p1", "r", "a")
+    wn.add_pipe("p2", "a", "b")
+    wn.add_pipe("p3", "b", "c")
+    wn.add_pipe("p4", "b", "c")
+    wn.add_pipe("p5", "a", "d")
+    return wn
+
+
+class TestNetworkConnectivity(unittest.TestCase):
+    def test_isolated_masks(self):
+        wn = _branched_network()
+        connectivity = NetworkConnectivity(wn)
+        isolated_junctions, isolated_links = connectivity.find_isolated()
+        self.assertFalse(isolated_junctions.any())
+        self.assertFalse(isolated_links.any())
+
+        # parallel links: closing one of them does not isolate c
+        wn.get_link("p3").initial_status = LinkStatus.Closed
+        connectivity.set_status(wn.get_link("p3"))
+        isolated_junctions, isolated_links = connectivity.find_isolated()
+        self.assertFalse(isolated_junctions.any())
+
+        wn.get_link("p2").initial_status = LinkStatus.Closed
+        connectivity.set_status(wn.get_link("p2"))
+        isolated_junctions, isolated_links = connectivity.find_isolated()
+        self.assertEqual([connectivity.node_names[i] for i in np.flatnonzero(isolated_junctions)], ["b", "c"])
+        self.assertEqual([connectivity.link_names[i] for i in np.flatnonzero(isolated_links)], ["p2", "p3", "p4"])
+
+    def test_relabel_only_on_status_change(self):
+        wn = _branched_network()
+        connectivity = NetworkConnectivity(wn)
+        connectivity.find_isolated()
+        connectivity.find_isolated()
+        self.assertEqual(connectivity.num_labellings, 1)
+
+        # a status change between open and active does not change the connectivity
+        wn.get_link("p5").initial_status = LinkStatus.Active
+        connectivity.set_status(wn.get_link("p5"))
+        connectivity.find_isolated()
+        self.assertEqual(connectivity.num_labellings, 1)
+
+        wn.get_link("p5").initial_status = LinkStatus.Closed
+        connectivity.set_status(wn.get_link("p5"))
+        isolated_junctions, isolated_links = connectivity.find_isolated()
+        self.assertEqual(connectivity.num_labellings, 2)
+        self.assertEqual([connectivity.node_names[i] for i in np.flatnonzero(isolated_junctions)], ["d"])
+
+    def test_simulation(self):
+        wn = _branched_network()
+        wn.options.time.duration = 4 * 3600
+        pipe = wn.get_link("p2")
+        for status, t in [(LinkStatus.Closed, 3600), (LinkStatus.Open, 3 * 3600)]:
+            action = wntr.network.ControlAction(pipe, "status", status)
+            condition = wntr.network.SimTimeCondition(wn, "=", t)
+            wn.add_control("p2_" + str(t), wntr.network.Control(condition, action))
+        results = wntr.sim.WNTRSimulator(wn).run_sim()
+
+        for name in ["b", "c"]:
+            self.assertGreater(results.node["head"].at[0, name], 0)
+            self.assertEqual(results.node["head"].at[3600, name], 0)
+            self.assertEqual(results.node["demand"].at[7200, name], 0)
+            self.assertGreater(results.node["head"].at[3 * 3600, name], 0)
+        self.assertEqual(results.link["flowrate"].at[3600, "p3"], 0)
+        self.assertGreater(results.node["head"].at[3600, "d"], 0)
+        self.assertFalse(wn.get_node("b")._is_isolated)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import tempfile
+import unittest
+from os.path import abspath, dirname, join
+
+import numpy as np
+import wntr
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def get_network(days=20):
+    wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net1.inp"))
+    wn.options.time.duration = days * 86400
+    return wn
+
+
+class TestPeriodicStateDetector(unittest.TestCase):
+    def test_record(self):
+        detector = wntr.sim.PeriodicStateDetector(period=4, level_tolerance=0.01)
+        levels = [1.0, 2.0, 3.0, 2.5]
+        for t in range(8):
+            self.assertFalse(detector.record(t, [levels[t % 4] + 0.1 * max(0, 4 - t)], [t % 2]))
+        for t in range(8, 12):
+            self.assertFalse(detector.record(t, [levels[t % 4]], [t % 2]))
+        self.assertTrue(detector.record(12, [levels[0] + 0.005], [0]))
+        self.assertEqual(detector.detected_time, 12)
+        detector.reset()
+        self.assertFalse(detector.detected)
+
+    def test_status_change(self):
+        detector = wntr.sim.PeriodicStateDetector(period=2)
+        for t in range(6):
+            detector.record(t, [1.0], [1 if t != 3 else 0])
+        self.assertFalse(detector.detected)
+        self.assertFalse(detector.record(6, [1.0], [1]))
+        self.assertFalse(detector.record(7, [1.0], [1]))
+        self.assertTrue(detector.record(8, [1.0], [1]))
+
+
+class TestPeriodicExit(unittest.TestCase):
+    def test_wntr(self):
+        expected = wntr.sim.WNTRSimulator(get_network()).run_sim()
+        self.assertIsNone(expected.early_exit)
+        detector = wntr.sim.PeriodicStateDetector(tile=True)
+        results = wntr.sim.WNTRSimulator(get_network()).run_sim(periodic_state=detector)
+        self.assertLess(results.early_exit["time"], 20 * 86400)
+        self.assertTrue(results.early_exit["tiled"])
+        self.assertEqual(results.time, expected.time)
+        self.assertLess(results.solver_statistics["time"].max(), 20 * 86400)
+        self.assertLess(abs(results.node["head"] - expected.node["head"]).max().max(), 0.01)
+        self.assertTrue((results.link["status"] == expected.link["status"]).all().all())
+
+        detector = wntr.sim.PeriodicStateDetector()
+        results = wntr.sim.WNTRSimulator(get_network()).run_sim(periodic_state=detector)
+        self.assertFalse(results.early_exit["tiled"])
+        self.assertEqual(results.time[-1], results.early_exit["time"])
+
+    def test_no_period(self):
+        detector = wntr.sim.PeriodicStateDetector()
+        results = wntr.sim.WNTRSimulator(get_network(days=2)).run_sim(periodic_state=detector)
+        self.assertIsNone(results.early_exit)
+        self.assertEqual(results.time[-1], 2 * 86400)
+
+    def test_stepwise_epanet(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_prefix = join(tmpdir, "temp")
+            wn = get_network()
+            expected = wntr.sim.EpanetSimulator(wn).run_sim(file_prefix=file_prefix)
+            detector = wntr.sim.PeriodicStateDetector(tile=True)
+            sim = wntr.sim.epanet.StepwiseEpanetSimulator().open(get_network(), file_prefix=file_prefix,
+                                                                 periodic_state=detector)
+            with sim:
+                for step in sim:
+                    pass
+                self.assertTrue(sim.periodic_state_detected)
+                results = sim.get_results()
+        self.assertLess(results.early_exit["time"], 20 * 86400)
+        self.assertTrue(np.array_equal(results.node["head"].index, expected.node["head"].index))
+        self.assertLess(abs(results.node["head"] - expected.node["head"]).max().max(), 0.01)
+
+    def test_get_values(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = wntr.sim.epanet.StepwiseEpanetSimulator().open(get_network(days=1),
+                                                                 file_prefix=join(tmpdir, "temp"))
+            with sim:
+                next(sim)
+                flow = sim.get_link_value("10", "flow")
+                self.assertEqual(flow, sim.get_link_value("10", wntr.epanet.util.EN.FLOW))
+                self.assertEqual(sim.get_link_value("10", "Quality"),
+                                 sim.get_link_value("10", wntr.epanet.util.EN.LINKQUAL))
+                self.assertEqual(sim.get_node_value("10", "head"),
+                                 sim.get_node_value("10", wntr.epanet.util.EN.HEAD))
+        self.assertGreater(flow, 0)
+
+    def test_exception_propagates(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sim = wntr.sim.epanet.StepwiseEpanetSimulator().open(get_network(days=1),
+                                                                 file_prefix=join(tmpdir, "temp"))
+            with self.assertRaises(KeyError):
+                with sim:
+                    next(sim)
+                    sim.get_link_value("10", "not_an_attribute")
+            self.assertIsNone(sim.toolkit())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import tempfile
+import unittest
+from os.path import abspath, dirname, join
+
+import wntr
+from wntr.network import LinkStatus
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def build_network(mode="DD"):
+    """
+    A loop fed by a reservoir with a series chain (J5, J6) on one side of the
+    loop and a dead-end branch (J7, J8, J9) hanging from J2.
+    """
+    wn = wntr.network.WaterNetworkModel()
+    wn.add_pattern("pat", [1.0, 0.6, 1.4])
+    wn.add_reservoir("R", base_head=60.0)
+    elevations = {"J1": 10.0, "J2": 12.0, "J3": 8.0, "J4": 9.0, "J5": 11.0, "J6": 10.0, "J7": 14.0, "J8": 15.0,
+                  "J9": 13.0}
+    demands = {"J1": 0.005, "J2": 0.01, "J3": 0.008, "J4": 0.012, "J5": 0.0, "J6": 0.0, "J7": 0.004, "J8": 0.002,
+               "J9": 0.0}
+    if mode != "DD":
+        # only branches without demands are removed with pressure dependent demands
+        demands["J8"] = 0.0
+    for name, elevation in elevations.items():
+        wn.add_junction(name, base_demand=demands[name], demand_pattern="pat", elevation=elevation)
+    pipes = [("P0", "R", "J1", 0.4), ("P1", "J1", "J2", 0.3), ("P2", "J2", "J3", 0.25), ("P3", "J3", "J4", 0.25),
+             ("P4", "J4", "J1", 0.3), ("P5", "J6", "J2", 0.2), ("P6", "J5", "J6", 0.2), ("P7", "J5", "J4", 0.25),
+             ("P8", "J2", "J7", 0.15), ("P9", "J8", "J7", 0.1), ("P10", "J7", "J9", 0.1)]
+    for name, start, end, diameter in pipes:
+        wn.add_pipe(name, start, end, length=500.0, diameter=diameter, roughness=100, minor_loss=1.0)
+    wn.options.time.duration = 6 * 3600
+    wn.options.time.hydraulic_timestep = 3600
+    wn.options.time.pattern_timestep = 3600
+    wn.options.hydraulic.demand_model = mode
+    return wn
+
+
+def close_link(wn, name, t):
+    action = wntr.network.ControlAction(wn.get_link(name), "status", LinkStatus.Closed)
+    condition = wntr.network.SimTimeCondition(wn, "=", t)
+    wn.add_control("close " + name, wntr.network.Control(condition, action))
+
+
+class TestModelPresolve(unittest.TestCase):
+    def assert_results_equal(self, results1, results2, tol=1e-6):
+        self.assertEqual(results1.time, results2.time)
+        for key in ["head", "pressure", "demand"]:
+            self.assertLess(abs(results1.node[key] - results2.node[key]).max().max(), tol)
+        self.assertLess(abs(results1.link["flowrate"] - results2.link["flowrate"]).max().max(), tol)
+
+    def test_structures(self):
+        wn = build_network()
+        m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn)
+        presolve = wntr.sim.hydraulics.ModelPresolve(m, wn, updater)
+        m.set_structure()
+        num_vars = len(m.get_x())
+        self.assertTrue(presolve.update())
+        self.assertFalse(presolve.update())
+        # J7, J8, J9 (branch), J5, J6 (chain)
+        self.assertEqual(presolve.num_eliminated_junctions, 5)
+        # P8, P9, P10 (branch), P6, P7 (chain, replaced by P5)
+        self.assertEqual(presolve.num_eliminated_links, 5)
+        m.set_structure()
+        self.assertEqual(len(m.get_x()), num_vars - 10)
+        self.assertEqual(len(presolve.eliminated_vars), 10)
+
+    def test_pdd_structures(self):
+        wn = build_network("PDD")
+        m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn)
+        presolve = wntr.sim.hydraulics.ModelPresolve(m, wn, updater)
+        presolve.update()
+        # the branch below J7 is kept because J7 has a demand
+        self.assertEqual(presolve.num_eliminated_junctions, 4)
+        self.assertEqual(presolve.num_eliminated_links, 4)
+
+    def test_results(self):
+        for mode in ["DD", "PDD"]:
+            results1 = wntr.sim.WNTRSimulator(build_network(mode)).run_sim()
+            results2 = wntr.sim.WNTRSimulator(build_network(mode)).run_sim(presolve=True)
+            self.assert_results_equal(results1, results2)
+
+    def test_status_changes(self):
+        # closing a pipe of the chain and of the branch restores their constraints
+        for name in ["P6", "P8"]:
+            wn = build_network()
+            close_link(wn, name, 2 * 3600)
+            results1 = wntr.sim.WNTRSimulator(wn).run_sim()
+            wn = build_network()
+            close_link(wn, name, 2 * 3600)
+            results2 = wntr.sim.WNTRSimulator(wn).run_sim(presolve=True)
+            self.assert_results_equal(results1, results2)
+            self.assertEqual(results2.link["flowrate"].at[3 * 3600, name], 0)
+
+    def test_net3(self):
+        inp_file = join(ex_datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 24 * 3600
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim()
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 24 * 3600
+        results2 = wntr.sim.WNTRSimulator(wn).run_sim(presolve=True)
+        self.assert_results_equal(results1, results2)
+
+    def test_checkpoint(self):
+        class Interrupt(Exception):
+            pass
+
+        def interrupt(record):
+            if record["time"] >= 4 * 3600:
+                raise Interrupt()
+
+        results1 = wntr.sim.WNTRSimulator(build_network()).run_sim(presolve=True)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_file = join(tmpdir, "presolve.ckpt")
+            sim = wntr.sim.WNTRSimulator(build_network())
+            with self.assertRaises(Interrupt):
+                sim.run_sim(presolve=True, checkpoint_file=checkpoint_file, checkpoint_interval=3 * 3600,
+                            profile_callback=interrupt)
+            sim = wntr.sim.WNTRSimulator.from_checkpoint(checkpoint_file)
+            results2 = sim.run_sim(presolve=True)
+        self.assert_results_equal(results1, results2, 1e-10)
+
+    def test_errors(self):
+        sim = wntr.sim.WNTRSimulator(build_network())
+        self.assertRaises(NotImplementedError, sim.run_sim, presolve=True, evaluator="vectorized")
+        sim = wntr.sim.WNTRSimulator(build_network())
+        self.assertRaises(NotImplementedError, sim.run_sim, presolve=True, HW_approx="piecewise")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,10 @@
+import tempfile
 import unittest
 from os.path import abspath, dirname, join
 #import matplotlib.pylab as plt
+import numpy as np
 import wntr
+from wntr.sim.solvers import DirectLUSolver
 
 testdir = dirname(abspath(str(__file__)))
 datadir = join(testdir, "..", "..", "examples", "networks")
@@ -44,7 +47,159 @@ class TestSimulationResults(unittest.TestCase):
     @classmethod
     def tearDownClass(self):
         pass
- 
+
+
+class TestResultsBuffer(unittest.TestCase):
+    def test_results_match_network(self):
+        inp_file = join(datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 6 * 3600
+        wn.options.time.report_timestep = "all"
+        sim = wntr.sim.WNTRSimulator(wn)
+        results = sim.run_sim()
+
+        # the buffer is sized from the hydraulic timestep; controls add report times
+        self.assertGreater(len(results.time), 7)
+        for key in ["head", "demand", "pressure", "leak_demand"]:
+            self.assertEqual(results.node[key].shape, (len(results.time), wn.num_nodes))
+        for key in ["flowrate", "velocity", "status", "setting"]:
+            self.assertEqual(results.link[key].shape, (len(results.time), wn.num_links))
+
+        t = results.time[-1]
+        for name, node in wn.nodes():
+            self.assertAlmostEqual(results.node["head"].at[t, name], node.head, 10)
+            self.assertAlmostEqual(results.node["demand"].at[t, name], node.demand, 10)
+        for name, link in wn.links():
+            self.assertAlmostEqual(results.link["flowrate"].at[t, name], link.flow, 10)
+            self.assertEqual(results.link["status"].at[t, name], link.status)
+
+    def test_update_network(self):
+        inp_file = join(datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 12 * 3600
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim()
+        wn.reset_initial_values()
+        results2 = wntr.sim.WNTRSimulator(wn).run_sim(update_network=False)
+        for key in results1.node.keys():
+            self.assertLess(abs(results1.node[key] - results2.node[key]).max().max(), 1e-6)
+        for key in results1.link.keys():
+            self.assertLess(abs(results1.link[key] - results2.link[key]).max().max(), 1e-6)
+
+        # all elements are updated at the end of the simulation
+        t = results2.time[-1]
+        for name, node in wn.junctions():
+            self.assertAlmostEqual(results2.node["head"].at[t, name], node.head, 10)
+        for name, node in wn.tanks():
+            self.assertAlmostEqual(results2.node["demand"].at[t, name], node.demand, 10)
+        for name, link in wn.links():
+            self.assertAlmostEqual(results2.link["flowrate"].at[t, name], link.flow, 10)
+
+    def test_no_copy(self):
+        inp_file = join(datadir, "Net1.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 3 * 3600
+        results_buffer = wntr.sim.hydraulics.ResultsBuffer(wn, 4)
+        results = wntr.sim.results.SimulationResults()
+        results.time = [0, 3600]
+        results_buffer.get_results(results)
+        self.assertEqual(results.node["head"].shape, (2, wn.num_nodes))
+        self.assertTrue(np.shares_memory(results.node["head"].values, results_buffer.node["head"]))
+        self.assertTrue(np.shares_memory(results.link["flowrate"].values, results_buffer.link["flowrate"]))
+
+
+class TestCheckpoint(unittest.TestCase):
+    def test_resume(self):
+        class Interrupt(Exception):
+            pass
+
+        def interrupt(record):
+            if record["time"] >= 17 * 3600:
+                raise Interrupt()
+
+        inp_file = join(datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 24 * 3600
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim()
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_file = join(tmpdir, "Net3.ckpt")
+            wn = wntr.network.WaterNetworkModel(inp_file)
+            wn.options.time.duration = 24 * 3600
+            sim = wntr.sim.WNTRSimulator(wn)
+            with self.assertRaises(Interrupt):
+                sim.run_sim(checkpoint_file=checkpoint_file, checkpoint_interval=4 * 3600, profile_callback=interrupt)
+
+            sim = wntr.sim.WNTRSimulator.from_checkpoint(checkpoint_file)
+            with self.assertRaises(ValueError):
+                sim.run_sim(HW_approx="piecewise")
+            sim = wntr.sim.WNTRSimulator.from_checkpoint(checkpoint_file)
+            self.assertEqual(sim._wn.sim_time, 16 * 3600)
+            results2 = sim.run_sim()
+
+        self.assertEqual(results1.time, results2.time)
+        for key in results1.node.keys():
+            self.assertTrue(results1.node[key].equals(results2.node[key]))
+        for key in results1.link.keys():
+            self.assertTrue(results1.link[key].equals(results2.link[key]))
+        self.assertEqual(len(results1.solver_statistics), len(results2.solver_statistics))
+
+    def test_resume_linear_solver(self):
+        class Interrupt(Exception):
+            pass
+
+        def interrupt(record):
+            if record["time"] >= 5 * 3600:
+                raise Interrupt()
+
+        inp_file = join(datadir, "Net3.inp")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_file = join(tmpdir, "Net3.ckpt")
+            wn = wntr.network.WaterNetworkModel(inp_file)
+            wn.options.time.duration = 8 * 3600
+            sim = wntr.sim.WNTRSimulator(wn)
+            with self.assertRaises(Interrupt):
+                sim.run_sim(solver_options={"LINEAR_SOLVER": DirectLUSolver(reuse_symbolic=False)},
+                            checkpoint_file=checkpoint_file, checkpoint_interval=4 * 3600, profile_callback=interrupt)
+
+            # an equivalent solver object matches; one with other parameters does not
+            sim = wntr.sim.WNTRSimulator.from_checkpoint(checkpoint_file)
+            with self.assertRaises(ValueError):
+                sim.run_sim(solver_options={"LINEAR_SOLVER": DirectLUSolver(reuse_symbolic=True)})
+            sim = wntr.sim.WNTRSimulator.from_checkpoint(checkpoint_file)
+            results = sim.run_sim(solver_options={"LINEAR_SOLVER": DirectLUSolver(reuse_symbolic=False)})
+        self.assertEqual(results.time[-1], 8 * 3600)
+
+    def test_resume_chord(self):
+        class Interrupt(Exception):
+            pass
+
+        def interrupt(record):
+            if record["time"] >= 13 * 3600:
+                raise Interrupt()
+
+        inp_file = join(datadir, "Net3.inp")
+        options = {"CHORD": True}
+        with tempfile.TemporaryDirectory() as tmpdir:
+            checkpoint_file = join(tmpdir, "Net3.ckpt")
+            wn = wntr.network.WaterNetworkModel(inp_file)
+            wn.options.time.duration = 24 * 3600
+            results1 = wntr.sim.WNTRSimulator(wn).run_sim(solver_options=options, checkpoint_file=checkpoint_file,
+                                                          checkpoint_interval=4 * 3600)
+            wn = wntr.network.WaterNetworkModel(inp_file)
+            wn.options.time.duration = 24 * 3600
+            sim = wntr.sim.WNTRSimulator(wn)
+            with self.assertRaises(Interrupt):
+                sim.run_sim(solver_options=options, checkpoint_file=checkpoint_file, checkpoint_interval=4 * 3600,
+                            profile_callback=interrupt)
+            sim = wntr.sim.WNTRSimulator.from_checkpoint(checkpoint_file)
+            self.assertEqual(sim._wn.sim_time, 12 * 3600)
+            results2 = sim.run_sim(solver_options=options)
+
+        self.assertGreater(results1.solver_statistics["lu_reused"].sum(), 0)
+        for key in results1.node.keys():
+            self.assertTrue(results1.node[key].equals(results2.node[key]))
+        for key in results1.link.keys():
+            self.assertTrue(results1.link[key].equals(results2.link[key]))
 
 
 if __name__ == "__main__":
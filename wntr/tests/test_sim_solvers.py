@@ -0,0 +1,438 @@
+import unittest
+from os.path import abspath, dirname, join
+
+import numpy as np
+import scipy.sparse as sp
+import wntr
+import wntr.sim.aml as aml
+from wntr.sim.solvers import (BlockTriangularForm, BlockTriangularSolver, DenseLUSolver, DirectLUSolver,
+                               EliminationLayout, GGASolver, IterativeSolver, LinearSolver, NewtonSolver,
+                               SolverStatus, SparseLUCache)
+
+testdir = dirname(abspath(str(__file__)))
+ex_datadir = join(testdir, "..", "..", "examples", "networks")
+
+
+def build_model():
+    m = aml.Model()
+    m.x = aml.Var(0.5)
+    m.y = aml.Var(0.5)
+    m.z = aml.Var(0.5)
+    m.p = aml.Param(val=2.0)
+    m.c1 = aml.Constraint(m.x ** 2 + m.y - m.p)
+    m.c2 = aml.Constraint(m.y - m.z ** 3)
+    m.c3 = aml.Constraint(m.x + m.y + m.z - 1.5 * m.p)
+    return m
+
+
+class TestSparseLUCache(unittest.TestCase):
+    def test_factorize(self):
+        np.random.seed(0)
+        A = (sp.random(40, 40, density=0.1, format="csr") + 4 * sp.eye(40)).tocsr()
+        b = np.random.rand(40)
+        cache = SparseLUCache()
+        x1 = cache.factorize(A, structure_version=1).solve(b)
+        self.assertEqual(cache.num_symbolic, 1)
+        self.assertEqual(cache.num_numeric, 0)
+        A.data *= 2.0
+        x2 = cache.factorize(A, structure_version=1).solve(b)
+        self.assertEqual(cache.num_symbolic, 1)
+        self.assertEqual(cache.num_numeric, 1)
+        self.assertAlmostEqual(np.abs(A @ x2 - b).max(), 0, 12)
+        self.assertAlmostEqual(np.abs(x1 - 2 * x2).max(), 0, 12)
+        cache.factorize(A, structure_version=2)
+        self.assertEqual(cache.num_symbolic, 2)
+        cache.factorize(A, structure_version=None)
+        self.assertEqual(cache.num_symbolic, 3)
+
+    def test_state(self):
+        np.random.seed(0)
+        A = (sp.random(40, 40, density=0.1, format="csr") + 4 * sp.eye(40)).tocsr()
+        b = np.random.rand(40)
+        cache = SparseLUCache()
+        cache.factorize(A, structure_version=1)
+        A.data *= 2.0
+        x1 = cache.factorize(A, structure_version=1).solve(b)
+
+        restored = SparseLUCache()
+        restored.set_state(cache.get_state())
+        x2 = restored.factorize(A, structure_version=5).solve(b)
+        self.assertEqual(restored.num_symbolic, 0)
+        self.assertEqual(restored.num_numeric, 1)
+        self.assertTrue(np.array_equal(x1, x2))
+
+        # the ordering is ignored if the sparsity pattern differs
+        restored.set_state(cache.get_state())
+        B = (A + sp.eye(40, k=1)).tocsr()
+        restored.factorize(B, structure_version=6)
+        self.assertEqual(restored.num_symbolic, 1)
+
+
+class TestNewtonSolver(unittest.TestCase):
+    def test_reuse_symbolic(self):
+        m1 = build_model()
+        m1.set_structure()
+        opt = NewtonSolver()
+        status, msg, num_iter = opt.solve(m1)
+        self.assertEqual(status, SolverStatus.converged)
+        self.assertEqual(opt.lu_cache.num_symbolic, 1)
+        self.assertEqual(opt.lu_cache.num_numeric, num_iter - 1)
+
+        m2 = build_model()
+        m2.set_structure()
+        status, msg, num_iter = NewtonSolver({"REUSE_SYMBOLIC": False}).solve(m2)
+        self.assertEqual(status, SolverStatus.converged)
+        for v1, v2 in zip(m1.vars(), m2.vars()):
+            self.assertAlmostEqual(v1.value, v2.value, 8)
+
+        m1.p.value = 2.5
+        m1.set_structure()
+        status, msg, num_iter = opt.solve(m1)
+        self.assertEqual(status, SolverStatus.converged)
+        self.assertEqual(opt.lu_cache.num_symbolic, 1)
+
+    def test_chord(self):
+        m1 = build_model()
+        m1.set_structure()
+        opt = NewtonSolver({"CHORD": True, "TOL": 1e-10})
+        status, msg, num_iter = opt.solve(m1)
+        self.assertEqual(status, SolverStatus.converged)
+        # a small change in the parameters should be handled with the old factorization
+        m1.p.value = 2.01
+        m1.set_structure()
+        num_factorizations = opt.lu_cache.num_symbolic + opt.lu_cache.num_numeric
+        status, msg, num_iter = opt.solve(m1)
+        self.assertEqual(status, SolverStatus.converged)
+        self.assertGreater(opt.lu_cache.num_reused, 0)
+        self.assertLess(opt.lu_cache.num_symbolic + opt.lu_cache.num_numeric - num_factorizations, num_iter)
+
+        m2 = build_model()
+        m2.p.value = 2.01
+        m2.set_structure()
+        status, msg, num_iter = NewtonSolver({"TOL": 1e-10}).solve(m2)
+        for v1, v2 in zip(m1.vars(), m2.vars()):
+            self.assertAlmostEqual(v1.value, v2.value, 8)
+
+    def test_singular(self):
+        m = aml.Model()
+        m.x = aml.Var(1.0)
+        m.y = aml.Var(1.0)
+        m.c1 = aml.Constraint(m.x + m.y - 1)
+        m.c2 = aml.Constraint(2 * m.x + 2 * m.y - 1)
+        m.set_structure()
+        status, msg, num_iter = NewtonSolver().solve(m)
+        self.assertEqual(status, SolverStatus.error)
+        self.assertIn("singular", msg)
+
+
+class TestEliminationLayout(unittest.TestCase):
+    def test_reduce_expand(self):
+        np.random.seed(0)
+        n, k = 30, 12
+        # rows 0..k-1 only contain their own column among the columns 0..k-1
+        A = sp.random(n, n, density=0.15, format="lil") + 4 * sp.eye(n, format="lil")
+        A[:k, :k] = 0
+        A[np.arange(k), np.arange(k)] = np.random.rand(k) + 1
+        A[3, 3] = 0.0  # structural zero on the diagonal; the pair is not eliminated
+        A = sp.csr_matrix(A)
+        A.eliminate_zeros()
+        r = np.random.rand(n)
+        layout = EliminationLayout(A, np.arange(k), np.arange(k))
+        self.assertEqual(layout.num_eliminated, k - 1)
+        self.assertEqual(layout.num_reduced, n - k + 1)
+        B, b, diag = layout.reduce(A, r)
+        d = layout.expand(A, r, diag, sp.linalg.spsolve(sp.csc_matrix(B), b))
+        self.assertAlmostEqual(np.abs(A @ d + r).max(), 0, 10)
+
+        # a row containing another eliminated column is not eliminated
+        A = A.tolil()
+        A[0, 1] = 1.0
+        A = sp.csr_matrix(A)
+        layout = EliminationLayout(A, np.arange(k), np.arange(k))
+        self.assertEqual(layout.num_eliminated, k - 2)
+        B, b, diag = layout.reduce(A, r)
+        d = layout.expand(A, r, diag, sp.linalg.spsolve(sp.csc_matrix(B), b))
+        self.assertAlmostEqual(np.abs(A @ d + r).max(), 0, 10)
+
+
+class TestGGASolver(unittest.TestCase):
+    def _compare(self, wn, **kwargs):
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim(**kwargs)
+        wn.reset_initial_values()
+        results2 = wntr.sim.WNTRSimulator(wn).run_sim(solver=GGASolver, **kwargs)
+        self.assertEqual(list(results1.solver_statistics["iterations"]),
+                         list(results2.solver_statistics["iterations"]))
+        self.assertLess(abs(results1.node["head"] - results2.node["head"]).max().max(), 1e-6)
+        self.assertLess(abs(results1.node["demand"] - results2.node["demand"]).max().max(), 1e-8)
+        self.assertLess(abs(results1.link["flowrate"] - results2.link["flowrate"]).max().max(), 1e-8)
+        return results2
+
+    def test_net3(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+        wn.options.time.duration = 24 * 3600
+        self._compare(wn)
+        wn.reset_initial_values()
+        self._compare(wn, evaluator="vectorized")
+
+    def test_pdd_leak(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net1.inp"))
+        wn.options.time.duration = 12 * 3600
+        wn.options.hydraulic.demand_model = "PDD"
+        wn.get_node("22").add_leak(wn, area=0.01, start_time=3600)
+        results = self._compare(wn)
+        self.assertGreater(results.node["leak_demand"].at[7200, "22"], 0)
+
+    def test_valves(self):
+        wn = wntr.network.WaterNetworkModel()
+        wn.options.time.duration = 3 * 3600
+        wn.add_reservoir("r1", base_head=100.0)
+        wn.add_junction("j1", base_demand=0.0, elevation=0.0)
+        wn.add_junction("j2", base_demand=0.0, elevation=0.0)
+        wn.add_junction("j3", base_demand=0.0, elevation=0.0)
+        wn.add_junction("j4", base_demand=0.05, elevation=0.0)
+        wn.add_pipe("p1", "r1", "j1", length=100, diameter=0.3, roughness=100)
+        wn.add_valve("prv", "j1", "j2", diameter=0.3, valve_type="PRV", initial_setting=50.0)
+        wn.add_valve("fcv", "j2", "j3", diameter=0.3, valve_type="FCV", initial_setting=0.05)
+        wn.add_pipe("p2", "j3", "j4", length=100, diameter=0.3, roughness=100)
+        valve = wn.get_link("fcv")
+        action = wntr.network.ControlAction(valve, "status", wntr.network.LinkStatus.Opened)
+        wn.add_control("c1", wntr.network.Control(wntr.network.SimTimeCondition(wn, "=", 3600), action))
+        results = self._compare(wn)
+        self.assertAlmostEqual(results.node["pressure"].at[0, "j2"], 50.0, 5)
+
+    def test_options(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net1.inp"))
+        self.assertRaises(ValueError, wntr.sim.WNTRSimulator(wn).run_sim, solver=GGASolver,
+                          solver_options={"CHORD": True})
+        self.assertRaises(ValueError, GGASolver)
+
+
+class TestBlockTriangularForm(unittest.TestCase):
+    def test_form(self):
+        # a 2x2 cycle (rows 1 and 3) fed by row 0 and feeding row 2, with the rows and columns shuffled
+        dense = np.array([[2.0, 0.0, 0.0, 0.0],
+                          [1.0, 3.0, 0.0, 1.0],
+                          [0.0, 1.0, 4.0, 0.0],
+                          [0.0, 1.0, 0.0, 5.0]])
+        row_perm = [2, 0, 3, 1]
+        col_perm = [3, 1, 0, 2]
+        J = sp.csr_matrix(dense[row_perm][:, col_perm])
+        form = BlockTriangularForm(J)
+        self.assertEqual(form.num_blocks, 3)
+        self.assertEqual(form.core_size, 2)
+        self.assertEqual([len(rows) for rows, cols in form.stages], [1, 2, 1])
+        self.assertEqual(form.core_stage, 1)
+
+        # the permuted matrix is block lower triangular with a zero-free diagonal
+        A = J[form.row_order][:, form.col_order].toarray()
+        block = np.repeat(np.arange(form.num_blocks), np.diff(form.block_ptr))
+        self.assertTrue(np.all(np.diag(A) != 0))
+        rows, cols = np.nonzero(A)
+        self.assertTrue(np.all(block[cols] <= block[rows]))
+
+        for stage, (rows, cols) in enumerate(form.stages):
+            self.assertTrue(np.array_equal(form.get_stage_jacobian(J, stage).toarray(), J[rows][:, cols].toarray()))
+
+    def test_singular(self):
+        # both rows only contain the first column
+        J = sp.csr_matrix(np.array([[1.0, 0.0], [2.0, 0.0]]))
+        self.assertRaises(ValueError, BlockTriangularForm, J)
+
+    def test_network(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+        m, updater = wntr.sim.hydraulics.create_hydraulic_model(wn)
+        m.set_structure()
+        lu_cache = SparseLUCache()
+        form = lu_cache.get_block_triangular_form(m.evaluate_jacobian(), m.structure_version)
+        self.assertIs(lu_cache.get_block_triangular_form(m.evaluate_jacobian(), m.structure_version), form)
+        # the flows and heads of the dead-end branches are outside of the core
+        self.assertLess(form.core_size, form.size)
+        self.assertEqual(len(form.stages[form.core_stage][0]), form.core_size)
+        self.assertEqual(sum(len(rows) for rows, cols in form.stages), form.size)
+
+
+class TestBlockTriangularSolver(unittest.TestCase):
+    def _compare(self, wn, **kwargs):
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim(**kwargs)
+        wn.reset_initial_values()
+        results2 = wntr.sim.WNTRSimulator(wn).run_sim(solver=BlockTriangularSolver, **kwargs)
+        self.assertEqual(results1.time, results2.time)
+        self.assertLess(abs(results1.node["head"] - results2.node["head"]).max().max(), 1e-6)
+        self.assertLess(abs(results1.node["demand"] - results2.node["demand"]).max().max(), 1e-6)
+        self.assertLess(abs(results1.link["flowrate"] - results2.link["flowrate"]).max().max(), 1e-6)
+        return results2
+
+    def test_net3(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+        wn.options.time.duration = 24 * 3600
+        results = self._compare(wn)
+        self.assertGreater(results.solver_statistics["lu_numeric"].sum(), 0)
+        wn.reset_initial_values()
+        self._compare(wn, evaluator="vectorized")
+
+    def test_pdd(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net1.inp"))
+        wn.options.time.duration = 12 * 3600
+        wn.options.hydraulic.demand_model = "PDD"
+        self._compare(wn)
+
+    def test_model(self):
+        m = build_model()
+        m.set_structure()
+        status, message, iterations = BlockTriangularSolver().solve(m)
+        self.assertEqual(status, SolverStatus.converged)
+        self.assertLess(np.max(np.abs(m.evaluate_residuals())), 1e-6)
+
+
+class _CountingSolver(LinearSolver):
+    def __init__(self):
+        self.num_factorizations = 0
+
+    def factorize(self, J, structure_version, lu_cache):
+        self.num_factorizations += 1
+        return sp.linalg.splu(sp.csc_matrix(J))
+
+
+class TestLinearSolvers(unittest.TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net3.inp"))
+        self.wn.options.time.duration = 12 * 3600
+        self.expected = wntr.sim.WNTRSimulator(self.wn).run_sim()
+
+    def _run(self, linear_solver, **kwargs):
+        self.wn.reset_initial_values()
+        results = wntr.sim.WNTRSimulator(self.wn).run_sim(solver_options={"LINEAR_SOLVER": linear_solver}, **kwargs)
+        self.assertEqual(list(results.solver_statistics["iterations"]),
+                         list(self.expected.solver_statistics["iterations"]))
+        self.assertLess(abs(results.node["head"] - self.expected.node["head"]).max().max(), 1e-6)
+        self.assertLess(abs(results.link["flowrate"] - self.expected.link["flowrate"]).max().max(), 1e-8)
+        return results.solver_statistics
+
+    def test_backends(self):
+        stats = self._run("dense")
+        self.assertEqual(stats["krylov_iterations"].sum(), 0)
+        for method in ["gmres", "bicgstab"]:
+            stats = self._run(method)
+            self.assertGreater(stats["krylov_iterations"].sum(), 0)
+            self.assertGreater(stats["fill_in"].min(), 1)
+        self._run(DirectLUSolver(reuse_symbolic=False))
+        self._run("gmres", solver=GGASolver)
+
+        linear_solver = _CountingSolver()
+        stats = self._run(linear_solver)
+        self.assertEqual(linear_solver.num_factorizations, stats["iterations"].sum())
+        self.assertTrue(stats["fill_in"].isna().all())
+
+    def test_unpreconditioned(self):
+        wn = wntr.network.WaterNetworkModel(join(ex_datadir, "Net1.inp"))
+        wn.options.time.duration = 6 * 3600
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim()
+        wn.reset_initial_values()
+        linear_solver = IterativeSolver(preconditioner=None, maxiter=100, restart=100)
+        results2 = wntr.sim.WNTRSimulator(wn).run_sim(solver_options={"LINEAR_SOLVER": linear_solver})
+        self.assertTrue(results2.solver_statistics["fill_in"].isna().all())
+        self.assertGreater(results2.solver_statistics["krylov_iterations"].sum(),
+                           results2.solver_statistics["iterations"].sum())
+        self.assertLess(abs(results1.node["head"] - results2.node["head"]).max().max(), 1e-6)
+
+    def test_dense(self):
+        np.random.seed(0)
+        J = sp.csr_matrix(np.random.rand(10, 10) + 10 * np.eye(10))
+        b = np.random.rand(10)
+        lu_cache = SparseLUCache()
+        x = DenseLUSolver().solve(J, b, None, lu_cache)
+        self.assertAlmostEqual(np.abs(J @ x - b).max(), 0, 12)
+        self.assertAlmostEqual(lu_cache.fill_in, 1)
+        factor = DenseLUSolver(max_size=5).factorize(J, None, lu_cache)
+        self.assertAlmostEqual(np.abs(J @ factor.solve(b) - b).max(), 0, 12)
+        self.assertEqual(lu_cache.num_symbolic, 1)
+        self.assertRaises(sp.linalg.MatrixRankWarning, DenseLUSolver().factorize,
+                          sp.csr_matrix(np.ones((3, 3))), None, lu_cache)
+
+    def test_options(self):
+        self.assertRaises(ValueError, NewtonSolver, {"LINEAR_SOLVER": "cholesky"})
+        self.assertRaises(ValueError, IterativeSolver, method="cg")
+        self.assertRaises(ValueError, IterativeSolver, preconditioner="jacobi")
+        self.assertIsInstance(NewtonSolver().linear_solver, DirectLUSolver)
+        self.assertFalse(NewtonSolver({"REUSE_SYMBOLIC": False}).linear_solver.reuse_symbolic)
+
+
+class TestSolverStatistics(unittest.TestCase):
+    def test_lu_cache_statistics(self):
+        inp_file = join(ex_datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 6 * 3600
+        sim = wntr.sim.WNTRSimulator(wn)
+        results = sim.run_sim()
+        stats = results.solver_statistics
+        self.assertEqual(list(stats.columns), ["time", "trial", "iterations", "lu_symbolic", "lu_numeric", "lu_reused",
+                                               "full_restructures", "incremental_restructures", "start_point", "iterations_without_predictor",
+                                               "linear_solve_time", "fill_in", "krylov_iterations"])
+        self.assertGreater(stats["linear_solve_time"].sum(), 0)
+        self.assertGreater(stats["fill_in"].min(), 1)
+        self.assertEqual(stats["krylov_iterations"].sum(), 0)
+        self.assertGreater(stats["lu_numeric"].sum(), 0)
+        self.assertEqual((stats["lu_symbolic"] + stats["lu_numeric"]).sum(), stats["iterations"].sum())
+        self.assertEqual(stats["lu_reused"].sum(), 0)
+
+    def test_profile(self):
+        inp_file = join(ex_datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 6 * 3600
+        results = wntr.sim.WNTRSimulator(wn).run_sim()
+        self.assertIsNone(results.profile)
+
+        records = []
+        wn.reset_initial_values()
+        results = wntr.sim.WNTRSimulator(wn).run_sim(profile_callback=records.append)
+        profile = results.profile
+        stats = results.solver_statistics
+        self.assertEqual(len(profile), len(records))
+        self.assertEqual(list(profile["time"]), list(stats["time"]))
+        self.assertEqual(list(profile["iterations"]), list(stats["iterations"]))
+        self.assertEqual(list(profile["full_restructures"]), list(stats["full_restructures"]))
+        self.assertGreaterEqual(profile["line_search_steps"].sum(), profile["iterations"].sum())
+        self.assertGreater(profile["solve"].sum(), 0)
+        self.assertTrue((profile["presolve_controls"] >= 0).all())
+        self.assertEqual(records[-1]["time"], profile["time"].iloc[-1])
+
+    def test_chord(self):
+        inp_file = join(ex_datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 12 * 3600
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim()
+        wn.reset_initial_values()
+        results2 = wntr.sim.WNTRSimulator(wn).run_sim(solver_options={"CHORD": True})
+        stats1 = results1.solver_statistics
+        stats2 = results2.solver_statistics
+        self.assertGreater(stats2["lu_reused"].sum(), 0)
+        self.assertLess((stats2["lu_symbolic"] + stats2["lu_numeric"]).sum(),
+                        (stats1["lu_symbolic"] + stats1["lu_numeric"]).sum())
+        self.assertLess(abs(results1.node["head"] - results2.node["head"]).max().max(), 1e-3)
+        self.assertLess(abs(results1.link["flowrate"] - results2.link["flowrate"]).max().max(), 1e-5)
+
+    def test_predictor(self):
+        inp_file = join(ex_datadir, "Net3.inp")
+        wn = wntr.network.WaterNetworkModel(inp_file)
+        wn.options.time.duration = 2 * 24 * 3600
+        results1 = wntr.sim.WNTRSimulator(wn).run_sim()
+        for predictor in ["linear", "secant"]:
+            wn.reset_initial_values()
+            results2 = wntr.sim.WNTRSimulator(wn).run_sim(predictor=predictor)
+            stats = results2.solver_statistics
+            self.assertIn("library", set(stats["start_point"]))
+            self.assertIn("extrapolation", set(stats["start_point"]))
+            predicted = stats["start_point"] != "previous"
+            self.assertTrue((stats["iterations_without_predictor"][~predicted] == stats["iterations"][~predicted]).all())
+            self.assertLess(stats["iterations"][predicted].sum(), stats["iterations_without_predictor"][predicted].sum())
+            self.assertLess(stats["iterations"].sum(), results1.solver_statistics["iterations"].sum())
+            self.assertLess(abs(results1.node["head"] - results2.node["head"]).max().max(), 1e-3)
+            self.assertLess(abs(results1.link["flowrate"] - results2.link["flowrate"]).max().max(), 1e-5)
+
+        wn.reset_initial_values()
+        self.assertRaises(ValueError, wntr.sim.WNTRSimulator(wn).run_sim, predictor="quadratic")
+
+
+if __name__ == "__main__":
+    unittest.main()